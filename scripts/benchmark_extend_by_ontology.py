@@ -0,0 +1,92 @@
+"""Benchmark propagating gene sets up the GO hierarchy.
+
+Every GO term in the INDRA bio ontology gets a random set of genes and the
+mapping is extended with :func:`indra_cogex.client.enrichment.utils.extend_by_ontology`.
+With ``--legacy``, the previous implementation, which looked up the
+transitive children of every term separately, is run on the same mapping
+and its results are compared.
+
+Usage::
+
+    python scripts/benchmark_extend_by_ontology.py --terms 5000 --legacy
+"""
+
+import argparse
+import copy
+import random
+import time
+
+from indra.databases.identifiers import get_ns_id_from_identifiers
+from indra.ontology.bio import bio_ontology
+
+from indra_cogex.client.enrichment.utils import extend_by_ontology
+from indra_cogex.representation import norm_id
+
+
+def legacy_extend_by_ontology(gene_set_mapping):
+    """Extend the gene set mapping one term at a time."""
+    for curie, name in gene_set_mapping:
+        graph_ns, graph_id = curie.split(":", maxsplit=1)
+        db_ns, db_id = get_ns_id_from_identifiers(graph_ns, graph_id)
+        for child_ns, child_id in bio_ontology.get_children(db_ns, db_id):
+            child_name = bio_ontology.get_name(child_ns, child_id)
+            gene_set_mapping[curie, name] |= gene_set_mapping.get(
+                (norm_id(child_ns, child_id), child_name), set()
+            )
+
+
+def get_random_go_mapping(n_terms=None, n_genes=20000, max_genes=50, seed=0):
+    """Assign random genes to GO terms."""
+    rng = random.Random(seed)
+    nodes = sorted(
+        bio_ontology.get_ns_id(node)
+        for node in bio_ontology.nodes
+        if node.startswith("GO:")
+    )
+    if n_terms is not None and n_terms < len(nodes):
+        nodes = rng.sample(nodes, n_terms)
+    genes = [str(gene) for gene in range(n_genes)]
+    return {
+        (norm_id(db_ns, db_id), bio_ontology.get_name(db_ns, db_id)): set(
+            rng.sample(genes, rng.randint(1, max_genes))
+        )
+        for db_ns, db_id in nodes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--terms", type=int, help="The number of GO terms to use. Default: all."
+    )
+    parser.add_argument(
+        "--genes", type=int, default=20000, help="The size of the gene universe."
+    )
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also run and compare with the per-term implementation.",
+    )
+    args = parser.parse_args()
+
+    bio_ontology.initialize()
+    mapping = get_random_go_mapping(n_terms=args.terms, n_genes=args.genes)
+    print(f"{len(mapping)} GO terms, {sum(map(len, mapping.values()))} annotations")
+
+    extended = copy.deepcopy(mapping)
+    start = time.perf_counter()
+    extend_by_ontology(extended)
+    print(f"extend_by_ontology: {time.perf_counter() - start:.2f} s")
+
+    if args.legacy:
+        legacy = copy.deepcopy(mapping)
+        start = time.perf_counter()
+        legacy_extend_by_ontology(legacy)
+        print(f"legacy: {time.perf_counter() - start:.2f} s")
+        missing = sum(len(legacy[key] - extended[key]) for key in mapping)
+        added = sum(len(extended[key] - legacy[key]) for key in mapping)
+        print(f"genes only found by legacy: {missing}, only by new: {added}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark serializing a large query API response.
+
+A response with random relations (as returned by, e.g., the subnetwork
+queries) and their statements is serialized with
+:func:`indra_cogex.apps.serialization.dumps` and the way it was done before,
+converting each object with ``to_json()`` and encoding the result with the
+standard library like :func:`flask.jsonify` does.
+
+Usage::
+
+    python scripts/benchmark_serialization.py --relations 10000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from indra.statements import Agent, Evidence, Phosphorylation
+
+from indra_cogex.apps.serialization import dumps
+from indra_cogex.representation import Relation
+
+
+def get_relations(n, seed=0):
+    """Make random INDRA relations."""
+    rng = random.Random(seed)
+    return [
+        Relation(
+            "HGNC", str(rng.randint(1, 50000)),
+            "HGNC", str(rng.randint(1, 50000)),
+            "indra_rel",
+            {
+                "stmt_hash": rng.getrandbits(63),
+                "stmt_type": "Phosphorylation",
+                "evidence_count": rng.randint(1, 100),
+                "belief": rng.random(),
+                "source_counts": '{"reach": 2, "sparser": 1}',
+                "has_database_evidence": False,
+            },
+            source_name=f"GENE{i}",
+            target_name=f"GENE{i + 1}",
+        )
+        for i in range(n)
+    ]
+
+
+def get_statements(n):
+    """Make statements with a few evidences each."""
+    return [
+        Phosphorylation(
+            Agent(f"GENE{i}"),
+            Agent(f"GENE{i + 1}"),
+            evidence=[
+                Evidence(source_api="reach", pmid=str(i + j), text="A phosphorylates B")
+                for j in range(3)
+            ],
+        )
+        for i in range(n)
+    ]
+
+
+def legacy_dumps(objects):
+    """Serialize like jsonify(process_result(...)) did."""
+    return json.dumps(
+        [obj.to_json() for obj in objects], sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def benchmark(name, func, objects, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(objects)
+        times.append(time.perf_counter() - start)
+    print(f"{name}: {min(times) * 1000:.1f} ms, {len(body) / 1024 ** 2:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--relations", type=int, default=10000)
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    relations = get_relations(args.relations)
+    print(f"{len(relations)} relations")
+    benchmark("legacy", legacy_dumps, relations, args.repeat)
+    benchmark("dumps", dumps, relations, args.repeat)
+
+    statements = get_statements(args.statements)
+    print(f"{len(statements)} statements")
+    benchmark("legacy", legacy_dumps, statements, args.repeat)
+    benchmark("dumps", dumps, statements, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,8 @@ from indra_cogex.client.enrichment.discrete import (
     kinase_ora,
 )
 from indra_cogex.client.enrichment.signed import reverse_causal_reasoning
+from indra_cogex.analysis.jobs import report_progress
+from indra_cogex.analysis.result_cache import cache_analysis_result
 from indra.databases.hgnc_client import is_kinase, is_transcription_factor
 from indra.databases import uniprot_client
 
@@ -36,6 +38,7 @@ logger = logging.getLogger(__name__)
 
 
 @autoclient()
+@cache_analysis_result(unordered=("gene_list", "background_gene_list"))
 def discrete_analysis(
     gene_list: List[str],
     method: str = 'fdr_bh',
@@ -102,6 +105,7 @@ def discrete_analysis(
         ("indra-upstream", indra_upstream_ora),
         ("indra-downstream", indra_downstream_ora)
     ]:
+        report_progress(f"Running {analysis_name} analysis")
         # Non-INDRA ORAs
         if analysis_name in {"go", "wikipathways", "reactome", "phenotype"}:
             analysis_result = analysis_func(
@@ -140,6 +144,7 @@ def discrete_analysis(
 
     # Optimized statement metadata enrichment
     if indra_path_analysis:
+        report_progress("Adding statement metadata")
         results = enrich_with_optimized_metadata(
             results=results,
             gene_set=gene_set,
@@ -152,6 +157,7 @@ def discrete_analysis(
 
 
 @autoclient()
+@cache_analysis_result(unordered=("positive_genes", "negative_genes"))
 def signed_analysis(
     positive_genes: List[str],
     negative_genes: List[str],
@@ -257,6 +263,7 @@ def signed_analysis(
 
 
 @autoclient()
+@cache_analysis_result()
 def continuous_analysis(
     gene_names: List[str],
     log_fold_change: List[str],
@@ -369,6 +376,7 @@ def continuous_analysis(
 
 
 @autoclient()
+@cache_analysis_result(unordered=("phosphosite_list", "background"))
 def kinase_analysis(
     phosphosite_list: List[str],
     alpha: float = 0.05,
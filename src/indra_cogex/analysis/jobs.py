@@ -0,0 +1,559 @@
+"""A persistent queue for running long analyses in the background.
+
+Gene set, source-target and kinase analyses can take longer than a web
+request should, so the web apps submit them here and poll for their status
+and result instead. Jobs are stored in a SQLite file in the app cache, so
+every web server worker on a machine sees the same jobs, and each worker
+process runs claimed jobs on a small pool of threads. A user can only have a
+limited number of queued or running jobs at a time, and finished jobs are
+deleted after they expire.
+
+The pool size, the per-user limit and the expiry time (in seconds) can be
+set with the ``INDRA_COGEX_JOB_WORKERS``, ``INDRA_COGEX_JOB_USER_LIMIT`` and
+``INDRA_COGEX_JOB_EXPIRY`` configuration values.
+"""
+
+import importlib
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Union
+
+from indra.config import get_config
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+from indra_cogex.client.neo4j_client import Neo4jClient
+
+__all__ = [
+    "JOB_DB_PATH",
+    "JOB_FUNCTIONS",
+    "JobQueue",
+    "JobError",
+    "JobLimitError",
+    "JobCancelled",
+    "get_job_queue",
+    "report_progress",
+]
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = APP_CACHE_MODULE.join(name="analysis_jobs.db")
+
+#: The analyses that can be run as jobs, by name, as ``module:function``
+JOB_FUNCTIONS = {
+    "discrete_analysis": "indra_cogex.analysis.gene_analysis:discrete_analysis",
+    "signed_analysis": "indra_cogex.analysis.gene_analysis:signed_analysis",
+    "continuous_analysis": "indra_cogex.analysis.gene_analysis:continuous_analysis",
+    "kinase_analysis": "indra_cogex.analysis.gene_analysis:kinase_analysis",
+    "metabolite_discrete_analysis": (
+        "indra_cogex.analysis.metabolite_analysis:metabolite_discrete_analysis"
+    ),
+    "source_target_analysis": (
+        "indra_cogex.analysis.source_targets_explanation:source_target_analysis"
+    ),
+}
+
+#: The default number of jobs run at the same time by each process
+DEFAULT_WORKERS = 2
+#: The default number of queued or running jobs a user can have
+DEFAULT_USER_LIMIT = 3
+#: The default number of seconds a finished job is kept
+DEFAULT_EXPIRY = 24 * 60 * 60
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_JOB_QUEUE: Dict[Path, "JobQueue"] = {}
+_JOB_QUEUE_LOCK = threading.Lock()
+_CURRENT_JOB = threading.local()
+
+
+class JobError(ValueError):
+    """Raised when a job can't be submitted or its result isn't available."""
+
+
+class JobLimitError(JobError):
+    """Raised when a user already has the maximum number of active jobs."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when it has been cancelled."""
+
+
+def _get_config_number(key: str, default: float) -> float:
+    value = get_config(key)
+    return float(value) if value else default
+
+
+def _resolve_function(path: str) -> Callable:
+    module_name, function_name = path.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _get_worker_token(pid: int) -> str:
+    """Get an identifier of a process that isn't shared with a reused pid."""
+    token = f"{socket.gethostname()}:{pid}"
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            # The start time of the process, after the command name which
+            # may contain spaces
+            start = fh.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return token
+    return f"{token}:{start}"
+
+
+def _is_worker_alive(pid: Optional[int], worker: Optional[str]) -> bool:
+    if pid is None:
+        return False
+    if worker is None:
+        # Jobs claimed before worker tokens were recorded
+        return _is_alive(pid)
+    if worker.split(":", 1)[0] != socket.gethostname():
+        # The pid belongs to another host sharing the file, which recovers
+        # its own jobs
+        return True
+    return _is_alive(pid) and _get_worker_token(pid) == worker
+
+
+class JobQueue:
+    """A queue of analysis jobs in a SQLite file run by a thread pool."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        *,
+        workers: int = DEFAULT_WORKERS,
+        user_limit: int = DEFAULT_USER_LIMIT,
+        expiry: float = DEFAULT_EXPIRY,
+        functions: Optional[Mapping[str, Union[str, Callable]]] = None,
+        client: Optional[Neo4jClient] = None,
+    ):
+        """Initialize the queue, creating the file if needed.
+
+        Jobs left running by a process that no longer exists are marked as
+        failed and jobs left queued are picked up by this queue.
+
+        Parameters
+        ----------
+        path :
+            The path to the SQLite file.
+        workers :
+            The number of jobs run at the same time by this process.
+        user_limit :
+            The number of queued or running jobs a user can have.
+        expiry :
+            The number of seconds a finished job is kept.
+        functions :
+            A mapping from job function names to functions or their
+            ``module:function`` paths. Defaults to :data:`JOB_FUNCTIONS`.
+        client :
+            The client passed to the job functions. If not given, the
+            functions create their own.
+        """
+        self.path = Path(path)
+        self.user_limit = user_limit
+        self.expiry = expiry
+        self.functions = dict(JOB_FUNCTIONS if functions is None else functions)
+        self.client = client
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, "
+                "user TEXT NOT NULL, function TEXT NOT NULL, "
+                "parameters BLOB NOT NULL, status TEXT NOT NULL, progress TEXT, "
+                "cancel_requested INTEGER NOT NULL DEFAULT 0, result BLOB, "
+                "error TEXT, pid INTEGER, created REAL NOT NULL, started REAL, "
+                "finished REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user, status)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "worker" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+        conn.close()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="analysis-job"
+        )
+        self._recover()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _recover(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        running = conn.execute(
+            "SELECT id, pid, worker FROM jobs WHERE status = ?", (RUNNING,)
+        ).fetchall()
+        now = time.time()
+        interrupted = [
+            (FAILED, "Interrupted", now, job_id)
+            for job_id, pid, worker in running
+            if not _is_worker_alive(pid, worker)
+        ]
+        conn.executemany(
+            "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+            interrupted,
+        )
+        (queued,) = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+        ).fetchone()
+        conn.execute("COMMIT")
+        conn.close()
+        if interrupted:
+            logger.warning("Marked %d interrupted jobs as failed", len(interrupted))
+        for _ in range(queued):
+            self._executor.submit(self._run_next)
+
+    def submit(self, function: str, parameters: Mapping[str, Any], user: str) -> str:
+        """Queue a job.
+
+        Parameters
+        ----------
+        function :
+            The name of the job function, e.g., ``discrete_analysis``.
+        parameters :
+            The keyword arguments of the function, which must be picklable.
+        user :
+            The user submitting the job, e.g., an email or IP address.
+
+        Returns
+        -------
+        :
+            The ID of the job.
+
+        Raises
+        ------
+        JobError
+            If the function is unknown.
+        JobLimitError
+            If the user already has the maximum number of active jobs.
+        """
+        if function not in self.functions:
+            raise JobError(
+                f"Unknown job function: {function}. Must be one of "
+                f"{', '.join(sorted(self.functions))}."
+            )
+        self.expire()
+        job_id = uuid.uuid4().hex
+        blob = pickle.dumps(dict(parameters), protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            (active,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user = ? AND status IN (?, ?)",
+                (user, QUEUED, RUNNING),
+            ).fetchone()
+            if active >= self.user_limit:
+                conn.execute("ROLLBACK")
+                raise JobLimitError(
+                    f"{user} already has {active} active jobs, the maximum is "
+                    f"{self.user_limit}."
+                )
+            conn.execute(
+                "INSERT INTO jobs (id, user, function, parameters, status, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, user, function, blob, QUEUED, time.time()),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        self._executor.submit(self._run_next)
+        return job_id
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the status of a job.
+
+        Parameters
+        ----------
+        job_id :
+            The ID of the job.
+
+        Returns
+        -------
+        :
+            A dict with the keys ``id``, ``user``, ``function``, ``status``
+            (one of ``queued``, ``running``, ``finished``, ``failed`` or
+            ``cancelled``), ``progress``, ``error``, ``created``, ``started``,
+            ``finished`` and, for queued jobs, ``position`` (the number of
+            jobs ahead of it). None if there is no such job.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, user, function, status, progress, error, created, "
+            "started, finished FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            conn.close()
+            return None
+        keys = (
+            "id", "user", "function", "status", "progress", "error", "created",
+            "started", "finished",
+        )
+        rv = dict(zip(keys, row))
+        if rv["status"] == QUEUED:
+            (rv["position"],) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?",
+                (QUEUED, rv["created"]),
+            ).fetchone()
+        conn.close()
+        return rv
+
+    def get_result(self, job_id: str) -> Any:
+        """Get the result of a finished job.
+
+        Parameters
+        ----------
+        job_id :
+            The ID of the job.
+
+        Returns
+        -------
+        :
+            The return value of the job function.
+
+        Raises
+        ------
+        KeyError
+            If there is no such job.
+        JobError
+            If the job hasn't finished successfully.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT status, result, error FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        conn.close()
+        if row is None:
+            raise KeyError(job_id)
+        status, blob, error = row
+        if status == FAILED:
+            raise JobError(f"Job {job_id} failed: {error}")
+        if status != FINISHED:
+            raise JobError(f"Job {job_id} is {status}")
+        return pickle.loads(blob)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job.
+
+        Queued jobs are cancelled right away and running jobs stop the next
+        time they call :func:`report_progress`.
+
+        Parameters
+        ----------
+        job_id :
+            The ID of the job.
+
+        Returns
+        -------
+        :
+            True if the job was queued or running, False otherwise.
+        """
+        conn = self._connect()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED),
+        )
+        if not cursor.rowcount:
+            cursor = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+        conn.close()
+        return bool(cursor.rowcount)
+
+    def set_progress(self, job_id: str, progress: str) -> bool:
+        """Record the progress of a running job.
+
+        Parameters
+        ----------
+        job_id :
+            The ID of the job.
+        progress :
+            A description of the current step of the job.
+
+        Returns
+        -------
+        :
+            True if the job has been cancelled and should stop.
+        """
+        conn = self._connect()
+        conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+        row = conn.execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        conn.close()
+        return bool(row and row[0])
+
+    def expire(self) -> int:
+        """Delete finished, failed and cancelled jobs older than the expiry time.
+
+        Returns
+        -------
+        :
+            The number of deleted jobs.
+        """
+        conn = self._connect()
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished < ?",
+            (FINISHED, FAILED, CANCELLED, time.time() - self.expiry),
+        )
+        conn.close()
+        return cursor.rowcount
+
+    def shutdown(self, wait: bool = True):
+        """Stop the thread pool of this queue.
+
+        Parameters
+        ----------
+        wait :
+            Whether to wait for the running jobs to finish.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _claim(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, function, parameters FROM jobs WHERE status = ? "
+                "ORDER BY created LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                pid = os.getpid()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started = ?, pid = ?, worker = ? "
+                    "WHERE id = ?",
+                    (RUNNING, time.time(), pid, _get_worker_token(pid), row[0]),
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return row
+
+    def _finish(self, job_id: str, status: str, result=None, error=None):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? "
+            "WHERE id = ?",
+            (status, result, error, time.time(), job_id),
+        )
+        conn.close()
+
+    def _run_next(self):
+        try:
+            row = self._claim()
+        except sqlite3.Error as err:
+            logger.warning("Could not claim a job: %s", err)
+            return
+        if row is None:
+            return
+        job_id, function, blob = row
+        _CURRENT_JOB.job = (self, job_id)
+        try:
+            func = self.functions[function]
+            if isinstance(func, str):
+                func = _resolve_function(func)
+            parameters = pickle.loads(blob)
+            if self.client is not None:
+                parameters["client"] = self.client
+            rv = func(**parameters)
+            result = pickle.dumps(rv, protocol=pickle.HIGHEST_PROTOCOL)
+        except JobCancelled:
+            logger.info("Job %s was cancelled", job_id)
+            self._finish(job_id, CANCELLED)
+        except Exception as err:
+            logger.exception("Job %s failed", job_id)
+            self._finish(job_id, FAILED, error=str(err) or type(err).__name__)
+        else:
+            self._finish(job_id, FINISHED, result=result)
+        finally:
+            _CURRENT_JOB.job = None
+
+
+def get_job_queue(
+    path: Union[None, str, Path] = None, *, client: Optional[Neo4jClient] = None
+) -> JobQueue:
+    """Get the job queue of this process, starting it if needed.
+
+    Parameters
+    ----------
+    path :
+        The path to the SQLite file. Defaults to :data:`JOB_DB_PATH`.
+    client :
+        The client passed to the job functions, only used when the queue is
+        started.
+
+    Returns
+    -------
+    :
+        The job queue.
+    """
+    path = Path(path) if path else JOB_DB_PATH
+    with _JOB_QUEUE_LOCK:
+        if path not in _JOB_QUEUE:
+            _JOB_QUEUE[path] = JobQueue(
+                path,
+                workers=int(_get_config_number("INDRA_COGEX_JOB_WORKERS", DEFAULT_WORKERS)),
+                user_limit=int(
+                    _get_config_number("INDRA_COGEX_JOB_USER_LIMIT", DEFAULT_USER_LIMIT)
+                ),
+                expiry=_get_config_number("INDRA_COGEX_JOB_EXPIRY", DEFAULT_EXPIRY),
+                client=client,
+            )
+    return _JOB_QUEUE[path]
+
+
+def report_progress(progress: str):
+    """Record the progress of the job running in this thread, if any.
+
+    Analyses call this between their steps. It does nothing when the
+    analysis isn't run as a job.
+
+    Parameters
+    ----------
+    progress :
+        A description of the current step.
+
+    Raises
+    ------
+    JobCancelled
+        If the job has been cancelled.
+    """
+    job = getattr(_CURRENT_JOB, "job", None)
+    if job is None:
+        return
+    queue, job_id = job
+    try:
+        cancelled = queue.set_progress(job_id, progress)
+    except sqlite3.Error as err:
+        logger.warning("Could not record the progress of job %s: %s", job_id, err)
+        return
+    if cancelled:
+        raise JobCancelled(job_id)
@@ -10,11 +10,13 @@ from indra_cogex.client.enrichment.mla import (
     metabolomics_ora,
 )
 from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
+from indra_cogex.analysis.result_cache import cache_analysis_result
 
 logger = logging.getLogger(__name__)
 
 
 @autoclient()
+@cache_analysis_result(unordered=("metabolites",))
 def metabolite_discrete_analysis(
         metabolites: List[str],
         method: str = "fdr_bh",
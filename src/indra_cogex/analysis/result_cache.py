@@ -0,0 +1,401 @@
+"""A persistent cache for the results of gene, metabolite and kinase analyses.
+
+Results are stored in a SQLite file in the app cache, so they are shared by
+all web server workers on a machine, keyed by a fingerprint of the analysis,
+its canonicalized arguments and the version of the data it ran on (the
+loaded graph and the enrichment SQLite cache). The total size of the stored
+results is bounded by evicting the least recently used entries, and hits and
+misses are counted in the same file. Lookups only read the file: each
+process collects the access times and counts of its lookups and writes them
+with its next result, or after :data:`ACCESS_FLUSH_INTERVAL` seconds.
+
+The maximum size (in megabytes) can be set with the
+``INDRA_COGEX_RESULT_CACHE_SIZE`` configuration value, where 0 disables the
+cache.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+from indra.config import get_config
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+from indra_cogex.client.enrichment.utils import SQLITE_CACHE_PATH
+from indra_cogex.client.graph_stats import get_cached_graph_version
+from indra_cogex.client.neo4j_client import Neo4jClient
+
+__all__ = [
+    "RESULT_CACHE_PATH",
+    "ResultCache",
+    "cache_analysis_result",
+    "get_result_cache",
+    "get_fingerprint",
+]
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_PATH = APP_CACHE_MODULE.join(name="analysis_result_cache.db")
+
+#: The default maximum total size of cached results in megabytes
+DEFAULT_MAX_SIZE_MB = 512
+
+#: How many seconds the accesses of lookups are collected before being written
+ACCESS_FLUSH_INTERVAL = 30
+
+_RESULT_CACHE: Dict[Path, "ResultCache"] = {}
+
+
+class ResultCache:
+    """A size bounded LRU cache of pickled results in a SQLite file."""
+
+    def __init__(self, path: Union[str, Path], max_size: int):
+        """Initialize the cache, creating the file if needed.
+
+        Parameters
+        ----------
+        path :
+            The path to the SQLite file.
+        max_size :
+            The maximum total size of the stored results in bytes.
+        """
+        self.path = Path(path)
+        self.max_size = max_size
+        self._accesses: Dict[str, float] = {}
+        self._counts: Counter = Counter()
+        self._flushed = time.time()
+        self._lock = threading.Lock()
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                "value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_access "
+                "ON results (last_access)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters "
+                "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _flush_accesses(self, conn: sqlite3.Connection):
+        """Write the collected access times and counts of lookups."""
+        with self._lock:
+            accesses, counts = self._accesses, self._counts
+            self._accesses, self._counts = {}, Counter()
+            self._flushed = time.time()
+        conn.executemany(
+            "UPDATE results SET last_access = MAX(last_access, ?) WHERE key = ?",
+            [(accessed, key) for key, accessed in accesses.items()],
+        )
+        conn.executemany(
+            "INSERT INTO counters VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            list(counts.items()),
+        )
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Look up a result.
+
+        Parameters
+        ----------
+        key :
+            The fingerprint of the result.
+
+        Returns
+        -------
+        :
+            A pair of whether the result was found and the result (None if
+            not found).
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        now = time.time()
+        with self._lock:
+            if row is None:
+                self._counts["misses"] += 1
+            else:
+                self._accesses[key] = now
+                self._counts["hits"] += 1
+            flush = now - self._flushed > ACCESS_FLUSH_INTERVAL
+        if flush:
+            conn = self._connect()
+            try:
+                with conn:
+                    self._flush_accesses(conn)
+            except sqlite3.Error as err:
+                logger.warning("Could not record result cache accesses: %s", err)
+            finally:
+                conn.close()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """Store a result and evict least recently used ones above the size limit.
+
+        Parameters
+        ----------
+        key :
+            The fingerprint of the result.
+        value :
+            The result, which must be picklable.
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_size:
+            logger.info("Result of %d bytes is too large to cache", len(blob))
+            return
+        conn = self._connect()
+        with conn:
+            # Evictions go by the accesses of all lookups so far
+            self._flush_accesses(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            (total,) = conn.execute("SELECT SUM(size) FROM results").fetchone()
+            if total > self.max_size:
+                evict = []
+                for old_key, size in conn.execute(
+                    "SELECT key, size FROM results ORDER BY last_access"
+                ):
+                    if total <= self.max_size:
+                        break
+                    evict.append((old_key,))
+                    total -= size
+                conn.executemany("DELETE FROM results WHERE key = ?", evict)
+                conn.execute(
+                    "INSERT INTO counters VALUES ('evictions', ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (len(evict),),
+                )
+        conn.close()
+
+    def clear(self):
+        """Remove all results and reset the counters."""
+        with self._lock:
+            self._accesses, self._counts = {}, Counter()
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM counters")
+        conn.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the hit, miss and eviction counts and the size of the cache.
+
+        Returns
+        -------
+        :
+            A dict with the keys ``hits``, ``misses``, ``evictions``,
+            ``entries`` and ``size`` (in bytes).
+        """
+        conn = self._connect()
+        with conn:
+            self._flush_accesses(conn)
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        conn.close()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "size": size,
+        }
+
+
+def get_result_cache(path: Union[None, str, Path] = None) -> Optional[ResultCache]:
+    """Get the analysis result cache of this process.
+
+    Parameters
+    ----------
+    path :
+        The path to the SQLite file. Defaults to :data:`RESULT_CACHE_PATH`.
+
+    Returns
+    -------
+    :
+        The cache, or None if it is disabled or can't be opened.
+    """
+    path = Path(path) if path else RESULT_CACHE_PATH
+    if path not in _RESULT_CACHE:
+        max_size_mb = get_config("INDRA_COGEX_RESULT_CACHE_SIZE")
+        max_size_mb = float(max_size_mb) if max_size_mb else DEFAULT_MAX_SIZE_MB
+        if max_size_mb <= 0:
+            return None
+        try:
+            _RESULT_CACHE[path] = ResultCache(path, int(max_size_mb * 1024 ** 2))
+        except sqlite3.Error as err:
+            logger.warning("Could not open the result cache at %s: %s", path, err)
+            return None
+    return _RESULT_CACHE[path]
+
+
+def _get_data_version(client: Neo4jClient) -> Optional[str]:
+    """Get the version of the graph and the enrichment cache results depend on."""
+    graph_version = get_cached_graph_version(client)
+    if graph_version is None:
+        return None
+    sqlite_version = (
+        str(SQLITE_CACHE_PATH.stat().st_mtime) if SQLITE_CACHE_PATH.exists() else ""
+    )
+    return f"{graph_version}|{sqlite_version}"
+
+
+def _canonicalize(value: Any, unordered: bool = False) -> Any:
+    """Turn a value into a JSON serializable value that is the same for equal values.
+
+    Raises
+    ------
+    TypeError
+        If the value or any value it contains isn't a mapping, sequence, set,
+        string, number, boolean, None or NumPy scalar or array.
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, Mapping):
+        # Keys are encoded as JSON so that, e.g., 1 and "1" stay apart
+        return {
+            json.dumps(_canonicalize(k), sort_keys=True): _canonicalize(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (set, frozenset)):
+        unordered = True
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonicalize(v) for v in value]
+        if unordered:
+            items = sorted(set(json.dumps(v, sort_keys=True) for v in items))
+        return items
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    raise TypeError(
+        f"Can't make a result cache key from a value of type {type(value).__name__}"
+    )
+
+
+def get_fingerprint(
+    name: str,
+    arguments: Mapping[str, Any],
+    version: str,
+    unordered: Iterable[str] = (),
+) -> str:
+    """Get a canonical hash of an analysis run.
+
+    Parameters
+    ----------
+    name :
+        The name of the analysis.
+    arguments :
+        The arguments of the analysis.
+    version :
+        The version of the data the analysis runs on.
+    unordered :
+        The names of arguments whose order doesn't matter, e.g., gene lists.
+        These are deduplicated and sorted.
+
+    Returns
+    -------
+    :
+        A SHA-256 hex digest.
+
+    Raises
+    ------
+    TypeError
+        If an argument has a type that has no canonical encoding.
+    """
+    unordered = set(unordered)
+    canonical = {
+        key: _canonicalize(value, unordered=key in unordered)
+        for key, value in arguments.items()
+    }
+    blob = json.dumps([name, version, canonical], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cache_analysis_result(*, unordered: Iterable[str] = ()):
+    """Wrap an analysis function so its results are stored in the result cache.
+
+    The wrapped function must take a keyword-only ``client`` argument and
+    the decorator goes below :func:`indra_cogex.client.neo4j_client.autoclient`.
+
+    Parameters
+    ----------
+    unordered :
+        The names of arguments whose order doesn't affect the result, e.g.,
+        gene lists.
+
+    Returns
+    -------
+    :
+        A decorator object that will wrap the function
+    """
+    unordered = frozenset(unordered)
+
+    def _decorator(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def _wrapped(*args, **kwargs):
+            cache = get_result_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            client = arguments.pop("client")
+            version = _get_data_version(client)
+            if version is None:
+                return func(*args, **kwargs)
+
+            try:
+                key = get_fingerprint(name, arguments, version, unordered=unordered)
+            except TypeError as err:
+                logger.warning("Not caching the result of %s: %s", name, err)
+                return func(*args, **kwargs)
+            try:
+                hit, rv = cache.get(key)
+            except (sqlite3.Error, pickle.UnpicklingError) as err:
+                logger.warning("Could not read from the result cache: %s", err)
+                hit, rv = False, None
+            if hit:
+                return rv
+
+            rv = func(*args, **kwargs)
+            try:
+                cache.put(key, rv)
+            except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError) as err:
+                logger.warning("Could not write to the result cache: %s", err)
+            return rv
+
+        return _wrapped
+
+    return _decorator
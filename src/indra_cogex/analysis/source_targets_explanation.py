@@ -36,6 +36,7 @@ from ..client.enrichment.discrete import (
     wikipathways_ora
 )
 from .gene_analysis import discrete_analysis
+from .jobs import report_progress
 
 logger = logging.getLogger(__name__)
 
@@ -624,6 +625,7 @@ def run_explain_downstream_analysis(
         os.makedirs(output_dir)
 
     # 1. Get statements and create visualizations
+    report_progress("Get statements and create visualizations")
     stmts_df, filtered_df = get_stmts_from_source(source_hgnc_id, target_proteins=target_hgnc_ids)
 
     # Create and convert interaction plot
@@ -702,6 +704,7 @@ def run_explain_downstream_analysis(
                 json.dump(stmt_data, f, default=str, indent=2)
 
     # 2. Run discrete analysis
+    report_progress("Run discrete analysis")
     hgnc_map = {hgnc_id: hgnc_client.get_hgnc_name(hgnc_id) for hgnc_id in target_hgnc_ids}
     discrete_result = discrete_analysis(hgnc_map, client=client)
     results['discrete_analysis'] = discrete_result
@@ -710,6 +713,7 @@ def run_explain_downstream_analysis(
             json.dump(discrete_result, f, default=str, indent=2)
 
     # 3. Find shared pathways
+    report_progress("Find shared pathways")
     shared_pathways_result = shared_pathways_between_gene_sets([source_hgnc_id], target_hgnc_ids)
     results['shared_pathways'] = shared_pathways_result
     if output_dir:
@@ -717,6 +721,7 @@ def run_explain_downstream_analysis(
             json.dump(shared_pathways_result, f, default=str, indent=2)
 
     # 4. Analyze protein families
+    report_progress("Analyze protein families")
     shared_families_result = shared_protein_families(target_hgnc_ids, source_hgnc_id)
     results['protein_families'] = shared_families_result
     if output_dir:
@@ -724,6 +729,7 @@ def run_explain_downstream_analysis(
             json.dump(shared_families_result, f, default=str, indent=2)
 
     # 5. GO terms analysis
+    report_progress("GO terms analysis")
     source_go_terms, _ = get_go_terms_for_source(source_hgnc_id)
     shared_go_df = find_shared_go_terms(source_go_terms, target_hgnc_ids)
     results['go_terms'] = {
@@ -745,6 +751,7 @@ def run_explain_downstream_analysis(
             shared_go_df.to_html(os.path.join(go_terms_dir, 'shared_terms.html'))
 
     # 6. Additional analyses
+    report_progress("Additional analyses")
     shared_proteins, shared_entities = shared_upstream_bioentities_from_targets(
         stmts_df,
         target_hgnc_ids
@@ -762,6 +769,7 @@ def run_explain_downstream_analysis(
             json.dump(shared_entities, f, default=str, indent=2)
 
     # 7. Get combined pathway analysis
+    report_progress("Get combined pathway analysis")
     pathways_df = combine_target_gene_pathways(source_hgnc_id, target_hgnc_ids)
     results['combined_pathways'] = pathways_df
     if output_dir and not pathways_df.empty:
@@ -770,6 +778,7 @@ def run_explain_downstream_analysis(
         pathways_df.to_html(os.path.join(output_dir, 'combined_pathways.html'))
 
     # 8. Create analysis plots
+    report_progress("Create analysis plots")
     if not shared_go_df.empty and not shared_entities.empty:
         # graph_boxplots now returns base64 string directly
         results['analysis_plot'] = graph_boxplots(shared_go_df, shared_entities)
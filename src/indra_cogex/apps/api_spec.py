@@ -0,0 +1,341 @@
+"""A cached specification of the functions exposed by the query API.
+
+Building the query API needs the signature and the parsed docstring of each
+of its ~200 functions, which means importing every module that defines them,
+including the analysis modules and their scientific stack, before the app can
+serve anything. :func:`get_api_spec` instead keeps the short and full
+docstrings, the parameters and the return type of each function in a JSON
+file in the app cache, keyed by a fingerprint of the source files of the
+modules, so the app only imports and parses them when one of those files
+changed. The functions themselves are looked up with :class:`LazyFunctions`,
+which imports a function's module when the function is first called.
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from importlib.machinery import PathFinder
+from inspect import isfunction, signature
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+
+__all__ = [
+    "API_SPEC_PATH",
+    "SPEC_FORMAT_VERSION",
+    "DECORATOR_MODULES",
+    "LazyFunctions",
+    "get_source_fingerprint",
+    "compute_function_spec",
+    "get_api_spec",
+]
+
+logger = logging.getLogger(__name__)
+
+API_SPEC_PATH = APP_CACHE_MODULE.join(name="query_api_spec.json")
+
+#: Increment this when the layout of the spec changes
+SPEC_FORMAT_VERSION = 1
+
+#: The modules of the decorators wrapping the query functions, which change
+#: their signatures and docstrings, e.g., ``autoclient`` and the analysis
+#: result cache
+DECORATOR_MODULES = (
+    "indra_cogex.client.neo4j_client",
+    "indra_cogex.analysis.result_cache",
+)
+
+#: A function taking a function and the parameters to skip and returning its
+#: short and full docstring, see :func:`indra_cogex.apps.queries_web.helpers.get_docstring`
+DocstringFunc = Callable[..., Tuple[str, str]]
+
+
+class LazyFunctions(Mapping):
+    """A mapping of function names to functions importing their modules on access.
+
+    Parameters
+    ----------
+    module_functions :
+        Pairs of the name of a module and the name of a function in it.
+    """
+
+    def __init__(self, module_functions: Iterable[Tuple[str, str]]):
+        self.module_names: Dict[str, str] = {
+            func_name: module_name for module_name, func_name in module_functions
+        }
+        self._functions: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, func_name: str) -> Callable:
+        func = self._functions.get(func_name)
+        if func is not None:
+            return func
+        module_name = self.module_names[func_name]
+        with self._lock:
+            if func_name not in self._functions:
+                module = importlib.import_module(module_name)
+                self._functions[func_name] = getattr(module, func_name)
+            return self._functions[func_name]
+
+    def __contains__(self, func_name) -> bool:
+        # Unlike Mapping's, this doesn't import the module
+        return func_name in self.module_names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.module_names)
+
+    def __len__(self) -> int:
+        return len(self.module_names)
+
+    def is_loaded(self, func_name: str) -> bool:
+        """Get if a function was already imported."""
+        return func_name in self._functions
+
+
+def _get_source_path(module_name: str) -> Optional[Path]:
+    """Find the source file of a module without importing it or its packages."""
+    module = sys.modules.get(module_name)
+    if module is not None and getattr(module, "__file__", None):
+        return Path(module.__file__)
+    search_path = None
+    spec = None
+    for part in module_name.split("."):
+        spec = PathFinder.find_spec(part, search_path)
+        if spec is None:
+            return None
+        search_path = spec.submodule_search_locations
+    if spec is None or not spec.has_location:
+        return None
+    return Path(spec.origin)
+
+
+def get_source_fingerprint(module_names: Iterable[str], extra: Any = None) -> str:
+    """Get a fingerprint of the source files of the given modules.
+
+    Parameters
+    ----------
+    module_names :
+        The names of the modules.
+    extra :
+        Any other JSON-serializable data the fingerprint should depend on.
+
+    Returns
+    -------
+    :
+        A hex digest changing whenever any of the source files or the extra
+        data change.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([SPEC_FORMAT_VERSION, extra], sort_keys=True).encode())
+    for module_name in sorted(set(module_names)):
+        digest.update(module_name.encode())
+        path = _get_source_path(module_name)
+        if path is None or not path.is_file():
+            logger.warning(f"Could not find the source of {module_name}")
+            continue
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def _to_json_value(value: Any) -> Any:
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    return value
+
+
+def _type_to_str(annotation: Any) -> str:
+    return str(annotation).replace("typing.", "")
+
+
+def compute_function_spec(
+    func: Any,
+    func_name: str,
+    skip_params: Set[str],
+    get_docstring: DocstringFunc,
+) -> Optional[Dict[str, Any]]:
+    """Get the specification of a function exposed by the query API.
+
+    Parameters
+    ----------
+    func :
+        The function.
+    func_name :
+        The name of the function.
+    skip_params :
+        The parameters to leave out of the docstring.
+    get_docstring :
+        The function getting the short and full docstring of a function.
+
+    Returns
+    -------
+    :
+        The short and full docstring, the parameters other than ``client``
+        with their type, default and if they are required, and the return
+        type. None if the object isn't a function taking a ``client``.
+
+    Raises
+    ------
+    ValueError
+        If the docstring of the function is incomplete.
+    """
+    if not isfunction(func):
+        return None
+    func_sig = signature(func)
+    if "client" not in func_sig.parameters:
+        return None
+    try:
+        short_doc, doc = get_docstring(func, skip_params=skip_params)
+    except ValueError as err:
+        raise ValueError(
+            f"Error processing docstring for function '{func_name}': {err}"
+        ) from err
+    parameters = {}
+    for param_name, param in func_sig.parameters.items():
+        if param_name == "client":
+            continue
+        required = param.default is param.empty
+        parameters[param_name] = {
+            "type": _type_to_str(param.annotation),
+            "required": required,
+            "default": None if required else _to_json_value(param.default),
+        }
+    return {
+        "short_doc": short_doc,
+        "doc": doc,
+        "parameters": parameters,
+        "return_type": _type_to_str(func_sig.return_annotation),
+    }
+
+
+def _load_spec(path: Path, fingerprint: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as fh:
+            spec = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if (
+        spec.get("version") != SPEC_FORMAT_VERSION
+        or spec.get("fingerprint") != fingerprint
+    ):
+        return None
+    return spec["functions"]
+
+
+def _write_spec(path: Path, spec: Dict[str, Any]):
+    """Write the spec to a temporary file first so readers never see half of it."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(spec, fh, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as err:
+        logger.warning(f"Could not write the API spec to {path}: {err}")
+
+
+def get_api_spec(
+    module_functions: List[Tuple[str, str]],
+    get_docstring: DocstringFunc,
+    *,
+    skip_global: Set[str],
+    skip_arguments: Mapping[str, Set[str]],
+    functions: Optional[Mapping[str, Callable]] = None,
+    source_modules: Iterable[str] = (),
+    path: Union[None, str, Path] = None,
+    skip_errors: bool = False,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Get the specification of each function exposed by the query API.
+
+    The specification is read from the cached file if it was written for
+    the same source files and parameters, and computed and cached
+    otherwise.
+
+    Parameters
+    ----------
+    module_functions :
+        Pairs of the name of a module and the name of a function in it.
+    get_docstring :
+        The function getting the short and full docstring of a function.
+    skip_global :
+        The parameters to leave out of every docstring.
+    skip_arguments :
+        The parameters to leave out of the docstring, by function name.
+    functions :
+        The functions by name. Defaults to a :class:`LazyFunctions` over
+        ``module_functions``, only used if the cache is outdated.
+    source_modules :
+        The names of other modules whose source affects the specification,
+        e.g., the one defining ``get_docstring``. The modules in
+        :data:`DECORATOR_MODULES` are always included.
+    path :
+        The path of the cached file. Defaults to :data:`API_SPEC_PATH`.
+    skip_errors :
+        If True, functions whose docstring can't be processed get no
+        specification instead of raising an error.
+
+    Returns
+    -------
+    :
+        The specification of each function by name, see
+        :func:`compute_function_spec`.
+    """
+    path = Path(path) if path else API_SPEC_PATH
+    fingerprint = get_source_fingerprint(
+        [module_name for module_name, _ in module_functions]
+        + list(source_modules)
+        + list(DECORATOR_MODULES),
+        extra={
+            "functions": [list(pair) for pair in module_functions],
+            "skip_global": sorted(skip_global),
+            "skip_arguments": {
+                name: sorted(params) for name, params in skip_arguments.items()
+            },
+            "skip_errors": skip_errors,
+        },
+    )
+    spec = _load_spec(path, fingerprint)
+    if spec is not None:
+        return spec
+
+    logger.info("Building the query API specification")
+    if functions is None:
+        functions = LazyFunctions(module_functions)
+    spec = {}
+    for _, func_name in module_functions:
+        try:
+            spec[func_name] = compute_function_spec(
+                functions[func_name],
+                func_name,
+                skip_global | skip_arguments.get(func_name, set()),
+                get_docstring,
+            )
+        except (ValueError, AttributeError) as err:
+            if not skip_errors:
+                raise
+            logger.debug("Skipping %s: %s", func_name, err)
+            spec[func_name] = None
+    _write_spec(
+        path,
+        {"version": SPEC_FORMAT_VERSION, "fingerprint": fingerprint, "functions": spec},
+    )
+    return spec
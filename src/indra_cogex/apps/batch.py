@@ -0,0 +1,183 @@
+"""Running many query API calls in a single request.
+
+Clients that would otherwise send hundreds of small requests, e.g., one
+``is_gene_in_tissue`` call per gene, can send a list of ``{"function": ...,
+"params": {...}}`` items to ``/api/batch`` instead. The items run on a
+bounded thread pool shared by all batch requests of the process and identical
+items are only run once. Each batch only has a few items queued or running on
+the pool at a time, so one large batch can't hold up the items of all other
+batches until it is done. The response has one entry per item, in order, with
+either the ``result`` or the ``error`` and its HTTP ``status``.
+
+The number of threads, the maximum number of items of a batch and the maximum
+number of items of a batch on the pool at a time can be set with the
+``INDRA_COGEX_BATCH_WORKERS``, ``INDRA_COGEX_BATCH_MAX_SIZE`` and
+``INDRA_COGEX_BATCH_MAX_IN_FLIGHT`` configuration values.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from indra.config import get_config
+
+from indra_cogex.apps.query_limits import AdmissionError
+from indra_cogex.client.query_budget import QueryCancelledError, QueryTimeoutError
+
+__all__ = [
+    "run_batch",
+    "get_batch_executor",
+    "get_batch_max_size",
+    "get_batch_max_in_flight",
+]
+
+logger = logging.getLogger(__name__)
+
+#: The default number of threads running batch items
+DEFAULT_WORKERS = 8
+#: The default maximum number of items in a batch
+DEFAULT_MAX_SIZE = 1000
+#: The default maximum number of items of a batch queued or running at a time
+DEFAULT_MAX_IN_FLIGHT = 4
+
+_EXECUTOR: Dict[str, ThreadPoolExecutor] = {}
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Get the thread pool running batch items in this process.
+
+    Returns
+    -------
+    :
+        The thread pool, created on first use.
+    """
+    with _EXECUTOR_LOCK:
+        if "default" not in _EXECUTOR:
+            workers = get_config("INDRA_COGEX_BATCH_WORKERS")
+            _EXECUTOR["default"] = ThreadPoolExecutor(
+                max_workers=int(workers) if workers else DEFAULT_WORKERS,
+                thread_name_prefix="batch",
+            )
+    return _EXECUTOR["default"]
+
+
+def get_batch_max_size() -> int:
+    """Get the maximum number of items in a batch.
+
+    Returns
+    -------
+    :
+        The maximum number of items.
+    """
+    max_size = get_config("INDRA_COGEX_BATCH_MAX_SIZE")
+    return int(max_size) if max_size else DEFAULT_MAX_SIZE
+
+
+def get_batch_max_in_flight() -> int:
+    """Get the maximum number of items of a batch queued or running at a time.
+
+    Returns
+    -------
+    :
+        The maximum number of items.
+    """
+    max_in_flight = get_config("INDRA_COGEX_BATCH_MAX_IN_FLIGHT")
+    return int(max_in_flight) if max_in_flight else DEFAULT_MAX_IN_FLIGHT
+
+
+def run_batch(
+    items: Sequence[Mapping[str, Any]],
+    call: Callable[[str, Mapping[str, Any]], Any],
+    executor: Executor,
+    max_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Run the items of a batch concurrently.
+
+    Parameters
+    ----------
+    items :
+        The items of the batch, each with the name of a ``function`` and its
+        ``params``.
+    call :
+        The function running a single item given the function name and the
+        parameters and returning its JSON-serializable result. It raises a
+        ValueError for invalid items.
+    executor :
+        The executor to run the items on.
+    max_size :
+        The maximum number of items.
+    max_in_flight :
+        The maximum number of items submitted to the executor and not done
+        yet. Further items are submitted as earlier ones finish. If None,
+        all items are submitted at once.
+
+    Returns
+    -------
+    :
+        One dict per item, in the order of the items, either with the
+        ``result`` of the item or with an ``error`` message and the HTTP
+        ``status`` for it. Items rejected because too many heavy queries
+        are running also have the seconds after which to ``retry_after``.
+
+    Raises
+    ------
+    ValueError
+        If the batch isn't a list of items with function names or has too
+        many items.
+    """
+    if not isinstance(items, list):
+        raise ValueError("The batch has to be a list of items")
+    if max_size is not None and len(items) > max_size:
+        raise ValueError(f"The batch has {len(items)} items, the maximum is {max_size}")
+
+    keys = []
+    unique = {}
+    for i, item in enumerate(items):
+        if not isinstance(item, Mapping) or not isinstance(item.get("function"), str):
+            raise ValueError(f"Item {i} of the batch has no function name")
+        params = item.get("params") or {}
+        if not isinstance(params, Mapping):
+            raise ValueError(f"The params of item {i} of the batch aren't an object")
+        # Identical items share one run
+        key = json.dumps([item["function"], params], sort_keys=True)
+        keys.append(key)
+        unique.setdefault(key, (item["function"], params))
+    semaphore = threading.Semaphore(max_in_flight) if max_in_flight else None
+    futures = {}
+    for key, (func_name, params) in unique.items():
+        if semaphore is not None:
+            semaphore.acquire()
+        futures[key] = executor.submit(call, func_name, params)
+        if semaphore is not None:
+            futures[key].add_done_callback(lambda _: semaphore.release())
+
+    results = []
+    for key in keys:
+        try:
+            results.append({"result": futures[key].result()})
+        except (ValueError, TypeError) as err:
+            results.append({"error": str(err), "status": HTTPStatus.BAD_REQUEST.value})
+        except AdmissionError as err:
+            results.append({
+                "error": str(err),
+                "status": HTTPStatus.TOO_MANY_REQUESTS.value,
+                "retry_after": err.retry_after,
+            })
+        except QueryTimeoutError as err:
+            results.append({"error": str(err), "status": HTTPStatus.GATEWAY_TIMEOUT.value})
+        except QueryCancelledError as err:
+            results.append({
+                "error": str(err), "status": HTTPStatus.SERVICE_UNAVAILABLE.value
+            })
+        except Exception as err:
+            logger.exception(err)
+            results.append({
+                "error": "Internal server error",
+                "status": HTTPStatus.INTERNAL_SERVER_ERROR.value,
+            })
+    return results
@@ -1 +1,2 @@
 from .curation_cache import *
+from .store import *
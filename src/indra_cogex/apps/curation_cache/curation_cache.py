@@ -6,61 +6,315 @@ The curation cache should handle:
     - Submitting curations to the curation database
     - Update the in memory cache when curations are submitted or at regular
       intervals
+
+The curations are refreshed on a background thread of each process, so no
+request waits for the full download. A refresh only processes the curations
+whose IDs it hasn't seen before and then swaps in a new list together with
+indexes by statement hash and evidence hash. If curations were deleted from
+the curation database, the refresh replaces all curations instead. Curations submitted through the
+cache are visible immediately, before the next refresh picks them up from
+the curation database.
+
+With a :class:`~indra_cogex.apps.curation_cache.store.CurationStore`, the
+worker processes of a host share one download of the curations, see
+:mod:`indra_cogex.apps.curation_cache.store`.
+
+Every new snapshot of the curations bumps :attr:`CurationCache.version`.
+Views derived from the curations, like the set of curated statement hashes,
+are computed once per snapshot and shared by all requests, so they must not
+be modified.
 """
 
+import logging
+import os
+import threading
+import time
 from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import DefaultDict, Dict, List, Optional, Set, Union
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import dateutil.parser
-import pandas as pd
 from indra.sources.indra_db_rest import get_curations, submit_curation
 
+from .store import CurationStore
+
 __all__ = [
     "CurationCache",
     "Curation",
     "Curations",
 ]
 
+logger = logging.getLogger(__name__)
+
 Curation = Dict[str, Union[str, int, None]]
 Curations = List[Curation]
+#: The curations with positions of curations by pa_hash and by source_hash
+CurationIndex = Tuple[Curations, int, Dict[int, List[int]], Dict[int, List[int]]]
+
+
+def _as_set(hashes: Union[int, Iterable[int]]) -> Set[int]:
+    if isinstance(hashes, int):
+        return {hashes}
+    return set(hashes)
 
 
 class CurationCache:
-    # Todo: store static sets and lists, like the set of all curated
-    #  statement hashes, for direct return instead of looping the curations
-    #  every time it's requested (unless refreshed of course)
     update_interval: timedelta
     last_update: datetime
     curation_list: Curations
-    curations_df: pd.DataFrame
+    version: int
 
     def __init__(
         self,
         update_interval: timedelta = timedelta(minutes=30),
+        store: Optional[CurationStore] = None,
+        poll_interval: timedelta = timedelta(seconds=10),
     ):
+        """Initialize the cache and load the curations.
+
+        Parameters
+        ----------
+        update_interval :
+            How often new curations are downloaded.
+        store :
+            A store shared with the other processes of the host. If given,
+            the curations are loaded from it and only the process holding
+            its lock downloads new ones.
+        poll_interval :
+            How often the shared store is checked for new curations.
+        """
         self.update_interval = update_interval
+        self.poll_interval = poll_interval
+        self.last_update = datetime.min
         self.curation_list = []
-        self.refresh_curations()
+        self._store = store
+        self._store_version = 0
+        self._store_generation = 0
+        self._upstream: Curations = []
+        self._known_ids: Set[int] = set()
+        # Curations submitted through this cache with the time they were
+        # submitted, until a refresh gets them from the curation database
+        self._pending: List[Tuple[datetime, Curation]] = []
+        self._index: Optional[CurationIndex] = None
+        self.version = 0
+        self._derived: Optional[Tuple[int, Curations, int, Dict[Any, Any]]] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresher_pid: Optional[int] = None
+        self._stop = threading.Event()
+        if store is None:
+            self.refresh_curations()
+        elif not self._sync_from_store():
+            self._load_empty_store()
 
     def refresh_curations(self):
-        """Refresh the curation cache"""
-        self.curation_list: Curations = [
-            self._process_curation(curation) for curation in get_curations()
-        ]
-        self.curations_df = self._get_curation_df(self.curation_list)
-        self.last_update = datetime.utcnow()
+        """Refresh the curation cache with the curations not seen before
 
-    @staticmethod
-    def _get_curation_df(curations) -> pd.DataFrame:
-        rv = pd.DataFrame(curations).astype(
-            dtype={
-                "id": pd.Int64Dtype(),
-                "pa_hash": pd.Int64Dtype(),
-                "source_hash": pd.Int64Dtype(),
-            }
+        If curations seen before are missing from the curation database,
+        e.g., because they were deleted, all curations are replaced.
+        """
+        with self._refresh_lock:
+            if self._store is not None:
+                # Know all curations of the store to tell which were deleted
+                self._sync_from_store()
+            started = datetime.utcnow()
+            curations = get_curations()
+            deleted = self._known_ids - {curation["id"] for curation in curations}
+            new_curations = [
+                self._process_curation(curation)
+                for curation in curations
+                if deleted or curation["id"] not in self._known_ids
+            ]
+            if self._store is not None:
+                # Go through the store so all processes get the same order
+                # and the same time of the last update
+                if deleted:
+                    self._store.replace(new_curations, started)
+                else:
+                    self._store.add(new_curations, started)
+                self._sync_from_store()
+            else:
+                self._merge_curations(new_curations, started, replace=bool(deleted))
+                self.last_update = datetime.utcnow()
+        if deleted:
+            logger.info(
+                f"Replaced the curations in the cache, {len(deleted)} were deleted"
+            )
+        elif new_curations:
+            logger.info(f"Added {len(new_curations)} curations to the cache")
+
+    def _sync_from_store(self) -> bool:
+        """Load the curations added to the shared store by any process.
+
+        Returns
+        -------
+        :
+            True if there were curations to load.
+        """
+        version, curations, generation = self._store.read(
+            after=self._store_version, generation=self._store_generation
         )
-        return rv
+        replaced = generation != self._store_generation
+        fetched = self._store.get_fetched()
+        self._store_version = version
+        self._store_generation = generation
+        self._merge_curations(curations, fetched, replace=replaced)
+        if fetched is not None and fetched > self.last_update:
+            self.last_update = fetched
+        return bool(curations) or replaced
+
+    def _load_empty_store(self, timeout: float = 300):
+        """Fill an empty shared store, or wait for another process to do it."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._store.acquire_refresh_lock():
+                # Release the lock again, it's taken for good by the
+                # background refresh, which may run in a forked process
+                try:
+                    self.refresh_curations()
+                finally:
+                    self._store.release_refresh_lock()
+                return
+            time.sleep(1)
+            if self._sync_from_store():
+                return
+        logger.warning("Timed out waiting for the curation store to be filled")
+        self.refresh_curations()
+
+    def _merge_curations(
+        self,
+        curations: Curations,
+        fetched: Optional[datetime],
+        replace: bool = False,
+    ):
+        with self._lock:
+            if replace:
+                self._upstream = []
+                self._known_ids = set()
+            new_curations = [
+                curation for curation in curations
+                if curation["id"] not in self._known_ids
+            ]
+            self._known_ids.update(curation["id"] for curation in new_curations)
+            # Curations submitted before the download started are in it
+            pending = [
+                (submitted, curation)
+                for submitted, curation in self._pending
+                if fetched is None or submitted >= fetched
+            ]
+            if (
+                not replace
+                and not new_curations
+                and len(pending) == len(self._pending)
+                and self.version
+            ):
+                return
+            self._upstream = self._upstream + new_curations
+            self._pending = pending
+            self._swap_curations()
+
+    def _swap_curations(self):
+        # Build the new list and its index before making them visible, so
+        # readers always see a complete snapshot
+        curations = self._upstream + [curation for _, curation in self._pending]
+        self._index = self._build_index(curations)
+        self.curation_list = curations
+        self.version += 1
+
+    @staticmethod
+    def _build_index(curations: Curations) -> CurationIndex:
+        by_pa_hash: DefaultDict[int, List[int]] = defaultdict(list)
+        by_source_hash: DefaultDict[int, List[int]] = defaultdict(list)
+        for position, curation in enumerate(curations):
+            by_pa_hash[curation["pa_hash"]].append(position)
+            by_source_hash[curation["source_hash"]].append(position)
+        return curations, len(curations), dict(by_pa_hash), dict(by_source_hash)
+
+    def _get_index(self) -> CurationIndex:
+        curations = self.curation_list
+        index = self._index
+        # Rebuild the index if the list was replaced or extended in place
+        if index is None or index[0] is not curations or index[1] != len(curations):
+            index = self._build_index(curations)
+            self._index = index
+        return index
+
+    def _get_derived(
+        self, name: str, only_most_recent: bool, compute: Callable[[Curations], Any]
+    ) -> Any:
+        """Get a view of the curations, computing it once per snapshot."""
+        curation_list = self.curation_list
+        memo = self._derived
+        # The list is also compared in case it was replaced or extended in place
+        if (
+            memo is None
+            or memo[0] != self.version
+            or memo[1] is not curation_list
+            or memo[2] != len(curation_list)
+        ):
+            memo = (self.version, curation_list, len(curation_list), {})
+            self._derived = memo
+        views = memo[3]
+        key = (name, only_most_recent)
+        if key not in views:
+            views[key] = compute(
+                self.get_curation_cache(only_most_recent=only_most_recent)
+            )
+        return views[key]
+
+    def _ensure_refresher(self):
+        """Start the background refresh in this process if it isn't running.
+
+        The check is per process since threads don't survive forking, e.g.,
+        when gunicorn preloads the app.
+        """
+        pid = os.getpid()
+        if self._refresher_pid == pid:
+            return
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher_pid = pid
+            self._stop = threading.Event()
+            thread = threading.Thread(
+                target=self._refresh_loop, name="curation-cache-refresh", daemon=True
+            )
+            thread.start()
+
+    def _refresh_loop(self):
+        stop = self._stop
+        interval = self.update_interval if self._store is None else self.poll_interval
+        while not stop.wait(interval.total_seconds()):
+            try:
+                if self._store is None:
+                    self.refresh_curations()
+                elif self._store.acquire_refresh_lock() and (
+                    self.last_update + self.update_interval < datetime.utcnow()
+                    or self._store.is_refresh_requested(self.last_update)
+                ):
+                    self.refresh_curations()
+                else:
+                    self._sync_from_store()
+            except Exception as err:
+                logger.exception(f"Could not refresh the curation cache: {err}")
+
+    def stop(self):
+        """Stop the background refresh of this process."""
+        self._stop.set()
+        self._refresher_pid = None
 
     @staticmethod
     def _process_curation(curation) -> Curation:
@@ -71,6 +325,11 @@ class CurationCache:
             curation["date"] = dateutil.parser.parse(curation["date"])
         else:
             raise TypeError(f"Unhandled type for date {type(curation['date'])}")
+        # Dates are compared with each other, so they are all naive UTC
+        if curation["date"].tzinfo is not None:
+            curation["date"] = (
+                curation["date"].astimezone(timezone.utc).replace(tzinfo=None)
+            )
         return curation
 
     def get_curation_cache(
@@ -90,19 +349,24 @@ class CurationCache:
         -------
         :
             A list of all curations, potentially filtered if
-            ``only_most_recent`` is set to true.
+            ``only_most_recent`` is set to true. The list is shared and must
+            not be modified.
         """
         if refresh:
             self.refresh_curations()
+        else:
+            self._ensure_refresher()
         if not only_most_recent:
             return self.curation_list
+        return self._get_derived("most_recent", False, self._get_most_recent)
 
+    @classmethod
+    def _get_most_recent(cls, curation_list: Curations) -> Curations:
         # Aggregate all curations by curator/statement/evidence,
         # then only keep the curation with the most recent datetime
-        keys = ("curator", "pa_hash", "source_hash")
         aggregator = defaultdict(list)
-        for curation in self.curation_list:
-            aggregator[self._curation_key(curation)].append(curation)
+        for curation in curation_list:
+            aggregator[cls._curation_key(curation)].append(curation)
         return [
             max(values, key=lambda value: value["date"])
             for values in aggregator.values()
@@ -135,30 +399,35 @@ class CurationCache:
         Returns
         -------
         :
-            A list of curations
+            A list of curations, in the order they are in the cache
         """
         if source_hash is not None and pa_hash is None:
             raise ValueError("Must provide a pa_hash if source_hash is provided")
 
-        # Update the curation cache if it is too old or if asked
-        if refresh or self.last_update + self.update_interval < datetime.utcnow():
+        if refresh:
             self.refresh_curations()
-
-        temp_df = self.curations_df
-        if pa_hash is not None:
-            if isinstance(pa_hash, int):
-                temp_df = temp_df[temp_df.pa_hash == pa_hash]
-            else:
-                # pa_hash is a list
-                temp_df = temp_df[temp_df.pa_hash.isin(pa_hash)]
-        if source_hash is not None:
-            if isinstance(source_hash, int):
-                temp_df = temp_df[temp_df.source_hash == source_hash]
-            else:
-                # source_hash is a list
-                temp_df = temp_df[temp_df.source_hash.isin(source_hash)]
-
-        return temp_df.copy().to_dict(orient="records")
+        else:
+            self._ensure_refresher()
+
+        curations, _, by_pa_hash, by_source_hash = self._get_index()
+        if pa_hash is None:
+            return [dict(curation) for curation in curations]
+
+        pa_hashes = _as_set(pa_hash)
+        if source_hash is None:
+            positions = [
+                position
+                for stmt_hash in pa_hashes
+                for position in by_pa_hash.get(stmt_hash, [])
+            ]
+        else:
+            positions = [
+                position
+                for ev_hash in _as_set(source_hash)
+                for position in by_source_hash.get(ev_hash, [])
+                if curations[position]["pa_hash"] in pa_hashes
+            ]
+        return [dict(curations[position]) for position in sorted(positions)]
 
     def submit_curation(
         self,
@@ -180,15 +449,31 @@ class CurationCache:
             source=source_api,
         )
 
-        # Set last update to older than the update interval to force an
-        # update on the next call
-        self.last_update = (
-            datetime.utcnow() - self.update_interval - timedelta(seconds=1)
-        )
+        # Make the curation visible right away instead of waiting for the
+        # next refresh to download it
+        submitted = datetime.utcnow()
+        curation = {
+            "id": None,
+            "pa_hash": hash_val,
+            "source_hash": int(ev_hash) if ev_hash is not None else None,
+            "tag": tag,
+            "text": text,
+            "curator": email,
+            "source": source_api,
+            "date": submitted,
+        }
+        with self._lock:
+            self._pending.append((submitted, curation))
+            self._swap_curations()
+        if self._store is not None:
+            # Other processes get the curation once it has been downloaded
+            self._store.request_refresh()
 
         return dbid
 
-    def get_correct_evidence_hashes(self, only_most_recent: bool = False) -> Set[int]:
+    def get_correct_evidence_hashes(
+        self, only_most_recent: bool = False
+    ) -> FrozenSet[int]:
         """Get a set of all evidence hashes marked as correct.
 
         Parameters
@@ -203,16 +488,24 @@ class CurationCache:
             A set of evidence hashes (i.e., from the "source_hash" field) that
             have been marked as correct
         """
+        return self._get_derived(
+            "correct_evidence_hashes", only_most_recent, self._get_correct_evidence_hashes
+        )
+
+    @staticmethod
+    def _get_correct_evidence_hashes(curation_list: Curations) -> FrozenSet[int]:
         d: DefaultDict[int, Curations] = defaultdict(list)
-        for curation in self.get_curation_cache(only_most_recent=only_most_recent):
+        for curation in curation_list:
             d[curation["source_hash"]].append(curation)
-        return {
+        return frozenset(
             source_hash
             for source_hash, curations in d.items()
             if any(curation["tag"] == "correct" for curation in curations)
-        }
+        )
 
-    def get_incorrect_evidence_hashes(self, only_most_recent: bool = False) -> Set[int]:
+    def get_incorrect_evidence_hashes(
+        self, only_most_recent: bool = False
+    ) -> FrozenSet[int]:
         """Get a set of all evidence hashes marked as incorrect (undisputed).
 
         Parameters
@@ -227,16 +520,26 @@ class CurationCache:
             A set of evidence hashes (i.e., from the "source_hash" field) that
             have been not been marked incorrect
         """
+        return self._get_derived(
+            "incorrect_evidence_hashes",
+            only_most_recent,
+            self._get_incorrect_evidence_hashes,
+        )
+
+    @staticmethod
+    def _get_incorrect_evidence_hashes(curation_list: Curations) -> FrozenSet[int]:
         d: DefaultDict[int, Curations] = defaultdict(list)
-        for curation in self.get_curation_cache(only_most_recent=only_most_recent):
+        for curation in curation_list:
             d[curation["source_hash"]].append(curation)
-        return {
+        return frozenset(
             source_hash
             for source_hash, curations in d.items()
             if all(curation["tag"] != "correct" for curation in curations)
-        }
+        )
 
-    def get_curated_evidence_hashes(self, only_most_recent: bool = False) -> Set[int]:
+    def get_curated_evidence_hashes(
+        self, only_most_recent: bool = False
+    ) -> FrozenSet[int]:
         """Get a set of all evidence hashes.
 
         Parameters
@@ -251,12 +554,15 @@ class CurationCache:
             A set of all evidence hashes (i.e., from the "source_hash" field) that
             have been curated
         """
-        return {
-            curation["source_hash"]
-            for curation in self.get_curation_cache(only_most_recent=only_most_recent)
-        }
+        return self._get_derived(
+            "curated_evidence_hashes",
+            only_most_recent,
+            lambda curations: frozenset(curation["source_hash"] for curation in curations),
+        )
 
-    def get_correct_statement_hashes(self, only_most_recent: bool = False) -> Set[int]:
+    def get_correct_statement_hashes(
+        self, only_most_recent: bool = False
+    ) -> FrozenSet[int]:
         """Get a set of all statement hashes marked as correct.
 
         Parameters
@@ -271,13 +577,19 @@ class CurationCache:
             A set of statement hashes (i.e., from the "pa_hash" field) that
             have been marked as correct by any curator, for any evidence
         """
-        return {
-            curation["pa_hash"]
-            for curation in self.get_curation_cache(only_most_recent=only_most_recent)
-            if curation["tag"] == "correct"
-        }
+        return self._get_derived(
+            "correct_statement_hashes",
+            only_most_recent,
+            lambda curations: frozenset(
+                curation["pa_hash"]
+                for curation in curations
+                if curation["tag"] == "correct"
+            ),
+        )
 
-    def get_curated_statement_hashes(self, only_most_recent: bool = False) -> Set[int]:
+    def get_curated_statement_hashes(
+        self, only_most_recent: bool = False
+    ) -> FrozenSet[int]:
         """Get the set of all statement hashes that have curated evidence
 
         Parameters
@@ -292,7 +604,41 @@ class CurationCache:
             A set of statement hashes that have any evidence that has been
             curated
         """
-        return {
-            curation["pa_hash"]
-            for curation in self.get_curation_cache(only_most_recent=only_most_recent)
-        }
+        return self._get_derived(
+            "curated_statement_hashes",
+            only_most_recent,
+            lambda curations: frozenset(curation["pa_hash"] for curation in curations),
+        )
+
+    def get_curated_pa_hash_map(
+        self, only_correct: bool = True
+    ) -> Mapping[int, FrozenSet[int]]:
+        """Get the curated evidence hashes of each curated statement hash.
+
+        Parameters
+        ----------
+        only_correct :
+            If True, only include curations tagged as correct.
+
+        Returns
+        -------
+        :
+            A mapping from statement hashes (i.e., from the "pa_hash" field)
+            to the sets of their curated evidence hashes (i.e., from the
+            "source_hash" field)
+        """
+        return self._get_derived(
+            "correct_pa_hash_map" if only_correct else "pa_hash_map",
+            False,
+            lambda curations: self._get_pa_hash_map(curations, only_correct),
+        )
+
+    @staticmethod
+    def _get_pa_hash_map(
+        curation_list: Curations, only_correct: bool
+    ) -> Mapping[int, FrozenSet[int]]:
+        rv: DefaultDict[int, Set[int]] = defaultdict(set)
+        for curation in curation_list:
+            if not only_correct or curation["tag"] == "correct":
+                rv[curation["pa_hash"]].add(curation["source_hash"])
+        return {pa_hash: frozenset(source_hashes) for pa_hash, source_hashes in rv.items()}
@@ -0,0 +1,278 @@
+"""A curation snapshot shared by the worker processes of a host.
+
+Without it, every gunicorn worker downloads all curations on start-up and
+again on its own schedule. With a :class:`CurationStore`, one worker at a
+time (the one holding the store's lock file) downloads new curations and
+appends them to a SQLite file, and all workers load the rows they haven't
+seen yet from that file. Rows are numbered in the order they were added, so
+every worker ends up with the same curations in the same order, and checking
+for changes is a single query of the latest row number.
+
+When curations were deleted from the curation database, the refreshing
+worker replaces all rows of the store in one transaction and increments the
+store's generation, and the workers that read an earlier generation load all
+curations again.
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+
+__all__ = [
+    "CURATION_STORE_PATH",
+    "CurationStore",
+]
+
+CURATION_STORE_PATH = APP_CACHE_MODULE.join(name="curations.db")
+
+
+def _dump_curation(curation) -> str:
+    return json.dumps(
+        {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in curation.items()
+        }
+    )
+
+
+def _to_timestamp(time_utc: datetime) -> float:
+    return time_utc.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _from_timestamp(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _load_curation(blob: str):
+    curation = json.loads(blob)
+    curation["date"] = datetime.fromisoformat(curation["date"])
+    return curation
+
+
+class CurationStore:
+    """Curations in a SQLite file shared between processes."""
+
+    def __init__(self, path: Union[None, str, Path] = None):
+        """Initialize the store, creating the file if needed.
+
+        Parameters
+        ----------
+        path :
+            The path to the SQLite file. Defaults to
+            :data:`CURATION_STORE_PATH`.
+        """
+        self.path = Path(path) if path is not None else CURATION_STORE_PATH
+        self._lock_file = None
+        self._lock_pid: Optional[int] = None
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS curations (seq INTEGER PRIMARY KEY "
+                "AUTOINCREMENT, id INTEGER UNIQUE NOT NULL, curation TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)"
+            )
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get_meta(self, key: str) -> float:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0.0
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: float):
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def acquire_refresh_lock(self) -> bool:
+        """Try to become the process that downloads curations for the host.
+
+        The lock is held until the process exits or releases it.
+
+        Returns
+        -------
+        :
+            True if this process holds the lock.
+        """
+        pid = os.getpid()
+        if self._lock_pid == pid:
+            return True
+        # A lock file inherited from a parent process belongs to the parent
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self._lock_pid = pid
+        return True
+
+    def release_refresh_lock(self):
+        """Let another process download curations for the host."""
+        if self._lock_pid == os.getpid():
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+            self._lock_pid = None
+
+    @staticmethod
+    def _get_generation(conn: sqlite3.Connection) -> int:
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key = 'generation'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def get_version(self) -> int:
+        """Get the number of the latest curation in the store.
+
+        Returns
+        -------
+        :
+            The version, which increases whenever curations are added, or
+            0 if the store is empty.
+        """
+        conn = self._connect()
+        try:
+            (version,) = conn.execute("SELECT MAX(seq) FROM curations").fetchone()
+        finally:
+            conn.close()
+        return version or 0
+
+    def read(self, after: int = 0, generation: int = 0) -> Tuple[int, List[dict], int]:
+        """Read the curations added after a given version.
+
+        Parameters
+        ----------
+        after :
+            The version the caller has already read.
+        generation :
+            The generation of the store the caller has read, i.e., the number
+            of times its curations were replaced.
+
+        Returns
+        -------
+        :
+            The latest version, the curations added after ``after``, in the
+            order they were added, and the generation of the store. If the
+            generation differs from ``generation``, the curations were
+            replaced and all curations of the store are returned.
+        """
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            # Read the generation and the rows from the same snapshot
+            conn.execute("BEGIN")
+            current_generation = self._get_generation(conn)
+            if current_generation != generation:
+                after = 0
+            rows = conn.execute(
+                "SELECT seq, curation FROM curations WHERE seq > ? ORDER BY seq",
+                (after,),
+            ).fetchall()
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        if not rows:
+            return after, [], current_generation
+        return (
+            rows[-1][0],
+            [_load_curation(blob) for _, blob in rows],
+            current_generation,
+        )
+
+    def add(self, curations: List[dict], fetched: datetime):
+        """Add downloaded curations, skipping ones that are already stored.
+
+        Parameters
+        ----------
+        curations :
+            The curations to add.
+        fetched :
+            When the download of the curations started, in UTC.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO curations (id, curation) VALUES (?, ?)",
+                    ((curation["id"], _dump_curation(curation)) for curation in curations),
+                )
+                self._set_meta(conn, "fetched", _to_timestamp(fetched))
+        finally:
+            conn.close()
+
+    def replace(self, curations: List[dict], fetched: datetime):
+        """Replace all stored curations with downloaded ones.
+
+        Parameters
+        ----------
+        curations :
+            All curations of the curation database.
+        fetched :
+            When the download of the curations started, in UTC.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM curations")
+                generation = self._get_generation(conn) + 1
+                conn.executemany(
+                    "INSERT INTO curations (id, curation) VALUES (?, ?)",
+                    ((curation["id"], _dump_curation(curation)) for curation in curations),
+                )
+                self._set_meta(conn, "generation", generation)
+                self._set_meta(conn, "fetched", _to_timestamp(fetched))
+        finally:
+            conn.close()
+
+    def get_fetched(self) -> Optional[datetime]:
+        """Get when the download of the stored curations last started.
+
+        Returns
+        -------
+        :
+            The time in UTC, or None if nothing was downloaded yet.
+        """
+        fetched = self._get_meta("fetched")
+        return _from_timestamp(fetched) if fetched else None
+
+    def request_refresh(self):
+        """Ask the process holding the refresh lock to download curations soon."""
+        conn = self._connect()
+        try:
+            with conn:
+                self._set_meta(conn, "refresh_requested", time.time())
+        finally:
+            conn.close()
+
+    def is_refresh_requested(self, since: datetime) -> bool:
+        """Check if a refresh was requested after a given time.
+
+        Parameters
+        ----------
+        since :
+            The time in UTC of the last refresh.
+
+        Returns
+        -------
+        :
+            True if a refresh was requested after ``since``.
+        """
+        requested = self._get_meta("refresh_requested")
+        return bool(requested) and _from_timestamp(requested) > since
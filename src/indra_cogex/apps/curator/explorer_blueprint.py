@@ -2,6 +2,7 @@
 
 import logging
 import time
+from functools import partial
 from typing import Any, Callable, List, Mapping, Optional, Tuple
 
 import flask
@@ -29,7 +30,10 @@ from indra_cogex.client.curation import (
 from indra_cogex.client.queries import get_stmts_for_mesh, get_stmts_for_stmt_hashes, get_network
 from indra_cogex.client import Neo4jClient
 from .utils import get_conflict_source_counts
+from ..response_cache import get_cached_graph_version
+from ..task_lists import TaskListView, get_task_list_page
 from ..utils import (
+    get_curated_pa_hashes,
     remove_curated_pa_hashes,
     remove_curated_statements,
     render_statements,
@@ -41,6 +45,7 @@ from ...client.neo4j_client import process_identifier
 
 __all__ = [
     "explorer_blueprint",
+    "TASK_LIST_VIEWS",
 ]
 
 logger = logging.getLogger(__name__)
@@ -52,6 +57,28 @@ such that entries appearing earlier should be easier to explore.
 """
 
 
+def _get_task_list_name(task_list: str, include_db_evidence: bool) -> str:
+    return task_list if include_db_evidence else f"{task_list}_without_db_evidence"
+
+
+#: The functions computing the materialized task lists by list name
+TASK_LIST_VIEWS: Mapping[str, TaskListView] = {
+    _get_task_list_name(task_list, include_db_evidence): partial(
+        func, include_db_evidence=include_db_evidence
+    )
+    for task_list, func in [
+        ("ppi", get_ppi_source_counts),
+        ("goa", get_goa_source_counts),
+        ("tf", get_tf_statements),
+        ("kinase", get_kinase_statements),
+        ("phosphatase", get_phosphatase_statements),
+        ("dub", get_dub_statements),
+        ("mirna", get_mirna_statements),
+    ]
+    for include_db_evidence in (True, False)
+}
+
+
 def _database_text(s: str) -> str:
     return f"""\
     INDRA statements already
@@ -288,6 +315,7 @@ def _render_func(
     description: str,
     func_kwargs: Optional[Mapping[str, Any]] = None,
     is_proteocentric=False,
+    task_list: Optional[str] = None,
     **kwargs,
 ) -> Response:
     """Render the evidence counts generated by a function call.
@@ -304,6 +332,11 @@ def _render_func(
         The title of the page
     description :
         The description text to show on the page
+    task_list :
+        The name of the materialized task list holding the function's
+        results, see :data:`TASK_LIST_VIEWS`. If given, the page of the list
+        selected by the ``offset`` and ``limit`` query parameters is shown
+        instead of calling the function.
     kwargs :
         Remaining keyword arguments to forward to :func:`_render_evidence_counts`
 
@@ -319,7 +352,28 @@ def _render_func(
     func_kwargs['include_db_evidence'] = include_db_evidence
 
     start = time.time()
-    stmt_hash_to_source_counts = func(client=client, **(func_kwargs or {}))
+    next_page_url = None
+    if task_list is not None:
+        name = _get_task_list_name(task_list, include_db_evidence)
+        offset = max(request.args.get("offset", type=int, default=0), 0)
+        stmt_hash_to_source_counts, has_more = get_task_list_page(
+            name,
+            TASK_LIST_VIEWS[name],
+            client=client,
+            graph_version=get_cached_graph_version(client),
+            offset=offset,
+            limit=proxies.limit,
+            exclude=(
+                get_curated_pa_hashes() if kwargs.get("filter_curated", True) else ()
+            ),
+        )
+        if has_more:
+            next_page_url = url_for(
+                request.endpoint,
+                **{**request.view_args, **request.args.to_dict(), "offset": offset + proxies.limit},
+            )
+    else:
+        stmt_hash_to_source_counts = func(client=client, **(func_kwargs or {}))
     time_delta = time.time() - start
     logger.info(
         f"got evidence counts for {len(stmt_hash_to_source_counts)} statements in {time_delta:.2f} seconds."
@@ -330,6 +384,7 @@ def _render_func(
         'description': description,
         'include_db_evidence': include_db_evidence,
         'is_proteocentric': is_proteocentric,
+        'next_page_url': next_page_url,
     }
     render_kwargs.update(kwargs)
 
@@ -343,6 +398,7 @@ def _render_evidence_counts(
     description: Optional[str] = None,
     include_db_evidence: bool = True,
     is_proteocentric=False,
+    next_page_url: Optional[str] = None,
 ) -> Response:
     curations = curation_cache.get_curation_cache()
     logger.debug(f"loaded {len(curations):,} curations")
@@ -378,6 +434,7 @@ def _render_evidence_counts(
         source_counts_dict=stmt_hash_to_source_counts,
         include_db_evidence=include_db_evidence,
         is_proteocentric=is_proteocentric,
+        next_page_url=next_page_url,
         # no limit necessary here since it was already applied above
     )
 
@@ -389,6 +446,7 @@ def ppi():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_ppi_source_counts,
+        task_list="ppi",
         title="PPI Explorer",
         description=f"""\
             The protein-protein interaction (PPI) explorer identifies INDRA
@@ -410,6 +468,7 @@ def goa():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_goa_source_counts,
+        task_list="goa",
         title="GO Annotation Explorer",
         description=f"""\
             The Gene Ontology annotation explorer identifiers INDRA statements
@@ -447,6 +506,7 @@ def tf():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_tf_statements,
+        task_list="tf",
         title="Transcription Factor Explorer",
         description=f"""\
             The transcription factor explorer identifies INDRA statements using
@@ -467,6 +527,7 @@ def kinase():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_kinase_statements,
+        task_list="kinase",
         title="Kinase Explorer",
         description=f"""\
             The kinase explorer identifies INDRA statements using INDRA
@@ -487,6 +548,7 @@ def phosphatase():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_phosphatase_statements,
+        task_list="phosphatase",
         title="Phosphatase Explorer",
         description=f"""\
             The phosphatase explorer identifies INDRA statements using INDRA
@@ -507,6 +569,7 @@ def deubiquitinase():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_dub_statements,
+        task_list="dub",
         title="Deubiquitinase Explorer",
         description=f"""\
             The deubiquitinase explorer identifies INDRA statements using INDRA
@@ -527,6 +590,7 @@ def mirna():
     include_db_evidence = request.args.get('include_db_evidence', 'true').lower() == 'true'
     return _render_func(
         get_mirna_statements,
+        task_list="mirna",
         title="miRNA Explorer",
         description=f"""\
             The miRNA explorer identifies INDRA statements using INDRA
@@ -25,7 +25,7 @@ from indra.util.statement_presentation import reverse_source_mappings
 from indralab_auth_tools.auth import resolve_auth
 
 from indra_cogex.apps.proxies import client, curation_cache
-from indra_cogex.apps.queries_web.helpers import process_result
+from indra_cogex.apps.serialization import make_json_response
 from indra_cogex.client.queries import (
     enrich_statements,
     get_evidences_for_stmt_hash,
@@ -35,6 +35,12 @@ from indra_cogex.client.queries import (
 
 from ..constants import LOCAL_VUE, VUE_SRC_CSS, VUE_SRC_JS, sources_dict
 from ..curation_cache import Curations
+from ..statement_pages import (
+    MAX_PAGE_SIZE,
+    REFETCH_EVIDENCE_LIMIT,
+    get_result_store,
+    stmt_row_to_json,
+)
 from ..utils import format_stmts
 from ...representation import Relation
 
@@ -173,7 +179,7 @@ def get_stmts():
         stmt_hash_list_str = request.args.get("stmt_hash")
         stmt_hash_list = map(int, stmt_hash_list_str.split(","))
         stmts = get_stmts_for_stmt_hashes(stmt_hash_list, client=client)
-        return jsonify(process_result(stmts))
+        return make_json_response(stmts)
     except (TypeError, ValueError) as err:
         logger.exception(err)
         abort(Response("Parameter 'stmt_hash' unfilled", status=415))
@@ -307,6 +313,59 @@ def get_evidence(stmt_hash):
         abort(HTTPStatus.INTERNAL_SERVER_ERROR, "Error fetching evidence")
 
 
+@data_display_blueprint.route("/statements/page", methods=["GET"])
+@jwt_required(optional=True)
+def get_statement_page():
+    """Format a page of the statements of a rendered statement list
+
+    The query string has the ``token`` of the statement results given to
+    the page and the comma separated hashes of the statements of the page
+    as ``stmt_hash``, see :mod:`indra_cogex.apps.statement_pages`.
+
+    Returns
+    -------
+    :
+        A JSON object with the formatted ``rows`` of the statements.
+    """
+    user, roles = resolve_auth(dict(request.args))
+    remove_medscan = user is None
+
+    stmt_hash_list_str = request.args.get("stmt_hash", "")
+    try:
+        stmt_hashes = [
+            int(stmt_hash) for stmt_hash in stmt_hash_list_str.split(",") if stmt_hash
+        ]
+    except ValueError:
+        abort(HTTPStatus.BAD_REQUEST, "Statement hashes must be integers")
+    if len(stmt_hashes) > MAX_PAGE_SIZE:
+        abort(HTTPStatus.BAD_REQUEST, f"At most {MAX_PAGE_SIZE} statements per page")
+
+    results = get_result_store().get(request.args.get("token", ""), stmt_hashes)
+    if results is not None and results.remove_medscan == remove_medscan:
+        stmt_rows = format_stmts(
+            stmts=results.get_statements(stmt_hashes),
+            evidence_counts=results.evidence_counts,
+            curations=results.curations,
+            remove_medscan=remove_medscan,
+            source_counts_per_hash=results.source_counts,
+        )
+    else:
+        # The results have expired, get the statements again
+        stmts, evidence_counts = get_stmts_for_stmt_hashes(
+            stmt_hashes,
+            client=client,
+            evidence_limit=REFETCH_EVIDENCE_LIMIT,
+            return_evidence_counts=True,
+        )
+        stmt_rows = format_stmts(
+            stmts=stmts,
+            evidence_counts=evidence_counts,
+            remove_medscan=remove_medscan,
+        )
+    body = '{"rows":[%s]}' % ",".join(map(stmt_row_to_json, stmt_rows))
+    return Response(body, mimetype="application/json")
+
+
 # Serve the statement display template
 @data_display_blueprint.route("/statement_display", methods=["GET"])
 @jwt_required(optional=True)
@@ -69,7 +69,7 @@ species_field = RadioField(
 )
 permutations_field = IntegerField(
     "Permutations",
-    default=100,
+    default=1000,
     validators=[DataRequired()],
     description="The number of permutations used with GSEA",
 )
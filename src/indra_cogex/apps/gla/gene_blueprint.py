@@ -12,20 +12,12 @@ from wtforms.validators import DataRequired
 import io
 
 
-from indra_cogex.analysis.gene_analysis import (
-    discrete_analysis,
-    signed_analysis,
-    continuous_analysis,
-    parse_gene_list,
-    kinase_analysis,
-    parse_phosphosite_list,
-)
 from indra_cogex.apps.constants import INDRA_COGEX_WEB_LOCAL
 from indra_cogex.apps.proxies import client
-from indra_cogex.client.enrichment.discrete import EXAMPLE_GENE_IDS
-from indra_cogex.client.enrichment.signed import (
+from indra_cogex.client.enrichment.examples import (
+    EXAMPLE_GENE_IDS,
     EXAMPLE_NEGATIVE_HGNC_IDS,
-    EXAMPLE_POSITIVE_HGNC_IDS
+    EXAMPLE_POSITIVE_HGNC_IDS,
 )
 from .fields import (
     alpha_field,
@@ -87,6 +79,8 @@ class DiscreteForm(FlaskForm):
     def parse_genes(self) -> Tuple[Mapping[str, str], List[str]]:
         """Resolve the contents of the text field."""
         gene_set = parse_text_field(self.genes.data)
+        from indra_cogex.analysis.gene_analysis import parse_gene_list
+
         return parse_gene_list(gene_set)
 
     def parse_background_genes(self) -> Tuple[Mapping[str, str], List[str]]:
@@ -94,6 +88,8 @@ class DiscreteForm(FlaskForm):
         if not self.background_genes.data:
             return {}, []
         gene_set = parse_text_field(self.background_genes.data)
+        from indra_cogex.analysis.gene_analysis import parse_gene_list
+
         return parse_gene_list(gene_set)
 
 
@@ -111,11 +107,15 @@ class SignedForm(FlaskForm):
     def parse_positive_genes(self) -> Tuple[Mapping[str, str], List[str]]:
         """Resolve the contents of the text field."""
         gene_set = parse_text_field(self.positive_genes.data)
+        from indra_cogex.analysis.gene_analysis import parse_gene_list
+
         return parse_gene_list(gene_set)
 
     def parse_negative_genes(self) -> Tuple[Mapping[str, str], List[str]]:
         """Resolve the contents of the text field."""
         gene_set = parse_text_field(self.negative_genes.data)
+        from indra_cogex.analysis.gene_analysis import parse_gene_list
+
         return parse_gene_list(gene_set)
 
 
@@ -186,6 +186,7 @@ def discretize_analysis():
     -------
     str
         Rendered HTML template."""
+    from indra_cogex.analysis.gene_analysis import discrete_analysis
 
     form = DiscreteForm()
     if form.validate_on_submit():
@@ -249,6 +250,8 @@ def signed_analysis_route():
     -------
     str
         Rendered HTML template."""
+    from indra_cogex.analysis.gene_analysis import signed_analysis
+
     form = SignedForm()
     if form.validate_on_submit():
         positive_genes, positive_errors = form.parse_positive_genes()
@@ -289,6 +292,8 @@ def continuous_analysis_route():
     -------
     str
         Rendered HTML template."""
+    from indra_cogex.analysis.gene_analysis import continuous_analysis
+
     form = ContinuousForm()
     if form.validate_on_submit():
 
@@ -360,6 +365,8 @@ def kinase_analysis_route():
     str
         Rendered HTML template.
     """
+    from indra_cogex.analysis.gene_analysis import kinase_analysis
+
     form = KinaseAnalysisForm()
     if form.validate_on_submit():
         phosphosites = form.parse_phosphosites()
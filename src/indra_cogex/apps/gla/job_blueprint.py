@@ -0,0 +1,86 @@
+"""Blueprint for running analyses as background jobs and polling for results."""
+
+from http import HTTPStatus
+
+import flask
+from flask import abort, jsonify, request, url_for
+
+from indra_cogex.analysis.jobs import JobError, JobLimitError, get_job_queue
+from indra_cogex.apps.proxies import client
+from indra_cogex.apps.queries_web.helpers import ParseError, parse_json
+from indra_cogex.apps.serialization import make_json_response
+from indra_cogex.apps.utils import get_job_user
+
+__all__ = ["job_blueprint"]
+
+job_blueprint = flask.Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+def _get_queue():
+    return get_job_queue(client=client._get_current_object())
+
+
+def _get_own_status(job_id: str):
+    status = _get_queue().get_status(job_id)
+    if status is None or status["user"] != get_job_user():
+        abort(HTTPStatus.NOT_FOUND, f"No job with ID {job_id}")
+    return status
+
+
+@job_blueprint.route("/", methods=["POST"])
+def submit_job():
+    """Submit an analysis as a background job.
+
+    The JSON body has the name of the analysis as ``function`` (e.g.,
+    ``discrete_analysis``) and its arguments as ``parameters``.
+
+    Returns
+    -------
+    :
+        The status of the new job with a 202 status code and a ``Location``
+        header pointing to it.
+    """
+    body = request.get_json(silent=True)
+    if not body or "function" not in body:
+        abort(HTTPStatus.BAD_REQUEST, "Missing function in the JSON body")
+    try:
+        parameters = parse_json(body.get("parameters") or {})
+        job_id = _get_queue().submit(body["function"], parameters, get_job_user())
+    except JobLimitError as err:
+        response = jsonify({"message": str(err)})
+        response.status_code = HTTPStatus.TOO_MANY_REQUESTS
+        return response
+    except (JobError, ParseError, ValueError) as err:
+        abort(HTTPStatus.BAD_REQUEST, str(err))
+    response = jsonify(_get_queue().get_status(job_id))
+    response.status_code = HTTPStatus.ACCEPTED
+    response.headers["Location"] = url_for(".job_status", job_id=job_id)
+    return response
+
+
+@job_blueprint.route("/<job_id>", methods=["GET"])
+def job_status(job_id: str):
+    """Get the status and progress of a job."""
+    return jsonify(_get_own_status(job_id))
+
+
+@job_blueprint.route("/<job_id>/result", methods=["GET"])
+def job_result(job_id: str):
+    """Get the result of a finished job."""
+    _get_own_status(job_id)
+    try:
+        result = _get_queue().get_result(job_id)
+    except KeyError:
+        abort(HTTPStatus.NOT_FOUND, f"No job with ID {job_id}")
+    except JobError as err:
+        abort(HTTPStatus.CONFLICT, str(err))
+    return make_json_response(result)
+
+
+@job_blueprint.route("/<job_id>", methods=["DELETE"])
+def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    _get_own_status(job_id)
+    if not _get_queue().cancel(job_id):
+        abort(HTTPStatus.CONFLICT, f"Job {job_id} has already stopped")
+    return jsonify(_get_queue().get_status(job_id))
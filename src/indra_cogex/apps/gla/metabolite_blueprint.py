@@ -11,12 +11,7 @@ from wtforms import SubmitField, TextAreaField
 from wtforms.validators import DataRequired
 
 from indra_cogex.apps.proxies import client
-from indra_cogex.analysis.metabolite_analysis import (
-    metabolite_discrete_analysis,
-    enzyme_analysis,
-    parse_metabolites,
-)
-from indra_cogex.client.enrichment.mla import EXAMPLE_CHEBI_CURIES
+from indra_cogex.client.enrichment.examples import EXAMPLE_CHEBI_CURIES
 
 from .fields import (
     alpha_field,
@@ -48,6 +43,8 @@ def parse_metabolites_field(s: str) -> Tuple[Dict[str, str], List[str]]:
     Tuple[Dict[str, str], List[str]]
         A tuple containing a dictionary of ChEBI IDs to metabolite names,
         and a list of any metabolite identifiers that couldn't be parsed."""
+    from indra_cogex.analysis.metabolite_analysis import parse_metabolites
+
     records = parse_text_field(s)
     return parse_metabolites(records)
 
@@ -80,6 +77,8 @@ class DiscreteForm(FlaskForm):
 @metabolite_blueprint.route("/discrete", methods=["GET", "POST"])
 def discrete_analysis_route():
     """Render the discrete metabolomic set analysis page."""
+    from indra_cogex.analysis.metabolite_analysis import metabolite_discrete_analysis
+
     form = DiscreteForm()
     if form.validate_on_submit():
         metabolite_chebi_ids, errors = form.parse_metabolites()
@@ -114,6 +113,7 @@ def discrete_analysis_route():
 def enzyme_route(ec_code: str):
     """Render the enzyme page."""
     # Note: jwt_required is needed here because we're rendering a statement page
+    from indra_cogex.analysis.metabolite_analysis import enzyme_analysis
 
     chebi_ids = request.args.get("q").split(",") if "q" in request.args else None
     _, identifier = bioregistry.normalize_parsed_curie("eccode", ec_code)
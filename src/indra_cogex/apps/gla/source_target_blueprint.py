@@ -8,11 +8,6 @@ from wtforms.validators import DataRequired
 
 from indra_cogex.apps.constants import VUE_SRC_JS, VUE_SRC_CSS, sources_dict
 from indra_cogex.apps.proxies import client
-from indra_cogex.analysis.source_targets_explanation import (
-    run_explain_downstream_analysis,
-    get_valid_gene_id,
-    get_valid_gene_ids,
-)
 
 __all__ = [
     "source_target_blueprint",
@@ -72,6 +67,12 @@ def process_target_genes(target_genes_input):
 @jwt_required(optional=True)
 def source_target_analysis_route():
     """Main analysis route."""
+    from indra_cogex.analysis.source_targets_explanation import (
+        run_explain_downstream_analysis,
+        get_valid_gene_id,
+        get_valid_gene_ids,
+    )
+
     form = SourceTargetForm()
 
     # Define example genes for the template
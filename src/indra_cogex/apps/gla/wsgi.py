@@ -2,6 +2,7 @@
 
 """An app for gene list analysis."""
 
+import logging
 import os
 
 from flask import Flask
@@ -10,13 +11,20 @@ from indralab_auth_tools.auth import auth, config_auth
 from more_click import make_web_command
 
 from indra_cogex.apps.constants import INDRA_COGEX_EXTENSION, STATIC_DIR, TEMPLATES_DIR
+from indra_cogex.apps.serialization import JSONProvider
+from indra_cogex.apps.utils import apply_proxy_fix
 
 from .gene_blueprint import gene_blueprint
+from .job_blueprint import job_blueprint
 from .metabolite_blueprint import metabolite_blueprint
 from indra_cogex.apps.gla.source_target_blueprint import source_target_blueprint
 from ...client.neo4j_client import Neo4jClient
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__, template_folder=str(TEMPLATES_DIR), static_folder=STATIC_DIR)
+app.json = JSONProvider(app)
+apply_proxy_fix(app)
 
 bootstrap = Bootstrap4(app)
 
@@ -39,6 +47,8 @@ app.register_blueprint(metabolite_blueprint)
 print("Metabolite registered")
 app.register_blueprint(source_target_blueprint)
 print("Source Target registered")
+app.register_blueprint(job_blueprint)
+logger.info("Jobs registered")
 
 
 def list_routes():
@@ -6,6 +6,22 @@ https://docs.gunicorn.org/en/stable/settings.html#config-file
 import threading
 from indralab_auth_tools.src.database import monitor_database_connection
 
+# Load the app once in the master so the workers share its resources
+preload_app = True
+
+
+def when_ready(server):
+    """Function to run in the master before forking the workers
+
+    See: https://docs.gunicorn.org/en/stable/settings.html#when-ready
+
+    This function loads the resources registered in
+    :mod:`indra_cogex.apps.warmup` so that the workers start warmed up.
+    """
+    from indra_cogex.apps.warmup import warm_up_app
+
+    warm_up_app(server.app.wsgi())
+
 
 def post_fork(server, worker):
     """Function to run after forking a worker
@@ -13,8 +29,13 @@ def post_fork(server, worker):
     See: https://docs.gunicorn.org/en/stable/settings.html#post-fork
 
     This function is called after a worker is forked. It starts a thread to monitor
-    the database connection and reset it if it is lost.
+    the database connection and reset it if it is lost, and starts the worker's
+    own Neo4j connection and background tasks.
     """
     thread = threading.Thread(target=monitor_database_connection, args=(60,), daemon=True)
     thread.start()
     print(f"Started database connection monitor thread in worker {worker.pid}.")
+
+    from indra_cogex.apps.warmup import start_worker
+
+    start_worker(worker.app.wsgi())
@@ -0,0 +1,142 @@
+"""Report how long importing each module takes when starting the web app.
+
+Run with ``python -m indra_cogex.apps.import_profile`` to import the web app
+in a new interpreter with ``-X importtime`` and list the modules that took
+longest to import, either including (``--sort cumulative``) or excluding
+(``--sort self``) the modules they import in turn.
+"""
+
+import subprocess
+import sys
+from typing import Iterable, List, NamedTuple
+
+__all__ = [
+    "ImportTime",
+    "parse_import_times",
+    "profile_imports",
+]
+
+DEFAULT_MODULE = "indra_cogex.apps.wsgi"
+
+
+class ImportTime(NamedTuple):
+    """The time it took to import a module."""
+
+    #: The name of the module
+    module: str
+    #: Microseconds spent in the module itself
+    self_us: int
+    #: Microseconds including the modules it imported
+    cumulative_us: int
+    #: How many imports deep the module was imported
+    depth: int
+
+
+def parse_import_times(lines: Iterable[str]) -> List[ImportTime]:
+    """Parse the output of ``python -X importtime``.
+
+    Parameters
+    ----------
+    lines :
+        The lines written to stderr by the interpreter.
+
+    Returns
+    -------
+    :
+        The import time of each module, in the order they finished importing.
+    """
+    times = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        try:
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            # The header line
+            continue
+        name = name.rstrip()
+        module = name.lstrip()
+        times.append(
+            ImportTime(
+                module=module,
+                self_us=self_us,
+                cumulative_us=cumulative_us,
+                # Modules imported at the top level are at depth 0
+                depth=(len(name) - len(module) - 1) // 2 - 1,
+            )
+        )
+    return times
+
+
+def profile_imports(module: str = DEFAULT_MODULE) -> List[ImportTime]:
+    """Import a module in a new interpreter and get the import time of each module.
+
+    Parameters
+    ----------
+    module :
+        The name of the module to import.
+
+    Returns
+    -------
+    :
+        The import time of each module imported along the way.
+
+    Raises
+    ------
+    RuntimeError
+        If the module can't be imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Could not import {module}:\n{proc.stderr[-2000:]}")
+    return parse_import_times(proc.stderr.splitlines())
+
+
+def main():
+    """Print the modules that took longest to import."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Report the import time of the modules loaded when starting "
+                    "the web app."
+    )
+    parser.add_argument(
+        "module",
+        nargs="?",
+        default=DEFAULT_MODULE,
+        help=f"The module to import (default: {DEFAULT_MODULE})",
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["cumulative", "self"],
+        default="cumulative",
+        help="Rank modules by the time including (cumulative) or excluding (self) "
+             "the modules they import (default: cumulative)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=30,
+        help="The number of modules to list (default: 30)",
+    )
+    args = parser.parse_args()
+
+    times = profile_imports(args.module)
+    total_us = sum(t.self_us for t in times)
+    key = "cumulative_us" if args.sort == "cumulative" else "self_us"
+    print(f"Imported {len(times)} modules in {total_us / 1e6:.2f} seconds\n")
+    print(f"{'cumulative [ms]':>16} {'self [ms]':>10}  module")
+    for t in sorted(times, key=lambda t: getattr(t, key), reverse=True)[:args.top]:
+        print(f"{t.cumulative_us / 1e3:>16.1f} {t.self_us / 1e3:>10.1f}  {t.module}")
+
+
+if __name__ == "__main__":
+    main()
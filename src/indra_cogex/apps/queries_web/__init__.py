@@ -8,29 +8,67 @@ The endpoints are created dynamically based on the functions in the following mo
 - indra_cogex.analysis.metabolite_analysis
 - indra_cogex.analysis.gene_analysis,
 - indra_cogex.analysis.source_targets_explanation
+
+The docstrings and parameters of the functions are read from a cached
+specification (see :mod:`indra_cogex.apps.api_spec`) so that the modules only
+need to be imported when one of their functions is first called.
 """
 import csv
 import logging
+from contextlib import ExitStack, contextmanager
 from http import HTTPStatus
-from inspect import isfunction, signature
 
-from flask import jsonify, request
+from flask import current_app, request, stream_with_context
 from flask_restx import Resource, abort, fields, Namespace
 
+from indra_cogex.analysis import gene_continuous_analysis_example_data
+from indra_cogex.analysis.jobs import JobError, JobLimitError, get_job_queue
+from indra_cogex.apps.api_spec import LazyFunctions, get_api_spec
+from indra_cogex.apps.batch import (
+    get_batch_executor,
+    get_batch_max_in_flight,
+    get_batch_max_size,
+    run_batch,
+)
 from indra_cogex.apps.proxies import client
-from indra_cogex.client import queries, subnetwork
-from indra_cogex.client.enrichment.mla import EXAMPLE_CHEBI_CURIES
-from indra_cogex.client.enrichment.discrete import EXAMPLE_GENE_IDS
-from indra_cogex.client.enrichment.signed import EXAMPLE_POSITIVE_HGNC_IDS, EXAMPLE_NEGATIVE_HGNC_IDS
-from indra_cogex.analysis import (
-    metabolite_analysis,
-    gene_analysis,
-    gene_continuous_analysis_example_data,
-    source_targets_explanation
+from indra_cogex.apps.query_limits import (
+    AdmissionError,
+    get_default_query_timeout,
+    get_heavy_query_limiter,
+    is_client_disconnected,
+    iter_limited,
+)
+from indra_cogex.apps.serialization import dumps, make_json_response
+from indra_cogex.apps.response_cache import (
+    get_cached_graph_version,
+    get_response_cache,
+    get_response_cache_key,
+)
+from indra_cogex.apps.streaming import (
+    NDJSON_MIMETYPE,
+    decode_cursor,
+    get_query_fingerprint,
+    iter_ndjson,
+    iter_positions,
+    wants_ndjson,
+)
+from indra_cogex.apps.utils import get_job_user
+from indra_cogex.apps.warmup import register_preloader
+from indra_cogex.client import queries, streaming
+from indra_cogex.client.enrichment.examples import (
+    EXAMPLE_CHEBI_CURIES,
+    EXAMPLE_GENE_IDS,
+    EXAMPLE_NEGATIVE_HGNC_IDS,
+    EXAMPLE_POSITIVE_HGNC_IDS,
+)
+from indra_cogex.client.query_budget import (
+    QueryCancelledError,
+    QueryTimeoutError,
+    make_query_budget,
+    use_query_budget,
 )
-from indra_cogex.apps.search import search
 from .constants import EXAMPLE_QUERY_EMBEDDING
-from .helpers import ParseError, get_docstring, parse_json, process_result
+from .helpers import ParseError, get_docstring, parse_json
 
 logger = logging.getLogger(__name__)
 
@@ -55,7 +93,8 @@ __all__ = [
     "enzyme_activity_ns",
     "cell_line_properties_ns",
     "analysis_ns",
-    "subnetwork_ns"
+    "subnetwork_ns",
+    "service_ns",
 ]
 
 # Define category descriptions
@@ -83,7 +122,8 @@ CATEGORY_DESCRIPTIONS = {
     'cell_line_properties': "Explore cell line characteristics including mutations, copy number alterations, "
                             "and drug sensitivity",
     'subnetwork': "Explore biological subnetwork relationships and pathways",
-    'analysis': "Perform statistical and biological data analysis"
+    'analysis': "Perform statistical and biological data analysis",
+    'service': "Information about the state of the query service",
 }
 
 # Define all namespaces
@@ -115,6 +155,7 @@ cell_line_properties_ns = Namespace("Cell Line Property Queries", CATEGORY_DESCR
                                     path="/api")
 analysis_ns = Namespace("Analysis Queries", CATEGORY_DESCRIPTIONS['analysis'], path="/api")
 subnetwork_ns = Namespace("Subnetwork Queries", CATEGORY_DESCRIPTIONS['subnetwork'], path="/api")
+service_ns = Namespace("Service", CATEGORY_DESCRIPTIONS['service'], path="/api")
 
 
 def get_example_data():
@@ -130,6 +171,7 @@ continuous_analysis_example_names, continuous_analysis_example_data = get_exampl
 FUNCTION_CATEGORIES = {
     'gene_expression': {
         'namespace': gene_expression_ns,
+        'cache_responses': True,
         'functions': [
             "get_genes_in_tissue",
             "get_tissues_for_gene",
@@ -138,6 +180,7 @@ FUNCTION_CATEGORIES = {
     },
     'go_terms': {
         'namespace': go_terms_ns,
+        'cache_responses': True,
         'functions': [
             "get_go_terms_for_gene",
             "get_genes_for_go_term",
@@ -146,6 +189,7 @@ FUNCTION_CATEGORIES = {
     },
     'clinical_trials': {
         'namespace': clinical_trials_ns,
+        'cache_responses': True,
         'functions': [
             "get_trials_for_drug",
             "get_trials_for_disease",
@@ -155,6 +199,7 @@ FUNCTION_CATEGORIES = {
     },
     'biological_pathways': {
         'namespace': biological_pathways_ns,
+        'cache_responses': True,
         'functions': [
             "get_pathways_for_gene",
             "get_shared_pathways_for_genes",
@@ -164,6 +209,7 @@ FUNCTION_CATEGORIES = {
     },
     'drug_side_effects': {
         'namespace': drug_side_effects_ns,
+        'cache_responses': True,
         'functions': [
             "get_side_effects_for_drug",
             "get_drugs_for_side_effect",
@@ -172,6 +218,7 @@ FUNCTION_CATEGORIES = {
     },
     'ontology': {
         'namespace': ontology_ns,
+        'cache_responses': True,
         'functions': [
             "get_ontology_child_terms",
             "get_ontology_parent_terms",
@@ -180,6 +227,7 @@ FUNCTION_CATEGORIES = {
     },
     'literature_metadata': {
         'namespace': literature_metadata_ns,
+        'cache_responses': True,
         'functions': [
             "get_pmids_for_mesh",
             "get_pmids_for_stmt_hash",
@@ -195,6 +243,7 @@ FUNCTION_CATEGORIES = {
     },
     'statements': {
         'namespace': statements_ns,
+        'timeout': 60,
         'functions': [
             "get_evidences_for_mesh",
             "get_evidences_for_stmt_hash",
@@ -213,6 +262,7 @@ FUNCTION_CATEGORIES = {
     },
     'drug_targets': {
         'namespace': drug_targets_ns,
+        'cache_responses': True,
         'functions': [
             "get_drugs_for_target",
             "get_drugs_for_targets",
@@ -223,6 +273,7 @@ FUNCTION_CATEGORIES = {
     },
     'cell_markers': {
         'namespace': cell_markers_ns,
+        'cache_responses': True,
         'functions': [
             "get_markers_for_cell_type",
             "get_cell_types_for_marker",
@@ -231,6 +282,7 @@ FUNCTION_CATEGORIES = {
     },
     'disease_phenotypes': {
         'namespace': disease_phenotypes_ns,
+        'cache_responses': True,
         'functions': [
             "get_phenotypes_for_disease",
             "get_diseases_for_phenotype",
@@ -242,6 +294,7 @@ FUNCTION_CATEGORIES = {
     },
     'gene_disease_variant': {
         'namespace': gene_disease_variant_ns,
+        'cache_responses': True,
         'functions': [
             "get_diseases_for_gene",
             "get_genes_for_disease",
@@ -256,6 +309,7 @@ FUNCTION_CATEGORIES = {
     },
     'research_project_output': {
         'namespace': research_project_output_ns,
+        'cache_responses': True,
         'functions': [
             "get_publications_for_project",
             "get_clinical_trials_for_project",
@@ -267,6 +321,7 @@ FUNCTION_CATEGORIES = {
     },
     'gene_domains': {
         'namespace': gene_domains_ns,
+        'cache_responses': True,
         'functions': [
             "get_domains_for_gene",
             "get_genes_for_domain",
@@ -275,6 +330,7 @@ FUNCTION_CATEGORIES = {
     },
     'phenotype_variant': {
         'namespace': phenotype_variant_ns,
+        'cache_responses': True,
         'functions': [
             "get_phenotypes_for_variant_gwas",
             "get_variants_for_phenotype_gwas",
@@ -283,6 +339,7 @@ FUNCTION_CATEGORIES = {
     },
     'drug_indications': {
         'namespace': drug_indications_ns,
+        'cache_responses': True,
         'functions': [
             "get_indications_for_drug",
             "get_drugs_for_indication",
@@ -291,6 +348,7 @@ FUNCTION_CATEGORIES = {
     },
     'gene_codependence': {
         'namespace': gene_codependence_ns,
+        'cache_responses': True,
         'functions': [
             "get_codependents_for_gene",
             "gene_has_codependency"
@@ -298,6 +356,7 @@ FUNCTION_CATEGORIES = {
     },
     'enzyme_activity': {
         'namespace': enzyme_activity_ns,
+        'cache_responses': True,
         'functions': [
             "get_enzyme_activities_for_gene",
             "get_genes_for_enzyme_activity",
@@ -306,6 +365,7 @@ FUNCTION_CATEGORIES = {
     },
     'cell_line_properties': {
         'namespace': cell_line_properties_ns,
+        'cache_responses': True,
         'functions': [
             "get_cell_lines_with_mutation",
             "get_mutated_genes_in_cell_line",
@@ -320,6 +380,7 @@ FUNCTION_CATEGORIES = {
     },
     'analysis': {
         'namespace': analysis_ns,
+        'timeout': 300,
         'functions': [
             "discrete_analysis",
             "signed_analysis",
@@ -331,6 +392,8 @@ FUNCTION_CATEGORIES = {
     },
     'subnetwork': {
         'namespace': subnetwork_ns,
+        'cache_responses': True,
+        'timeout': 60,
         'functions': [
             "indra_subnetwork_relations",
             "indra_subnetwork_meta",
@@ -341,6 +404,26 @@ FUNCTION_CATEGORIES = {
     }
 }
 
+# Timeouts (in seconds) of functions that need a different one than their
+# category or the configured default
+FUNCTION_TIMEOUTS = {
+    "get_network": 120,
+    "get_network_for_statements": 120,
+}
+
+# Functions that can scan large parts of the graph, of which only a limited
+# number run at once (see indra_cogex.apps.query_limits)
+HEAVY_FUNCTIONS = {
+    "get_statements",
+    "get_network",
+    "get_network_for_statements",
+    "get_evidences_for_mesh",
+    "get_stmts_for_mesh",
+    "get_mesh_annotated_evidence",
+    *FUNCTION_CATEGORIES['subnetwork']['functions'],
+    *FUNCTION_CATEGORIES['analysis']['functions'],
+}
+
 examples_dict = {
     "tissue": fields.List(fields.String, example=["UBERON", "UBERON:0001162"]),
     "gene": {
@@ -467,7 +550,7 @@ examples_dict = {
     "minimum_evidence": fields.Float(example=2),
     "log_fold_change": fields.List(fields.Float, example=continuous_analysis_example_data),
     "species": fields.String(example="human"),
-    "permutations": fields.Integer(example=100),
+    "permutations": fields.Integer(example=1000),
     "source": {
         "source_target_analysis": fields.String(example="BRCA1"),
         "default": fields.String(example="go")
@@ -527,31 +610,52 @@ SKIP_ARGUMENTS = {
     "get_statements": {"mesh_term", "include_child_terms"}
 }
 
-# This is the list of functions to be included
+# This is the list of functions to be included, by the name of their module
 # To add a new function, make sure it is part of __all__ in the respective module or is
 # listed explicitly below and properly documented in its docstring as well as having
 # example values for its parameters in the examples_dict above.
 module_functions = (
-    [(queries, fn) for fn in queries.__all__] +
-    [(subnetwork, fn) for fn in [
+    [(queries.__name__, fn) for fn in queries.__all__] +
+    [("indra_cogex.client.subnetwork", fn) for fn in [
         "indra_subnetwork_relations",
         "indra_subnetwork_meta",
         "indra_mediated_subnetwork",
         "indra_subnetwork_tissue",
         "indra_subnetwork_go"]] +
-    [(metabolite_analysis, fn) for fn in ["metabolite_discrete_analysis"]] +
-    [(gene_analysis, fn) for fn in [
+    [("indra_cogex.analysis.metabolite_analysis", fn) for fn in ["metabolite_discrete_analysis"]] +
+    [("indra_cogex.analysis.gene_analysis", fn) for fn in [
         "discrete_analysis",
         "signed_analysis",
         "continuous_analysis",
         "kinase_analysis"]] +
-    [(source_targets_explanation, fn) for fn in ["source_target_analysis"]] +
-    [(search, fn) for fn in ["get_network_for_statements"]]
+    [("indra_cogex.analysis.source_targets_explanation", fn) for fn in ["source_target_analysis"]] +
+    [("indra_cogex.apps.search.search", fn) for fn in ["get_network_for_statements"]]
 
 )
 
-# Maps function names to the actual functions
-func_mapping = {fname: getattr(module, fname) for module, fname in module_functions}
+# Functions of the modules above that aren't exposed as queries
+SKIP_FUNCTIONS = {
+    "get_schema_graph",
+    "get_node_counter",
+    "get_prefix_counter",
+    "get_edge_counter",
+}
+
+# Maps function names to the actual functions, the analysis modules are only
+# imported when one of their functions is first called
+func_mapping = LazyFunctions(module_functions)
+
+# The docstrings and parameters of the functions, cached on disk until the
+# source of one of their modules changes
+api_spec = get_api_spec(
+    [(module_name, fname) for module_name, fname in module_functions
+     if fname not in SKIP_FUNCTIONS],
+    get_docstring,
+    skip_global=SKIP_GLOBAL,
+    skip_arguments=SKIP_ARGUMENTS,
+    functions=func_mapping,
+    source_modules=["indra_cogex.apps.queries_web.helpers"],
+)
 
 # Validate that all functions in func_mapping are registered in FUNCTION_CATEGORIES.
 # This catches the common mistake of adding a function to module_functions but forgetting
@@ -571,15 +675,151 @@ if _unregistered_functions:
 # Clean up temporary variables
 del _registered_functions, _unregistered_functions
 
-# Create resource for each query function
-for module, func_name in module_functions:
-    if not isfunction(getattr(module, func_name)) or func_name == "get_schema_graph":
-        continue
 
-    func = getattr(module, func_name)
-    func_sig = signature(func)
-    client_param = func_sig.parameters.get("client")
-    if client_param is None:
+def get_query_timeout(func_name: str) -> float:
+    """Get the number of seconds a query function may take."""
+    if func_name in FUNCTION_TIMEOUTS:
+        return FUNCTION_TIMEOUTS[func_name]
+    for info in FUNCTION_CATEGORIES.values():
+        if func_name in info['functions'] and 'timeout' in info:
+            return info['timeout']
+    return get_default_query_timeout()
+
+
+@contextmanager
+def _limit_query(func_name: str, user: str, environ=None):
+    """Run a query within its time budget and, if heavy, the heavy query limit.
+
+    The budget is cancelled once the client of the request with the given
+    WSGI environment disconnects.
+    """
+    with ExitStack() as stack:
+        if func_name in HEAVY_FUNCTIONS:
+            stack.enter_context(get_heavy_query_limiter().admit(user))
+        stack.enter_context(use_query_budget(_make_query_budget(func_name, environ)))
+        yield
+
+
+def _make_query_budget(func_name: str, environ=None):
+    """Make the time budget of a query, cancelled once its client disconnects."""
+    return make_query_budget(
+        get_query_timeout(func_name),
+        is_cancelled=(
+            (lambda: is_client_disconnected(environ)) if environ else None
+        ),
+        metadata={"app": "indra_cogex", "function": func_name},
+    )
+
+
+def _iter_limited(func_name: str, user: str, environ, make_items):
+    """Stream the items of a query within the limits of :func:`_limit_query`.
+
+    The query is admitted and its first item computed before this returns,
+    so rejected or failing queries still get an error status, see
+    :func:`indra_cogex.apps.query_limits.iter_limited`.
+    """
+    return iter_limited(
+        make_items,
+        _make_query_budget(func_name, environ),
+        get_heavy_query_limiter().admit(user) if func_name in HEAVY_FUNCTIONS else None,
+    )
+
+
+def _make_too_many_requests_response(err: AdmissionError):
+    """Make a 429 response telling the client when to try again."""
+    response = make_json_response(
+        {"message": str(err), "retry_after": err.retry_after},
+        status=HTTPStatus.TOO_MANY_REQUESTS,
+    )
+    response.headers["Retry-After"] = str(err.retry_after)
+    return response
+
+
+def _make_conditional_response(body: bytes, etag: str):
+    """Make a JSON response, or a 304 if the client already has this body."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=HTTPStatus.NOT_MODIFIED)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response
+
+
+# Query functions with a variant that streams its results from the graph,
+# the results of other functions are streamed once they are computed
+STREAMING_FUNCTIONS = {
+    "get_publications_for_journal": streaming.iter_publications_for_journal,
+    "get_genes_for_go_term": streaming.iter_genes_for_go_term,
+    "get_stmts_for_stmt_hashes": streaming.iter_stmts_for_stmt_hashes,
+}
+
+
+def _make_stream_response(func_name: str, json_dict):
+    """Make an NDJSON response streaming the results of a query."""
+    fingerprint = get_query_fingerprint(func_name, json_dict)
+    try:
+        cursor = request.args.get("cursor")
+        offset = decode_cursor(cursor, fingerprint) if cursor else 0
+        page_size = request.args.get("page_size", type=int)
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size has to be positive")
+        parsed_query = parse_json(json_dict)
+        if func_name in STREAMING_FUNCTIONS:
+            neo4j_client = client._get_current_object()
+            items = _iter_limited(
+                func_name,
+                get_job_user(),
+                request.environ,
+                lambda: STREAMING_FUNCTIONS[func_name](
+                    **parsed_query, offset=offset, client=neo4j_client
+                ),
+            )
+        else:
+            with _limit_query(func_name, get_job_user(), request.environ):
+                result = func_mapping[func_name](**parsed_query, client=client)
+            if isinstance(result, bool):
+                result = {func_name: result}
+            items = iter_positions(result, offset)
+
+    except AdmissionError as err:
+        return _make_too_many_requests_response(err)
+
+    except QueryTimeoutError as err:
+        logger.warning(f"{func_name} timed out: {err}")
+        abort(code=HTTPStatus.GATEWAY_TIMEOUT, message=str(err))
+
+    except QueryCancelledError as err:
+        logger.info(f"{func_name} was cancelled: {err}")
+        abort(code=HTTPStatus.SERVICE_UNAVAILABLE, message=str(err))
+
+    except ParseError as err:
+        logger.error(err)
+        abort(code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, message=str(err))
+
+    except ValueError as err:
+        logger.error(err)
+        abort(code=HTTPStatus.BAD_REQUEST, message=str(err))
+
+    except Exception as err:
+        logger.error(err)
+        abort(code=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    return current_app.response_class(
+        stream_with_context(iter_ndjson(items, dumps, fingerprint, page_size)),
+        mimetype=NDJSON_MIMETYPE,
+    )
+
+
+@register_preloader("query_functions")
+def _preload_query_functions(neo4j_client):
+    for func_name in func_mapping:
+        func_mapping[func_name]
+
+
+# Create resource for each query function
+for func_name, func_spec in api_spec.items():
+    # Skip anything that isn't a function taking a client
+    if func_spec is None:
         continue
 
     # Find the appropriate namespace for this function
@@ -587,6 +827,7 @@ for module, func_name in module_functions:
     for category, info in FUNCTION_CATEGORIES.items():
         if func_name in info['functions']:
             target_ns = info['namespace']
+            cache_responses = info.get('cache_responses', False)
             break
 
     if target_ns is None:
@@ -595,17 +836,8 @@ for module, func_name in module_functions:
             f"it to FUNCTION_CATEGORIES."
         )
 
-    try:
-        short_doc, fixed_doc = get_docstring(
-            func, skip_params=SKIP_GLOBAL | SKIP_ARGUMENTS.get(func_name, set())
-        )
-    except ValueError as e:
-        raise ValueError(
-            f"Error processing docstring for function '{func_name}': {e}"
-        ) from e
-
-    param_names = list(func_sig.parameters.keys())
-    param_names.remove("client")
+    short_doc, fixed_doc = func_spec["short_doc"], func_spec["doc"]
+    param_names = list(func_spec["parameters"])
 
     model_name = f"{func_name}_model"
 
@@ -643,6 +875,7 @@ for module, func_name in module_functions:
         """A resource for a query."""
 
         func_name = func_name
+        cache_responses = cache_responses
 
         def post(self):
             """Get a query."""
@@ -653,15 +886,42 @@ for module, func_name in module_functions:
                     message="Missing application/json header or json body",
                 )
 
+            if wants_ndjson(request):
+                return _make_stream_response(self.func_name, json_dict)
+
+            # Identical queries against the same graph get the same response
+            cache = get_response_cache() if self.cache_responses else None
+            cache_key = None
+            if cache is not None:
+                version = get_cached_graph_version(client)
+                if version is not None:
+                    cache_key = get_response_cache_key(self.func_name, json_dict, version)
+                    cached = cache.get(cache_key)
+                    if cached is not None:
+                        etag, body = cached
+                        return _make_conditional_response(body, etag)
+
             try:
                 parsed_query = parse_json(json_dict)
-                result = func_mapping[self.func_name](**parsed_query, client=client)
+                with _limit_query(self.func_name, get_job_user(), request.environ):
+                    result = func_mapping[self.func_name](**parsed_query, client=client)
 
                 # Any 'is' type query
                 if isinstance(result, bool):
-                    return jsonify({self.func_name: result})
+                    response = make_json_response({self.func_name: result})
                 else:
-                    return jsonify(process_result(result))
+                    response = make_json_response(result)
+
+            except AdmissionError as err:
+                return _make_too_many_requests_response(err)
+
+            except QueryTimeoutError as err:
+                logger.warning(f"{self.func_name} timed out: {err}")
+                abort(code=HTTPStatus.GATEWAY_TIMEOUT, message=str(err))
+
+            except QueryCancelledError as err:
+                logger.info(f"{self.func_name} was cancelled: {err}")
+                abort(code=HTTPStatus.SERVICE_UNAVAILABLE, message=str(err))
 
             except ParseError as err:
                 logger.error(err)
@@ -675,4 +935,185 @@ for module, func_name in module_functions:
                 logger.error(err)
                 abort(code=HTTPStatus.INTERNAL_SERVER_ERROR)
 
+            if cache_key is None:
+                return response
+            body = response.get_data()
+            return _make_conditional_response(body, cache.put(cache_key, body))
+
         post.__doc__ = fixed_doc
+
+
+job_model = analysis_ns.model(
+    "job_model",
+    {
+        "function": fields.String(example="discrete_analysis"),
+        "parameters": fields.Raw(example={"gene_list": EXAMPLE_GENE_IDS}),
+    },
+)
+
+
+def _get_own_job_status(job_id: str):
+    status = get_job_queue(client=client._get_current_object()).get_status(job_id)
+    if status is None or status["user"] != get_job_user():
+        abort(code=HTTPStatus.NOT_FOUND, message=f"No job with ID {job_id}")
+    return status
+
+
+@analysis_ns.expect(job_model)
+@analysis_ns.route("/jobs", doc={"summary": "Run an analysis as a background job"})
+class JobsResource(Resource):
+    """A resource for submitting analysis jobs."""
+
+    def post(self):
+        """Submit an analysis to run in the background.
+
+        The body has the name of one of the analysis queries as ``function``
+        and its arguments as ``parameters``. Poll the returned job ID for its
+        status and result.
+        """
+        json_dict = request.json
+        if json_dict is None or "function" not in json_dict:
+            abort(
+                code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                message="Missing application/json header or function in json body",
+            )
+        queue = get_job_queue(client=client._get_current_object())
+        try:
+            parameters = parse_json(json_dict.get("parameters") or {})
+            job_id = queue.submit(json_dict["function"], parameters, get_job_user())
+        except JobLimitError as err:
+            abort(code=HTTPStatus.TOO_MANY_REQUESTS, message=str(err))
+        except ParseError as err:
+            abort(code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, message=str(err))
+        except ValueError as err:
+            abort(code=HTTPStatus.BAD_REQUEST, message=str(err))
+        return queue.get_status(job_id), HTTPStatus.ACCEPTED
+
+
+@analysis_ns.route("/jobs/<job_id>", doc={"summary": "Get or cancel a background job"})
+class JobResource(Resource):
+    """A resource for the status of an analysis job."""
+
+    def get(self, job_id):
+        """Get the status and progress of a job."""
+        return _get_own_job_status(job_id)
+
+    def delete(self, job_id):
+        """Cancel a queued or running job."""
+        _get_own_job_status(job_id)
+        queue = get_job_queue(client=client._get_current_object())
+        if not queue.cancel(job_id):
+            abort(code=HTTPStatus.CONFLICT, message=f"Job {job_id} has already stopped")
+        return queue.get_status(job_id)
+
+
+@analysis_ns.route("/jobs/<job_id>/result", doc={"summary": "Get the result of a job"})
+class JobResultResource(Resource):
+    """A resource for the result of an analysis job."""
+
+    def get(self, job_id):
+        """Get the result of a finished job."""
+        _get_own_job_status(job_id)
+        try:
+            result = get_job_queue(client=client._get_current_object()).get_result(job_id)
+        except KeyError:
+            abort(code=HTTPStatus.NOT_FOUND, message=f"No job with ID {job_id}")
+        except JobError as err:
+            abort(code=HTTPStatus.CONFLICT, message=str(err))
+        return make_json_response(result)
+
+
+@service_ns.route("/response_cache", doc={"summary": "Get query response cache statistics"})
+class ResponseCacheResource(Resource):
+    """A resource for the statistics of the query response cache."""
+
+    def get(self):
+        """Get the hit rate and size of the query response cache."""
+        cache = get_response_cache()
+        if cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **cache.get_stats()}
+
+
+@service_ns.route("/heavy_queries", doc={"summary": "Get heavy query statistics"})
+class HeavyQueriesResource(Resource):
+    """A resource for the statistics of the heavy query limiter."""
+
+    def get(self):
+        """Get the number of running and rejected heavy queries of this worker."""
+        return get_heavy_query_limiter().get_stats()
+
+
+@service_ns.route("/query_coalescing", doc={"summary": "Get query coalescing statistics"})
+class QueryCoalescingResource(Resource):
+    """A resource for the statistics of the sharing of identical queries."""
+
+    def get(self):
+        """Get the number of graph queries run and shared by this worker."""
+        single_flight = client.single_flight
+        if single_flight is None:
+            return {"enabled": False}
+        return {"enabled": True, **single_flight.get_stats()}
+
+
+batch_model = service_ns.model(
+    "batch_model",
+    {
+        "items": fields.List(
+            fields.Raw,
+            example=[
+                {"function": "is_gene_in_tissue",
+                 "params": {"gene": ["HGNC", "9896"], "tissue": ["UBERON", "UBERON:0001162"]}},
+                {"function": "get_go_terms_for_gene", "params": {"gene": ["HGNC", "2697"]}},
+            ],
+        ),
+    },
+)
+
+
+def _run_batch_item(app, neo4j_client, user: str, func_name: str, params):
+    if func_name not in func_mapping:
+        raise ValueError(f"Unknown function: {func_name}")
+    with app.app_context(), _limit_query(func_name, user):
+        result = func_mapping[func_name](**parse_json(params), client=neo4j_client)
+        if isinstance(result, bool):
+            return {func_name: result}
+        return result
+
+
+@service_ns.expect(batch_model)
+@service_ns.route("/batch", doc={"summary": "Run many queries in one request"})
+class BatchResource(Resource):
+    """A resource for running a batch of queries."""
+
+    def post(self):
+        """Run a batch of queries concurrently.
+
+        The body has a list of ``items``, each with the name of a query
+        ``function`` and its ``params`` as they would be sent to the query's
+        own endpoint. Identical items are only run once. The response has one
+        entry per item, in order, with either the ``result`` or an ``error``
+        message and its HTTP ``status``.
+        """
+        json_dict = request.json
+        if json_dict is None or "items" not in json_dict:
+            abort(
+                code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                message="Missing application/json header or items in json body",
+            )
+        app = current_app._get_current_object()
+        neo4j_client = client._get_current_object()
+        user = get_job_user()
+        try:
+            results = run_batch(
+                json_dict["items"],
+                lambda func_name, params: _run_batch_item(
+                    app, neo4j_client, user, func_name, params
+                ),
+                get_batch_executor(),
+                max_size=get_batch_max_size(),
+                max_in_flight=get_batch_max_in_flight(),
+            )
+        except ValueError as err:
+            abort(code=HTTPStatus.BAD_REQUEST, message=str(err))
+        return make_json_response(results)
@@ -3,18 +3,52 @@
 Provides introspection capabilities for dynamically discovering and documenting
 the 190+ autoclient functions exposed through the MCP server gateway tools.
 Extracts type information, parameter details, and category descriptions.
+
+The signatures and docstrings are read from a specification cached in the app
+cache (see :func:`indra_cogex.apps.api_spec.get_api_spec`) that is only
+rebuilt, importing the modules, when their source changes. Functions can be
+looked up by words of their name, description and category with a
+:class:`FunctionSearchIndex`.
 """
 import logging
-from inspect import signature
-from typing import Any, Callable, Dict, List, NamedTuple, Set, Tuple
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from indra_cogex.apps.api_spec import get_api_spec
+from indra_cogex.apps.constants import APP_CACHE_MODULE
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
+    "FUNCTION_REGISTRY_PATH",
     "FunctionMetadata",
+    "FunctionSearchIndex",
     "build_function_registry",
 ]
 
+FUNCTION_REGISTRY_PATH = APP_CACHE_MODULE.join(name="mcp_function_spec.json")
+
+#: How much more a word in the name of a function counts than one in its
+#: description or category when searching
+NAME_WEIGHT = 3
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
 
 class FunctionMetadata(NamedTuple):
     """Metadata for a single query function.
@@ -49,23 +83,25 @@ class FunctionMetadata(NamedTuple):
 
 
 def build_function_registry(
-    module_functions: List[Tuple[Any, str]],
-    func_mapping: Dict[str, Callable],
+    module_functions: List[Tuple[str, str]],
+    func_mapping: Mapping[str, Callable],
     function_categories: Dict[str, Dict[str, Any]],
     category_descriptions: Dict[str, str],
     examples_dict: Dict[str, Any],
     skip_global: Set[str],
     skip_arguments: Dict[str, Set[str]],
     get_docstring_func: Callable,
+    cache_path: Union[None, str, Path] = None,
 ) -> Dict[str, FunctionMetadata]:
     """Build function registry with metadata.
 
     Parameters
     ----------
     module_functions :
-        List of (module, function_name) tuples
+        List of (module_name, function_name) tuples
     func_mapping :
-        Mapping of function names to function objects
+        Mapping of function names to function objects, only accessed if the
+        cached specification is outdated
     function_categories :
         Category definitions with namespace and function lists
     category_descriptions :
@@ -78,80 +114,171 @@ def build_function_registry(
         Function-specific parameters to skip
     get_docstring_func :
         Function to extract docstrings (from helpers module)
+    cache_path :
+        The path of the cached specification. Defaults to
+        :data:`FUNCTION_REGISTRY_PATH`.
 
     Returns
     -------
     :
         Registry mapping function names to FunctionMetadata objects
     """
-    registry = {}
+    module_functions = [
+        (module_name, func_name)
+        for module_name, func_name in module_functions
+        if func_name in func_mapping
+    ]
+    # Functions without proper documentation get no specification
+    spec = get_api_spec(
+        module_functions,
+        get_docstring_func,
+        skip_global=skip_global,
+        skip_arguments=skip_arguments,
+        functions=func_mapping,
+        source_modules=[get_docstring_func.__module__],
+        path=cache_path or FUNCTION_REGISTRY_PATH,
+        skip_errors=True,
+    )
 
-    for module, func_name in module_functions:
-        if func_name not in func_mapping:
-            continue
+    # The first category listing a function is its category
+    categories = {}
+    for cat_name, cat_info in function_categories.items():
+        for func_name in cat_info['functions']:
+            categories.setdefault(func_name, cat_name)
 
-        func = func_mapping[func_name]
-        func_sig = signature(func)
-
-        # Find category
-        category = None
-        category_desc = ""
-        for cat_name, cat_info in function_categories.items():
-            if func_name in cat_info['functions']:
-                category = cat_name
-                category_desc = category_descriptions.get(cat_name, "")
-                break
-
-        if category is None:
-            category = 'uncategorized'
-
-        # Get docstring
-        try:
-            short_desc, full_doc = get_docstring_func(
-                func,
-                skip_params=skip_global | skip_arguments.get(func_name, set())
-            )
-        except (ValueError, AttributeError) as err:
-            # Skip functions without proper documentation
-            logger.debug("Skipping %s: %s", func_name, err)
+    registry = {}
+    for module_name, func_name in module_functions:
+        func_spec = spec.get(func_name)
+        if func_spec is None:
             continue
 
+        category = categories.get(func_name, 'uncategorized')
+        skipped = skip_arguments.get(func_name, set())
+
         # Build parameter details
         param_details = {}
-        for param_name, param_obj in func_sig.parameters.items():
+        for param_name, param in func_spec["parameters"].items():
             # Skip client and other global parameters
-            if param_name in skip_global:
-                continue
-            if param_name in skip_arguments.get(func_name, set()):
+            if param_name in skip_global or param_name in skipped:
                 continue
 
             # Get example from examples_dict
-            example = None
-            if param_name in examples_dict:
-                ex = examples_dict[param_name]
-                # Handle function-specific examples
-                if isinstance(ex, dict):
-                    example = ex.get(func_name, ex.get("default"))
-                else:
-                    example = ex
-
-            param_details[param_name] = {
-                "type": str(param_obj.annotation).replace("typing.", ""),
-                "required": param_obj.default == param_obj.empty,
-                "default": None if param_obj.default == param_obj.empty else param_obj.default,
-                "example": example
-            }
+            example = examples_dict.get(param_name)
+            # Handle function-specific examples
+            if isinstance(example, dict):
+                example = example.get(func_name, example.get("default"))
+
+            param_details[param_name] = {**param, "example": example}
 
-        # Create metadata entry
         registry[func_name] = FunctionMetadata(
             name=func_name,
-            description=short_desc,
-            full_docstring=full_doc,
+            description=func_spec["short_doc"],
+            full_docstring=func_spec["doc"],
             category=category,
-            category_description=category_desc,
-            module_name=module.__name__,
+            category_description=category_descriptions.get(category, ""),
+            module_name=module_name,
             parameters=param_details,
-            return_type=str(func_sig.return_annotation).replace("typing.", "")
+            return_type=func_spec["return_type"],
         )
 
     return registry
+
+
+def _tokenize(text: Optional[str]) -> List[str]:
+    return _WORD_RE.findall(text.lower()) if text else []
+
+
+class FunctionSearchIndex:
+    """An inverted index of the words in the names and descriptions of functions.
+
+    Parameters
+    ----------
+    registry :
+        The function metadata by function name, see
+        :func:`build_function_registry`.
+    """
+
+    def __init__(self, registry: Mapping[str, FunctionMetadata]):
+        self.registry = registry
+        #: The weight of each function containing a word, by word
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._by_category: Dict[str, List[str]] = defaultdict(list)
+        for name, metadata in registry.items():
+            self._by_category[metadata.category].append(name)
+            weights = defaultdict(int)
+            for word in _tokenize(name.replace("_", " ")):
+                weights[word] = NAME_WEIGHT
+            for word in _tokenize(metadata.description) + _tokenize(
+                metadata.category.replace("_", " ")
+            ):
+                weights[word] = max(weights[word], 1)
+            for word, weight in weights.items():
+                self._postings[word][name] = weight
+        self._words = sorted(self._postings)
+
+    def _match_word(self, word: str) -> Dict[str, int]:
+        """Get the functions with a word starting with the given one."""
+        matches: Dict[str, int] = {}
+        i = bisect_left(self._words, word)
+        while i < len(self._words) and self._words[i].startswith(word):
+            for name, weight in self._postings[self._words[i]].items():
+                # Whole words count more than prefixes
+                if self._words[i] != word:
+                    weight = weight / 2
+                matches[name] = max(matches.get(name, 0), weight)
+            i += 1
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 10,
+        categories: Optional[Iterable[str]] = None,
+    ) -> List[FunctionMetadata]:
+        """Find the functions best matching the words of a query.
+
+        Parameters
+        ----------
+        query :
+            The words to look for, each matching whole words or the start of
+            words in the name, description or category of a function.
+        limit :
+            The maximum number of functions to return, all if None.
+        categories :
+            If given, only return functions in these categories.
+
+        Returns
+        -------
+        :
+            The metadata of the matching functions, ordered by decreasing
+            number of matching words, weighing matches in the name higher.
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        for word in set(_tokenize(query)):
+            for name, weight in self._match_word(word).items():
+                scores[name] += weight
+        if categories is not None:
+            allowed = set(categories)
+            scores = {
+                name: score for name, score in scores.items()
+                if self.registry[name].category in allowed
+            }
+        ranked = sorted(scores, key=lambda name: (-scores[name], name))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.registry[name] for name in ranked]
+
+    def get_category(self, category: str) -> List[FunctionMetadata]:
+        """Get the functions in a category.
+
+        Parameters
+        ----------
+        category :
+            The name of the category.
+
+        Returns
+        -------
+        :
+            The metadata of the functions in the category.
+        """
+        return [self.registry[name] for name in self._by_category.get(category, [])]
@@ -0,0 +1,304 @@
+"""Timeouts and admission control for the queries of the web app.
+
+Each query API call runs within a time budget (see
+:mod:`indra_cogex.client.query_budget`), after which Neo4j aborts its
+transaction and the API responds with 504. The budget is also cancelled once
+the HTTP client disconnects, checked with :func:`is_client_disconnected`
+before each graph query.
+
+Heavy queries, e.g., undirected ``get_statements`` calls, subnetworks or
+analyses, can each occupy a worker thread and a Neo4j thread for a long time.
+A :class:`ConcurrencyLimiter` caps how many of them run at once in a worker
+process, and how many of those belong to the same user, so that one user
+can't slow down everyone else. Queries over the limit are rejected right
+away with an :class:`AdmissionError`, which the API turns into a 429
+response whose ``Retry-After`` header estimates when a slot frees up.
+
+Streamed results are read within these limits with :func:`iter_limited`.
+
+The default timeout (in seconds) and the limits can be set with the
+``INDRA_COGEX_QUERY_TIMEOUT``, ``INDRA_COGEX_MAX_HEAVY_QUERIES`` and
+``INDRA_COGEX_MAX_HEAVY_QUERIES_PER_USER`` configuration values.
+"""
+
+import math
+import select
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional
+
+from indra.config import get_config
+
+from indra_cogex.client.query_budget import QueryBudget, use_query_budget
+
+__all__ = [
+    "AdmissionError",
+    "ConcurrencyLimiter",
+    "get_default_query_timeout",
+    "get_heavy_query_limiter",
+    "is_client_disconnected",
+    "iter_limited",
+]
+
+#: The default number of seconds a query may take
+DEFAULT_QUERY_TIMEOUT = 30
+#: The default number of heavy queries running at once in a worker process
+DEFAULT_MAX_HEAVY_QUERIES = 4
+#: The default number of heavy queries of one user running at once
+DEFAULT_MAX_HEAVY_QUERIES_PER_USER = 2
+
+#: How much the latest duration counts in the running average of durations
+DURATION_SMOOTHING = 0.2
+
+_LIMITER: Dict[str, "ConcurrencyLimiter"] = {}
+_LIMITER_LOCK = threading.Lock()
+_EXHAUSTED = object()
+
+
+class AdmissionError(Exception):
+    """Raised when a query is rejected because too many are running.
+
+    Parameters
+    ----------
+    message :
+        Why the query was rejected.
+    retry_after :
+        The number of seconds after which to try again.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Limit how many queries run at once, in total and per user.
+
+    Parameters
+    ----------
+    max_concurrent :
+        The maximum number of queries running at once.
+    max_per_user :
+        The maximum number of queries of the same user running at once, no
+        limit other than ``max_concurrent`` if None.
+    """
+
+    def __init__(self, max_concurrent: int, max_per_user: Optional[int] = None):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self._running: Dict[str, int] = defaultdict(int)
+        self._total = 0
+        self._rejected = 0
+        self._average_duration: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get_retry_after(self) -> int:
+        """Estimate the seconds until a running query finishes.
+
+        Returns
+        -------
+        :
+            The running average of the query durations, rounded up, at
+            least one second.
+        """
+        return max(1, math.ceil(self._average_duration or 1))
+
+    @contextmanager
+    def admit(self, user: str = ""):
+        """Run the block as one of the limited queries.
+
+        Parameters
+        ----------
+        user :
+            Who runs the query.
+
+        Raises
+        ------
+        AdmissionError
+            If the maximum number of queries, in total or of the user, are
+            already running.
+        """
+        with self._lock:
+            if self._total >= self.max_concurrent:
+                message = "Too many heavy queries are running, try again later"
+            elif (
+                self.max_per_user is not None
+                and self._running[user] >= self.max_per_user
+            ):
+                message = (
+                    f"You are already running {self._running[user]} heavy "
+                    f"queries, wait for them to finish"
+                )
+            else:
+                message = None
+            if message is not None:
+                self._rejected += 1
+                raise AdmissionError(message, self.get_retry_after())
+            self._total += 1
+            self._running[user] += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - start
+            with self._lock:
+                self._total -= 1
+                self._running[user] -= 1
+                if not self._running[user]:
+                    del self._running[user]
+                if self._average_duration is None:
+                    self._average_duration = duration
+                else:
+                    self._average_duration += DURATION_SMOOTHING * (
+                        duration - self._average_duration
+                    )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of running and rejected queries.
+
+        Returns
+        -------
+        :
+            The limits, the number of running queries and of users running
+            them, the number of rejected queries, and the average duration.
+        """
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_per_user": self.max_per_user,
+                "running": self._total,
+                "users": len(self._running),
+                "rejected": self._rejected,
+                "average_duration": self._average_duration,
+            }
+
+
+def get_default_query_timeout() -> float:
+    """Get the number of seconds a query may take unless configured otherwise.
+
+    Returns
+    -------
+    :
+        The timeout.
+    """
+    timeout = get_config("INDRA_COGEX_QUERY_TIMEOUT")
+    return float(timeout) if timeout else DEFAULT_QUERY_TIMEOUT
+
+
+def get_heavy_query_limiter() -> ConcurrencyLimiter:
+    """Get the limiter of the heavy queries of this process.
+
+    Returns
+    -------
+    :
+        The limiter, created on first use.
+    """
+    with _LIMITER_LOCK:
+        if "default" not in _LIMITER:
+            max_concurrent = get_config("INDRA_COGEX_MAX_HEAVY_QUERIES")
+            max_per_user = get_config("INDRA_COGEX_MAX_HEAVY_QUERIES_PER_USER")
+            _LIMITER["default"] = ConcurrencyLimiter(
+                int(max_concurrent) if max_concurrent else DEFAULT_MAX_HEAVY_QUERIES,
+                int(max_per_user) if max_per_user else DEFAULT_MAX_HEAVY_QUERIES_PER_USER,
+            )
+    return _LIMITER["default"]
+
+
+def is_client_disconnected(environ: Mapping[str, Any]) -> bool:
+    """Check if the client of a request closed its connection.
+
+    This only works with gunicorn, which puts the socket of the connection
+    in the WSGI environment. A closed connection is readable and reading
+    from it returns no data.
+
+    Parameters
+    ----------
+    environ :
+        The WSGI environment of the request.
+
+    Returns
+    -------
+    :
+        True if the client disconnected, False if it didn't or if it can't
+        be told.
+    """
+    sock = environ.get("gunicorn.socket")
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except BlockingIOError:
+        return False
+    except (OSError, ValueError):
+        # The socket is closed or was reset
+        return True
+
+
+def iter_limited(
+    make_items: Callable[[], Iterable],
+    budget: QueryBudget,
+    admission: Optional[AbstractContextManager] = None,
+) -> Iterator:
+    """Stream the items of a query within a time budget and an admission.
+
+    The query is admitted and its first item is computed before this
+    returns, so a query that is rejected or fails right away raises here,
+    before a response has started. The budget is only set while an item is
+    computed, and the admission is held until the stream is exhausted or
+    closed.
+
+    Parameters
+    ----------
+    make_items :
+        A function returning the items, e.g., a generator reading a query.
+    budget :
+        The budget the items are computed within, see
+        :func:`indra_cogex.client.query_budget.make_query_budget`.
+    admission :
+        A context manager admitting the query, e.g.,
+        :meth:`ConcurrencyLimiter.admit`.
+
+    Returns
+    -------
+    :
+        An iterator over the items.
+
+    Raises
+    ------
+    AdmissionError
+        If the query isn't admitted.
+    """
+    with ExitStack() as stack:
+        if admission is not None:
+            stack.enter_context(admission)
+        with use_query_budget(budget):
+            items = iter(make_items())
+            first = next(items, _EXHAUSTED)
+        limits = stack.pop_all()
+
+    def _iter():
+        try:
+            # Started right away, so closing the stream releases the limits
+            # even if it is never read
+            yield
+            item = first
+            while item is not _EXHAUSTED:
+                yield item
+                with use_query_budget(budget):
+                    item = next(items, _EXHAUSTED)
+        finally:
+            try:
+                if hasattr(items, "close"):
+                    items.close()
+            finally:
+                limits.close()
+
+    stream = _iter()
+    next(stream)
+    return stream
@@ -0,0 +1,213 @@
+"""An in-memory cache of serialized query API responses.
+
+Many clients, e.g., agents using the MCP server, send the same query API
+requests over and over. Responses of the query functions in the categories
+that opt in are kept compressed in memory, keyed by the function name, the
+canonical JSON request body and the version of the loaded graph, so a
+repeated request only costs a lookup and a decompression. Each response
+carries an ``ETag`` so clients can revalidate with ``If-None-Match``.
+
+The maximum size (in megabytes) and the time to live (in seconds) of the
+cache can be set with the ``INDRA_COGEX_RESPONSE_CACHE_SIZE`` and
+``INDRA_COGEX_RESPONSE_CACHE_TTL`` configuration values, where a size of 0
+disables the cache.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from indra.config import get_config
+
+from indra_cogex.client.graph_stats import get_cached_graph_version
+
+__all__ = [
+    "ResponseCache",
+    "get_response_cache",
+    "get_response_cache_key",
+    "get_cached_graph_version",
+    "make_etag",
+]
+
+#: The default maximum total size of cached responses in megabytes
+DEFAULT_MAX_SIZE_MB = 256
+#: The default number of seconds a response is kept
+DEFAULT_TTL = 60 * 60
+
+_RESPONSE_CACHE: Dict[str, Optional["ResponseCache"]] = {}
+
+
+class ResponseCache:
+    """A size and age bounded LRU cache of compressed response bodies."""
+
+    def __init__(self, max_size: int, ttl: float):
+        """Initialize the cache.
+
+        Parameters
+        ----------
+        max_size :
+            The maximum total size of the compressed bodies in bytes.
+        ttl :
+            The number of seconds a response is kept.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: str):
+        _, _, blob = self._entries.pop(key)
+        self._size -= len(blob)
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """Look up a response.
+
+        Parameters
+        ----------
+        key :
+            The key of the response.
+
+        Returns
+        -------
+        :
+            The ETag and the body of the response, or None if it isn't
+            cached or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        _, etag, blob = entry
+        return etag, zlib.decompress(blob)
+
+    def put(self, key: str, body: bytes) -> str:
+        """Store a response and evict least recently used ones above the size limit.
+
+        Parameters
+        ----------
+        key :
+            The key of the response.
+        body :
+            The serialized body of the response.
+
+        Returns
+        -------
+        :
+            The ETag of the response.
+        """
+        etag = make_etag(body)
+        blob = zlib.compress(body, 1)
+        if len(blob) > self.max_size:
+            return etag
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + self.ttl, etag, blob)
+            self._size += len(blob)
+            while self._size > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return etag
+
+    def clear(self):
+        """Remove all responses and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the hit rate and the size of the cache.
+
+        Returns
+        -------
+        :
+            A dict with the keys ``hits``, ``misses``, ``hit_rate``,
+            ``evictions``, ``expirations``, ``entries`` and ``size`` (in
+            bytes).
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "size": self._size,
+            }
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the response cache of this process.
+
+    Returns
+    -------
+    :
+        The cache, or None if it is disabled.
+    """
+    if "default" not in _RESPONSE_CACHE:
+        max_size_mb = get_config("INDRA_COGEX_RESPONSE_CACHE_SIZE")
+        max_size_mb = float(max_size_mb) if max_size_mb else DEFAULT_MAX_SIZE_MB
+        ttl = get_config("INDRA_COGEX_RESPONSE_CACHE_TTL")
+        ttl = float(ttl) if ttl else DEFAULT_TTL
+        _RESPONSE_CACHE["default"] = (
+            ResponseCache(int(max_size_mb * 1024 ** 2), ttl) if max_size_mb > 0 else None
+        )
+    return _RESPONSE_CACHE["default"]
+
+
+def get_response_cache_key(
+    func_name: str, body: Mapping[str, Any], version: str
+) -> str:
+    """Get the key of a query response.
+
+    Parameters
+    ----------
+    func_name :
+        The name of the query function.
+    body :
+        The JSON body of the request.
+    version :
+        The version of the loaded graph.
+
+    Returns
+    -------
+    :
+        A SHA-256 hex digest of the canonical JSON of the arguments.
+    """
+    blob = json.dumps([func_name, version, body], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def make_etag(body: bytes) -> str:
+    """Get the ETag of a response body.
+
+    Parameters
+    ----------
+    body :
+        The serialized body of the response.
+
+    Returns
+    -------
+    :
+        The (unquoted) entity tag.
+    """
+    return hashlib.sha256(body).hexdigest()[:32]
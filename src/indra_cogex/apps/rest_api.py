@@ -1,4 +1,7 @@
+from flask import make_response
 from flask_restx import Api
+
+from .serialization import dumps
 from .bioentity.api import bioentity_ns
 
 # Import and add namespaces after api is created
@@ -23,7 +26,8 @@ from .queries_web import (
     enzyme_activity_ns,
     cell_line_properties_ns,
     analysis_ns,
-    subnetwork_ns
+    subnetwork_ns,
+    service_ns,
 )
 
 
@@ -56,6 +60,16 @@ api.add_namespace(enzyme_activity_ns)
 api.add_namespace(cell_line_properties_ns)
 api.add_namespace(analysis_ns)
 api.add_namespace(subnetwork_ns)
+api.add_namespace(service_ns)
 api.add_namespace(bioentity_ns)
 
+
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    """Serialize the return values of resources with the fast JSON encoder."""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = "application/json"
+    return response
+
 __all__ = ["api"]
@@ -0,0 +1,195 @@
+"""Fast JSON serialization of query results.
+
+Query results are lists of :class:`Node` and :class:`Relation` objects, INDRA
+statements and evidences, data frames or plain Python and NumPy values.
+Instead of first converting them into plain Python objects and then encoding
+those with the standard library, they are encoded in a single pass with
+`orjson <https://github.com/ijl/orjson>`_ which writes bytes directly and
+calls :func:`to_jsonable` only for the types it doesn't know. NumPy arrays
+and scalars are encoded natively. Dates are encoded as HTTP dates and keys
+are sorted like :func:`flask.jsonify` does. If orjson isn't installed, the
+standard library encoder is used with the same fallback.
+
+The two encoders differ in how they write floats that JSON can't represent:
+orjson writes NaN and infinite values as ``null``, while the standard
+library (and :func:`flask.jsonify` before) writes the non-standard
+``NaN``, ``Infinity`` and ``-Infinity`` tokens, which many JSON parsers reject.
+
+The JSON responses of the apps use this through :class:`JSONProvider`.
+"""
+
+import json
+from collections.abc import Iterable, Mapping
+from datetime import date
+from functools import singledispatch
+from http import HTTPStatus
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from flask import Response, current_app
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from indra.statements import Evidence, Statement
+
+from indra_cogex.representation import Node, Relation
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = [
+    "JSONProvider",
+    "dumps",
+    "make_json_response",
+    "to_jsonable",
+]
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_SORT_KEYS
+    )
+
+
+@singledispatch
+def to_jsonable(obj) -> Any:
+    """Convert an object the JSON encoder doesn't know to one it does.
+
+    Parameters
+    ----------
+    obj :
+        The object to convert.
+
+    Returns
+    -------
+    :
+        A JSON-serializable representation of the object, which may itself
+        contain objects handled by this function.
+
+    Raises
+    ------
+    TypeError
+        If the object can't be serialized.
+    """
+    if hasattr(obj, "to_json"):
+        return obj.to_json()
+    raise TypeError(f"Don't know how to serialize object of type {type(obj)}")
+
+
+@to_jsonable.register
+def _node_to_jsonable(obj: Node):
+    return obj.to_json()
+
+
+@to_jsonable.register
+def _relation_to_jsonable(obj: Relation):
+    return obj.to_json()
+
+
+@to_jsonable.register
+def _statement_to_jsonable(obj: Statement):
+    return obj.to_json()
+
+
+@to_jsonable.register
+def _evidence_to_jsonable(obj: Evidence):
+    return obj.to_json()
+
+
+@to_jsonable.register
+def _date_to_jsonable(obj: date):
+    return http_date(obj)
+
+
+@to_jsonable.register
+def _data_frame_to_jsonable(obj: pd.DataFrame):
+    return obj.to_dict(orient="records")
+
+
+@to_jsonable.register(np.generic)
+@to_jsonable.register(np.ndarray)
+def _numpy_to_jsonable(obj):
+    return obj.tolist()
+
+
+@to_jsonable.register
+def _mapping_to_jsonable(obj: Mapping):
+    return dict(obj)
+
+
+@to_jsonable.register
+def _iterable_to_jsonable(obj: Iterable):
+    return list(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize a query result to compact JSON.
+
+    Parameters
+    ----------
+    obj :
+        The object to serialize.
+
+    Returns
+    -------
+    :
+        The UTF-8 encoded JSON with sorted keys. With orjson, NaN and
+        infinite values are written as ``null``.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=to_jsonable, option=ORJSON_OPTIONS)
+    return json.dumps(
+        obj,
+        default=to_jsonable,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode("utf-8")
+
+
+def make_json_response(obj: Any, status: int = HTTPStatus.OK) -> Response:
+    """Make a JSON response from a query result.
+
+    Parameters
+    ----------
+    obj :
+        The object to serialize.
+    status :
+        The status code of the response.
+
+    Returns
+    -------
+    :
+        The response.
+    """
+    return current_app.response_class(
+        dumps(obj), status=status, mimetype="application/json"
+    )
+
+
+class JSONProvider(DefaultJSONProvider):
+    """A Flask JSON provider that uses :func:`dumps`.
+
+    Use it with ``app.json = JSONProvider(app)`` so that :func:`flask.jsonify`
+    handles query results directly.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize an object to a JSON string.
+
+        Keyword arguments, e.g., from the ``tojson`` template filter, fall
+        back to the standard library encoder.
+        """
+        if kwargs:
+            kwargs.setdefault("default", to_jsonable)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj).decode("utf-8")
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Serialize the arguments like :func:`flask.jsonify` does."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
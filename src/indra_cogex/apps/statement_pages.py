@@ -0,0 +1,599 @@
+"""Page-by-page rendering of statement lists.
+
+Pages like the statement search get up to a thousand statements with up to
+a thousand evidences each. Formatting all of them (English text, evidence
+JSON, badges) before sending any HTML made the first paint as slow as the
+whole result. Instead, :func:`indra_cogex.apps.utils.render_statements`
+ranks the statements, formats only the first page and keeps the rest as a
+:class:`StatementResults` in the :class:`ResultStore`. The store keeps
+results in the memory of the worker process and in a SQLite file in the app
+cache shared by the workers of the host, so the next pages can be served by
+any worker with the evidences, source counts and curations of the first one.
+The page embeds the ranked statement hashes and fetches the rows of the
+next pages from a JSON endpoint, sending the token of the results and the
+hashes of the page, i.e., the cursor is the position in the ranked list.
+When the results have expired, the statements of the page are fetched again
+by hash.
+
+Formatted rows are also kept in a :class:`RowCache`, keyed by the statement
+hash, its evidences and counts, whether MedScan evidences are removed and
+the version of the curation cache, so statements showing up in several
+results are only formatted once.
+
+The page size, the maximum number of evidences of the results kept per
+worker (and in the shared file) and the maximum size (in megabytes) of the row cache can be set with
+the ``INDRA_COGEX_STATEMENT_PAGE_SIZE``,
+``INDRA_COGEX_STATEMENT_RESULTS_MAX_EVIDENCES`` and
+``INDRA_COGEX_STATEMENT_ROW_CACHE_SIZE`` configuration values, where a row
+cache size of 0 disables the row cache.
+"""
+
+import hashlib
+import json
+import logging
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from indra.config import get_config
+from indra.statements import Statement
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+
+__all__ = [
+    "STATEMENT_RESULTS_PATH",
+    "StmtRow",
+    "StatementResults",
+    "ResultStore",
+    "RowCache",
+    "rank_statements",
+    "get_row_key",
+    "stmt_row_to_json",
+    "get_page_size",
+    "get_result_store",
+    "get_row_cache",
+]
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_RESULTS_PATH = APP_CACHE_MODULE.join(name="statement_results.db")
+
+#: The default number of statements formatted per page
+DEFAULT_PAGE_SIZE = 50
+#: The maximum number of statements of a page requested from the endpoint, so
+#: that their hashes fit in the URL
+MAX_PAGE_SIZE = 100
+#: The default maximum number of evidences of the results kept per worker
+DEFAULT_MAX_EVIDENCES = 1_000_000
+#: The default number of seconds results are kept
+DEFAULT_RESULTS_TTL = 60 * 60
+#: The default maximum total size of the cached rows in megabytes
+DEFAULT_ROW_CACHE_SIZE_MB = 128
+#: The number of evidences fetched for a statement of a page fetched again
+REFETCH_EVIDENCE_LIMIT = 1000
+
+#: The fields of a formatted row, see :data:`StmtRow`
+ROW_FIELDS = ("ev_array", "english", "hash", "sources", "total_evidence", "badges")
+
+_RESULT_STORE: Dict[str, "ResultStore"] = {}
+_ROW_CACHE: Dict[str, Optional["RowCache"]] = {}
+_SINGLETON_LOCK = threading.Lock()
+
+StmtRow = Tuple[str, str, str, str, str, str]
+
+
+def rank_statements(
+    stmts: Iterable[Statement],
+    evidence_counts: Mapping[int, int],
+    remove_medscan: bool = True,
+) -> List[Statement]:
+    """Rank statements the way they are displayed.
+
+    Parameters
+    ----------
+    stmts :
+        The statements.
+    evidence_counts :
+        A dictionary mapping statement hashes to evidence counts.
+    remove_medscan :
+        Whether MedScan evidences are removed, in which case statements
+        with only MedScan evidences aren't displayed.
+
+    Returns
+    -------
+    :
+        The statements by decreasing evidence count, keeping the given order
+        between statements with the same count.
+    """
+    if remove_medscan:
+        stmts = [
+            stmt
+            for stmt in stmts
+            if any(ev.source_api != "medscan" for ev in stmt.evidence)
+        ]
+    return sorted(stmts, key=lambda stmt: evidence_counts[stmt.get_hash()], reverse=True)
+
+
+class StatementResults:
+    """The ranked statements of a rendered page that remain to be formatted.
+
+    Parameters
+    ----------
+    stmts :
+        The ranked statements.
+    evidence_counts :
+        A dictionary mapping statement hashes to evidence counts.
+    source_counts :
+        A dictionary mapping statement hashes to source counts.
+    curations :
+        The curations to show, None to get them from the curation cache.
+    remove_medscan :
+        Whether MedScan evidences are removed.
+    """
+
+    def __init__(
+        self,
+        stmts: Sequence[Statement],
+        evidence_counts: Mapping[int, int],
+        source_counts: Optional[Mapping[int, Mapping[str, int]]] = None,
+        curations: Optional[List[Mapping[str, Any]]] = None,
+        remove_medscan: bool = True,
+    ):
+        self.stmts_by_hash = {stmt.get_hash(): stmt for stmt in stmts}
+        self.evidence_counts = {
+            stmt_hash: evidence_counts[stmt_hash] for stmt_hash in self.stmts_by_hash
+        }
+        self.source_counts = source_counts and {
+            stmt_hash: source_counts[stmt_hash]
+            for stmt_hash in self.stmts_by_hash
+            if stmt_hash in source_counts
+        }
+        self.curations = curations
+        self.remove_medscan = remove_medscan
+        self.num_evidences = sum(len(stmt.evidence) for stmt in stmts)
+
+    def get_statements(self, stmt_hashes: Iterable[int]) -> List[Statement]:
+        """Get the statements with the given hashes.
+
+        Parameters
+        ----------
+        stmt_hashes :
+            The statement hashes.
+
+        Returns
+        -------
+        :
+            The statements, skipping hashes that aren't part of the results.
+        """
+        return [
+            self.stmts_by_hash[stmt_hash]
+            for stmt_hash in stmt_hashes
+            if stmt_hash in self.stmts_by_hash
+        ]
+
+
+class ResultStore:
+    """An LRU store of statement results bounded by their number of evidences.
+
+    Parameters
+    ----------
+    max_evidences :
+        The maximum total number of evidences of the kept results, both in
+        memory and in the shared file.
+    ttl :
+        The number of seconds results are kept.
+    path :
+        The path to a SQLite file the results are also kept in, so that
+        other processes can get the statements of a page. If not given,
+        results are only kept in memory.
+    """
+
+    def __init__(
+        self,
+        max_evidences: int,
+        ttl: float = DEFAULT_RESULTS_TTL,
+        path: Union[None, str, Path] = None,
+    ):
+        self.max_evidences = max_evidences
+        self.ttl = ttl
+        self.path = Path(path) if path is not None else None
+        self._results: "OrderedDict[str, Tuple[float, StatementResults]]" = OrderedDict()
+        self._num_evidences = 0
+        self._lock = threading.Lock()
+        if self.path is not None:
+            conn = self._connect()
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results (token TEXT PRIMARY KEY, "
+                    "expires REAL NOT NULL, num_evidences INTEGER NOT NULL, "
+                    "remove_medscan INTEGER NOT NULL, curations BLOB NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS statements (token TEXT NOT NULL, "
+                    "stmt_hash INTEGER NOT NULL, stmt BLOB NOT NULL, "
+                    "evidence_count INTEGER NOT NULL, source_counts TEXT, "
+                    "PRIMARY KEY (token, stmt_hash))"
+                )
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _remove(self, token: str):
+        _, results = self._results.pop(token)
+        self._num_evidences -= results.num_evidences
+
+    def put(self, results: StatementResults) -> Optional[str]:
+        """Keep results, evicting the least recently used ones if needed.
+
+        Parameters
+        ----------
+        results :
+            The results.
+
+        Returns
+        -------
+        :
+            The token to get the results with, None if they are too large
+            to be kept.
+        """
+        if results.num_evidences > self.max_evidences:
+            return None
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._results[token] = (time.monotonic() + self.ttl, results)
+            self._num_evidences += results.num_evidences
+            while self._num_evidences > self.max_evidences:
+                self._remove(next(iter(self._results)))
+        if self.path is not None:
+            try:
+                self._dump(token, results)
+            except sqlite3.Error as err:
+                logger.warning("Could not share statement results: %s", err)
+        return token
+
+    def _dump(self, token: str, results: StatementResults):
+        source_counts = results.source_counts or {}
+        rows = [
+            (
+                token,
+                stmt_hash,
+                pickle.dumps(stmt, protocol=pickle.HIGHEST_PROTOCOL),
+                results.evidence_counts[stmt_hash],
+                json.dumps(source_counts[stmt_hash])
+                if stmt_hash in source_counts
+                else None,
+            )
+            for stmt_hash, stmt in results.stmts_by_hash.items()
+        ]
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO results (token, expires, num_evidences, "
+                "remove_medscan, curations) VALUES (?, ?, ?, ?, ?)",
+                (
+                    token,
+                    now + self.ttl,
+                    results.num_evidences,
+                    results.remove_medscan,
+                    pickle.dumps(results.curations, protocol=pickle.HIGHEST_PROTOCOL),
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO statements (token, stmt_hash, stmt, evidence_count, "
+                "source_counts) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Evict expired results and the oldest results of all processes
+            # beyond the maximum number of evidences
+            total = 0
+            evicted = []
+            for old_token, expires, num_evidences in conn.execute(
+                "SELECT token, expires, num_evidences FROM results "
+                "ORDER BY expires DESC"
+            ):
+                total += num_evidences
+                if expires < now or total > self.max_evidences:
+                    evicted.append((old_token,))
+            conn.executemany("DELETE FROM statements WHERE token = ?", evicted)
+            conn.executemany("DELETE FROM results WHERE token = ?", evicted)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(
+        self, token: str, stmt_hashes: Optional[Iterable[int]] = None
+    ) -> Optional[StatementResults]:
+        """Get results.
+
+        Parameters
+        ----------
+        token :
+            The token returned when the results were kept.
+        stmt_hashes :
+            The hashes of the statements that are needed. When the results
+            aren't in the memory of this process, only these statements are
+            loaded from the shared file. If not given, all of them are.
+
+        Returns
+        -------
+        :
+            The results, None if they have expired or weren't kept in this
+            process or the shared file.
+        """
+        with self._lock:
+            entry = self._results.get(token)
+            if entry is not None:
+                if entry[0] < time.monotonic():
+                    self._remove(token)
+                    return None
+                self._results.move_to_end(token)
+                return entry[1]
+        if self.path is None:
+            return None
+        try:
+            return self._load(token, stmt_hashes)
+        except sqlite3.Error as err:
+            logger.warning("Could not load shared statement results: %s", err)
+            return None
+
+    def _load(
+        self, token: str, stmt_hashes: Optional[Iterable[int]]
+    ) -> Optional[StatementResults]:
+        conn = self._connect()
+        try:
+            # Read the results and their statements from one snapshot
+            conn.execute("BEGIN")
+            row = conn.execute(
+                "SELECT expires, remove_medscan, curations FROM results "
+                "WHERE token = ?",
+                (token,),
+            ).fetchone()
+            if row is None or row[0] < time.time():
+                return None
+            query = (
+                "SELECT stmt_hash, stmt, evidence_count, source_counts "
+                "FROM statements WHERE token = ?"
+            )
+            params = [token]
+            if stmt_hashes is not None:
+                stmt_hashes = list(stmt_hashes)
+                query += " AND stmt_hash IN (%s)" % ",".join("?" * len(stmt_hashes))
+                params += stmt_hashes
+            stmt_rows = conn.execute(query, params).fetchall()
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        _, remove_medscan, curations = row
+        return StatementResults(
+            [pickle.loads(stmt) for _, stmt, _, _ in stmt_rows],
+            evidence_counts={
+                stmt_hash: evidence_count
+                for stmt_hash, _, evidence_count, _ in stmt_rows
+            },
+            source_counts={
+                stmt_hash: json.loads(source_counts)
+                for stmt_hash, _, _, source_counts in stmt_rows
+                if source_counts is not None
+            },
+            curations=pickle.loads(curations),
+            remove_medscan=bool(remove_medscan),
+        )
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of kept results and of their evidences."""
+        with self._lock:
+            return {"results": len(self._results), "evidences": self._num_evidences}
+
+
+def get_row_key(
+    stmt: Statement,
+    *,
+    total_evidence: int,
+    sources: Optional[Mapping[str, int]],
+    remove_medscan: bool,
+    curation_version: int,
+) -> Tuple[Hashable, ...]:
+    """Get the key of the formatted row of a statement.
+
+    Parameters
+    ----------
+    stmt :
+        The statement with the evidences to show.
+    total_evidence :
+        The total evidence count of the statement.
+    sources :
+        The source counts of the statement, None if they are computed from
+        its evidences.
+    remove_medscan :
+        Whether MedScan evidences are removed.
+    curation_version :
+        The version of the curation cache the curations were taken from.
+
+    Returns
+    -------
+    :
+        A key identifying everything the row is made from.
+    """
+    evidence = hashlib.md5()
+    for ev in stmt.evidence:
+        evidence.update(str(ev.get_source_hash()).encode())
+        evidence.update(b",")
+    return (
+        stmt.get_hash(),
+        evidence.hexdigest(),
+        total_evidence,
+        None if sources is None else json.dumps(sources, sort_keys=True),
+        remove_medscan,
+        curation_version,
+    )
+
+
+class RowCache:
+    """An LRU cache of formatted statement rows bounded by their size.
+
+    Parameters
+    ----------
+    max_size :
+        The maximum total length of the cached rows in characters.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._rows: "OrderedDict[Hashable, StmtRow]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, key: Hashable):
+        row = self._rows.pop(key)
+        self._size -= sum(map(len, row))
+
+    def get(self, key: Hashable) -> Optional[StmtRow]:
+        """Look up a row.
+
+        Parameters
+        ----------
+        key :
+            The key of the row, see :func:`get_row_key`.
+
+        Returns
+        -------
+        :
+            The row, None if it isn't cached.
+        """
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put(self, key: Hashable, row: StmtRow):
+        """Cache a row, evicting the least recently used ones if needed.
+
+        Parameters
+        ----------
+        key :
+            The key of the row, see :func:`get_row_key`.
+        row :
+            The formatted row.
+        """
+        size = sum(map(len, row))
+        if size > self.max_size:
+            return
+        with self._lock:
+            if key in self._rows:
+                self._remove(key)
+            self._rows[key] = row
+            self._size += size
+            while self._size > self.max_size:
+                self._remove(next(iter(self._rows)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the hit rate and the size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "rows": len(self._rows),
+                "size": self._size,
+            }
+
+
+def stmt_row_to_json(row: StmtRow) -> str:
+    """Serialize a formatted row as the object the statement list expects.
+
+    Parameters
+    ----------
+    row :
+        A row of JSON serialized fields, see
+        :func:`indra_cogex.apps.utils.format_stmts`.
+
+    Returns
+    -------
+    :
+        A JSON object with the fields of the row, made without parsing them.
+    """
+    return "{%s}" % ",".join(
+        f'"{field}":{value}' for field, value in zip(ROW_FIELDS, row)
+    )
+
+
+def get_page_size() -> int:
+    """Get the number of statements formatted per page.
+
+    Returns
+    -------
+    :
+        The page size.
+    """
+    page_size = get_config("INDRA_COGEX_STATEMENT_PAGE_SIZE")
+    return min(int(page_size), MAX_PAGE_SIZE) if page_size else DEFAULT_PAGE_SIZE
+
+
+def get_result_store() -> ResultStore:
+    """Get the statement result store of this process.
+
+    The results are also kept in :data:`STATEMENT_RESULTS_PATH`, shared by
+    the processes of the host.
+
+    Returns
+    -------
+    :
+        The store, created on first use.
+    """
+    with _SINGLETON_LOCK:
+        if "default" not in _RESULT_STORE:
+            max_evidences = get_config("INDRA_COGEX_STATEMENT_RESULTS_MAX_EVIDENCES")
+            _RESULT_STORE["default"] = ResultStore(
+                int(max_evidences) if max_evidences else DEFAULT_MAX_EVIDENCES,
+                path=STATEMENT_RESULTS_PATH,
+            )
+    return _RESULT_STORE["default"]
+
+
+def get_row_cache() -> Optional[RowCache]:
+    """Get the formatted row cache of this process.
+
+    Returns
+    -------
+    :
+        The cache, or None if it is disabled.
+    """
+    with _SINGLETON_LOCK:
+        if "default" not in _ROW_CACHE:
+            max_size_mb = get_config("INDRA_COGEX_STATEMENT_ROW_CACHE_SIZE")
+            max_size_mb = float(max_size_mb) if max_size_mb else DEFAULT_ROW_CACHE_SIZE_MB
+            _ROW_CACHE["default"] = (
+                RowCache(int(max_size_mb * 1024 ** 2)) if max_size_mb > 0 else None
+            )
+    return _ROW_CACHE["default"]
@@ -0,0 +1,218 @@
+"""Newline delimited JSON (NDJSON) responses for large query results.
+
+Clients opt in with an ``Accept: application/x-ndjson`` header or a
+``stream=1`` query parameter. Each result item is serialized and sent on its
+own line as soon as it is available instead of building the whole JSON array
+in memory first. When a ``page_size`` is given and there are more results,
+the last line is ``{"next_cursor": "..."}``; sending the same request again
+with ``cursor=...`` resumes after the last item that was sent. A cursor is
+only valid for the query it was made for.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Tuple
+
+import pandas as pd
+from flask import Request
+
+__all__ = [
+    "NDJSON_MIMETYPE",
+    "wants_ndjson",
+    "get_query_fingerprint",
+    "encode_cursor",
+    "decode_cursor",
+    "iter_positions",
+    "iter_ndjson",
+]
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+#: The number of bytes collected before a chunk is sent
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Check if the client asked for a streamed NDJSON response.
+
+    Parameters
+    ----------
+    request :
+        The current request.
+
+    Returns
+    -------
+    :
+        True if the ``stream`` query parameter is set or NDJSON is preferred
+        over JSON in the ``Accept`` header.
+    """
+    if request.args.get("stream", "").lower() in {"1", "true", "yes"}:
+        return True
+    # Wildcards like */* prefer the first option, i.e., plain JSON
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def get_query_fingerprint(func_name: str, body: Mapping[str, Any]) -> str:
+    """Get a short fingerprint of a query that cursors are bound to.
+
+    Parameters
+    ----------
+    func_name :
+        The name of the query function.
+    body :
+        The JSON body of the request.
+
+    Returns
+    -------
+    :
+        A truncated SHA-256 hex digest of the canonical JSON of the query.
+    """
+    blob = json.dumps([func_name, body], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(position: int, fingerprint: str) -> str:
+    """Encode a position in the results of a query as an opaque cursor.
+
+    Parameters
+    ----------
+    position :
+        The position to resume from.
+    fingerprint :
+        The fingerprint of the query.
+
+    Returns
+    -------
+    :
+        A URL safe cursor string.
+    """
+    blob = json.dumps({"p": position, "q": fingerprint}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(blob.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> int:
+    """Decode a cursor made by :func:`encode_cursor`.
+
+    Parameters
+    ----------
+    cursor :
+        The cursor string.
+    fingerprint :
+        The fingerprint of the query the cursor is used with.
+
+    Returns
+    -------
+    :
+        The position to resume from.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed or was made for a different query.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        position, cursor_fingerprint = int(data["p"]), data["q"]
+    except (ValueError, TypeError, KeyError) as err:
+        raise ValueError(f"Invalid cursor: {cursor}") from err
+    if cursor_fingerprint != fingerprint or position < 0:
+        raise ValueError("The cursor doesn't belong to this query")
+    return position
+
+
+def iter_positions(result: Any, offset: int = 0) -> Iterator[Tuple[int, Any]]:
+    """Split the already computed result of a query into positioned items.
+
+    This is how the results of queries without a streaming variant are
+    streamed.
+
+    Parameters
+    ----------
+    result :
+        The result of a query function.
+    offset :
+        The number of items to skip.
+
+    Yields
+    ------
+    :
+        The position and each item, where rows of a data frame are records,
+        other iterables are split into their elements and anything else is a
+        single item.
+    """
+    if isinstance(result, pd.DataFrame):
+        items = iter(result.to_dict(orient="records"))
+    elif isinstance(result, Iterable) and not isinstance(result, (str, bytes, Mapping)):
+        items = iter(result)
+    else:
+        items = iter([result])
+    for position, item in enumerate(items, start=1):
+        if position > offset:
+            yield position, item
+
+
+def iter_ndjson(
+    items: Iterable[Tuple[int, Any]],
+    dumps: Callable[[Any], bytes],
+    fingerprint: str,
+    page_size: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Serialize positioned items into chunks of NDJSON.
+
+    Parameters
+    ----------
+    items :
+        The position and each item, e.g., from one of the functions in
+        :mod:`indra_cogex.client.streaming` or :func:`iter_positions`.
+    dumps :
+        The function serializing an item to UTF-8 encoded JSON, e.g.,
+        :func:`indra_cogex.apps.serialization.dumps`.
+    fingerprint :
+        The fingerprint of the query, used for the next cursor.
+    page_size :
+        The maximum number of items to send. If there are more, the last
+        line has the cursor of the next page.
+    chunk_size :
+        The approximate number of bytes sent at a time.
+
+    Yields
+    ------
+    :
+        Chunks of complete NDJSON lines. If an error happens after the
+        response has started, the last line is ``{"error": ...}``.
+    """
+    buffer = []
+    buffered = 0
+    sent = 0
+    items = iter(items)
+    try:
+        for position, item in items:
+            if page_size is not None and sent >= page_size:
+                next_cursor = encode_cursor(last_position, fingerprint)
+                buffer.append(json.dumps({"next_cursor": next_cursor}).encode("utf-8") + b"\n")
+                break
+            line = dumps(item) + b"\n"
+            buffer.append(line)
+            buffered += len(line)
+            sent += 1
+            last_position = position
+            if buffered >= chunk_size:
+                yield b"".join(buffer)
+                buffer, buffered = [], 0
+    except Exception as err:
+        logger.exception(err)
+        # The status code has already been sent, so report the error in-band
+        buffer.append(json.dumps({"error": str(err)}).encode("utf-8") + b"\n")
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+    if buffer:
+        yield b"".join(buffer)
@@ -0,0 +1,468 @@
+"""Materialized task lists for the curator explorer.
+
+The explorer pages listing statements to curate, e.g., ``/explore/tf`` or
+``/explore/ppi``, are each backed by a query scanning all ``indra_rel``
+relations of the graph, which takes several seconds to minutes. The results
+only change when a new graph is loaded, so a :class:`TaskListStore` keeps
+each list's statement hashes with their source counts, ranked by decreasing
+evidence count, in a SQLite file in the app cache, together with the version
+of the graph it was computed from.
+
+A background thread started with :func:`start_task_list_refresher`
+recomputes the lists whose graph version is out of date, in the one process
+per host that holds the store's lock file. Pages are read with
+:func:`get_task_list_page`, which skips curated statements while reading
+rows in rank order, so only the rows of the requested page are decoded. A
+list that was never computed is computed by the first request for it. An
+outdated list is served as is while a refresher is running and recomputed
+by the request otherwise.
+
+How often the graph version is checked (in seconds) can be set with the
+``INDRA_COGEX_TASK_LIST_INTERVAL`` configuration value.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import (
+    Callable,
+    Container,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from indra.config import get_config
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+from indra_cogex.client.graph_stats import get_graph_version
+from indra_cogex.client.neo4j_client import Neo4jClient
+
+__all__ = [
+    "TASK_LIST_PATH",
+    "TaskListStore",
+    "TaskListView",
+    "get_task_list_store",
+    "get_task_list_page",
+    "refresh_task_lists",
+    "start_task_list_refresher",
+]
+
+logger = logging.getLogger(__name__)
+
+TASK_LIST_PATH = APP_CACHE_MODULE.join(name="task_lists.db")
+
+#: The default number of seconds between checks of the graph version
+DEFAULT_INTERVAL = 10 * 60
+
+#: A function taking a ``client`` and returning source counts by statement hash
+TaskListView = Callable[..., Mapping[int, Mapping[str, int]]]
+
+SourceCounts = Dict[int, Dict[str, int]]
+
+_STORE: Dict[str, "TaskListStore"] = {}
+_STORE_LOCK = threading.Lock()
+#: Locks making concurrent requests for a missing list compute it only once
+_COMPUTE_LOCKS: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_REFRESHER: Dict[str, Tuple[int, threading.Thread]] = {}
+
+
+class TaskListStore:
+    """Ranked statement hash lists in a SQLite file shared between processes."""
+
+    def __init__(self, path: Union[None, str, Path] = None):
+        """Initialize the store, creating the file if needed.
+
+        Parameters
+        ----------
+        path :
+            The path to the SQLite file. Defaults to :data:`TASK_LIST_PATH`.
+        """
+        self.path = Path(path) if path is not None else TASK_LIST_PATH
+        self._lock_file = None
+        self._lock_pid: Optional[int] = None
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_lists (name TEXT PRIMARY KEY, "
+                "graph_version TEXT, created REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_list_items (name TEXT NOT NULL, "
+                "rank INTEGER NOT NULL, stmt_hash INTEGER NOT NULL, "
+                "source_counts TEXT NOT NULL, PRIMARY KEY (name, rank))"
+            )
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def acquire_refresh_lock(self) -> bool:
+        """Try to become the process that refreshes the lists for the host.
+
+        Returns
+        -------
+        :
+            True if this process holds the lock.
+        """
+        pid = os.getpid()
+        if self._lock_pid == pid:
+            return True
+        # A lock file inherited from a parent process belongs to the parent
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self._lock_pid = pid
+        return True
+
+    def release_refresh_lock(self):
+        """Let another process refresh the lists for the host."""
+        if self._lock_pid == os.getpid():
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+            self._lock_pid = None
+
+    def is_refresher_running(self) -> bool:
+        """Check if any process of the host holds the refresh lock.
+
+        Returns
+        -------
+        :
+            True if the lists are kept up to date by a refresher.
+        """
+        if self._lock_pid == os.getpid():
+            return True
+        with open(f"{self.path}.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+
+    def get_info(self, name: str) -> Optional[Tuple[Optional[str], int]]:
+        """Get the graph version and the size of a list.
+
+        Parameters
+        ----------
+        name :
+            The name of the list.
+
+        Returns
+        -------
+        :
+            The graph version the list was computed from and its number of
+            statements, or None if the list was never computed.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT graph_version, size FROM task_lists WHERE name = ?", (name,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return tuple(row) if row else None
+
+    def put(
+        self,
+        name: str,
+        source_counts: Mapping[int, Mapping[str, int]],
+        graph_version: Optional[str],
+    ):
+        """Replace a list, ranking its statements by decreasing evidence count.
+
+        Parameters
+        ----------
+        name :
+            The name of the list.
+        source_counts :
+            The source counts of the statements of the list by statement hash.
+        graph_version :
+            The version of the graph the list was computed from.
+        """
+        evidence_counts = {
+            stmt_hash: sum(counts.values())
+            for stmt_hash, counts in source_counts.items()
+        }
+        ranked = sorted(evidence_counts, key=evidence_counts.get, reverse=True)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM task_list_items WHERE name = ?", (name,))
+                conn.executemany(
+                    "INSERT INTO task_list_items (name, rank, stmt_hash, "
+                    "source_counts) VALUES (?, ?, ?, ?)",
+                    (
+                        (name, rank, stmt_hash, json.dumps(source_counts[stmt_hash]))
+                        for rank, stmt_hash in enumerate(ranked)
+                    ),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO task_lists (name, graph_version, "
+                    "created, size) VALUES (?, ?, ?, ?)",
+                    (name, graph_version, time.time(), len(ranked)),
+                )
+        finally:
+            conn.close()
+
+    def get_page(
+        self,
+        name: str,
+        offset: int = 0,
+        limit: int = 100,
+        exclude: Container[int] = (),
+    ) -> Tuple[SourceCounts, bool]:
+        """Get a page of a list.
+
+        Parameters
+        ----------
+        name :
+            The name of the list.
+        offset :
+            The number of statements to skip, not counting excluded ones.
+        limit :
+            The maximum number of statements of the page.
+        exclude :
+            Statement hashes to leave out, e.g., the curated ones.
+
+        Returns
+        -------
+        :
+            The source counts of the statements of the page by statement
+            hash, in rank order, and whether there are more statements after
+            the page.
+        """
+        page = {}
+        skipped = 0
+        has_more = False
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT stmt_hash, source_counts FROM task_list_items "
+                "WHERE name = ? ORDER BY rank",
+                (name,),
+            )
+            for stmt_hash, blob in cursor:
+                if stmt_hash in exclude:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                if len(page) == limit:
+                    has_more = True
+                    break
+                page[stmt_hash] = json.loads(blob)
+        finally:
+            conn.close()
+        return page, has_more
+
+
+def get_task_list_store() -> TaskListStore:
+    """Get the task list store of this process.
+
+    Returns
+    -------
+    :
+        The store at :data:`TASK_LIST_PATH`, created on first use.
+    """
+    with _STORE_LOCK:
+        if "default" not in _STORE:
+            _STORE["default"] = TaskListStore()
+    return _STORE["default"]
+
+
+def _compute(
+    name: str,
+    view: TaskListView,
+    store: TaskListStore,
+    client: Neo4jClient,
+    graph_version: Optional[str],
+):
+    start = time.time()
+    source_counts = view(client=client)
+    store.put(name, source_counts, graph_version)
+    logger.info(
+        f"Materialized task list {name} with {len(source_counts):,} statements "
+        f"in {time.time() - start:.2f} seconds"
+    )
+
+
+def get_task_list_page(
+    name: str,
+    view: TaskListView,
+    *,
+    client: Neo4jClient,
+    graph_version: Optional[str],
+    store: Optional[TaskListStore] = None,
+    offset: int = 0,
+    limit: int = 100,
+    exclude: Container[int] = (),
+) -> Tuple[SourceCounts, bool]:
+    """Get a page of a task list, computing the list if needed.
+
+    Parameters
+    ----------
+    name :
+        The name of the list.
+    view :
+        The function computing the list.
+    client :
+        The Neo4j client.
+    graph_version :
+        The version of the loaded graph, or None if it isn't known, in which
+        case any stored list is used.
+    store :
+        The store of the lists. Defaults to :func:`get_task_list_store`.
+    offset :
+        The number of statements to skip, not counting excluded ones.
+    limit :
+        The maximum number of statements of the page.
+    exclude :
+        Statement hashes to leave out, e.g., the curated ones.
+
+    Returns
+    -------
+    :
+        The source counts of the statements of the page by statement hash,
+        in rank order, and whether there are more statements after the page.
+    """
+    if store is None:
+        store = get_task_list_store()
+    if _needs_compute(store, name, graph_version):
+        with _COMPUTE_LOCKS[name]:
+            # Another thread may have computed it in the meantime
+            if _needs_compute(store, name, graph_version):
+                _compute(name, view, store, client, graph_version)
+    return store.get_page(name, offset=offset, limit=limit, exclude=exclude)
+
+
+def _needs_compute(
+    store: TaskListStore, name: str, graph_version: Optional[str]
+) -> bool:
+    info = store.get_info(name)
+    if info is None:
+        return True
+    if graph_version is None or info[0] == graph_version:
+        return False
+    # An outdated list is still good enough until the refresher replaces it
+    return not store.is_refresher_running()
+
+
+def refresh_task_lists(
+    views: Mapping[str, TaskListView],
+    *,
+    client: Neo4jClient,
+    store: Optional[TaskListStore] = None,
+    graph_version: Optional[str] = None,
+) -> List[str]:
+    """Recompute the task lists computed from another graph version.
+
+    Parameters
+    ----------
+    views :
+        The functions computing the lists by the name of the list.
+    client :
+        The Neo4j client.
+    store :
+        The store of the lists. Defaults to :func:`get_task_list_store`.
+    graph_version :
+        The version of the loaded graph. Looked up if not given. Lists are
+        only computed if missing when the version isn't known.
+
+    Returns
+    -------
+    :
+        The names of the lists that were recomputed.
+    """
+    if store is None:
+        store = get_task_list_store()
+    if graph_version is None:
+        graph_version = get_graph_version(client=client)
+    refreshed = []
+    for name, view in views.items():
+        info = store.get_info(name)
+        if info is not None and (graph_version is None or info[0] == graph_version):
+            continue
+        with _COMPUTE_LOCKS[name]:
+            try:
+                _compute(name, view, store, client, graph_version)
+            except Exception as err:
+                logger.exception(f"Could not materialize task list {name}: {err}")
+                continue
+        refreshed.append(name)
+    return refreshed
+
+
+def start_task_list_refresher(
+    views: Mapping[str, TaskListView],
+    *,
+    client: Neo4jClient,
+    store: Optional[TaskListStore] = None,
+    interval: Optional[float] = None,
+) -> threading.Thread:
+    """Refresh the task lists in a background thread.
+
+    The thread checks the graph version right away and then every
+    ``interval`` seconds, and only refreshes the lists while this process
+    holds the store's lock, so one process per host does the work. It is
+    started at most once per process.
+
+    Parameters
+    ----------
+    views :
+        The functions computing the lists by the name of the list.
+    client :
+        The Neo4j client.
+    store :
+        The store of the lists. Defaults to :func:`get_task_list_store`.
+    interval :
+        The number of seconds between checks of the graph version. Defaults
+        to the ``INDRA_COGEX_TASK_LIST_INTERVAL`` configuration value.
+
+    Returns
+    -------
+    :
+        The thread.
+    """
+    if store is None:
+        store = get_task_list_store()
+    if interval is None:
+        interval = get_config("INDRA_COGEX_TASK_LIST_INTERVAL")
+        interval = float(interval) if interval else DEFAULT_INTERVAL
+    pid = os.getpid()
+    with _STORE_LOCK:
+        if str(store.path) in _REFRESHER:
+            refresher_pid, thread = _REFRESHER[str(store.path)]
+            if refresher_pid == pid and thread.is_alive():
+                return thread
+
+        def refresh_loop():
+            while True:
+                if store.acquire_refresh_lock():
+                    try:
+                        refresh_task_lists(views, client=client, store=store)
+                    except Exception as err:
+                        logger.exception(f"Could not refresh task lists: {err}")
+                time.sleep(interval)
+
+        thread = threading.Thread(
+            target=refresh_loop, name="task-list-refresher", daemon=True
+        )
+        thread.start()
+        _REFRESHER[str(store.path)] = (pid, thread)
+    return thread
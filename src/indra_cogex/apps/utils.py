@@ -12,17 +12,17 @@ from typing import (
     Mapping,
     Optional,
     Set,
-    Tuple,
     cast,
     Union,
 )
 
-from flask import render_template, request, session
+from flask import Flask, render_template, request, session
 from indra.assemblers.html.assembler import (
     _format_evidence_text,
     _format_stmt_text,
     DEFAULT_SOURCE_COLORS,
 )
+from indra.config import get_config
 from indra.sources import SOURCE_INFO
 from indra.statements import Statement
 from indra.util.statement_presentation import (
@@ -32,11 +32,22 @@ from indra.util.statement_presentation import (
 from indra_cogex.apps.constants import VUE_SRC_JS, VUE_SRC_CSS, sources_dict
 from indra_cogex.apps.curation_cache.curation_cache import Curations
 from indra_cogex.apps.proxies import curation_cache
+from indra_cogex.apps.statement_pages import (
+    StatementResults,
+    StmtRow,
+    get_page_size,
+    get_result_store,
+    get_row_cache,
+    get_row_key,
+    rank_statements,
+)
 from indralab_auth_tools.auth import resolve_auth
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 logger = logging.getLogger(__name__)
 
-StmtRow = Tuple[str, str, str, str, str, str]
+#: The default number of reverse proxies in front of the web apps
+DEFAULT_PROXY_COUNT = 1
 
 
 def count_curations(
@@ -106,7 +117,9 @@ def render_statements(
     evidence_lookup_time :
         Time taken to look up evidences in seconds
     limit :
-        Maximum number of statements to render
+        Maximum number of statements to render. Only the first page of them
+        is formatted, the others are fetched by the page as they are needed,
+        see :mod:`indra_cogex.apps.statement_pages`.
     curations :
         List of curation data dictionaries for the statements
     source_counts_dict :
@@ -130,34 +143,37 @@ def render_statements(
     remove_medscan = not bool(user_email)
 
     start_time = time.time()
+    if evidence_counts is None:
+        evidence_counts = {stmt.get_hash(): len(stmt.evidence) for stmt in stmts}
+    ranked_stmts = rank_statements(stmts, evidence_counts, remove_medscan=remove_medscan)
+    if limit:
+        ranked_stmts = ranked_stmts[:limit]
+    page_size = get_page_size()
     formatted_stmts = format_stmts(
-        stmts=stmts,
+        stmts=ranked_stmts[:page_size],
         evidence_counts=evidence_counts,
-        limit=limit,
         curations=curations,
         remove_medscan=remove_medscan,
         source_counts_per_hash=source_counts_dict,
     )
+    # The rest of the statements are formatted when the page asks for them
+    remaining_hashes = [str(stmt.get_hash()) for stmt in ranked_stmts[page_size:]]
+    page_token = None
+    if remaining_hashes:
+        page_token = get_result_store().put(
+            StatementResults(
+                ranked_stmts[page_size:],
+                evidence_counts=evidence_counts,
+                source_counts=source_counts_dict,
+                curations=curations,
+                remove_medscan=remove_medscan,
+            )
+        )
     # Store hashes in session if requested
-    if store_hashes_in_session and formatted_stmts:
-        # Extract hashes from formatted_stmts (tuples with hash at index 2)
-        try:
-            # Handle the fact that the hash is a string with quotes
-            statement_hashes = []
-            for stmt_tuple in formatted_stmts:
-                # Extract the hash string, which is at index 2
-                hash_str = stmt_tuple[2]
-                # Remove quotes if present
-                hash_str = hash_str.strip('"\'')
-                # Convert to integer
-                statement_hashes.append(int(hash_str))
-
-            session['statement_hashes'] = statement_hashes
-            session['include_db_evidence'] = include_db_evidence
-
-            logger.info(f"Stored {len(statement_hashes)} statement hashes in session")
-        except (IndexError, ValueError, TypeError) as e:
-            logger.error(f"Error storing statement hashes: {str(e)}")
+    if store_hashes_in_session and ranked_stmts:
+        session['statement_hashes'] = [stmt.get_hash() for stmt in ranked_stmts]
+        session['include_db_evidence'] = include_db_evidence
+        logger.info(f"Stored {len(ranked_stmts)} statement hashes in session")
 
     end_time = time.time() - start_time
 
@@ -165,11 +181,17 @@ def render_statements(
         footer = f"Got evidences in {evidence_lookup_time:.2f} seconds. "
     else:
         footer = ""
-    footer += f"Formatted {len(formatted_stmts)} statements in {end_time:.2f} seconds."
+    footer += (
+        f"Formatted {len(formatted_stmts)} of {len(ranked_stmts)} statements "
+        f"in {end_time:.2f} seconds."
+    )
 
     response = render_template(
         "data_display/data_display_base.html",
         stmts=formatted_stmts,
+        remaining_hashes=remaining_hashes,
+        page_token=page_token,
+        page_size=page_size,
         user_email=user_email,
         footer=footer,
         vue_src_js=VUE_SRC_JS,
@@ -235,7 +257,9 @@ def format_stmts(
     -------
     :
         A list of tuples of the form (evidence, english, hash, sources,
-        total_evidence, badges).
+        total_evidence, badges). When the curations are taken from the
+        curation cache, rows are reused from the row cache of
+        :mod:`indra_cogex.apps.statement_pages`.
     """
     if evidence_counts is None:
         evidence_counts = {}
@@ -255,7 +279,11 @@ def format_stmts(
         stmts = sorted(stmts, key=lambda s: evidence_counts[s.get_hash()], reverse=True)
 
     all_pa_hashes: Set[int] = {st.get_hash() for st in stmts}
+    row_cache = None
     if curations is None:
+        # Rows made from the curations of the cache can be reused until it changes
+        row_cache = get_row_cache()
+        curation_version = curation_cache.version
         curations = curation_cache.get_curations(pa_hash=list(all_pa_hashes))
     elif isinstance(curations, list):
         # If curations is already a list, we assume it's in the correct format
@@ -293,14 +321,30 @@ def format_stmts(
                 evidence_counts=evidence_counts
             )
         else:
+            source_counts = source_counts_per_hash.get(stmt.get_hash()) if source_counts_per_hash else None
+            row_key = None
+            if row_cache is not None:
+                row_key = get_row_key(
+                    stmt,
+                    total_evidence=evidence_counts[stmt.get_hash()],
+                    sources=source_counts,
+                    remove_medscan=remove_medscan,
+                    curation_version=curation_version,
+                )
+                row = row_cache.get(row_key)
+                if row is not None:
+                    stmt_rows.append(row)
+                    continue
             row = _stmt_to_row(
                 stmt,
                 cur_dict=cur_dict,
                 cur_counts=cur_counts,
                 remove_medscan=remove_medscan,
-                source_counts=source_counts_per_hash.get(stmt.get_hash()) if source_counts_per_hash else None,
+                source_counts=source_counts,
                 evidence_counts=evidence_counts
             )
+            if row is not None and row_key is not None:
+                row_cache.put(row_key, row)
         if row is not None:
             stmt_rows.append(row)
 
@@ -340,7 +384,8 @@ def _stmt_to_row(
     if source_counts is None:
         sources = _get_available_ev_source_counts(stmt.evidence)
     else:
-        sources = source_counts
+        # Copy, since medscan may be removed from the counts below
+        sources = dict(source_counts)
 
     # Calculate the total evidence as the sum of each of the sources' evidences
     if evidence_counts is not None:
@@ -409,12 +454,46 @@ def resolve_email():
     return user, roles, email
 
 
+def get_job_user() -> str:
+    """Get who background jobs submitted in the current request belong to.
+
+    Returns
+    -------
+    :
+        The email of the logged in user, or the client address otherwise
+        (see :func:`apply_proxy_fix`).
+    """
+    _, _, email = resolve_email()
+    return email or request.remote_addr or ""
+
+
+def apply_proxy_fix(app: Flask):
+    """Take the client address from the headers set by the reverse proxy.
+
+    Anonymous users are told apart by their address (see
+    :func:`get_job_user`), which would otherwise be the address of the
+    proxy for every request. The number of trusted proxies can be set with
+    the ``INDRA_COGEX_PROXY_COUNT`` configuration value, and should be 0 if
+    the app is served directly so that clients can't set their own address.
+
+    Parameters
+    ----------
+    app :
+        The app to configure.
+    """
+    proxy_count = get_config("INDRA_COGEX_PROXY_COUNT")
+    proxy_count = int(proxy_count) if proxy_count else DEFAULT_PROXY_COUNT
+    if proxy_count > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count)
+
+
 def get_curated_pa_hashes(
     curations: Optional[List[Mapping[str, Any]]] = None, only_correct: bool = True
 ) -> Mapping[int, Set[int]]:
     """Get a mapping from statement hashes to evidence hashes."""
-    if curations is None:
-        curations = curation_cache.get_curation_cache()
+    # The mapping for all curations in the cache is computed once per snapshot
+    if curations is None or curations is curation_cache.get_curation_cache():
+        return curation_cache.get_curated_pa_hash_map(only_correct=only_correct)
     rv = defaultdict(set)
     for curation in curations:
         if not only_correct or curation["tag"] == "correct":
@@ -0,0 +1,265 @@
+"""Warming up the web app before it serves requests.
+
+Resources like the bio ontology, the GO gene sets, the name maps and the
+query indexes are otherwise loaded by the first request that needs them,
+separately in every worker. The resources are registered here with
+:func:`register_preloader` and loaded by :func:`preload`.
+
+When gunicorn preloads the app (see ``gunicorn.conf.py``), the master process
+loads all resources with :func:`warm_up_app` before forking the workers, so
+the workers share the memory holding them until they write to it. Each
+worker then calls :func:`start_worker`, which connects to Neo4j with its own
+driver, loads anything the master couldn't in a background thread and runs
+the functions registered with :func:`register_worker_starter`, e.g., to
+start background refreshes. Without preloading, the first request of a
+worker starts it.
+
+``/ready`` responds with 200 once all resources of the worker were loaded (or
+failed to load) and with 503 before, so a load balancer only routes requests
+to warmed up workers.
+"""
+
+import logging
+import os
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Blueprint, Flask, jsonify
+from indra.ontology.bio import bio_ontology
+
+from indra_cogex.apps.constants import INDRA_COGEX_EXTENSION
+from indra_cogex.client.enrichment.utils import get_go
+from indra_cogex.client.graph_stats import get_graph_stats
+from indra_cogex.client.mesh_index import get_mesh_postings_index
+from indra_cogex.client.neo4j_client import Neo4jClient
+from indra_cogex.client.ontology_index import get_ontology_index
+from indra_cogex.client.queries import get_agent_name_cache
+
+__all__ = [
+    "PRELOADERS",
+    "register_preloader",
+    "register_worker_starter",
+    "preload",
+    "get_readiness",
+    "init_warmup",
+    "warm_up_app",
+    "start_worker",
+    "warmup_blueprint",
+]
+
+logger = logging.getLogger(__name__)
+
+#: The functions loading a resource, given a Neo4j client, by resource name
+PRELOADERS: Dict[str, Callable[[Neo4jClient], Any]] = {}
+
+_WORKER_STARTERS: List[Callable[[Flask], None]] = []
+_STATUS: Dict[str, Dict[str, Any]] = {}
+_STATUS_LOCK = threading.Lock()
+_START_LOCK = threading.Lock()
+#: The process that loaded the app and the one that started its worker
+_PIDS: Dict[str, int] = {}
+
+warmup_blueprint = Blueprint("warmup", __name__)
+
+
+def register_preloader(name: str):
+    """Register a function loading a resource before requests need it.
+
+    Parameters
+    ----------
+    name :
+        The name of the resource.
+
+    Returns
+    -------
+    :
+        A decorator registering a function that takes a Neo4j client.
+    """
+
+    def _decorator(func: Callable[[Neo4jClient], Any]):
+        PRELOADERS[name] = func
+        return func
+
+    return _decorator
+
+
+def register_worker_starter(func: Callable[[Flask], None]):
+    """Register a function to run once in every worker process.
+
+    Parameters
+    ----------
+    func :
+        A function taking the app, e.g., starting a background thread.
+
+    Returns
+    -------
+    :
+        The function.
+    """
+    _WORKER_STARTERS.append(func)
+    return func
+
+
+def preload(
+    client: Neo4jClient, names: Optional[Iterable[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Load the registered resources that aren't loaded yet.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    names :
+        The names of the resources to load. Defaults to all registered ones.
+
+    Returns
+    -------
+    :
+        The status of each resource, see :func:`get_readiness`.
+    """
+    for name in list(names or PRELOADERS):
+        with _STATUS_LOCK:
+            if _STATUS.get(name, {}).get("status") in {"loading", "ready"}:
+                continue
+            _STATUS[name] = {"status": "loading"}
+        start = time.time()
+        try:
+            PRELOADERS[name](client)
+        except Exception as err:
+            logger.exception(f"Could not preload {name}: {err}")
+            status = {"status": "failed", "error": str(err)}
+        else:
+            status = {"status": "ready"}
+        status["seconds"] = round(time.time() - start, 3)
+        logger.info(f"Preloaded {name} in {status['seconds']:.2f} seconds")
+        with _STATUS_LOCK:
+            _STATUS[name] = status
+    return get_readiness()[1]
+
+
+def get_readiness() -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+    """Get if the resources of this process are loaded.
+
+    Returns
+    -------
+    :
+        True if every registered resource was loaded or failed to load, and
+        the status of each resource (``pending``, ``loading``, ``ready`` or
+        ``failed``) with the seconds it took and the error if it failed.
+    """
+    with _STATUS_LOCK:
+        resources = {
+            name: dict(_STATUS.get(name, {"status": "pending"}))
+            for name in PRELOADERS
+        }
+    ready = all(
+        status["status"] in {"ready", "failed"} for status in resources.values()
+    )
+    return ready, resources
+
+
+@warmup_blueprint.route("/ready", methods=["GET"])
+def ready():
+    """Report if this worker has warmed up."""
+    is_ready, resources = get_readiness()
+    response = jsonify(ready=is_ready, pid=os.getpid(), resources=resources)
+    response.status_code = (
+        HTTPStatus.OK if is_ready else HTTPStatus.SERVICE_UNAVAILABLE
+    )
+    return response
+
+
+def init_warmup(app: Flask):
+    """Set up the warm up of an app in the process loading it.
+
+    Parameters
+    ----------
+    app :
+        The app, with a Neo4j client in its extensions.
+    """
+    _PIDS["app"] = os.getpid()
+    app.register_blueprint(warmup_blueprint)
+    app.before_request(lambda: start_worker(app))
+
+
+def warm_up_app(app: Flask):
+    """Load all resources in the process that loaded the app.
+
+    Call this in the gunicorn master before forking the workers. The
+    connections the master opened to Neo4j are closed afterwards since the
+    workers connect with their own drivers.
+
+    Parameters
+    ----------
+    app :
+        The app, with a Neo4j client in its extensions.
+    """
+    client = app.extensions[INDRA_COGEX_EXTENSION]
+    start = time.time()
+    preload(client)
+    logger.info(f"Warmed up the app in {time.time() - start:.2f} seconds")
+    client.driver.close()
+
+
+def start_worker(app: Flask):
+    """Start serving in this process, at most once per process.
+
+    Parameters
+    ----------
+    app :
+        The app, with a Neo4j client in its extensions.
+    """
+    pid = os.getpid()
+    if _PIDS.get("worker") == pid:
+        return
+    with _START_LOCK:
+        if _PIDS.get("worker") == pid:
+            return
+        client = app.extensions[INDRA_COGEX_EXTENSION]
+        if _PIDS.get("app") != pid:
+            client.reconnect()
+        threading.Thread(
+            target=preload, args=(client,), name="warmup", daemon=True
+        ).start()
+        for starter in _WORKER_STARTERS:
+            starter(app)
+        _PIDS["worker"] = pid
+
+
+@register_preloader("bio_ontology")
+def _preload_bio_ontology(client: Neo4jClient):
+    if not bio_ontology._initialized:
+        bio_ontology.initialize()
+
+
+@register_preloader("name_maps")
+def _preload_name_maps(client: Neo4jClient):
+    # The name maps are loaded when the clients are imported
+    from indra.databases import mgi_client, rgd_client  # noqa: F401
+
+
+@register_preloader("agent_names")
+def _preload_agent_names(client: Neo4jClient):
+    get_agent_name_cache()
+
+
+@register_preloader("graph_stats")
+def _preload_graph_stats(client: Neo4jClient):
+    get_graph_stats(client=client)
+
+
+@register_preloader("ontology_index")
+def _preload_ontology_index(client: Neo4jClient):
+    get_ontology_index(client=client)
+
+
+@register_preloader("mesh_index")
+def _preload_mesh_index(client: Neo4jClient):
+    get_mesh_postings_index(client=client)
+
+
+@register_preloader("go_gene_sets")
+def _preload_go_gene_sets(client: Neo4jClient):
+    get_go(client=client)
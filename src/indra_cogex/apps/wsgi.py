@@ -20,13 +20,19 @@ from indra_cogex.apps.constants import (
 )
 from indra_cogex.apps.chat_page import chat_blueprint
 from indra_cogex.apps.curator import explorer_blueprint
-from indra_cogex.apps.curation_cache import CurationCache
+from indra_cogex.apps.curator.explorer_blueprint import TASK_LIST_VIEWS
+from indra_cogex.apps.curation_cache import CurationCache, CurationStore
 from indra_cogex.apps.data_display import data_display_blueprint
 from indra_cogex.apps.gla.gene_blueprint import gene_blueprint
+from indra_cogex.apps.gla.job_blueprint import job_blueprint
 from indra_cogex.apps.gla.metabolite_blueprint import metabolite_blueprint
 from indra_cogex.apps.gla.source_target_blueprint import source_target_blueprint
 from indra_cogex.apps.home import home_blueprint
 from indra_cogex.apps.rest_api import api
+from indra_cogex.apps.serialization import JSONProvider
+from indra_cogex.apps.task_lists import start_task_list_refresher
+from indra_cogex.apps.utils import apply_proxy_fix
+from indra_cogex.apps.warmup import init_warmup, register_worker_starter
 from indra_cogex.client.neo4j_client import Neo4jClient
 from indra_cogex.apps.search import search_blueprint
 
@@ -45,6 +51,8 @@ def url_for(endpoint, **values):
 
 app = Flask(__name__, template_folder=TEMPLATES_DIR, static_folder=STATIC_DIR)
 app.jinja_env.globals['url_for'] = url_for
+app.json = JSONProvider(app)
+apply_proxy_fix(app)
 
 # AUTO-CREATE SESSION DIRECTORY (No manual bash commands needed!)
 SESSION_DIR = '/tmp/flask_session'
@@ -70,10 +78,20 @@ app.register_blueprint(explorer_blueprint)
 app.register_blueprint(chat_blueprint)
 app.register_blueprint(search_blueprint)
 app.register_blueprint(source_target_blueprint)
+app.register_blueprint(job_blueprint)
 api.init_app(app)
 
 app.extensions[INDRA_COGEX_EXTENSION] = Neo4jClient()
-app.extensions[STATEMENT_CURATION_CACHE] = CurationCache()
+app.extensions[STATEMENT_CURATION_CACHE] = CurationCache(store=CurationStore())
+init_warmup(app)
+
+
+@register_worker_starter
+def _start_task_list_refresher(worker_app: Flask):
+    start_task_list_refresher(
+        TASK_LIST_VIEWS, client=worker_app.extensions[INDRA_COGEX_EXTENSION]
+    )
+
 
 config_auth(app)
 
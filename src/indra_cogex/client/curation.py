@@ -3,7 +3,7 @@
 import logging
 from functools import lru_cache
 from itertools import chain
-from typing import Iterable, List, Mapping, Optional, Set, Tuple, Type
+from typing import FrozenSet, Iterable, List, Mapping, Optional, Tuple, Type
 
 import pandas as pd
 from indra.assemblers.indranet import IndraNetAssembler
@@ -59,9 +59,8 @@ def _get_text(stmt: Statement) -> Optional[str]:
     return stmt.evidence[0].text if stmt.evidence else None
 
 
-def _get_curated_statement_hashes() -> Set[int]:
-    curation_list = curation_cache.get_curation_cache()
-    return {curation["pa_hash"] for curation in curation_list}
+def _get_curated_statement_hashes() -> FrozenSet[int]:
+    return curation_cache.get_curated_statement_hashes()
 
 
 def get_prioritized_stmt_hashes(stmts: Iterable[Statement], include_db_evidence: bool = True) -> List[int]:
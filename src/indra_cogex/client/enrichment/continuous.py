@@ -5,18 +5,26 @@
 For example, this could be applied to the log_2 fold scores from differential gene
 expression experiments.
 
+GSEA is run with a vectorized implementation of the pre-ranked algorithm
+in :func:`prerank`. When results should be saved along with plots in a
+directory, the run is instead delegated to :func:`gseapy.prerank`.
+
 .. warning::
 
-    This module requires the optional dependency ``gseapy``. Install with
-    ``pip install gseapy``.
+    Saving results and plots requires the optional dependency ``gseapy``.
+    Install with ``pip install gseapy``.
 """
 
 
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, Optional, Set, Tuple, Union
 from indra.databases import hgnc_client
 from pathlib import Path
 import logging
-import gseapy
+import multiprocessing
+import os
+import threading
+import numpy as np
 import pandas as pd
 
 from indra_cogex.client.enrichment.utils import (
@@ -42,6 +50,7 @@ __all__ = [
     "indra_upstream_gsea",
     "indra_downstream_gsea",
     "gsea",
+    "prerank",
 ]
 
 
@@ -244,7 +253,7 @@ def wikipathways_gsea(
         Specify the directory if the results should be saved, including
         both a dataframe and plots for each gen set
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`gsea`
 
     Returns
     -------
@@ -280,7 +289,7 @@ def reactome_gsea(
         Specify the directory if the results should be saved, including
         both a dataframe and plots for each gen set
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`gsea`
 
     Returns
     -------
@@ -316,7 +325,7 @@ def phenotype_gsea(
         Specify the directory if the results should be saved, including
         both a dataframe and plots for each gen set
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`gsea`
 
     Returns
     -------
@@ -352,7 +361,7 @@ def go_gsea(
         Specify the directory if the results should be saved, including
         both a dataframe and plots for each gen set
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`gsea`
 
     Returns
     -------
@@ -397,7 +406,7 @@ def indra_upstream_gsea(
         The minimum belief for a relationship to count it as a regulator.
         Defaults to 0.0 (i.e., cutoff not applied).
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`gsea`
 
     Returns
     -------
@@ -456,7 +465,7 @@ def indra_downstream_gsea(
         The minimum belief for a relationship to count it as a regulator.
         Defaults to 0.0 (i.e., cutoff not applied).
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`gsea`
 
     Returns
     -------
@@ -485,6 +494,323 @@ def indra_downstream_gsea(
     )
 
 
+#: Keyword arguments of :func:`gseapy.prerank` that :func:`prerank` supports.
+#: ``format`` only applies to plots, which are not made by :func:`prerank`.
+PRERANK_KWARGS = {
+    "permutation_num",
+    "weight",
+    "min_size",
+    "max_size",
+    "seed",
+    "threads",
+    "format",
+    "verbose",
+}
+
+#: The number of permutations run with each random stream in :func:`prerank`
+PERMUTATION_BLOCK_SIZE = 100
+
+_EXECUTOR: Dict[str, Tuple[int, ProcessPoolExecutor]] = {}
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_permutation_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Get the process pool running permutations in this process.
+
+    The workers are spawned rather than forked since the process calling
+    :func:`prerank` is usually a multithreaded web app holding a Neo4j
+    driver.
+
+    Parameters
+    ----------
+    max_workers :
+        The number of processes needed. A smaller pool is replaced with one
+        of this size, letting the permutations already submitted to it
+        finish.
+
+    Returns
+    -------
+    :
+        The process pool, created on first use.
+    """
+    with _EXECUTOR_LOCK:
+        workers, executor = _EXECUTOR.get("default", (0, None))
+        if workers < max_workers:
+            if executor is not None:
+                executor.shutdown(wait=False)
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _EXECUTOR["default"] = (max_workers, executor)
+    return executor
+
+
+def _running_sums(
+    positions: np.ndarray,
+    ptr: np.ndarray,
+    weights: np.ndarray,
+    hit_numbers: np.ndarray,
+    miss_steps: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the running sum right after and right before each hit.
+
+    The running sum of a gene set only reaches its maximum right after a hit
+    and its minimum right before one, so it is enough to evaluate it at the
+    hits. ``positions`` holds the ranks of the hits of all gene sets, sorted
+    within each gene set, with the gene sets delimited by ``ptr``.
+    ``hit_numbers`` is the index of each hit within its gene set and
+    ``miss_steps`` the running sum decrement of the hit's gene set.
+    """
+    sizes = np.diff(ptr)
+    hit_weights = weights[positions]
+    cumulative = np.cumsum(hit_weights)
+    offsets = np.concatenate(([0.0], cumulative))[ptr[:-1]]
+    with np.errstate(divide="ignore"):
+        scales = np.repeat(1.0 / (cumulative[ptr[1:] - 1] - offsets), sizes)
+    after = cumulative
+    after -= np.repeat(offsets, sizes)
+    after *= scales
+    # The number of misses before a hit is its rank minus the number of
+    # preceding hits in the same gene set
+    after -= (positions - hit_numbers) * miss_steps
+    hit_weights *= scales
+    before = after - hit_weights
+    return after, before
+
+
+def _enrichment_scores(
+    positions: np.ndarray,
+    ptr: np.ndarray,
+    weights: np.ndarray,
+    hit_numbers: np.ndarray,
+    miss_steps: np.ndarray,
+) -> np.ndarray:
+    """Return the enrichment score of each gene set."""
+    after, before = _running_sums(positions, ptr, weights, hit_numbers, miss_steps)
+    es_max = np.maximum.reduceat(after, ptr[:-1])
+    es_min = np.minimum.reduceat(before, ptr[:-1])
+    return np.where(np.abs(es_max) > np.abs(es_min), es_max, es_min)
+
+
+def _null_enrichment_scores(
+    ranks: np.ndarray,
+    ptr: np.ndarray,
+    weights: np.ndarray,
+    hit_numbers: np.ndarray,
+    miss_steps: np.ndarray,
+    permutation_num: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """Return enrichment scores for gene sets with randomly permuted ranks.
+
+    Every permutation shuffles the ranking once and applies it to all gene
+    sets, which keeps the gene sets' sizes and the score distribution.
+    """
+    rng = np.random.default_rng(seed)
+    n_genes = len(weights)
+    segment_offsets = np.repeat(np.arange(len(ptr) - 1, dtype=np.int64), np.diff(ptr))
+    segment_offsets *= n_genes
+    rv = np.empty((len(ptr) - 1, permutation_num))
+    for i in range(permutation_num):
+        keys = segment_offsets + rng.permutation(n_genes)[ranks]
+        keys.sort()
+        keys -= segment_offsets
+        rv[:, i] = _enrichment_scores(keys, ptr, weights, hit_numbers, miss_steps)
+    return rv
+
+
+def _normalize(es: np.ndarray, es_null: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Scale scores by the mean of the null scores of the same sign."""
+    positive = es_null >= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pos_mean = np.where(positive, es_null, 0).sum(axis=1) / positive.sum(axis=1)
+        neg_mean = -np.where(~positive, es_null, 0).sum(axis=1) / (~positive).sum(axis=1)
+        nes = np.where(es >= 0, es / pos_mean, es / neg_mean)
+        nes_null = np.where(
+            positive, es_null / pos_mean[:, None], es_null / neg_mean[:, None]
+        )
+    return nes, nes_null
+
+
+def _nominal_pvalues(es: np.ndarray, es_null: np.ndarray) -> np.ndarray:
+    """Estimate p-values from the null scores with the sign of the observed score."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pos = (es_null >= es[:, None]).sum(axis=1) / (es_null >= 0).sum(axis=1)
+        neg = (es_null < es[:, None]).sum(axis=1) / (es_null < 0).sum(axis=1)
+    return np.where(es < 0, neg, pos)
+
+
+def _fdr(nes: np.ndarray, nes_null: np.ndarray) -> np.ndarray:
+    """Estimate FDR q-values by comparing the tails of the normalized scores.
+
+    For a non-negative NES, this is the fraction of non-negative null scores
+    at least as large, divided by the fraction of non-negative observed
+    scores at least as large, and symmetrically for negative scores.
+    """
+    null = np.sort(nes_null[np.isfinite(nes_null)])
+    observed = np.sort(nes[np.isfinite(nes)])
+    null_zero = np.searchsorted(null, 0, side="left")
+    observed_zero = np.searchsorted(observed, 0, side="left")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pos = (
+            (len(null) - np.searchsorted(null, nes, side="left"))
+            / (len(null) - null_zero)
+        ) / (
+            (len(observed) - np.searchsorted(observed, nes, side="left"))
+            / (len(observed) - observed_zero)
+        )
+        neg = (np.searchsorted(null, nes, side="right") / null_zero) / (
+            np.searchsorted(observed, nes, side="right") / observed_zero
+        )
+    fdr = np.where(nes >= 0, pos, neg)
+    return np.where(np.isnan(fdr), 1.0, np.minimum(fdr, 1.0))
+
+
+def prerank(
+    scores: Dict[str, float],
+    gene_sets: Dict[str, Set[str]],
+    permutation_num: int = 1000,
+    weight: float = 1.0,
+    min_size: int = 1,
+    max_size: int = 50000,
+    seed: int = 123,
+    threads: Optional[int] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Run pre-ranked GSEA on all gene sets at once.
+
+    This follows the algorithm (and the output format) of
+    :func:`gseapy.prerank`. The ranked scores are computed once and the
+    running-sum enrichment scores of all gene sets are evaluated together
+    on a flat membership array. Permutations are split across a process
+    pool, each process with its own stream of a seeded random generator.
+
+    Parameters
+    ----------
+    scores :
+        A mapping from gene identifiers to floating point scores
+    gene_sets :
+        A mapping from gene set identifiers to sets of gene identifiers
+    permutation_num :
+        The number of permutations for estimating significance. Defaults
+        to 1000.
+    weight :
+        The exponent of the scores used to weight hits in the running
+        sum. Defaults to 1.
+    min_size :
+        The minimum number of genes of a gene set in the ranking.
+    max_size :
+        The maximum number of genes of a gene set in the ranking.
+    seed :
+        The seed of the random generator used for permutations.
+    threads :
+        The number of processes to run permutations in. Defaults to the
+        number of CPUs, at most 4. The processes are shared by all calls in
+        this process, so a call may use more of them if an earlier one asked
+        for more.
+    kwargs :
+        Other keyword arguments of :func:`gseapy.prerank` that don't apply
+        here (e.g., ``format``), which are ignored.
+
+    Returns
+    -------
+    :
+        A pandas dataframe with the columns ``Term``, ``ES``, ``NES``,
+        ``NOM p-val``, ``FDR q-val`` and ``Tag %``, sorted by the absolute
+        value of NES, like the ``res2d`` attribute of the result of
+        :func:`gseapy.prerank`.
+    """
+    ranking = pd.Series(scores, dtype=float).dropna()
+    ranking = ranking[~ranking.index.duplicated()]
+    order = np.argsort(-ranking.to_numpy(), kind="stable")
+    ranking = ranking.iloc[order]
+    n_genes = len(ranking)
+    gene_to_rank = {gene: rank for rank, gene in enumerate(ranking.index)}
+
+    terms = []
+    set_ranks = []
+    for term, genes in gene_sets.items():
+        set_rank = sorted({gene_to_rank[g] for g in genes if g in gene_to_rank})
+        if set_rank and min_size <= len(set_rank) <= max_size:
+            terms.append(term)
+            set_ranks.append(set_rank)
+    if not terms:
+        return pd.DataFrame(columns=["Term", "ES", "NES", "NOM p-val", "FDR q-val", "Tag %"])
+
+    sizes = np.array([len(set_rank) for set_rank in set_ranks])
+    ptr = np.concatenate(([0], np.cumsum(sizes)))
+    ranks = np.fromiter(
+        (rank for set_rank in set_ranks for rank in set_rank),
+        dtype=np.int64,
+        count=ptr[-1],
+    )
+    hit_numbers = np.arange(len(ranks)) - np.repeat(ptr[:-1], sizes)
+    weights = np.abs(ranking.to_numpy()) ** weight
+    miss_steps = np.repeat(1.0 / np.maximum(n_genes - sizes, 1), sizes)
+    args = (ranks, ptr, weights, hit_numbers, miss_steps)
+
+    after, before = _running_sums(*args)
+    es_max = np.maximum.reduceat(after, ptr[:-1])
+    es_min = np.minimum.reduceat(before, ptr[:-1])
+    es = np.where(np.abs(es_max) > np.abs(es_min), es_max, es_min)
+
+    # The number of hits in the leading edge, i.e., up to the maximum of the
+    # running sum for positive scores and from the minimum for negative ones
+    at_es = np.where(np.repeat(es >= 0, sizes), after, before) == np.repeat(es, sizes)
+    first_at_es = np.minimum.reduceat(
+        np.where(at_es, hit_numbers, len(ranks)), ptr[:-1]
+    )
+    leading_edge = np.where(es >= 0, first_at_es + 1, sizes - first_at_es)
+
+    if permutation_num > 0:
+        # Permutations are run in fixed size blocks with their own random
+        # streams so that the results don't depend on the number of processes
+        blocks = [
+            len(block)
+            for block in np.array_split(
+                np.arange(permutation_num), -(-permutation_num // PERMUTATION_BLOCK_SIZE)
+            )
+        ]
+        seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+        if threads is None:
+            threads = min(4, os.cpu_count() or 1)
+        threads = max(1, min(threads, len(blocks)))
+        if threads == 1:
+            es_null = np.hstack(
+                [
+                    _null_enrichment_scores(*args, block, block_seed)
+                    for block, block_seed in zip(blocks, seeds)
+                ]
+            )
+        else:
+            executor = _get_permutation_executor(threads)
+            futures = [
+                executor.submit(_null_enrichment_scores, *args, block, block_seed)
+                for block, block_seed in zip(blocks, seeds)
+            ]
+            es_null = np.hstack([future.result() for future in futures])
+        nes, nes_null = _normalize(es, es_null)
+        pvals = _nominal_pvalues(es, es_null)
+        fdrs = _fdr(nes, nes_null)
+    else:
+        nes = pvals = fdrs = np.full(len(terms), np.nan)
+
+    rv = pd.DataFrame(
+        {
+            "Term": terms,
+            "ES": es,
+            "NES": nes,
+            "NOM p-val": pvals,
+            "FDR q-val": fdrs,
+            "Tag %": [f"{tags}/{size}" for tags, size in zip(leading_edge, sizes)],
+        }
+    )
+    return rv.reindex(rv["NES"].abs().sort_values(ascending=False).index).reset_index(
+        drop=True
+    )
+
+
 GSEA_RETURN_COLUMNS = [
     "Term",
     "Name",
@@ -536,7 +862,9 @@ def gsea(
     is_downstream :
         Whether this is downstream analysis (gene → regulator)
     kwargs :
-        Remaining keyword arguments to pass through to :func:`gseapy.prerank`
+        Remaining keyword arguments to pass through to :func:`prerank`,
+        or to :func:`gseapy.prerank` if a directory is given or an option
+        only supported by gseapy is used
 
     Returns
     -------
@@ -561,33 +889,30 @@ def gsea(
         for (curie, _), hgnc_gene_ids in gene_sets.items()
     }
 
-    # Set default parameters for gseapy
-    kwargs.setdefault("permutation_num", 100)
-    kwargs.setdefault("format", "svg")
-
     # Set gene set size limits to allow small and large gene sets
     kwargs.setdefault("min_size", 1)
     kwargs.setdefault("max_size", 50000)
 
-    # Convert gene sets to ensure they're regular sets of strings
-    curie_to_gene_sets_final = {
-        curie: set(str(gene_id) for gene_id in gene_set)
-        for curie, gene_set in curie_to_gene_sets.items()
-    }
-
-    # Run GSEA analysis
-    res = gseapy.prerank(
-        rnk=pd.Series(scores),
-        gene_sets=curie_to_gene_sets_final,
-        outdir=directory,
-        **kwargs,
-    )
+    if directory is None and set(kwargs) <= PRERANK_KWARGS:
+        res2d = prerank(scores=scores, gene_sets=curie_to_gene_sets, **kwargs)
+    else:
+        # Plots and other gseapy specific options need gseapy itself
+        import gseapy
+
+        kwargs.setdefault("permutation_num", 100)
+        kwargs.setdefault("format", "svg")
+        res2d = gseapy.prerank(
+            rnk=pd.Series(scores),
+            gene_sets=curie_to_gene_sets,
+            outdir=directory,
+            **kwargs,
+        ).res2d
 
     # Process results
     # Full column list as of gseapy 1.1.2:
     # Name, Term, ES, NES, NOM p-val, FDR q-val, FWER p-val, Tag %, Gene %,
     # Lead_genes
-    rv = res.res2d.reset_index()
+    rv = res2d.reset_index()
     rv["Name"] = rv["Term"].map(curie_to_name)
     rv["matched_size"] = rv['Tag %'].apply(lambda s: s.split('/')[0])
     rv["geneset_size"] = rv['Tag %'].apply(lambda s: s.split('/')[1])
@@ -10,6 +10,7 @@ from scipy.stats import fisher_exact
 from statsmodels.stats.multitest import multipletests
 
 from indra_cogex.apps.search.search import get_kinase_phosphosite_statements
+from indra_cogex.client.enrichment.examples import EXAMPLE_GENE_IDS
 from indra_cogex.client.enrichment.utils import (
     get_entity_to_regulators,
     get_entity_to_targets,
@@ -18,6 +19,9 @@ from indra_cogex.client.enrichment.utils import (
     get_reactome,
     get_wikipathways,
     get_kinase_phosphosites,
+    get_phosphosites,
+    get_sqlite_phosphosite_count,
+    SQLITE_CACHE_PATH,
 )
 from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
 from indra_cogex.client.queries import get_genes_for_go_term
@@ -35,20 +39,6 @@ __all__ = [
     "EXAMPLE_GENE_IDS",
 ]
 
-# fmt: off
-#: This example list comes from human genes associated with COVID-19
-#: (https://bgee.org/?page=top_anat#/result/9bbddda9dea22c21edcada56ad552a35cb8e29a7/)
-EXAMPLE_GENE_IDS = [
-    "613", "1116", "1119", "1697", "7067", "2537", "2734", "29517", "8568", "4910", "4931", "4932", "4962", "4983",
-    "18873", "5432", "5433", "5981", "16404", "5985", "18358", "6018", "6019", "6021", "6118", "6120", "6122",
-    "6148", "6374", "6378", "6395", "6727", "14374", "8004", "18669", "8912", "30306", "23785", "9253", "9788",
-    "10498", "10819", "6769", "11120", "11133", "11432", "11584", "18348", "11849", "28948", "11876", "11878",
-    "11985", "20820", "12647", "20593", "12713"
-]
-
-
-# fmt: on
-
 
 def _prepare_hypergeometric_test(
     query_set: Set[str],
@@ -467,33 +457,13 @@ def count_phosphosites(*, client: Neo4jClient) -> int:
     :
         Number of unique phosphosites
     """
-    # Query to get all target, residue, position combinations
-    query = """\
-        MATCH (s:BioEntity)-[r:indra_rel]->(t:BioEntity) 
-        WHERE r.stmt_type = 'Phosphorylation' 
-          AND r.stmt_json CONTAINS '"residue"' 
-          AND r.stmt_json CONTAINS '"position"'
-        RETURN DISTINCT t.id as target_id, 
-                        r.stmt_json as json_string
-    """
-
-    results = client.query_tx(query)
-
-    # Process the results to extract unique phosphosites
-    unique_sites = set()
-    import json
-
-    for target_id, json_string in results:
-        try:
-            stmt_json = json.loads(json_string)
-            residue = stmt_json.get("residue")
-            position = stmt_json.get("position")
-            if residue and position:
-                unique_sites.add((target_id, residue, position))
-        except json.JSONDecodeError:
-            continue
-
-    count = len(unique_sites)
+    # The phosphosite table of the SQLite cache is preferred, otherwise the
+    # sites are collected from the graph
+    count = None
+    if SQLITE_CACHE_PATH.exists():
+        count = get_sqlite_phosphosite_count(SQLITE_CACHE_PATH)
+    if count is None:
+        count = len(get_phosphosites(client=client, use_sqlite_cache=False))
 
     if count == 0:
         # Fallback to a minimum value to avoid division by zero
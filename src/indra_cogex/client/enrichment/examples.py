@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Example inputs for the enrichment analyses.
+
+These are kept apart from the analysis modules so that the web app can show
+them without importing the analyses.
+"""
+
+__all__ = [
+    "EXAMPLE_GENE_IDS",
+    "EXAMPLE_CHEBI_IDS",
+    "EXAMPLE_CHEBI_CURIES",
+    "EXAMPLE_POSITIVE_HGNC_IDS",
+    "EXAMPLE_NEGATIVE_HGNC_IDS",
+]
+
+# fmt: off
+#: This example list comes from human genes associated with COVID-19
+#: (https://bgee.org/?page=top_anat#/result/9bbddda9dea22c21edcada56ad552a35cb8e29a7/)
+EXAMPLE_GENE_IDS = [
+    "613", "1116", "1119", "1697", "7067", "2537", "2734", "29517", "8568", "4910", "4931", "4932", "4962", "4983",
+    "18873", "5432", "5433", "5981", "16404", "5985", "18358", "6018", "6019", "6021", "6118", "6120", "6122",
+    "6148", "6374", "6378", "6395", "6727", "14374", "8004", "18669", "8912", "30306", "23785", "9253", "9788",
+    "10498", "10819", "6769", "11120", "11133", "11432", "11584", "18348", "11849", "28948", "11876", "11878",
+    "11985", "20820", "12647", "20593", "12713"
+]
+# fmt: on
+
+#: Various alcohol dehydrogenase products
+EXAMPLE_CHEBI_IDS = [
+    "15366",  # acetic acid
+    "15343",  # acetaldehyde
+    "16995",  # oxalic acid
+    "16842",  # formaldehyde
+]
+
+EXAMPLE_CHEBI_CURIES = [f"CHEBI:{i}" for i in EXAMPLE_CHEBI_IDS]
+
+# Examples taken as top 40 up and down
+# genes from dz:135 in CREEDS (prostate cancer)
+# fmt: off
+EXAMPLE_POSITIVE_HGNC_IDS = [
+    "10354", "4141", "1692", "11771", "4932", "12692", "6561", "3999",
+    "20768", "10317", "5472", "10372", "12468", "132", "11253", "2198",
+    "10304", "10383", "7406", "10401", "10388", "10386", "7028", "10410",
+    "4933", "10333", "13312", "2705", "10336", "10610", "3189", "402",
+    "11879", "8831", "10371", "2528", "17194", "12458", "11553", "11820",
+]
+EXAMPLE_NEGATIVE_HGNC_IDS = [
+    "5471", "11763", "2192", "2001", "17389", "3972", "10312", "8556",
+    "10404", "7035", "7166", "13429", "29213", "6564", "6502", "15476",
+    "13347", "20766", "3214", "13388", "3996", "7541", "10417", "4910",
+    "2527", "667", "10327", "1546", "6492", "7", "163", "3284", "3774",
+    "12437", "8547", "6908", "3218", "10424", "10496", "1595",
+]
+# fmt: on
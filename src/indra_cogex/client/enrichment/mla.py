@@ -14,6 +14,10 @@ from indra.ontology.bio import bio_ontology
 from indra.statements import stmts_from_json
 
 from indra_cogex.client.enrichment.discrete import _do_ora
+from indra_cogex.client.enrichment.examples import (
+    EXAMPLE_CHEBI_CURIES,
+    EXAMPLE_CHEBI_IDS,
+)
 from indra_cogex.client.enrichment.utils import (
     minimum_belief_helper,
     minimum_evidence_helper,
@@ -220,17 +224,6 @@ def metabolomics_explanation(
     return stmts
 
 
-#: Various alcohol dehydrogenase products
-EXAMPLE_CHEBI_IDS = [
-    "15366",  # acetic acid
-    "15343",  # acetaldehyde
-    "16995",  # oxalic acid
-    "16842",  # formaldehyde
-]
-
-EXAMPLE_CHEBI_CURIES = [f"CHEBI:{i}" for i in EXAMPLE_CHEBI_IDS]
-
-
 def _main():
     from tabulate import tabulate
 
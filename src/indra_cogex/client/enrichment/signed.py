@@ -2,22 +2,40 @@
 
 """A collection of analyses possible on pairs of gene lists (of HGNC identifiers)."""
 
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from textwrap import dedent
-from typing import Iterable, Optional
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
 import pystow
+import scipy.sparse
 import scipy.stats
 
+from indra_cogex.client.enrichment.examples import (
+    EXAMPLE_NEGATIVE_HGNC_IDS,
+    EXAMPLE_POSITIVE_HGNC_IDS,
+)
 from indra_cogex.client.enrichment.utils import (
+    SQLITE_CACHE_PATH,
     get_negative_stmt_sets,
     get_positive_stmt_sets,
+    get_sqlite_cache_versions,
 )
+from indra_cogex.client.graph_stats import get_cached_graph_version
 from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
 
 HERE = Path(__file__).parent.resolve()
 
+#: The number of signed matrices (one per version of the statement sets and
+#: confidence cutoffs) kept in memory
+SIGNED_MATRIX_CACHE_SIZE = 4
+
+_SIGNED_MATRICES: "OrderedDict[Hashable, SignedMatrix]" = OrderedDict()
+_SIGNED_MATRICES_LOCK = threading.Lock()
+
 
 @autoclient()
 def reverse_causal_reasoning(
@@ -76,56 +94,47 @@ def reverse_causal_reasoning(
         alpha = 0.05
     positive_hgnc_ids = set(positive_hgnc_ids)
     negative_hgnc_ids = set(negative_hgnc_ids)
-    database_positive = get_positive_stmt_sets(
+    signed_matrix = get_signed_matrix(
         client=client,
         minimum_belief=minimum_belief,
         minimum_evidence_count=minimum_evidence_count,
     )
-    database_negative = get_negative_stmt_sets(
-        client=client,
-        minimum_belief=minimum_belief,
-        minimum_evidence_count=minimum_evidence_count,
+    entities, genes, signed_matrix = signed_matrix.get_submatrix(
+        positive_hgnc_ids | negative_hgnc_ids, minimum_size=minimum_size
     )
-    entities = set(database_positive).union(database_negative)
-
-    rows = []
-    for entity in entities:
-        entity_positive: set[str] = database_positive.get(entity, set())
-        entity_negative: set[str] = database_negative.get(entity, set())
-        if len(entity_positive) + len(entity_negative) < minimum_size:
-            continue  # skip this hypothesis
-        correct, incorrect, ambiguous = 0, 0, 0
-        for hgnc_id in positive_hgnc_ids:
-            if hgnc_id in entity_positive and hgnc_id in entity_negative:
-                ambiguous += 1
-            elif hgnc_id in entity_positive:
-                correct += 1
-            elif hgnc_id in entity_negative:
-                incorrect += 1
-            else:
-                ambiguous += 1
-        for hgnc_id in negative_hgnc_ids:
-            if hgnc_id in entity_positive and hgnc_id in entity_negative:
-                ambiguous += 1
-            elif hgnc_id in entity_positive:
-                incorrect += 1
-            elif hgnc_id in entity_negative:
-                correct += 1
-            else:
-                ambiguous += 1
-
-        if correct + incorrect:
-            res = scipy.stats.binomtest(
-                correct, correct + incorrect, alternative="greater"
-            )
-            res_p = res.pvalue
-            res_ambig = scipy.stats.binomtest(
-                correct, correct + incorrect + ambiguous, alternative="greater"
-            )
-            res_ambig_p = res_ambig.pvalue
-        else:
-            res_p, res_ambig_p = None, None
-        rows.append((*entity, correct, incorrect, ambiguous, res_p, res_ambig_p))
+    positive_vector = np.array([g in positive_hgnc_ids for g in genes], dtype=int)
+    negative_vector = np.array([g in negative_hgnc_ids for g in genes], dtype=int)
+
+    # For each entity, a gene it regulates in the direction observed counts as
+    # correct, in the opposite direction as incorrect, and otherwise (not
+    # regulated or regulated in both directions) as ambiguous
+    correct_minus_incorrect = signed_matrix @ (positive_vector - negative_vector)
+    correct_plus_incorrect = abs(signed_matrix) @ (positive_vector + negative_vector)
+    correct = (correct_plus_incorrect + correct_minus_incorrect) // 2
+    incorrect = (correct_plus_incorrect - correct_minus_incorrect) // 2
+    ambiguous = len(positive_hgnc_ids) + len(negative_hgnc_ids) - correct_plus_incorrect
+
+    # The one-sided binomial test p-value is the survival function at
+    # correct - 1, as in scipy.stats.binomtest
+    tested = correct_plus_incorrect > 0
+    binom_pvalue = np.minimum(
+        scipy.stats.binom.sf(correct - 1, correct_plus_incorrect, 0.5), 1.0
+    )
+    binom_ambig_pvalue = np.minimum(
+        scipy.stats.binom.sf(correct - 1, correct_plus_incorrect + ambiguous, 0.5), 1.0
+    )
+
+    rows = [
+        (
+            *entity,
+            int(correct[i]),
+            int(incorrect[i]),
+            int(ambiguous[i]),
+            float(binom_pvalue[i]) if tested[i] else None,
+            float(binom_ambig_pvalue[i]) if tested[i] else None,
+        )
+        for i, entity in enumerate(entities)
+    ]
 
     df = pd.DataFrame(
         rows,
@@ -144,26 +153,173 @@ def reverse_causal_reasoning(
     return df
 
 
-# Examples taken as top 40 up and down
-# genes from dz:135 in CREEDS (prostate cancer)
-# fmt: off
-EXAMPLE_POSITIVE_HGNC_IDS = [
-    "10354", "4141", "1692", "11771", "4932", "12692", "6561", "3999",
-    "20768", "10317", "5472", "10372", "12468", "132", "11253", "2198",
-    "10304", "10383", "7406", "10401", "10388", "10386", "7028", "10410",
-    "4933", "10333", "13312", "2705", "10336", "10610", "3189", "402",
-    "11879", "8831", "10371", "2528", "17194", "12458", "11553", "11820",
-]
-EXAMPLE_NEGATIVE_HGNC_IDS = [
-    "5471", "11763", "2192", "2001", "17389", "3972", "10312", "8556",
-    "10404", "7035", "7166", "13429", "29213", "6564", "6502", "15476",
-    "13347", "20766", "3214", "13388", "3996", "7541", "10417", "4910",
-    "2527", "667", "10327", "1546", "6492", "7", "163", "3284", "3774",
-    "12437", "8547", "6908", "3218", "10424", "10496", "1595",
-]
-
-
-# fmt: on
+class SignedMatrix:
+    """Positive and negative regulation encoded as a signed entity-gene matrix.
+
+    Parameters
+    ----------
+    database_positive :
+        A mapping from entities to the genes they positively regulate
+    database_negative :
+        A mapping from entities to the genes they negatively regulate
+    """
+
+    def __init__(
+        self,
+        database_positive: Dict[Tuple[str, str], Set[str]],
+        database_negative: Dict[Tuple[str, str], Set[str]],
+    ):
+        self.entities = sorted(set(database_positive).union(database_negative))
+        genes = sorted(
+            set().union(*database_positive.values(), *database_negative.values())
+        )
+        self.gene_index = {gene: i for i, gene in enumerate(genes)}
+        rows, columns, values = [], [], []
+        for row, entity in enumerate(self.entities):
+            for sign, entity_genes in (
+                (1, database_positive.get(entity, set())),
+                (-1, database_negative.get(entity, set())),
+            ):
+                for gene in entity_genes:
+                    rows.append(row)
+                    columns.append(self.gene_index[gene])
+                    values.append(sign)
+        # Duplicate entries are summed, so genes regulated in both directions
+        # end up as explicit zeros. The matrix is stored by column since each
+        # request only uses the columns of its genes.
+        self.matrix = scipy.sparse.csc_matrix(
+            (values, (rows, columns)),
+            shape=(len(self.entities), len(genes)),
+            dtype=int,
+        )
+        self.matrix.eliminate_zeros()
+        #: The number of positively and negatively regulated genes of each entity
+        self.sizes = np.array(
+            [
+                len(database_positive.get(entity, ()))
+                + len(database_negative.get(entity, ()))
+                for entity in self.entities
+            ]
+        )
+        self._rows: Dict[int, np.ndarray] = {}
+
+    def get_rows(self, minimum_size: int = 0) -> np.ndarray:
+        """Get the rows of the entities regulating enough genes.
+
+        Parameters
+        ----------
+        minimum_size :
+            The minimum number of positively and negatively regulated genes
+            of an entity to be included
+
+        Returns
+        -------
+        :
+            The indices of the rows, in order.
+        """
+        rows = self._rows.get(minimum_size)
+        if rows is None:
+            rows = np.flatnonzero(self.sizes >= minimum_size)
+            self._rows[minimum_size] = rows
+        return rows
+
+    def get_submatrix(
+        self, genes: Iterable[str], minimum_size: int = 0
+    ) -> Tuple[List[Tuple[str, str]], List[str], scipy.sparse.csr_matrix]:
+        """Get the signed matrix of some genes.
+
+        Parameters
+        ----------
+        genes :
+            The genes that make up the columns of the matrix. Genes that no
+            entity regulates are left out, since their columns are all zero.
+        minimum_size :
+            The minimum number of positively and negatively regulated genes
+            (including ones not in ``genes``) of an entity to be included
+
+        Returns
+        -------
+        :
+            The entities that make up the rows of the matrix, the genes that
+            make up its columns and a sparse matrix with 1 for positive, -1
+            for negative and 0 for no (or both positive and negative)
+            regulation of each gene by each entity.
+        """
+        genes = sorted(gene for gene in set(genes) if gene in self.gene_index)
+        rows = self.get_rows(minimum_size)
+        columns = [self.gene_index[gene] for gene in genes]
+        matrix = self.matrix[:, columns].tocsr()[rows]
+        return [self.entities[row] for row in rows], genes, matrix
+
+
+def _get_stmt_sets_version(client: Neo4jClient) -> Optional[str]:
+    """Get the version of the positive and negative statement sets."""
+    if not SQLITE_CACHE_PATH.exists():
+        # The statement sets are queried from the graph
+        graph_version = get_cached_graph_version(client)
+        return graph_version and f"graph|{graph_version}"
+    versions = get_sqlite_cache_versions(SQLITE_CACHE_PATH)
+    positive_version = versions.get("positive_statements")
+    negative_version = versions.get("negative_statements")
+    if positive_version is None or negative_version is None:
+        return None
+    return f"{positive_version}|{negative_version}"
+
+
+@autoclient()
+def get_signed_matrix(
+    *,
+    client: Neo4jClient,
+    minimum_evidence_count: Optional[int] = None,
+    minimum_belief: Optional[float] = None,
+) -> SignedMatrix:
+    """Get the signed matrix of the positive and negative statement sets.
+
+    The matrix is built once per version of the statement sets (see
+    :func:`indra_cogex.client.enrichment.utils.get_sqlite_cache_versions`)
+    and confidence cutoffs. If the version can't be told, it is built on
+    every call.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    minimum_evidence_count :
+        The minimum number of evidences for a relationship.
+    minimum_belief :
+        The minimum belief for a relationship.
+
+    Returns
+    -------
+    :
+        The signed matrix of all entities and genes.
+    """
+    version = _get_stmt_sets_version(client)
+    key = (version, minimum_evidence_count, minimum_belief)
+    if version is not None:
+        with _SIGNED_MATRICES_LOCK:
+            signed_matrix = _SIGNED_MATRICES.get(key)
+            if signed_matrix is not None:
+                _SIGNED_MATRICES.move_to_end(key)
+                return signed_matrix
+    signed_matrix = SignedMatrix(
+        get_positive_stmt_sets(
+            client=client,
+            minimum_belief=minimum_belief,
+            minimum_evidence_count=minimum_evidence_count,
+        ),
+        get_negative_stmt_sets(
+            client=client,
+            minimum_belief=minimum_belief,
+            minimum_evidence_count=minimum_evidence_count,
+        ),
+    )
+    if version is not None:
+        with _SIGNED_MATRICES_LOCK:
+            _SIGNED_MATRICES[key] = signed_matrix
+            while len(_SIGNED_MATRICES) > SIGNED_MATRIX_CACHE_SIZE:
+                _SIGNED_MATRICES.popitem(last=False)
+    return signed_matrix
 
 
 def main():
@@ -2,16 +2,23 @@
 
 """Utilities for getting gene sets."""
 import logging
+import time
+import networkx as nx
+import numpy as np
 import pandas as pd
 import sqlite3
 from tqdm import tqdm
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
 from textwrap import dedent
 from typing import (
+    Callable,
     DefaultDict,
     Dict,
     Iterable,
+    Iterator,
     Optional,
     Set,
     Tuple,
@@ -24,6 +31,7 @@ from indra.databases.identifiers import get_ns_id_from_identifiers
 from indra.ontology.bio import bio_ontology
 from indra_cogex.util import load_stmt_json_str
 from indra_cogex.apps.constants import PYOBO_RESOURCE_FILE_VERSIONS, APP_CACHE_MODULE
+from indra_cogex.client.graph_stats import get_graph_version
 from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
 from indra_cogex.representation import norm_id
 
@@ -36,7 +44,10 @@ __all__ = [
     "get_entity_to_targets",
     "get_entity_to_regulators",
     "get_kinase_phosphosites",
+    "get_phosphosites",
     "SQLITE_CACHE_PATH",
+    "build_sqlite_cache",
+    "get_sqlite_cache_versions",
 ]
 
 logger = logging.getLogger(__name__)
@@ -57,6 +68,73 @@ ConfidenceGeneSet = Literal[
     "negative_statements",
     "kinase_phosphosites",
 ]
+SQLITE_PHOSPHOSITE_TABLE = "phosphosites"
+#: The relations along which gene sets are propagated to ontology parents
+ONTOLOGY_PROPAGATION_RELATIONS = {"isa", "partof"}
+#: Holds the version each dataset in the cache was built from
+SQLITE_VERSION_TABLE = "dataset_versions"
+#: Bump this when the contents of the cached datasets change
+SQLITE_CACHE_VERSION = 1
+SQLITE_INSERT_BATCH_SIZE = 50_000
+
+SQLITE_CREATE_QUERIES = [
+    # Table for (curie, name) to gene set mapping
+    # Use for GO, Reactome, WikiPathways, Phenotypes
+    f"""
+    CREATE TABLE IF NOT EXISTS {SQLITE_GENE_SET_TABLE} (
+        cache_name TEXT NOT NULL,     -- which dataset (1 of 5)
+        curie TEXT NOT NULL,          -- key part 1
+        name TEXT NOT NULL,           -- key part 2
+        value TEXT NOT NULL,          -- one entry in the set
+        PRIMARY KEY (cache_name, curie, name, value)
+    );
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {SQLITE_GENES_WITH_CONFIDENCE_TABLE} (
+        cache_name TEXT NOT NULL,     -- which dataset (1 of 4)
+        curie TEXT NOT NULL,          -- outer key part 1
+        name TEXT NOT NULL,           -- outer key part 2
+        inner_key TEXT NOT NULL,      -- the nested key
+        belief REAL NOT NULL,         -- float value
+        ev_count INTEGER NOT NULL,    -- int value
+        PRIMARY KEY (cache_name, curie, name, inner_key)
+    );
+    """,
+    # Table for the unique phosphosites, used as the universe for kinase
+    # enrichment
+    f"""
+    CREATE TABLE IF NOT EXISTS {SQLITE_PHOSPHOSITE_TABLE} (
+        substrate TEXT NOT NULL,      -- substrate curie
+        residue TEXT NOT NULL,
+        position TEXT NOT NULL,
+        PRIMARY KEY (substrate, residue, position)
+    );
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {SQLITE_VERSION_TABLE} (
+        cache_name TEXT PRIMARY KEY,  -- which dataset
+        version TEXT,                 -- cache, graph and limit it was built with
+        row_count INTEGER NOT NULL,
+        built REAL NOT NULL           -- unix time
+    );
+    """,
+]
+
+SQLITE_INSERT_QUERIES = {
+    SQLITE_GENE_SET_TABLE: (
+        f"INSERT OR IGNORE INTO {SQLITE_GENE_SET_TABLE} "
+        f"(cache_name, curie, name, value) VALUES (?, ?, ?, ?);"
+    ),
+    SQLITE_GENES_WITH_CONFIDENCE_TABLE: (
+        f"INSERT OR IGNORE INTO {SQLITE_GENES_WITH_CONFIDENCE_TABLE} "
+        f"(cache_name, curie, name, inner_key, belief, ev_count) "
+        f"VALUES (?, ?, ?, ?, ?, ?);"
+    ),
+    SQLITE_PHOSPHOSITE_TABLE: (
+        f"INSERT OR IGNORE INTO {SQLITE_PHOSPHOSITE_TABLE} "
+        f"(substrate, residue, position) VALUES (?, ?, ?);"
+    ),
+}
 
 
 @autoclient()
@@ -114,23 +192,118 @@ def collect_gene_sets(
     return res
 
 
+def _get_ontology_children(node: str) -> List[str]:
+    """Get the direct isa/partof children of an ontology node."""
+    return [
+        child
+        for child, edge in bio_ontology.pred[node].items()
+        if edge["type"] in ONTOLOGY_PROPAGATION_RELATIONS
+    ]
+
+
+def _get_ontology_dag(nodes: Iterable[str]) -> nx.DiGraph:
+    """Get the ontology below the given nodes with cycles collapsed.
+
+    Returns the condensation of the subgraph, whose nodes stand for sets of
+    ontology nodes (in their ``members`` attribute) and whose edges point
+    from parents to children.
+    """
+    children: Dict[str, List[str]] = {}
+    queue = deque(nodes)
+    while queue:
+        node = queue.popleft()
+        if node in children:
+            continue
+        children[node] = _get_ontology_children(node)
+        queue.extend(child for child in children[node] if child not in children)
+    graph = nx.DiGraph()
+    graph.add_nodes_from(children)
+    graph.add_edges_from(
+        (node, child) for node, node_children in children.items()
+        for child in node_children
+    )
+    return nx.condensation(graph)
+
+
 def extend_by_ontology(gene_set_mapping: Dict[Tuple[str, str], Set[str]]):
-    """Extend the gene set mapping by ontology."""
+    """Extend each gene set in place with the genes of its ontology descendants.
 
-    # Keys are tuples of (curie, name)
-    for curie, name in gene_set_mapping:
+    The part of the ontology below the terms in the mapping is collected
+    once and walked from the most specific terms up, so the genes of each
+    term are merged into its parents exactly once. Gene sets are held as
+    integer bitsets while they are propagated.
 
+    Parameters
+    ----------
+    gene_set_mapping :
+        A dictionary whose keys are 2-tuples of CURIE and name and whose
+        values are sets of gene identifiers.
+    """
+    if not bio_ontology._initialized:
+        bio_ontology.initialize()
+
+    # Keys are tuples of (curie, name)
+    keys_by_node: DefaultDict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for key in gene_set_mapping:
         # Upper case the curie and split it into prefix and identifier
-        graph_ns, graph_id = curie.split(":", maxsplit=1)
+        graph_ns, graph_id = key[0].split(":", maxsplit=1)
         db_ns, db_id = get_ns_id_from_identifiers(graph_ns, graph_id)
+        if db_ns is None:
+            continue
+        node = bio_ontology.label(db_ns, db_id)
+        if node in bio_ontology:
+            keys_by_node[node].append(key)
+    if not keys_by_node:
+        return
 
-        # Loop the ontology children and add them to the mapping
-        for child_ns, child_id in bio_ontology.get_children(db_ns, db_id):
-            child_name = bio_ontology.get_name(child_ns, child_id)
+    genes = sorted(
+        {gene for keys in keys_by_node.values() for key in keys
+         for gene in gene_set_mapping[key]}
+    )
+    gene_index = {gene: index for index, gene in enumerate(genes)}
+    n_bytes = (len(genes) + 7) // 8
+
+    def _to_bits(gene_set: Set[str]) -> int:
+        bits = np.zeros(n_bytes * 8, dtype=bool)
+        bits[[gene_index[gene] for gene in gene_set]] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def _from_bits(value: int) -> Set[str]:
+        bits = np.unpackbits(
+            np.frombuffer(value.to_bytes(n_bytes, "little"), dtype=np.uint8),
+            bitorder="little",
+        )
+        return {genes[index] for index in np.flatnonzero(bits)}
 
-            gene_set_mapping[curie, name] |= gene_set_mapping.get(
-                (norm_id(child_ns, child_id), child_name), set()
-            )
+    own_bits = {
+        node: _to_bits(set().union(*(gene_set_mapping[key] for key in keys)))
+        for node, keys in keys_by_node.items()
+    }
+    dag = _get_ontology_dag(keys_by_node)
+
+    # Walk from the most specific terms up, only keeping the closure of a
+    # term until all of its parents have used it
+    parent_counts = dict(dag.in_degree())
+    closures: Dict[int, int] = {}
+    for component in reversed(list(nx.topological_sort(dag))):
+        members = dag.nodes[component]["members"]
+        own = 0
+        for node in members:
+            own |= own_bits.get(node, 0)
+        closure = own
+        for child in dag.successors(component):
+            closure |= closures[child]
+            parent_counts[child] -= 1
+            if not parent_counts[child]:
+                del closures[child]
+        if parent_counts[component]:
+            closures[component] = closure
+
+        keys = [key for node in members for key in keys_by_node.get(node, ())]
+        if len(keys) > 1 or (keys and closure != own):
+            descendant_genes = _from_bits(closure)
+            for key in keys:
+                gene_set_mapping[key] |= descendant_genes
 
 
 @autoclient()
@@ -644,6 +817,108 @@ def get_kinase_phosphosites(
     )
 
 
+def get_sqlite_phosphosite_count(
+    sqlite_db_path: Union[Path, str] = SQLITE_CACHE_PATH,
+) -> Optional[int]:
+    """Count the phosphosites in the SQLite cache.
+
+    Parameters
+    ----------
+    sqlite_db_path :
+        Path to the SQLite database to use for caching. Default:
+        APP_CACHE_MODULE found in `indra_cogex.apps.constants`.
+
+    Returns
+    -------
+    :
+        The number of unique (substrate, residue, position) phosphosites, or
+        None if the cache doesn't have a phosphosite table.
+    """
+    conn = sqlite3.connect(sqlite_db_path)
+    try:
+        (count,) = conn.execute(
+            f"SELECT COUNT(*) FROM {SQLITE_PHOSPHOSITE_TABLE}"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # The cache was built before phosphosites were added to it
+        count = None
+    finally:
+        conn.close()
+    return count
+
+
+@autoclient()
+def get_phosphosites(
+    *,
+    client: Neo4jClient,
+    use_sqlite_cache: bool = True,
+    sqlite_db_path: Union[Path, str] = SQLITE_CACHE_PATH,
+) -> Set[Tuple[str, str, str]]:
+    """Get all phosphorylated sites in the graph.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    use_sqlite_cache :
+        If True, use the SQLite cache if it exists. Default: True.
+    sqlite_db_path :
+        Path to the SQLite database to use for caching. Default:
+        APP_CACHE_MODULE found in `indra_cogex.apps.constants`.
+
+    Returns
+    -------
+    :
+        A set of (substrate curie, residue, position) tuples for each unique
+        phosphosite in Phosphorylation statements.
+    """
+    sqlite_db_path = Path(sqlite_db_path)
+    if use_sqlite_cache and sqlite_db_path.exists():
+        conn = sqlite3.connect(sqlite_db_path)
+        try:
+            return set(
+                conn.execute(
+                    f"SELECT substrate, residue, position FROM {SQLITE_PHOSPHOSITE_TABLE}"
+                ).fetchall()
+            )
+        except sqlite3.OperationalError:
+            logger.info("No phosphosites in SQLite cache, querying the graph")
+        finally:
+            conn.close()
+
+    # The residue and position are stored as relation properties at build time
+    query = dedent(
+        """        MATCH (:BioEntity)-[r:indra_rel]->(t:BioEntity)
+        WHERE r.stmt_type = 'Phosphorylation' AND r.residue IS NOT NULL
+        RETURN DISTINCT t.id, r.residue, r.position
+        """
+    )
+    phosphosites = {tuple(row) for row in client.query_tx(query)}
+    if phosphosites:
+        return phosphosites
+
+    # Graphs built before the properties were added need the statement JSONs
+    logger.info("No phosphosite properties in the graph, parsing statement JSONs")
+    query = dedent(
+        """        MATCH (:BioEntity)-[r:indra_rel]->(t:BioEntity)
+        WHERE r.stmt_type = 'Phosphorylation'
+          AND r.stmt_json CONTAINS '"residue"'
+          AND r.stmt_json CONTAINS '"position"'
+        RETURN DISTINCT t.id, r.stmt_json
+        """
+    )
+    for target_id, stmt_json_str in client.query_tx(query):
+        try:
+            stmt_json = load_stmt_json_str(stmt_json_str)
+        except ValueError:
+            continue
+        residue = stmt_json.get("residue")
+        position = stmt_json.get("position")
+        if residue and position:
+            phosphosites.add((target_id, residue, position))
+    return phosphosites
+
+
 @autoclient(cache=True)
 def get_kinase_phosphosites_raw(
     *,
@@ -1583,27 +1858,151 @@ def get_rat_cache(force_cache_refresh: bool = False):
     )
 
 
+def _get_cache_datasets() -> Dict[str, Tuple[str, Callable]]:
+    """Get the table and loader of each dataset in the SQLite cache."""
+    datasets = {
+        cache_name: (SQLITE_GENE_SET_TABLE, func)
+        for cache_name, func in gene_set_table_datasets.items()
+    }
+    datasets.update(
+        (cache_name, (SQLITE_GENES_WITH_CONFIDENCE_TABLE, func))
+        for cache_name, func in genes_with_confidence_datasets.items()
+    )
+    datasets[SQLITE_PHOSPHOSITE_TABLE] = (SQLITE_PHOSPHOSITE_TABLE, get_phosphosites)
+    return datasets
+
+
+def _iter_cache_rows(cache_name: str, table: str, data) -> Iterator[Tuple]:
+    """Yield the rows of a dataset in primary key order."""
+    if table == SQLITE_PHOSPHOSITE_TABLE:
+        yield from sorted(data)
+        return
+
+    if cache_name == "kinase_phosphosites":
+        # Make the inner key 3-tuple a string (curie, name, site)
+        data = {
+            key: {
+                f"{gene_curie}|{gene_name}|{site}": value
+                for (gene_curie, gene_name, site), value in values.items()
+            }
+            for key, values in data.items()
+        }
+
+    for curie, name in sorted(data, key=lambda x: (x[0], x[1])):
+        values = data[(curie, name)]
+        if table == SQLITE_GENE_SET_TABLE:
+            # Set name to curie if name is None or empty
+            for value in sorted(values):
+                yield cache_name, curie, name or curie, value
+        else:
+            for inner_key in sorted(values):
+                belief, ev_count = values[inner_key]
+                yield cache_name, curie, name, inner_key, belief, ev_count
+
+
+def _write_cache_dataset(
+    conn: sqlite3.Connection,
+    cache_name: str,
+    table: str,
+    data,
+    version: Optional[str],
+) -> int:
+    """Replace the rows of a dataset and its version stamp in one transaction."""
+    rows = _iter_cache_rows(cache_name, table, data)
+    count = 0
+    conn.execute("BEGIN")
+    try:
+        if table == SQLITE_PHOSPHOSITE_TABLE:
+            conn.execute(f"DELETE FROM {table}")
+        else:
+            conn.execute(f"DELETE FROM {table} WHERE cache_name = ?", (cache_name,))
+        while True:
+            batch = list(islice(rows, SQLITE_INSERT_BATCH_SIZE))
+            if not batch:
+                break
+            conn.executemany(SQLITE_INSERT_QUERIES[table], batch)
+            count += len(batch)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {SQLITE_VERSION_TABLE} "
+            f"(cache_name, version, row_count, built) VALUES (?, ?, ?, ?);",
+            (cache_name, version, count, time.time()),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return count
+
+
+def get_sqlite_cache_versions(
+    sqlite_db_path: Union[Path, str] = SQLITE_CACHE_PATH,
+) -> Dict[str, Optional[str]]:
+    """Get the version stamp of each dataset in the SQLite cache.
+
+    Parameters
+    ----------
+    sqlite_db_path :
+        Path to the SQLite database. Default: SQLITE_CACHE_PATH.
+
+    Returns
+    -------
+    :
+        A dictionary from dataset names to the version they were built
+        from. Datasets that haven't been built are missing.
+    """
+    if not Path(sqlite_db_path).exists():
+        return {}
+    conn = sqlite3.connect(sqlite_db_path)
+    try:
+        versions = dict(
+            conn.execute(f"SELECT cache_name, version FROM {SQLITE_VERSION_TABLE}")
+        )
+    except sqlite3.OperationalError:
+        # Caches built before version stamps were added
+        versions = {}
+    conn.close()
+    return versions
+
+
+@autoclient()
 def build_sqlite_cache(
     db_path: Path = SQLITE_CACHE_PATH,
     force: bool = False,
     limit: Optional[int] = None,
     return_cache: bool = False,
+    datasets: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    *,
+    client: Neo4jClient,
 ) -> Optional[Dict[str, Dict]]:
-    """Build the SQLite cache for CoGEx.
+    """Build or update the SQLite cache for CoGEx.
+
+    Each dataset is stamped with the version of the graph it was built from
+    and only datasets whose stamp doesn't match the current graph are
+    rebuilt. The dataset queries run concurrently and their rows are
+    written in batches, one transaction per dataset, so readers never see
+    a partially written dataset.
 
     Parameters
     ----------
     db_path :
         The path to the SQLite database file. Default: SQLITE_CACHE_PATH.
     force :
-        If True, the current cache will be ignored and the database will be
-        rebuilt. The current database will be overwritten. Default: False.
+        If True, the selected datasets are rebuilt even if they are up to
+        date. Default: False.
     limit :
         If given, limits the number of rows processed from Neo4j for each
         dataset. This is useful for testing and development. Default: None.
     return_cache :
         If True, returns the results from the graph database queries in a
         dictionary. This is useful for testing. Default: False.
+    datasets :
+        The names of the datasets to build. Default: all datasets.
+    workers :
+        The number of datasets queried at the same time. Default: one per
+        dataset being built.
+    client :
+        The Neo4j client.
 
     Returns
     -------
@@ -1611,49 +2010,43 @@ def build_sqlite_cache(
         If return_cache is True, returns a dictionary with the data used to
         populate the SQLite cache. Otherwise, returns None.
     """
-    if db_path.exists() and not force:
-        logger.info(f"SQLite cache already exists at {db_path}. Skipping build.")
-        return
-
-    if force:
-        logger.info(f"Force rebuilding SQLite cache at {db_path}.")
-        db_path.unlink(missing_ok=True)
+    all_datasets = _get_cache_datasets()
+    if datasets is None:
+        datasets = list(all_datasets)
+    else:
+        datasets = list(datasets)
+        unknown = set(datasets) - set(all_datasets)
+        if unknown:
+            raise ValueError(
+                f"Unknown datasets: {', '.join(sorted(unknown))}. Must be some of "
+                f"{', '.join(all_datasets)}."
+            )
 
-    client = Neo4jClient()
     if not client.ping():
         raise RuntimeError("Cannot connect to Neo4j database. Cannot build SQLite cache.")
 
-    # Table for (curie, name) to gene set mapping
-    # Use for GO, Reactome, WikiPathways, Phenotypes
-    gene_set_table = f"""
-    CREATE TABLE {SQLITE_GENE_SET_TABLE} (
-        cache_name TEXT NOT NULL,     -- which dataset (1 of 5)
-        curie TEXT NOT NULL,          -- key part 1
-        name TEXT NOT NULL,           -- key part 2
-        value TEXT NOT NULL,          -- one entry in the set
-        PRIMARY KEY (cache_name, curie, name, value)
-    );
-    """
-
-    regulator_target_table = f"""
-    CREATE TABLE {SQLITE_GENES_WITH_CONFIDENCE_TABLE} (
-        cache_name TEXT NOT NULL,     -- which dataset (1 of 4)
-        curie TEXT NOT NULL,          -- outer key part 1
-        name TEXT NOT NULL,           -- outer key part 2
-        inner_key TEXT NOT NULL,      -- the nested key
-        belief REAL NOT NULL,         -- float value
-        ev_count INTEGER NOT NULL,    -- int value
-        PRIMARY KEY (cache_name, curie, name, inner_key)
-    );
-    """
+    graph_version = get_graph_version(client=client)
+    version = (
+        f"{SQLITE_CACHE_VERSION}|{graph_version}|{limit}" if graph_version else None
+    )
+    current_versions = get_sqlite_cache_versions(db_path)
+    stale = [
+        cache_name
+        for cache_name in datasets
+        if force or version is None or current_versions.get(cache_name) != version
+    ]
+    if not stale:
+        logger.info(f"SQLite cache at {db_path} is up to date. Skipping build.")
+        return
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(gene_set_table)
-    cursor.execute(regulator_target_table)
-    conn.commit()
-    conn.close()
-    logger.info(f"Built SQLite cache at {db_path}.")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+    for create_table in SQLITE_CREATE_QUERIES:
+        conn.execute(create_table)
+    logger.info(f"Updating {len(stale)} datasets in SQLite cache at {db_path}.")
 
     # Populate the cache
     logger.info("Warming up bioontology...")
@@ -1663,78 +2056,34 @@ def build_sqlite_cache(
         cache_data[SQLITE_GENE_SET_TABLE] = {}
         cache_data[SQLITE_GENES_WITH_CONFIDENCE_TABLE] = {}
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    logger.info("Populating SQLite gene set cache")
-    for cache_name, func in tqdm(
-        gene_set_table_datasets.items(), desc="Populating gene set cache"
-    ):
-        data = func(use_sqlite_cache=False, limit=limit)
-
-        # Store in return cache if requested
-        if return_cache:
-            cache_data[SQLITE_GENE_SET_TABLE][cache_name] = data
-
-        # Prepare data for insertion
-        to_insert = []
-        sorted_keys = sorted(data.keys(), key=lambda x: (x[0], x[1]))
-        for (curie, name) in sorted_keys:
-            values = data[(curie, name)]
-            for value in sorted(values):
-                # Set name to curie if name is None or empty
-                if not name:
-                    name = curie
-                to_insert.append((cache_name, curie, name, value))
-
-        # Insert data into the database
-        cursor.executemany(
-            f"INSERT OR IGNORE INTO {SQLITE_GENE_SET_TABLE} "
-            f"(cache_name, curie, name, value) VALUES (?, ?, ?, ?);",
-            to_insert
-        )
-        conn.commit()
-
-    logger.info("Populating SQLite genes with confidence cache")
-    for cache_name, func in tqdm(
-        genes_with_confidence_datasets.items(),
-        desc="Populating genes with confidence cache"
-    ):
-        data = func(use_sqlite_cache=False, limit=limit)
-
-        # Store in return cache if requested
-        if return_cache:
-            cache_data[SQLITE_GENES_WITH_CONFIDENCE_TABLE][cache_name] = data
-
-        if cache_name == "kinase_phosphosites":
-            # Make the inner key 3-tuple a string (curie, name, site)
-            flat_key_data = {}
-            for (curie, name), values in data.items():
-                for (gene_curie, gene_name, site), (belief, ev_count) in values.items():
-                    inner_key = f"{gene_curie}|{gene_name}|{site}"
-                    if (curie, name) not in flat_key_data:
-                        flat_key_data[(curie, name)] = {}
-                    flat_key_data[(curie, name)][inner_key] = (belief, ev_count)
-            data = flat_key_data
-
-        # Prepare data for insertion
-        to_insert = []
-        sorted_keys = sorted(data.keys(), key=lambda x: (x[0], x[1]))
-        for (curie, name) in sorted_keys:
-            inner_dict = data[(curie, name)]
-            for inner_key in sorted(inner_dict.keys()):
-                belief, ev_count = inner_dict[inner_key]
-                to_insert.append((cache_name, curie, name, inner_key, belief, ev_count))
-
-        # Insert data into the database
-        cursor.executemany(
-            f"INSERT OR IGNORE INTO {SQLITE_GENES_WITH_CONFIDENCE_TABLE} "
-            f"(cache_name, curie, name, inner_key, belief, ev_count) "
-            f"VALUES (?, ?, ?, ?, ?, ?);",
-            to_insert
-        )
-        conn.commit()
-
-    conn.close()
+    def _load(cache_name: str):
+        table, func = all_datasets[cache_name]
+        if table == SQLITE_PHOSPHOSITE_TABLE:
+            return func(client=client, use_sqlite_cache=False)
+        return func(client=client, use_sqlite_cache=False, limit=limit)
+
+    # Queries run in the pool while this thread is the only one writing
+    try:
+        with ThreadPoolExecutor(max_workers=workers or len(stale)) as executor:
+            futures = {
+                executor.submit(_load, cache_name): cache_name for cache_name in stale
+            }
+            for future in tqdm(
+                as_completed(futures), total=len(futures),
+                desc="Populating SQLite cache",
+            ):
+                cache_name = futures[future]
+                data = future.result()
+                table = all_datasets[cache_name][0]
+                if return_cache:
+                    if table == SQLITE_PHOSPHOSITE_TABLE:
+                        cache_data[table] = data
+                    else:
+                        cache_data[table][cache_name] = data
+                count = _write_cache_dataset(conn, cache_name, table, data, version)
+                logger.info(f"Wrote {count} rows for {cache_name}")
+    finally:
+        conn.close()
     logger.info(f"Finished building and populating SQLite cache at {db_path}.")
 
     return cache_data or None
@@ -1768,8 +2117,20 @@ if __name__ == "__main__":
         action="store_true",
         help="Force a refresh of the cache.",
     )
+    parser.add_argument(
+        "--datasets",
+        nargs="+",
+        help="Only build these datasets. Default: all datasets.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="The number of datasets to query at the same time.",
+    )
     args = parser.parse_args()
-    build_sqlite_cache(force=args.force_refresh)
+    build_sqlite_cache(
+        force=args.force_refresh, datasets=args.datasets, workers=args.workers
+    )
 
     # Build the pyobo name-id mapping caches. Skip force refresh since the data
     # isn't from CoGEx, rather change the version to download a new cache.
@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+
+"""Graph-level statistics for the INDRA CoGEx graph.
+
+Node label and relationship type counts are read from the Neo4j count store
+in a single query instead of one query per label/type. Node prefix counts,
+which would otherwise require a scan over every node, are precomputed at
+ingestion time from the node TSV files and stored in a statistics manifest
+(see :func:`build_graph_stats_manifest`).
+
+All statistics are cached, both in memory and on disk, keyed by the version
+of the graph (the database id and creation date reported by Neo4j) so that
+restarting a web worker does not trigger a recount unless the underlying
+database has been re-imported.
+"""
+
+import csv
+import gzip
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+from tqdm import tqdm
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
+
+__all__ = [
+    "GraphStats",
+    "GRAPH_STATS_MANIFEST_PATH",
+    "GRAPH_STATS_CACHE_PATH",
+    "get_graph_version",
+    "get_cached_graph_version",
+    "get_graph_stats",
+    "build_graph_stats_manifest",
+    "load_graph_stats_manifest",
+]
+
+logger = logging.getLogger(__name__)
+
+#: Written at ingestion time from the node TSV files
+GRAPH_STATS_MANIFEST_PATH = APP_CACHE_MODULE.join(name="graph_stats_manifest.json")
+#: Written by the web app, holds the statistics for the last seen graph version
+GRAPH_STATS_CACHE_PATH = APP_CACHE_MODULE.join(name="graph_stats_cache.json")
+#: How long the graph version is trusted before checking the graph again
+GRAPH_VERSION_TTL = 60
+
+
+class GraphStats(NamedTuple):
+    """Counts describing the contents of the graph."""
+
+    graph_version: Optional[str]
+    node_counts: Counter
+    edge_counts: Counter
+    prefix_counts: Counter
+
+    def to_json(self) -> Dict:
+        """Serialize the statistics to a JSON compatible dict."""
+        return {
+            "graph_version": self.graph_version,
+            "node_counts": dict(self.node_counts),
+            "edge_counts": dict(self.edge_counts),
+            "prefix_counts": dict(self.prefix_counts),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "GraphStats":
+        """Load statistics from a dict produced by :meth:`to_json`."""
+        return cls(
+            graph_version=data.get("graph_version"),
+            node_counts=Counter(data.get("node_counts", {})),
+            edge_counts=Counter(data.get("edge_counts", {})),
+            prefix_counts=Counter(data.get("prefix_counts", {})),
+        )
+
+
+_STATS_CACHE: Dict[Optional[str], GraphStats] = {}
+_GRAPH_VERSION: Dict[Optional[str], Tuple[float, Optional[str]]] = {}
+
+
+@autoclient()
+def get_graph_version(*, client: Neo4jClient) -> Optional[str]:
+    """Get an identifier for the currently loaded graph.
+
+    The identifier changes whenever the database is recreated, e.g., by
+    ``neo4j-admin database import full --overwrite-destination``.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+
+    Returns
+    -------
+    :
+        A string combining the database id and its creation date, or None
+        if the database did not report this information.
+    """
+    try:
+        res = client.query_tx("CALL db.info() YIELD id, creationDate "
+                              "RETURN id, creationDate")
+    except Exception as err:
+        logger.warning("Could not get graph version: %s", err)
+        return None
+    if not res:
+        return None
+    db_id, creation_date = res[0]
+    return f"{db_id}:{creation_date}"
+
+
+def get_cached_graph_version(
+    client: Neo4jClient, refresh: bool = False
+) -> Optional[str]:
+    """Get the version of the loaded graph, checking it at most once a minute.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    refresh :
+        If True, check the graph even if the version was checked recently.
+
+    Returns
+    -------
+    :
+        The graph version, or None if it isn't available.
+    """
+    now = time.time()
+    # Clients of different databases have different versions
+    key = getattr(client, "_url", None)
+    checked, version = _GRAPH_VERSION.get(key, (0.0, None))
+    if refresh or version is None or now - checked > GRAPH_VERSION_TTL:
+        version = get_graph_version(client=client)
+        _GRAPH_VERSION[key] = (now, version)
+    return version
+
+
+@autoclient()
+def get_graph_stats(*, client: Neo4jClient, refresh: bool = False) -> GraphStats:
+    """Get node, edge and prefix counts for the graph.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    refresh :
+        If True, ignore any cached statistics and count again.
+
+    Returns
+    -------
+    :
+        The statistics of the current graph version.
+    """
+    graph_version = get_cached_graph_version(client, refresh=refresh)
+    if not refresh:
+        if graph_version in _STATS_CACHE:
+            return _STATS_CACHE[graph_version]
+        cached = _load_cached_stats(graph_version)
+        if cached is not None:
+            _STATS_CACHE[graph_version] = cached
+            return cached
+
+    node_counts, edge_counts = _get_count_store_counts(client)
+    manifest = load_graph_stats_manifest(graph_version=graph_version)
+    if manifest is not None and manifest.get("prefix_counts"):
+        prefix_counts = Counter(manifest["prefix_counts"])
+    else:
+        logger.info("No graph statistics manifest found, counting node prefixes")
+        prefix_counts = _query_prefix_counts(client)
+
+    stats = GraphStats(
+        graph_version=graph_version,
+        node_counts=node_counts,
+        edge_counts=edge_counts,
+        prefix_counts=prefix_counts,
+    )
+    _STATS_CACHE[graph_version] = stats
+    if graph_version is not None:
+        _dump_cached_stats(stats)
+    return stats
+
+
+def _get_count_store_counts(client: Neo4jClient):
+    try:
+        data = client.query_tx(
+            "CALL db.stats.retrieve('GRAPH COUNTS') YIELD data RETURN data",
+            squeeze=True,
+        )[0]
+    except Exception as err:
+        # db.stats.retrieve may be restricted to admin users, in which case
+        # we fall back to one count-store backed query for labels and one
+        # for relationship types
+        logger.info("Could not retrieve graph counts, falling back: %s", err)
+        return _query_label_counts(client), _query_edge_counts(client)
+    node_counts = Counter(
+        {
+            entry["label"]: entry["count"]
+            for entry in data.get("nodes", [])
+            if "label" in entry
+        }
+    )
+    edge_counts = Counter(
+        {
+            entry["relationshipType"]: entry["count"]
+            for entry in data.get("relationships", [])
+            if "relationshipType" in entry
+            and "startLabel" not in entry
+            and "endLabel" not in entry
+        }
+    )
+    return node_counts, edge_counts
+
+
+def _union_count_query(client: Neo4jClient, names: Iterable[str], template: str) -> Counter:
+    names = list(names)
+    if not names:
+        return Counter()
+    query = " UNION ALL ".join(
+        template.format(name=name.replace("`", "``"))
+        + f" RETURN $name_{idx} AS name, count(*) AS count"
+        for idx, name in enumerate(names)
+    )
+    params = {f"name_{idx}": name for idx, name in enumerate(names)}
+    return Counter(dict(client.query_tx(query, **params)))
+
+
+def _query_label_counts(client: Neo4jClient) -> Counter:
+    labels = client.query_tx("CALL db.labels();", squeeze=True)
+    return _union_count_query(client, labels, "MATCH (n:`{name}`)")
+
+
+def _query_edge_counts(client: Neo4jClient) -> Counter:
+    relationship_types = client.query_tx("CALL db.relationshipTypes();", squeeze=True)
+    return _union_count_query(client, relationship_types, "MATCH ()-[r:`{name}`]->()")
+
+
+def _query_prefix_counts(client: Neo4jClient) -> Counter:
+    cypher = (
+        """MATCH (n) WITH split(n.id, ":")[0] as prefix RETURN prefix, count(prefix)"""
+    )
+    return Counter(dict(client.query_tx(cypher)))
+
+
+def _load_cached_stats(graph_version: Optional[str]) -> Optional[GraphStats]:
+    if graph_version is None or not GRAPH_STATS_CACHE_PATH.exists():
+        return None
+    try:
+        with open(GRAPH_STATS_CACHE_PATH) as fh:
+            data = json.load(fh)
+    except (OSError, ValueError) as err:
+        logger.warning("Could not read graph statistics cache: %s", err)
+        return None
+    if data.get("graph_version") != graph_version:
+        return None
+    return GraphStats.from_json(data)
+
+
+def _dump_cached_stats(stats: GraphStats):
+    # Write to a temporary file first so that concurrent workers never read
+    # a partially written cache
+    tmp_path = GRAPH_STATS_CACHE_PATH.with_suffix(".json.tmp")
+    try:
+        with open(tmp_path, "w") as fh:
+            json.dump(stats.to_json(), fh)
+        tmp_path.replace(GRAPH_STATS_CACHE_PATH)
+    except OSError as err:
+        logger.warning("Could not write graph statistics cache: %s", err)
+
+
+def build_graph_stats_manifest(
+    node_paths: Iterable[Union[str, Path]],
+    manifest_path: Union[None, str, Path] = None,
+    graph_version: Optional[str] = None,
+) -> Dict:
+    """Count identifier prefixes in node TSV files.
+
+    Nodes are imported with ``--skip-duplicate-nodes``, so each node id is
+    only counted once even if it appears in several rows or files.
+
+    Parameters
+    ----------
+    node_paths :
+        Paths to the gzipped node TSV files that are imported into Neo4j.
+    manifest_path :
+        Where to write the manifest. Defaults to
+        :data:`GRAPH_STATS_MANIFEST_PATH`.
+    graph_version :
+        The version of the graph built from the node files, if known. The
+        manifest is usually built before the import, in which case it is
+        stamped with the version of the first graph created after it (see
+        :func:`load_graph_stats_manifest`).
+
+    Returns
+    -------
+    :
+        The manifest as a dict with the keys ``created``, ``graph_version``,
+        ``node_paths`` and ``prefix_counts``.
+    """
+    manifest_path = (
+        Path(manifest_path) if manifest_path else GRAPH_STATS_MANIFEST_PATH
+    )
+    node_paths = [Path(p) for p in node_paths]
+    node_ids = set()
+    prefix_counts = Counter()
+    for node_path in tqdm(node_paths, desc="Counting node prefixes", unit="file"):
+        with gzip.open(node_path, "rt") as fh:
+            reader = csv.reader(fh, delimiter="\t")
+            header = next(reader)
+            id_index = header.index("id:ID")
+            for row in tqdm(reader, unit="nodes", leave=False):
+                node_id = row[id_index]
+                if node_id in node_ids:
+                    continue
+                node_ids.add(node_id)
+                prefix_counts[node_id.split(":", 1)[0]] += 1
+
+    manifest = {
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"),
+        "graph_version": graph_version,
+        "node_paths": [str(p) for p in node_paths],
+        "prefix_counts": dict(prefix_counts),
+    }
+    _dump_manifest(manifest, manifest_path)
+    return manifest
+
+
+def load_graph_stats_manifest(
+    manifest_path: Union[None, str, Path] = None,
+    graph_version: Optional[str] = None,
+) -> Optional[Dict]:
+    """Load the graph statistics manifest, if available.
+
+    Parameters
+    ----------
+    manifest_path :
+        The path to the manifest. Defaults to :data:`GRAPH_STATS_MANIFEST_PATH`.
+    graph_version :
+        The version of the loaded graph. If given, a manifest stamped with a
+        different version is ignored. A manifest that isn't stamped yet is
+        stamped with this version if the graph was created after the
+        manifest, i.e., by the import the manifest was built for, and is
+        ignored otherwise.
+
+    Returns
+    -------
+    :
+        The manifest dict, or None if it does not exist, can't be read or
+        belongs to another graph.
+    """
+    manifest_path = (
+        Path(manifest_path) if manifest_path else GRAPH_STATS_MANIFEST_PATH
+    )
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError) as err:
+        logger.warning("Could not read graph statistics manifest: %s", err)
+        return None
+    if graph_version is None or manifest.get("graph_version") == graph_version:
+        return manifest
+    if manifest.get("graph_version") is None:
+        created = _get_graph_creation_date(graph_version)
+        if created is not None and created >= manifest.get("created", ""):
+            logger.info("Stamping graph statistics manifest with %s", graph_version)
+            manifest["graph_version"] = graph_version
+            try:
+                _dump_manifest(manifest, manifest_path)
+            except OSError as err:
+                logger.warning("Could not stamp graph statistics manifest: %s", err)
+            return manifest
+    logger.warning(
+        "Graph statistics manifest at %s does not match graph version %s",
+        manifest_path,
+        graph_version,
+    )
+    return None
+
+
+def _get_graph_creation_date(graph_version: str) -> Optional[str]:
+    # The version is "<db id>:<ISO creation date>", the date is in UTC
+    creation_date = graph_version.split(":", 1)[-1][:19]
+    try:
+        datetime.strptime(creation_date, "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return None
+    return creation_date
+
+
+def _dump_manifest(manifest: Dict, manifest_path: Path):
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as fh:
+        json.dump(manifest, fh, indent=1)
+    tmp_path.replace(manifest_path)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""Loading precomputed indexes that belong to a version of the graph.
+
+The ontology closure index (:mod:`indra_cogex.client.ontology_index`) and
+the MeSH postings index (:mod:`indra_cogex.client.mesh_index`) are built
+offline into a directory of the app cache whose ``meta.json`` records the
+version of the graph they were built for. The directory is a symlink to the
+latest build, which :func:`save_index_dir` writes next to it and swaps in
+with a single rename, so a process never sees the files of two different
+builds. An :class:`IndexLoader` keeps the
+loaded index of each directory in memory and, at most once per
+:data:`INDEX_RECHECK_INTERVAL`, checks whether ``meta.json`` was rewritten
+or the graph version changed, so an index that is built or downloaded
+while the app is running is picked up without a restart, and an index of
+another graph version is dropped. An index is only used if it was built for
+the graph the client is connected to.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Generic, NamedTuple, Optional, Tuple, TypeVar
+
+from indra_cogex.client.graph_stats import get_cached_graph_version
+from indra_cogex.client.neo4j_client import Neo4jClient
+
+__all__ = [
+    "IndexLoader",
+    "INDEX_RECHECK_INTERVAL",
+    "save_index_dir",
+]
+
+logger = logging.getLogger(__name__)
+
+#: How many seconds a loaded or missing index is trusted before checking again
+INDEX_RECHECK_INTERVAL = 60
+
+Index = TypeVar("Index")
+
+
+class _Entry(NamedTuple):
+    checked: float
+    meta_stamp: Optional[Tuple[str, float]]
+    graph_version: Optional[str]
+    index: Optional[object]
+
+
+class IndexLoader(Generic[Index]):
+    """Load an index per directory, checking it against the graph version.
+
+    Parameters
+    ----------
+    name :
+        The name of the index used in log messages.
+    load :
+        A function loading the index from its directory. The loaded index
+        has a ``meta`` dict with the ``graph_version`` it was built for.
+    recheck_interval :
+        How many seconds a loaded or missing index is trusted before its
+        directory and the graph version are checked again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[Path], Index],
+        recheck_interval: float = INDEX_RECHECK_INTERVAL,
+    ):
+        self.name = name
+        self._load = load
+        self.recheck_interval = recheck_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, client: Neo4jClient) -> Optional[Index]:
+        """Get the index of a directory if it was built for the current graph.
+
+        Parameters
+        ----------
+        path :
+            The directory of the index.
+        client :
+            The Neo4j client.
+
+        Returns
+        -------
+        :
+            The index, or None if it isn't available for the current graph.
+        """
+        key = str(path)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry.checked < self.recheck_interval:
+            return entry.index
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.checked < self.recheck_interval:
+                return entry.index
+            meta_path = path / "meta.json"
+            meta_stamp = (
+                (str(meta_path.resolve()), meta_path.stat().st_mtime)
+                if meta_path.exists()
+                else None
+            )
+            graph_version = get_cached_graph_version(client)
+            if (
+                entry is not None
+                and entry.meta_stamp == meta_stamp
+                and entry.graph_version == graph_version
+            ):
+                index = entry.index
+            else:
+                index = self._load_current(path, meta_stamp, graph_version)
+            self._entries[key] = _Entry(now, meta_stamp, graph_version, index)
+            return index
+
+    def _load_current(
+        self,
+        path: Path,
+        meta_stamp: Optional[Tuple[str, float]],
+        graph_version: Optional[str],
+    ) -> Optional[Index]:
+        if meta_stamp is None:
+            logger.info("No %s found at %s", self.name, path)
+            return None
+        try:
+            index = self._load(path)
+        except (OSError, ValueError) as err:
+            logger.warning("Could not load %s from %s: %s", self.name, path, err)
+            return None
+        built_version = index.meta.get("graph_version")
+        # If the graph can't tell its version, there is nothing to check against
+        if graph_version is not None and built_version != graph_version:
+            logger.warning(
+                "Ignoring %s at %s built for graph version %s, the current "
+                "graph version is %s", self.name, path, built_version, graph_version
+            )
+            return None
+        logger.info("Loaded %s with %d entries from %s", self.name, len(index), path)
+        return index
+
+    def clear(self):
+        """Forget the loaded indexes."""
+        with self._lock:
+            self._entries.clear()
+
+
+def save_index_dir(path: Path, write: Callable[[Path], None]):
+    """Write an index directory and swap it in with a single rename.
+
+    The files are written into a new directory next to ``path`` and
+    ``path`` is replaced by a symlink to it, so processes loading the index
+    see either the previous build or the new one. The previous build is kept
+    for processes that are still loading it and older builds are deleted.
+
+    Parameters
+    ----------
+    path :
+        The directory of the index.
+    write :
+        A function writing the files of the index into the directory it is
+        given, with ``meta.json`` among them.
+
+    Raises
+    ------
+    ValueError
+        If ``path`` is a directory that doesn't hold an index.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    build_dir = Path(tempfile.mkdtemp(prefix=f".{path.name}.build-", dir=path.parent))
+    try:
+        write(build_dir)
+        build_dir.chmod(0o755)
+        version_dir = path.with_name(f"{path.name}.{time.time_ns()}")
+        os.replace(build_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    if path.is_symlink():
+        previous = path.resolve()
+    elif path.is_dir():
+        # An index saved before builds were kept in their own directories
+        if any(path.iterdir()) and not (path / "meta.json").exists():
+            raise ValueError(f"{path} exists and is not an index directory")
+        previous = path.with_name(f"{path.name}.0")
+        os.replace(path, previous)
+    else:
+        previous = None
+    link_path = path.with_name(f".{path.name}.link-{os.getpid()}")
+    if link_path.is_symlink():
+        link_path.unlink()
+    link_path.symlink_to(version_dir.name)
+    os.replace(link_path, path)
+
+    for old_dir in path.parent.glob(f"{path.name}.*"):
+        if old_dir not in (version_dir, previous) and old_dir.name[
+            len(path.name) + 1:
+        ].isdigit():
+            shutil.rmtree(old_dir, ignore_errors=True)
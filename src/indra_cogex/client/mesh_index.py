@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+
+"""An inverted index from MeSH terms to the statements supported in papers.
+
+Finding the statements that have evidence from publications annotated with
+a given MeSH term requires joining Evidence, Publication and MeSH nodes,
+which means touching tens of millions of Evidence nodes for common terms.
+This module builds an inverted index once, mapping each MeSH term to a
+posting list of ``(stmt_hash, evidence_count)`` pairs sorted by statement
+hash, where the evidence count is the number of evidences for the
+statement from papers annotated with the term.
+
+The posting lists are stored as flat numpy arrays with a pointer array per
+term (compressed sparse row layout) so that they can be memory-mapped from
+the app cache directory. Descendant terms are rolled up at query time by
+merging their posting lists, see
+:meth:`MeshPostingsIndex.get_stmt_hash_counts`, or by looking up given
+statements in each of them, see :meth:`MeshPostingsIndex.has_stmt_hashes`.
+
+The index can be built with::
+
+    python -m indra_cogex.client.mesh_index
+"""
+
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+from indra_cogex.client.graph_stats import get_graph_version
+from indra_cogex.client.index_loader import IndexLoader, save_index_dir
+from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
+
+__all__ = [
+    "MeshPostingsIndex",
+    "MESH_INDEX_DIR",
+    "build_mesh_postings_index",
+    "build_mesh_postings_index_from_tsv",
+    "iter_mesh_postings_from_graph",
+    "get_mesh_postings_index",
+]
+
+logger = logging.getLogger(__name__)
+
+MESH_INDEX_DIR = APP_CACHE_MODULE.join("mesh_postings")
+
+_ARRAY_NAMES = ("terms", "ptr", "hashes", "counts")
+
+
+class MeshPostingsIndex:
+    """Look up the statements with evidence from papers with a MeSH term."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Optional[Dict] = None):
+        """Initialize the index from its arrays.
+
+        Parameters
+        ----------
+        arrays :
+            A dict with the sorted MeSH ids (``terms``), the posting list
+            pointers (``ptr``), and the concatenated posting lists
+            (``hashes`` and ``counts``).
+        meta :
+            Metadata describing how and when the index was built.
+        """
+        self.terms = arrays["terms"]
+        self.ptr = arrays["ptr"]
+        self.hashes = arrays["hashes"]
+        self.counts = arrays["counts"]
+        self.meta = meta or {}
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "MeshPostingsIndex":
+        """Load an index from a directory, memory-mapping its arrays.
+
+        Parameters
+        ----------
+        path :
+            The directory the index was saved to.
+
+        Returns
+        -------
+        :
+            The loaded index.
+        """
+        path = Path(path)
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r")
+            for name in _ARRAY_NAMES
+        }
+        meta_path = path / "meta.json"
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        return cls(arrays, meta)
+
+    def save(self, path: Union[str, Path]):
+        """Save the index arrays and metadata into a directory.
+
+        Parameters
+        ----------
+        path :
+            The directory to save the index into. The files are written into
+            a new directory that replaces it at once, since running processes
+            may have the previous arrays memory-mapped, see
+            :func:`indra_cogex.client.index_loader.save_index_dir`.
+        """
+        save_index_dir(Path(path), self._write)
+
+    def _write(self, path: Path):
+        for name in _ARRAY_NAMES:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "meta.json").write_text(json.dumps(self.meta, indent=1))
+
+    def _get_idx(self, mesh_id: str) -> Optional[int]:
+        key = mesh_id.encode("utf-8")
+        if len(key) > self.terms.dtype.itemsize:
+            return None
+        idx = int(np.searchsorted(self.terms, key))
+        if idx < len(self.terms) and self.terms[idx] == key:
+            return idx
+        return None
+
+    def __contains__(self, mesh_id: str) -> bool:
+        return self._get_idx(mesh_id) is not None
+
+    def get_postings(self, mesh_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the posting list of a single MeSH term.
+
+        Parameters
+        ----------
+        mesh_id :
+            The normalized MeSH identifier as used in the graph, e.g.,
+            ``mesh:D007251``.
+
+        Returns
+        -------
+        :
+            Two arrays with the statement hashes (sorted) and the
+            corresponding evidence counts.
+        """
+        idx = self._get_idx(mesh_id)
+        if idx is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        start, end = self.ptr[idx], self.ptr[idx + 1]
+        return self.hashes[start:end], self.counts[start:end]
+
+    def has_stmt_hashes(
+        self, mesh_ids: Iterable[str], stmt_hashes: Iterable[int]
+    ) -> np.ndarray:
+        """Check which statements have evidence from papers with any of the terms.
+
+        Each posting list is sorted by statement hash, so the statements are
+        looked up with a binary search per term instead of merging the
+        posting lists.
+
+        Parameters
+        ----------
+        mesh_ids :
+            The normalized MeSH identifiers, typically a term and all its
+            descendants.
+        stmt_hashes :
+            The statement hashes to check.
+
+        Returns
+        -------
+        :
+            A boolean array, True for the statement hashes that are in the
+            posting list of any of the terms.
+        """
+        stmt_hashes = np.fromiter(stmt_hashes, dtype=np.int64)
+        found = np.zeros(len(stmt_hashes), dtype=bool)
+        for mesh_id in set(mesh_ids):
+            hashes, _ = self.get_postings(mesh_id)
+            if not len(hashes):
+                continue
+            idx = np.searchsorted(hashes, stmt_hashes)
+            idx[idx == len(hashes)] = 0
+            found |= np.asarray(hashes[idx]) == stmt_hashes
+            if found.all():
+                break
+        return found
+
+    def get_stmt_hash_counts(
+        self, mesh_ids: Iterable[str], limit: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """Merge the posting lists of several MeSH terms.
+
+        Parameters
+        ----------
+        mesh_ids :
+            The normalized MeSH identifiers, typically a term and all its
+            descendants.
+        limit :
+            If given, only return this many statements, the ones with the
+            most evidences first.
+
+        Returns
+        -------
+        :
+            A list of (stmt_hash, evidence_count) pairs sorted by decreasing
+            evidence count, with evidence counts summed across the terms.
+        """
+        postings = [self.get_postings(mesh_id) for mesh_id in set(mesh_ids)]
+        postings = [(h, c) for h, c in postings if len(h)]
+        if not postings:
+            return []
+        if len(postings) == 1:
+            hashes, counts = postings[0]
+            hashes, counts = np.asarray(hashes), np.asarray(counts, dtype=np.int64)
+        else:
+            all_hashes = np.concatenate([h for h, _ in postings])
+            all_counts = np.concatenate([c for _, c in postings])
+            hashes, inverse = np.unique(all_hashes, return_inverse=True)
+            counts = np.bincount(inverse, weights=all_counts).astype(np.int64)
+        # Sort by count descending, breaking ties by hash for stable output
+        order = np.lexsort((hashes, -counts))
+        if limit is not None:
+            order = order[:limit]
+        return list(zip(hashes[order].tolist(), counts[order].tolist()))
+
+
+def _build_from_frame(
+    postings: pd.DataFrame,
+    path: Union[None, str, Path] = None,
+    meta: Optional[Dict] = None,
+) -> MeshPostingsIndex:
+    postings = postings.groupby(["mesh_id", "stmt_hash"], sort=True)[
+        "evidence_count"
+    ].sum().reset_index()
+    terms, term_starts = np.unique(postings["mesh_id"].to_numpy(), return_index=True)
+    ptr = np.append(term_starts, len(postings)).astype(np.int64)
+    index_meta = {
+        "created": datetime.now().isoformat(),
+        "n_terms": len(terms),
+        "n_postings": len(postings),
+    }
+    index_meta.update(meta or {})
+    index = MeshPostingsIndex(
+        {
+            "terms": np.array([t.encode("utf-8") for t in terms], dtype=bytes),
+            "ptr": ptr,
+            "hashes": postings["stmt_hash"].to_numpy(dtype=np.int64),
+            "counts": postings["evidence_count"].to_numpy(dtype=np.int32),
+        },
+        index_meta,
+    )
+    if path is not None:
+        index.save(path)
+    return index
+
+
+def build_mesh_postings_index(
+    postings: Iterable[Tuple[str, int, int]],
+    path: Union[None, str, Path] = None,
+    meta: Optional[Dict] = None,
+) -> MeshPostingsIndex:
+    """Build the MeSH postings index.
+
+    Parameters
+    ----------
+    postings :
+        An iterable of (mesh_id, stmt_hash, evidence_count) triples. Counts
+        for repeated (mesh_id, stmt_hash) pairs are summed.
+    path :
+        If given, the directory to save the index into.
+    meta :
+        Additional metadata to store with the index.
+
+    Returns
+    -------
+    :
+        The built index.
+    """
+    df = pd.DataFrame.from_records(
+        list(postings), columns=["mesh_id", "stmt_hash", "evidence_count"]
+    )
+    return _build_from_frame(df, path=path, meta=meta)
+
+
+def build_mesh_postings_index_from_tsv(
+    evidence_nodes_path: Union[None, str, Path] = None,
+    citation_edges_path: Union[None, str, Path] = None,
+    annotation_edges_path: Union[None, str, Path] = None,
+    path: Union[None, str, Path] = None,
+    chunksize: int = 10_000_000,
+    meta: Optional[Dict] = None,
+) -> MeshPostingsIndex:
+    """Build the MeSH postings index from the processor output files.
+
+    Parameters
+    ----------
+    evidence_nodes_path :
+        The Evidence nodes file of the ``indra_db_evidence`` processor.
+    citation_edges_path :
+        The ``has_citation`` edges file of the ``indra_db_evidence``
+        processor.
+    annotation_edges_path :
+        The ``annotated_with`` edges file of the ``publication`` processor.
+    path :
+        The directory to save the index into. Defaults to
+        :data:`MESH_INDEX_DIR`.
+    chunksize :
+        The number of rows to read at a time from the large files.
+    meta :
+        Additional metadata to store with the index, e.g., the version of
+        the graph the files were imported into.
+
+    Returns
+    -------
+    :
+        The built index.
+    """
+    if evidence_nodes_path is None or citation_edges_path is None:
+        from indra_cogex.sources.indra_db import EvidenceProcessor
+
+        evidence_nodes_path = (
+            evidence_nodes_path or EvidenceProcessor._get_node_paths("Evidence")[0]
+        )
+        citation_edges_path = citation_edges_path or EvidenceProcessor.edges_path
+    if annotation_edges_path is None:
+        from indra_cogex.sources.pubmed import PublicationProcessor
+
+        annotation_edges_path = PublicationProcessor.edges_path
+    path = Path(path) if path else MESH_INDEX_DIR
+
+    logger.info("Loading evidence statement hashes from %s", evidence_nodes_path)
+    evidence_hashes = pd.concat(
+        tqdm(
+            pd.read_csv(
+                evidence_nodes_path,
+                sep="\t",
+                usecols=["id:ID", "stmt_hash:int"],
+                chunksize=chunksize,
+            ),
+            desc="Evidence nodes",
+        )
+    ).rename(columns={"id:ID": "evidence_id", "stmt_hash:int": "stmt_hash"})
+
+    logger.info("Loading citations from %s", citation_edges_path)
+    citations = pd.read_csv(
+        citation_edges_path, sep="\t", usecols=[":START_ID", ":END_ID"]
+    ).rename(columns={":START_ID": "evidence_id", ":END_ID": "pmid"})
+    pmid_hashes = (
+        citations.merge(evidence_hashes, on="evidence_id")
+        .groupby(["pmid", "stmt_hash"])
+        .size()
+        .rename("evidence_count")
+        .reset_index()
+    )
+    del citations, evidence_hashes
+    pmids = set(pmid_hashes["pmid"])
+
+    # There are hundreds of millions of MeSH annotations, only keep the ones
+    # for publications that are cited by evidences
+    logger.info("Loading MeSH annotations from %s", annotation_edges_path)
+    annotations = pd.concat(
+        chunk.loc[
+            (chunk[":TYPE"] == "annotated_with") & chunk[":START_ID"].isin(pmids),
+            [":START_ID", ":END_ID"],
+        ]
+        for chunk in tqdm(
+            pd.read_csv(
+                annotation_edges_path,
+                sep="\t",
+                usecols=[":START_ID", ":END_ID", ":TYPE"],
+                chunksize=chunksize,
+            ),
+            desc="MeSH annotations",
+        )
+    ).rename(columns={":START_ID": "pmid", ":END_ID": "mesh_id"})
+    postings = annotations.merge(pmid_hashes, on="pmid")[
+        ["mesh_id", "stmt_hash", "evidence_count"]
+    ]
+    return _build_from_frame(
+        postings,
+        path=path,
+        meta={
+            "source": "tsv",
+            "paths": [
+                str(evidence_nodes_path),
+                str(citation_edges_path),
+                str(annotation_edges_path),
+            ],
+            **(meta or {}),
+        },
+    )
+
+
+@autoclient()
+def iter_mesh_postings_from_graph(
+    *, client: Neo4jClient
+) -> Iterable[Tuple[str, int, int]]:
+    """Yield (mesh_id, stmt_hash, evidence_count) triples from the graph.
+
+    The graph is queried one MeSH term at a time to keep individual queries
+    small.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+
+    Yields
+    ------
+    :
+        Triples of MeSH id, statement hash and evidence count.
+    """
+    mesh_ids = client.query_tx(
+        "MATCH (b:BioEntity) WHERE b.id STARTS WITH 'mesh:' RETURN b.id",
+        squeeze=True,
+    )
+    query = """\
+        MATCH (e:Evidence)-[:has_citation]->(:Publication)-[:annotated_with]->(:BioEntity {id: $mesh_id})
+        RETURN e.stmt_hash, count(e)
+    """
+    for mesh_id in tqdm(mesh_ids, desc="MeSH terms", unit="term"):
+        for stmt_hash, count in client.query_tx(query, mesh_id=mesh_id):
+            yield mesh_id, stmt_hash, count
+
+
+_LOADER: IndexLoader[MeshPostingsIndex] = IndexLoader("MeSH postings index", MeshPostingsIndex.load)
+
+
+@autoclient()
+def get_mesh_postings_index(
+    *, client: Neo4jClient, path: Union[None, str, Path] = None
+) -> Optional[MeshPostingsIndex]:
+    """Return the MeSH postings index if it has been built.
+
+    The index is kept in memory and checked again at most once a minute,
+    see :class:`indra_cogex.client.index_loader.IndexLoader`. An index that
+    was built for a different graph version than the one the client is
+    connected to is ignored.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    path :
+        The directory of the index. Defaults to :data:`MESH_INDEX_DIR`.
+
+    Returns
+    -------
+    :
+        The loaded index or None if it is not available.
+    """
+    path = Path(path) if path else MESH_INDEX_DIR
+    return _LOADER.get(path, client)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Build the MeSH term to statement postings index."
+    )
+    parser.add_argument(
+        "--from-graph",
+        action="store_true",
+        help="Query the postings from the graph instead of reading the "
+             "processor output files.",
+    )
+    parser.add_argument(
+        "--output",
+        default=str(MESH_INDEX_DIR),
+        help="The directory to save the index to.",
+    )
+    parser.add_argument(
+        "--graph-version",
+        help="The version of the graph the processor output files were "
+             "imported into, required unless --from-graph is given since the "
+             "files are usually indexed before they are imported. The index "
+             "is only used with this graph version.",
+    )
+    args = parser.parse_args()
+    if args.from_graph:
+        _client = Neo4jClient()
+        # The postings are queried from the graph, so they belong to its version
+        _graph_version = args.graph_version or get_graph_version(client=_client)
+        if _graph_version is None:
+            logger.warning(
+                "Could not get the graph version, the index won't be used until "
+                "it is rebuilt with --graph-version"
+            )
+        build_mesh_postings_index(
+            iter_mesh_postings_from_graph(client=_client),
+            path=args.output,
+            meta={"source": "graph", "graph_version": _graph_version},
+        )
+    else:
+        if not args.graph_version:
+            parser.error(
+                "--graph-version is required when building from the processor "
+                "output files"
+            )
+        build_mesh_postings_index_from_tsv(
+            path=args.output, meta={"graph_version": args.graph_version}
+        )
@@ -2,12 +2,14 @@
 
 import inspect
 import logging
+from contextlib import contextmanager
 from functools import lru_cache, wraps
 from itertools import count
 from typing import (
     Any,
     Dict,
     Iterable,
+    Iterator,
     List,
     Mapping,
     Optional,
@@ -18,6 +20,7 @@ from typing import (
 )
 import json
 
+import neo4j.exceptions
 import neo4j.graph
 from indra.config import get_config
 from indra.databases import identifiers
@@ -25,6 +28,8 @@ from indra.ontology.standardize import get_standard_agent
 from indra.statements import Agent
 from neo4j import GraphDatabase, ManagedTransaction, unit_of_work
 
+from indra_cogex.client.query_budget import QueryTimeoutError, get_query_budget
+from indra_cogex.client.single_flight import SingleFlight, get_query_key
 from indra_cogex.representation import Node, Relation, norm_id, \
     triple_query, triple_parameter_query
 
@@ -32,6 +37,9 @@ __all__ = ["Neo4jClient", "autoclient", "process_identifier"]
 
 logger = logging.getLogger(__name__)
 
+#: The status code of the error of a transaction that ran out of time
+TRANSACTION_TIMED_OUT_CODE = "Neo.ClientError.Transaction.TransactionTimedOut"
+
 
 class Neo4jClient:
     """A client to communicate with an INDRA CogEx neo4j instance
@@ -49,6 +57,8 @@ class Neo4jClient:
 
     #: The session
     session: Optional[neo4j.Session]
+    #: Shares the execution of identical concurrent read queries, if enabled
+    single_flight: Optional[SingleFlight] = None
 
     def __init__(
         self,
@@ -73,16 +83,34 @@ class Neo4jClient:
                 logger.debug("Using configured credentials for INDRA neo4j connection")
             else:
                 logger.info("INDRA_NEO4J_USER and INDRA_NEO4J_PASSWORD not configured")
+        self._url = url
+        self._auth = auth
+        # Identical concurrent reads share one execution unless disabled
+        if (get_config("INDRA_COGEX_QUERY_COALESCING") or "").lower() != "false":
+            memo_ttl = get_config("INDRA_COGEX_QUERY_MEMO_TTL")
+            self.single_flight = SingleFlight(
+                memo_ttl=float(memo_ttl) if memo_ttl else 0
+            )
+        self.reconnect()
+
+    def reconnect(self):
+        """Connect with a new driver.
+
+        A process forked from the one that created the client, e.g., a
+        gunicorn worker of a preloaded app, has to call this before querying
+        so that it doesn't share the connections of its parent's driver. The
+        old driver is left to the parent and isn't closed.
+        """
         # Set max_connection_lifetime to something smaller than the timeouts
         # on the server or on the way to the server. See
         # https://github.com/neo4j/neo4j-python-driver/issues/316#issuecomment-564020680
         self.driver = GraphDatabase.driver(
-            url,
-            auth=auth,
+            self._url,
+            auth=self._auth,
             max_connection_lifetime=3 * 60,
         )
         self.driver.verify_connectivity()
-        logger.info("Connected to neo4j graph at %s", url)
+        logger.info("Connected to neo4j graph at %s", self._url)
 
     def __del__(self):
         # Safely shut down the driver as a Neo4jClient object is garbage collected
@@ -199,13 +227,92 @@ class Neo4jClient:
             Tuple of (column_names, rows) where:
             - column_names: List of column names from RETURN clause
             - rows: List of result rows (each row is a list of values)
+
+        Raises
+        ------
+        QueryTimeoutError
+            If the query ran out of the time of the current
+            :func:`indra_cogex.client.query_budget.query_budget`.
+        QueryCancelledError
+            If the queries of the current budget were cancelled.
         """
-        with self.driver.session() as session:
-            keys, values = session.execute_read(
-                do_cypher_tx_with_keys, query, **query_params
-            )
+        key = None
+        if self.single_flight is not None:
+            key = get_query_key(query, query_params)
+        if key is None:
+            return self._query_tx_with_keys(query, query_params)
+        return self.single_flight.do(
+            key,
+            lambda: self._query_tx_with_keys(query, query_params),
+            budget=get_query_budget(),
+        )
+
+    def _query_tx_with_keys(
+        self, query: str, query_params: Dict[str, Any]
+    ) -> Tuple[List[str], List[List[Any]]]:
+        tx_func = do_cypher_tx_with_keys
+        budget = get_query_budget()
+        if budget is not None:
+            tx_func = unit_of_work(
+                timeout=budget.get_transaction_timeout(),
+                metadata=budget.metadata or None,
+            )(do_cypher_tx_with_keys)
+        with _raise_timeouts(), self.driver.session() as session:
+            keys, values = session.execute_read(tx_func, query, **query_params)
         return keys, values
 
+    def query_tx_stream(
+        self, query: str, fetch_size: int = 1000, **query_params
+    ) -> Iterator[List[Any]]:
+        """Run a read-only query and yield the results as they arrive.
+
+        Unlike :meth:`query_tx`, the results are not collected in memory,
+        records are fetched from the server in batches of ``fetch_size`` as
+        the iterator is consumed. The session stays open until the iterator
+        is exhausted or closed.
+
+        Parameters
+        ----------
+        query :
+            The query string to be executed.
+        fetch_size :
+            The number of records to fetch from the server at a time.
+        query_params :
+            kwargs to pass to query
+
+        Yields
+        ------
+        :
+            Each result as a list of one or more objects (typically neo4j
+            nodes or relations).
+
+        Raises
+        ------
+        QueryTimeoutError
+            If the query ran out of the time of the current
+            :func:`indra_cogex.client.query_budget.query_budget`.
+        QueryCancelledError
+            If the queries of the current budget were cancelled, checked
+            after each batch of records.
+        """
+        budget = get_query_budget()
+        tx_kwargs = {}
+        if budget is not None:
+            tx_kwargs = dict(
+                timeout=budget.get_transaction_timeout(),
+                metadata=budget.metadata or None,
+            )
+        with _raise_timeouts(), self.driver.session(
+            default_access_mode=neo4j.READ_ACCESS, fetch_size=fetch_size
+        ) as session:
+            with session.begin_transaction(**tx_kwargs) as tx:
+                for i, record in enumerate(
+                    tx.run(query, parameters=query_params), start=1
+                ):
+                    yield record.values()
+                    if budget is not None and i % fetch_size == 0:
+                        budget.check()
+
     def query_nodes(self, query: str, **query_params) -> List[Node]:
         """Run a read-only query for nodes.
 
@@ -1507,6 +1614,17 @@ def autoclient(*, cache: bool = False, maxsize: Optional[int] = 128):
     return _decorator
 
 
+@contextmanager
+def _raise_timeouts():
+    """Raise transactions timed out by Neo4j as QueryTimeoutError."""
+    try:
+        yield
+    except neo4j.exceptions.ClientError as err:
+        if (err.code or "").startswith(TRANSACTION_TIMED_OUT_CODE):
+            raise QueryTimeoutError("The query took too long") from err
+        raise
+
+
 # Follows example here:
 # https://neo4j.com/docs/api/python-driver/6.0/api.html#neo4j.unit_of_work
 @unit_of_work()
@@ -0,0 +1,548 @@
+# -*- coding: utf-8 -*-
+
+"""A precomputed transitive closure index over ``isa`` and ``partof`` edges.
+
+Variable length traversals such as
+``MATCH (c)-[:isa|partof*1..]->(:BioEntity {id: $id})`` are among the most
+expensive and least predictable queries run against the graph. This module
+builds a compact index over the ontology edges once (either from the edge
+TSV files produced by the processors or from a single export of the graph)
+and stores it as a set of numpy arrays that are memory-mapped when loaded.
+
+The index stores
+
+- the sorted node identifiers,
+- the parent adjacency list in compressed sparse row (CSR) form,
+- the strongly connected components of the graph, so that the rare cycles
+  in the ontology are handled correctly, and
+- an interval labelling of the resulting DAG: every component is given a
+  post-order rank from a depth first traversal of a spanning forest, and a
+  (usually very short) list of rank intervals covering all of its
+  descendants.
+
+Descendant lookups are then a handful of array slices, ``isa_or_partof``
+checks are a binary search and ancestor lookups are a walk up the parent
+CSR arrays.
+
+The index can be built with::
+
+    python -m indra_cogex.client.ontology_index
+"""
+
+import csv
+import gzip
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from tqdm import tqdm
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+from indra_cogex.client.graph_stats import get_graph_version
+from indra_cogex.client.index_loader import IndexLoader, save_index_dir
+from indra_cogex.client.neo4j_client import Neo4jClient, autoclient
+
+__all__ = [
+    "OntologyIndex",
+    "ONTOLOGY_INDEX_DIR",
+    "ONTOLOGY_RELATIONS",
+    "build_ontology_index",
+    "iter_ontology_edges_from_graph",
+    "iter_ontology_edges_from_tsv",
+    "get_ontology_index",
+]
+
+logger = logging.getLogger(__name__)
+
+ONTOLOGY_INDEX_DIR = APP_CACHE_MODULE.join("ontology_index")
+ONTOLOGY_RELATIONS = ("isa", "partof")
+
+_ARRAY_NAMES = (
+    "ids",
+    "parent_ptr",
+    "parent_idx",
+    "component",
+    "member_ptr",
+    "member_idx",
+    "post",
+    "order",
+    "interval_ptr",
+    "interval_lo",
+    "interval_hi",
+)
+
+
+class OntologyIndex:
+    """Answer descendant and ancestor queries over the ontology DAG."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Optional[Dict] = None):
+        """Initialize the index from its arrays.
+
+        Parameters
+        ----------
+        arrays :
+            A dict of the arrays making up the index, see
+            :func:`build_ontology_index`.
+        meta :
+            Metadata describing how and when the index was built.
+        """
+        self.ids = arrays["ids"]
+        self.parent_ptr = arrays["parent_ptr"]
+        self.parent_idx = arrays["parent_idx"]
+        self.component = arrays["component"]
+        self.member_ptr = arrays["member_ptr"]
+        self.member_idx = arrays["member_idx"]
+        self.post = arrays["post"]
+        self.order = arrays["order"]
+        self.interval_ptr = arrays["interval_ptr"]
+        self.interval_lo = arrays["interval_lo"]
+        self.interval_hi = arrays["interval_hi"]
+        self.meta = meta or {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "OntologyIndex":
+        """Load an index from a directory, memory-mapping its arrays.
+
+        Parameters
+        ----------
+        path :
+            The directory the index was saved to.
+
+        Returns
+        -------
+        :
+            The loaded index.
+        """
+        path = Path(path)
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r")
+            for name in _ARRAY_NAMES
+        }
+        meta_path = path / "meta.json"
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        return cls(arrays, meta)
+
+    def save(self, path: Union[str, Path]):
+        """Save the index arrays and metadata into a directory.
+
+        Parameters
+        ----------
+        path :
+            The directory to save the index into. The files are written into
+            a new directory that replaces it at once, since running processes
+            may have the previous arrays memory-mapped, see
+            :func:`indra_cogex.client.index_loader.save_index_dir`.
+        """
+        save_index_dir(Path(path), self._write)
+
+    def _write(self, path: Path):
+        for name in _ARRAY_NAMES:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "meta.json").write_text(json.dumps(self.meta, indent=1))
+
+    def _get_idx(self, curie: str) -> Optional[int]:
+        key = curie.encode("utf-8")
+        if len(key) > self.ids.dtype.itemsize:
+            return None
+        idx = int(np.searchsorted(self.ids, key))
+        if idx < len(self.ids) and self.ids[idx] == key:
+            return idx
+        return None
+
+    def __contains__(self, curie: str) -> bool:
+        return self._get_idx(curie) is not None
+
+    def _get_ids(self, indices: np.ndarray) -> List[str]:
+        return [self.ids[i].decode("utf-8") for i in indices]
+
+    def _intervals(self, idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.interval_ptr[idx], self.interval_ptr[idx + 1]
+        return self.interval_lo[start:end], self.interval_hi[start:end]
+
+    def get_descendants(self, curie: str) -> Set[str]:
+        """Return all nodes that reach the given node via isa/partof edges.
+
+        Parameters
+        ----------
+        curie :
+            The normalized identifier of the node, as used in the graph,
+            e.g., ``mesh:D007251``.
+
+        Returns
+        -------
+        :
+            The identifiers of all (direct and indirect) children.
+        """
+        idx = self._get_idx(curie)
+        if idx is None:
+            return set()
+        lows, highs = self._intervals(self.component[idx])
+        components = np.concatenate(
+            [self.order[lo:hi + 1] for lo, hi in zip(lows, highs)]
+        )
+        indices = np.concatenate(
+            [
+                self.member_idx[self.member_ptr[comp]:self.member_ptr[comp + 1]]
+                for comp in components
+            ]
+        )
+        indices = indices[indices != idx]
+        return set(self._get_ids(indices))
+
+    def get_ancestors(self, curie: str) -> Set[str]:
+        """Return all nodes reachable from the given node via isa/partof edges.
+
+        Parameters
+        ----------
+        curie :
+            The normalized identifier of the node, as used in the graph.
+
+        Returns
+        -------
+        :
+            The identifiers of all (direct and indirect) parents.
+        """
+        idx = self._get_idx(curie)
+        if idx is None:
+            return set()
+        seen = set()
+        queue = [idx]
+        while queue:
+            node = queue.pop()
+            parents = self.parent_idx[self.parent_ptr[node]:self.parent_ptr[node + 1]]
+            for parent in parents.tolist():
+                if parent not in seen:
+                    seen.add(parent)
+                    queue.append(parent)
+        seen.discard(idx)
+        return set(self._get_ids(sorted(seen)))
+
+    def isa_or_partof(self, curie: str, parent_curie: str) -> bool:
+        """Return True if the parent can be reached from the given node.
+
+        Parameters
+        ----------
+        curie :
+            The normalized identifier of the child node.
+        parent_curie :
+            The normalized identifier of the parent node.
+
+        Returns
+        -------
+        :
+            True if there is a path of one or more isa/partof edges from
+            the child to the parent.
+        """
+        idx = self._get_idx(curie)
+        parent_idx = self._get_idx(parent_curie)
+        if idx is None or parent_idx is None or idx == parent_idx:
+            return False
+        component, parent_component = self.component[idx], self.component[parent_idx]
+        if component == parent_component:
+            # Both are part of the same cycle
+            return True
+        rank = self.post[component]
+        lows, highs = self._intervals(parent_component)
+        pos = int(np.searchsorted(highs, rank))
+        return pos < len(highs) and lows[pos] <= rank
+
+
+def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    intervals.sort()
+    merged = [intervals[0]]
+    for lo, hi in intervals[1:]:
+        last_lo, last_hi = merged[-1]
+        if lo <= last_hi + 1:
+            if hi > last_hi:
+                merged[-1] = (last_lo, hi)
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def build_ontology_index(
+    edges: Iterable[Tuple[str, str]],
+    path: Union[None, str, Path] = None,
+    meta: Optional[Dict] = None,
+) -> OntologyIndex:
+    """Build the ontology closure index from child-parent pairs.
+
+    Parameters
+    ----------
+    edges :
+        An iterable of (child, parent) pairs of normalized identifiers, one
+        per isa/partof edge.
+    path :
+        If given, the directory to save the index into.
+    meta :
+        Additional metadata to store with the index, e.g., the graph version
+        it was built from.
+
+    Returns
+    -------
+    :
+        The built index.
+    """
+    pairs = {(child, parent) for child, parent in edges if child != parent}
+    ids = sorted({curie.encode("utf-8") for pair in pairs for curie in pair})
+    id_to_idx = {curie: idx for idx, curie in enumerate(ids)}
+    n_nodes = len(ids)
+    edge_array = np.array(
+        [
+            (id_to_idx[child.encode("utf-8")], id_to_idx[parent.encode("utf-8")])
+            for child, parent in pairs
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    children_arr, parents_arr = edge_array[:, 0], edge_array[:, 1]
+
+    # Parent CSR, used for ancestor lookups
+    parent_idx, parent_ptr = _to_csr(children_arr, parents_arr, n_nodes)
+
+    # Cycles can't be represented by the interval labelling, so the labelling
+    # is done on the condensation of the graph, in which every strongly
+    # connected component is collapsed into a single node
+    n_components, component = connected_components(
+        csr_matrix(
+            (np.ones(len(children_arr), dtype=np.int8), (children_arr, parents_arr)),
+            shape=(n_nodes, n_nodes),
+        ),
+        directed=True,
+        connection="strong",
+    )
+    component = component.astype(np.int32)
+    member_idx, member_ptr = _to_csr(
+        component, np.arange(n_nodes, dtype=np.int32), n_components
+    )
+    comp_children, comp_parents = component[children_arr], component[parents_arr]
+    between = comp_children != comp_parents
+    comp_edges = np.unique(
+        np.stack([comp_children[between], comp_parents[between]], axis=1), axis=0
+    ).reshape(-1, 2)
+    child_idx, child_ptr = _to_csr(comp_edges[:, 1], comp_edges[:, 0], n_components)
+    child_list, child_ptr = child_idx.tolist(), child_ptr.tolist()
+    has_parent = np.zeros(n_components, dtype=bool)
+    has_parent[comp_edges[:, 0]] = True
+
+    # Depth first traversal from the roots assigning post-order ranks. The
+    # components finishing while a component is on the stack are exactly its
+    # spanning tree descendants, so each one starts out with a contiguous
+    # interval which is then merged with the intervals of all its children.
+    finished = np.zeros(n_components, dtype=bool)
+    start = [0] * n_components
+    post = np.zeros(n_components, dtype=np.int32)
+    intervals: List[Optional[List[Tuple[int, int]]]] = [None] * n_components
+    counter = 0
+    for root in tqdm(
+        np.flatnonzero(~has_parent).tolist(), desc="Indexing ontology",
+        unit="root", leave=False,
+    ):
+        start[root] = counter
+        stack = [(root, iter(child_list[child_ptr[root]:child_ptr[root + 1]]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if not finished[child]:
+                    start[child] = counter
+                    stack.append(
+                        (child, iter(child_list[child_ptr[child]:child_ptr[child + 1]]))
+                    )
+                    break
+            else:
+                stack.pop()
+                post[node] = counter
+                finished[node] = True
+                node_intervals = [(start[node], counter)]
+                for child in child_list[child_ptr[node]:child_ptr[node + 1]]:
+                    node_intervals.extend(intervals[child])
+                intervals[node] = _merge_intervals(node_intervals)
+                counter += 1
+
+    order = np.empty(n_components, dtype=np.int32)
+    order[post] = np.arange(n_components, dtype=np.int32)
+    interval_ptr = np.zeros(n_components + 1, dtype=np.int64)
+    np.cumsum([len(ivs) for ivs in intervals], out=interval_ptr[1:])
+    flat = [iv for ivs in intervals for iv in ivs]
+    interval_lo = np.array([lo for lo, _ in flat], dtype=np.int32)
+    interval_hi = np.array([hi for _, hi in flat], dtype=np.int32)
+
+    index_meta = {
+        "created": datetime.now().isoformat(),
+        "relations": list(ONTOLOGY_RELATIONS),
+        "n_nodes": n_nodes,
+        "n_edges": len(pairs),
+        "n_components": int(n_components),
+        "n_intervals": len(flat),
+    }
+    index_meta.update(meta or {})
+    index = OntologyIndex(
+        {
+            "ids": np.array(ids, dtype=bytes),
+            "parent_ptr": parent_ptr,
+            "parent_idx": parent_idx,
+            "component": component,
+            "member_ptr": member_ptr,
+            "member_idx": member_idx,
+            "post": post,
+            "order": order,
+            "interval_ptr": interval_ptr,
+            "interval_lo": interval_lo,
+            "interval_hi": interval_hi,
+        },
+        index_meta,
+    )
+    if path is not None:
+        index.save(path)
+    return index
+
+
+def _to_csr(
+    rows: np.ndarray, cols: np.ndarray, n_rows: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the column indices and row pointers of a CSR adjacency."""
+    sort_order = np.lexsort((cols, rows))
+    indices = cols[sort_order].astype(np.int32)
+    ptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=ptr[1:])
+    return indices, ptr
+
+
+def iter_ontology_edges_from_tsv(
+    edge_paths: Iterable[Union[str, Path]],
+) -> Iterable[Tuple[str, str]]:
+    """Yield isa/partof (child, parent) pairs from processor edge files.
+
+    Parameters
+    ----------
+    edge_paths :
+        Paths to gzipped edge TSV files as written by the processors.
+
+    Yields
+    ------
+    :
+        Pairs of child and parent identifiers.
+    """
+    for edge_path in edge_paths:
+        with gzip.open(edge_path, "rt") as fh:
+            reader = csv.reader(fh, delimiter="\t")
+            header = next(reader)
+            start_index = header.index(":START_ID")
+            end_index = header.index(":END_ID")
+            type_index = header.index(":TYPE")
+            for row in reader:
+                if row[type_index] in ONTOLOGY_RELATIONS:
+                    yield row[start_index], row[end_index]
+
+
+@autoclient()
+def iter_ontology_edges_from_graph(
+    *, client: Neo4jClient
+) -> Iterable[Tuple[str, str]]:
+    """Return all isa/partof (child, parent) pairs in the graph.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+
+    Returns
+    -------
+    :
+        Pairs of child and parent identifiers.
+    """
+    query = """\
+        MATCH (c:BioEntity)-[:%s]->(p:BioEntity)
+        RETURN c.id, p.id
+    """ % "|".join(ONTOLOGY_RELATIONS)
+    return [(child, parent) for child, parent in client.query_tx(query)]
+
+
+_LOADER: IndexLoader[OntologyIndex] = IndexLoader("ontology index", OntologyIndex.load)
+
+
+@autoclient()
+def get_ontology_index(
+    *, client: Neo4jClient, path: Union[None, str, Path] = None
+) -> Optional[OntologyIndex]:
+    """Return the ontology index if it has been built for the current graph.
+
+    The index is kept in memory and checked again at most once a minute,
+    see :class:`indra_cogex.client.index_loader.IndexLoader`. An index that
+    was built for a different graph version than the one the client is
+    connected to is ignored.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    path :
+        The directory of the index. Defaults to :data:`ONTOLOGY_INDEX_DIR`.
+
+    Returns
+    -------
+    :
+        The loaded index or None if it is not available.
+    """
+    path = Path(path) if path else ONTOLOGY_INDEX_DIR
+    return _LOADER.get(path, client)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Build the isa/partof closure index used by the ontology queries."
+    )
+    parser.add_argument(
+        "--edges",
+        nargs="+",
+        help="Gzipped edge TSV files to build the index from. If not given, "
+             "the edges are exported from the graph.",
+    )
+    parser.add_argument(
+        "--output",
+        default=str(ONTOLOGY_INDEX_DIR),
+        help="The directory to save the index to.",
+    )
+    parser.add_argument(
+        "--graph-version",
+        help="The version of the graph the edge files were imported into, "
+             "required with --edges since the files are usually indexed "
+             "before they are imported. The index is only used with this "
+             "graph version.",
+    )
+    args = parser.parse_args()
+    if args.edges:
+        if not args.graph_version:
+            parser.error("--graph-version is required when building from --edges")
+        build_ontology_index(
+            iter_ontology_edges_from_tsv(args.edges),
+            path=args.output,
+            meta={
+                "source": "tsv",
+                "edge_paths": args.edges,
+                "graph_version": args.graph_version,
+            },
+        )
+    else:
+        _client = Neo4jClient()
+        # The edges are exported from the graph, so they belong to its version
+        _graph_version = args.graph_version or get_graph_version(client=_client)
+        if _graph_version is None:
+            logger.warning(
+                "Could not get the graph version, the index won't be used until "
+                "it is rebuilt with --graph-version"
+            )
+        build_ontology_index(
+            iter_ontology_edges_from_graph(client=_client),
+            path=args.output,
+            meta={"source": "graph", "graph_version": _graph_version},
+        )
@@ -5,7 +5,7 @@ import time
 import math
 from collections import Counter, defaultdict
 from textwrap import dedent
-from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Union, Any
+from typing import Collection, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Union, Any
 import networkx as nx
 from flask import session, request
 
@@ -14,8 +14,14 @@ from indra.statements import Agent, Evidence, Statement, Complex
 from indra.sources import SOURCE_INFO
 
 from indra_cogex.apps.constants import AGENT_NAME_CACHE
-from .neo4j_client import Neo4jClient, autoclient
-from ..representation import Node, Relation, indra_stmts_from_relations, norm_id, generate_paper_clause
+from .neo4j_client import Neo4jClient, autoclient, process_identifier
+from .graph_stats import get_cached_graph_version, get_graph_stats
+from .mesh_index import MeshPostingsIndex, get_mesh_postings_index
+from .ontology_index import get_ontology_index
+from ..json_store import JsonStore, get_json_store
+from ..representation import (
+    Node, Relation, indra_stmts_from_relations, load_statement_json, norm_id, generate_paper_clause
+)
 
 logger = logging.getLogger(__name__)
 
@@ -120,6 +126,10 @@ __all__ = [
     "get_schema_graph",
 ]
 
+#: The number of statement hashes checked against the MeSH postings index at
+#: a time
+MESH_HASH_BATCH_SIZE = 1000
+
 
 # BGee
 
@@ -265,6 +275,20 @@ def get_genes_for_go_term(
     :
         The genes associated with the given GO term.
     """
+    index = get_ontology_index(client=client) if include_indirect else None
+    if index is not None:
+        # Look up the genes for the term and all its children in one query
+        term_ids = [norm_id(*go_term)] + sorted(
+            index.get_descendants(norm_id(*go_term))
+        )
+        query = """
+            MATCH (gene:BioEntity)-[:associated_with]->(term:BioEntity)
+            WHERE term.id IN $term_ids
+            RETURN DISTINCT gene
+        """
+        genes = client.query_nodes(query, term_ids=term_ids)
+        return [gene for gene in genes if gene.db_ns == "HGNC"]
+
     go_children = (
         get_ontology_child_terms(go_term, client=client) if include_indirect else []
     )
@@ -634,6 +658,9 @@ def get_ontology_child_terms(
     :
         The child terms of the given term.
     """
+    index = get_ontology_index(client=client)
+    if index is not None:
+        return _get_nodes_by_id(index.get_descendants(norm_id(*term)), client=client)
     return client.get_predecessors(
         term,
         relations={"isa", "partof"},
@@ -660,6 +687,9 @@ def get_ontology_parent_terms(
     :
         The parent terms of the given term.
     """
+    index = get_ontology_index(client=client)
+    if index is not None:
+        return _get_nodes_by_id(index.get_ancestors(norm_id(*term)), client=client)
     return client.get_successors(
         term,
         relations={"isa", "partof"},
@@ -688,10 +718,25 @@ def isa_or_partof(
     :
         True if the given term is a child term of the given parent.
     """
+    index = get_ontology_index(client=client)
+    if index is not None:
+        return index.isa_or_partof(norm_id(*term), norm_id(*parent))
     term_parents = get_ontology_parent_terms(term, client=client)
     return any(parent == parent_term.grounding() for parent_term in term_parents)
 
 
+def _get_nodes_by_id(node_ids: Iterable[str], *, client: Neo4jClient) -> List[Node]:
+    node_ids = sorted(node_ids)
+    if not node_ids:
+        return []
+    query = """
+        MATCH (n:BioEntity)
+        WHERE n.id IN $node_ids
+        RETURN n
+    """
+    return client.query_nodes(query, node_ids=node_ids)
+
+
 # MESH / PMID
 
 @autoclient()
@@ -927,6 +972,25 @@ def get_evidences_for_mesh(
     else:
         child_terms = set()
 
+    # The postings index counts all evidences, so it can only be used when
+    # database evidences aren't excluded
+    mesh_index = get_mesh_postings_index(client=client)
+    if mesh_index is not None and include_db_evidence:
+        top_hashes = [
+            stmt_hash for stmt_hash, _ in mesh_index.get_stmt_hash_counts(
+                {norm_mesh} | child_terms, limit=25
+            )
+        ]
+        if not top_hashes:
+            return {}
+        query = """
+            MATCH (e:Evidence)
+            WHERE e.stmt_hash IN $top_hashes
+            RETURN e.stmt_hash, e.evidence
+        """
+        result = client.query_tx(query, top_hashes=top_hashes)
+        return _get_ev_dict_from_hash_ev_query(result, remove_medscan=remove_medscan)
+
     query_params = {}
     if child_terms:
         match_terms = {norm_mesh} | child_terms
@@ -1097,11 +1161,15 @@ def get_evidences_for_stmt_hashes(
         mesh_filter = "AND mesh_term.id IN $mesh_terms"
         mesh_pattern = "-[:has_citation]->(pub:Publication)-[:annotated_with]->(mesh_term:BioEntity)"
 
+    # If the JSON store is available, only the evidence ids are queried and
+    # the evidence JSONs are looked up in the store
+    json_store = _get_json_store(client)
+    evidence_property = "id" if json_store is not None else "evidence"
     query = f"""\
         MATCH (n:Evidence){mesh_pattern}
         WHERE
             n.stmt_hash IN $stmt_hashes {mesh_filter}
-        RETURN n.stmt_hash, collect(n.evidence){limit_box}
+        RETURN n.stmt_hash, collect(n.{evidence_property}){limit_box}
     """
 
     query_params = {
@@ -1111,6 +1179,36 @@ def get_evidences_for_stmt_hashes(
         query_params["mesh_terms"] = mesh_terms
 
     result = client.query_tx(query, **query_params)
+    if json_store is not None:
+        evidence_jsons = json_store.get_evidence_jsons_by_id(
+            evidence_id for _, evidence_ids in result for evidence_id in evidence_ids
+        )
+        missing_ids = [
+            evidence_id
+            for _, evidence_ids in result
+            for evidence_id in evidence_ids
+            if evidence_id not in evidence_jsons
+        ]
+        if missing_ids:
+            logger.warning(
+                "%d evidences are missing from the JSON store, getting them "
+                "from the graph", len(missing_ids)
+            )
+            evidence_jsons.update(
+                (evidence_id, json.loads(evidence_str))
+                for evidence_id, evidence_str in client.query_tx(
+                    "MATCH (n:Evidence) WHERE n.id IN $evidence_ids "
+                    "RETURN n.id, n.evidence",
+                    evidence_ids=missing_ids,
+                )
+            )
+        return {
+            stmt_hash: _filter_out_medscan_evidence(
+                (evidence_jsons[evidence_id] for evidence_id in evidence_ids),
+                remove_medscan=remove_medscan,
+            )
+            for stmt_hash, evidence_ids in result
+        }
 
     return {
         stmt_hash: _filter_out_medscan_evidence(
@@ -1287,6 +1385,33 @@ def get_stmts_meta_for_stmt_hashes(
     return [client.neo4j_to_relation(r[0]) for r in result]
 
 
+def _get_json_store(client: Neo4jClient) -> Optional[JsonStore]:
+    """Get the JSON store if it was stamped with the version of the graph."""
+    return get_json_store(graph_version=get_cached_graph_version(client))
+
+
+def _get_stmt_jsons(
+    stmt_hashes: Collection[int], json_store: JsonStore, *, client: Neo4jClient
+) -> Dict[int, Dict[str, Any]]:
+    """Get statement JSONs from the JSON store, or the graph if missing there."""
+    stmt_jsons = json_store.get_stmt_jsons(stmt_hashes)
+    missing_hashes = [h for h in stmt_hashes if h not in stmt_jsons]
+    if missing_hashes:
+        logger.warning(
+            "%d statements are missing from the JSON store, getting them from "
+            "the graph", len(missing_hashes)
+        )
+        stmt_jsons.update(
+            (int(stmt_hash), load_statement_json(stmt_json))
+            for stmt_hash, stmt_json in client.query_tx(
+                "MATCH ()-[r:indra_rel]->() WHERE r.stmt_hash IN $stmt_hashes "
+                "RETURN DISTINCT r.stmt_hash, r.stmt_json",
+                stmt_hashes=missing_hashes,
+            )
+        )
+    return stmt_jsons
+
+
 @autoclient()
 def get_stmts_for_stmt_hashes(
     stmt_hashes: List[int],
@@ -1341,6 +1466,16 @@ def get_stmts_for_stmt_hashes(
 
     db_evidence_constraint = "" if include_db_evidence else "AND NOT r.has_database_evidence"
 
+    json_store = _get_json_store(client)
+    if json_store is not None:
+        # Only get compact metadata from the graph, the statement JSONs are
+        # looked up in the JSON store
+        return_clause = (
+            "RETURN a.id, b.id, r {.stmt_hash, .evidence_count, .source_counts, "
+            ".belief, .stmt_type}"
+        )
+    else:
+        return_clause = "RETURN p"
     stmts_query = f"""\
         MATCH p=(a:BioEntity)-[r:indra_rel]->(b:BioEntity)
         WHERE
@@ -1348,11 +1483,28 @@ def get_stmts_for_stmt_hashes(
             {subject_constraint}
             {object_constraint}
             {db_evidence_constraint}
-        RETURN p
+        {return_clause}
     """
     logger.info(f"get_stmts_for_stmt_hashes executing query with {len(stmt_hashes)} hashes")
-    rels = client.query_relations(stmts_query, **query_params)
-    stmts = indra_stmts_from_relations(rels, deduplicate=True)
+    if json_store is not None:
+        rels = [
+            Relation(
+                *process_identifier(source_id),
+                *process_identifier(target_id),
+                "indra_rel",
+                data,
+            )
+            for source_id, target_id, data in client.query_tx(
+                stmts_query, **query_params
+            )
+        ]
+        stmt_jsons = _get_stmt_jsons(
+            {int(rel.data["stmt_hash"]) for rel in rels}, json_store, client=client
+        )
+    else:
+        rels = client.query_relations(stmts_query, **query_params)
+        stmt_jsons = None
+    stmts = indra_stmts_from_relations(rels, deduplicate=True, stmt_jsons=stmt_jsons)
 
     if evidence_limit == 1:
         rv = stmts
@@ -1433,22 +1585,28 @@ def get_statements(
     else:
         paper_clause = ""
 
-    if mesh_term or paper_term:
+    # With the MeSH postings index, the statements for the MeSH term(s) are
+    # looked up in the index instead of joining through the evidences
+    mesh_index = None
+    if mesh_term:
+        norm_mesh = norm_id(*mesh_term)
+        if include_child_terms:
+            child_terms = _get_mesh_child_terms(mesh_term, client=client)
+        else:
+            child_terms = set()
+        if child_terms:
+            mesh_all_term = {norm_mesh} | child_terms
+            mesh_all_term = list(mesh_all_term)
+        else:
+            mesh_all_term = [norm_mesh]
+        mesh_index = None if paper_term else get_mesh_postings_index(client=client)
+
+    if paper_term or (mesh_term and mesh_index is None):
         query = (f"MATCH (e:Evidence)-[:has_citation]->"
                  f"(pub:Publication {paper_clause})-[:annotated_with] "
                  f"-> (mesh_term:BioEntity)")
         hash_in_rel = "{stmt_hash: e.stmt_hash}"
         if mesh_term:
-            norm_mesh = norm_id(*mesh_term)
-            if include_child_terms:
-                child_terms = _get_mesh_child_terms(mesh_term, client=client)
-            else:
-                child_terms = set()
-            if child_terms:
-                mesh_all_term = {norm_mesh} | child_terms
-                mesh_all_term = list(mesh_all_term)
-            else:
-                mesh_all_term = [norm_mesh]
             where_clauses.append("mesh_term.id IN $mesh_terms")
     else:
         query = ""
@@ -1492,16 +1650,6 @@ def get_statements(
             stmt_sources = [stmt_sources]
         where_clauses.append("any(source IN $stmt_sources WHERE r.source_counts CONTAINS source)")
 
-    if where_clauses:
-        match_clause += " WHERE " + " AND ".join(where_clauses)
-
-    query += f"""
-        MATCH p = {match_clause}
-        WITH distinct r.stmt_hash AS hash, r.evidence_count as ev_count, collect(p) as pp
-        RETURN pp
-        ORDER BY ev_count DESC
-        LIMIT $limit
-    """
     params = {
         "agent_constraint": agent_constraint,
         "rel_types": rel_types if isinstance(rel_types, list) else [rel_types],
@@ -1516,6 +1664,39 @@ def get_statements(
     if paper_term:
         params['paper_parameter'] = paper_param
 
+    if mesh_index is not None:
+        # Go through the (lightweight) hashes of the statements matching the
+        # agent constraints by decreasing evidence count, checking them
+        # against the index a batch at a time, until there are enough
+        hash_match_clause = match_clause
+        if where_clauses:
+            hash_match_clause += " WHERE " + " AND ".join(where_clauses)
+        hash_query = f"""
+            MATCH {hash_match_clause}
+            RETURN DISTINCT r.stmt_hash, r.evidence_count
+            ORDER BY r.evidence_count DESC, r.stmt_hash DESC
+        """
+        params["stmt_hashes"] = _get_mesh_indexed_hashes(
+            client.query_tx_stream(
+                hash_query, fetch_size=MESH_HASH_BATCH_SIZE, **params
+            ),
+            mesh_index,
+            mesh_all_term,
+            limit,
+        )
+        where_clauses.append("r.stmt_hash IN $stmt_hashes")
+
+    if where_clauses:
+        match_clause += " WHERE " + " AND ".join(where_clauses)
+
+    query += f"""
+        MATCH p = {match_clause}
+        WITH distinct r.stmt_hash AS hash, r.evidence_count as ev_count, collect(p) as pp
+        RETURN pp
+        ORDER BY ev_count DESC
+        LIMIT $limit
+    """
+
     logger.info(f"Running query with constraints: rel_type={rel_types}, "
                 f"source={stmt_sources}, agent={agent}, other_agent={other_agent}, "
                 f"mesh = {mesh_all_term}"
@@ -1543,14 +1724,32 @@ def get_statements(
     return stmts, source_counts
 
 
+_AGENT_NAME_CACHE: Dict[str, Set[str]] = {}
+
+
+def get_agent_name_cache() -> Optional[Set[str]]:
+    """Get the agents with INDRA relations, loading them once per process.
+
+    Returns
+    -------
+    :
+        The set of agent ids, or None if the agent name cache file hasn't
+        been built.
+    """
+    if "agents" not in _AGENT_NAME_CACHE:
+        if not AGENT_NAME_CACHE.exists():
+            return None
+        with open(AGENT_NAME_CACHE, 'rb') as f:
+            _AGENT_NAME_CACHE["agents"] = pickle.load(f)
+    return _AGENT_NAME_CACHE["agents"]
+
+
 def check_agent_existence(
     agent: Union[str, Tuple[str, str]],
 ) -> Union[bool, None]:
     """Check if an agent exists in the database."""
-    if AGENT_NAME_CACHE.exists():
-        with open(AGENT_NAME_CACHE, 'rb') as f:
-            agent_cache = pickle.load(f)
-    else:
+    agent_cache = get_agent_name_cache()
+    if agent_cache is None:
         return None
     if isinstance(agent, tuple):
         agent = norm_id(*agent)
@@ -1632,6 +1831,56 @@ def enrich_statements(
     return stmts
 
 
+def _get_mesh_indexed_hashes(
+    rows: Iterable[Sequence[Any]],
+    mesh_index: MeshPostingsIndex,
+    mesh_ids: Iterable[str],
+    limit: Optional[int],
+) -> List[int]:
+    """Return the first statement hashes that are in the MeSH postings.
+
+    Parameters
+    ----------
+    rows :
+        (stmt_hash, evidence_count) rows, in the order they are wanted.
+    mesh_index :
+        The MeSH postings index.
+    mesh_ids :
+        The normalized MeSH identifiers whose postings are checked.
+    limit :
+        The number of hashes to return, None for all of them.
+
+    Returns
+    -------
+    :
+        The hashes in the order of the rows.
+    """
+    mesh_ids = set(mesh_ids)
+    rows = iter(rows)
+    stmt_hashes = []
+    seen = set()
+    try:
+        while limit is None or len(stmt_hashes) < limit:
+            batch = []
+            for stmt_hash, _ in rows:
+                if stmt_hash not in seen:
+                    seen.add(stmt_hash)
+                    batch.append(stmt_hash)
+                    if len(batch) == MESH_HASH_BATCH_SIZE:
+                        break
+            if not batch:
+                break
+            found = mesh_index.has_stmt_hashes(mesh_ids, batch)
+            stmt_hashes.extend(
+                stmt_hash for stmt_hash, hit in zip(batch, found) if hit
+            )
+    finally:
+        # Stop reading the rows of the query
+        if hasattr(rows, "close"):
+            rows.close()
+    return stmt_hashes if limit is None else stmt_hashes[:limit]
+
+
 @autoclient()
 def _get_mesh_child_terms(
     mesh_term: Tuple[str, str], *, client: Neo4jClient
@@ -1652,6 +1901,9 @@ def _get_mesh_child_terms(
         to the graph.
     """
     meshid_norm = norm_id(*mesh_term)
+    index = get_ontology_index(client=client)
+    if index is not None:
+        return index.get_descendants(meshid_norm)
     # todo: figure out why [:isa|partof*1..] is ~170x faster than [:isa*1..]
     #  for the query below
     query = (
@@ -1663,10 +1915,13 @@ def _get_mesh_child_terms(
     return set(client.query_tx(query, squeeze=True, mesh_id=meshid_norm))
 
 
-@autoclient(cache=True)
+@autoclient()
 def get_node_counter(*, client: Neo4jClient) -> Counter:
     """Get a count of each entity type.
 
+    Counts are read from the Neo4j count store and cached per graph version,
+    see :func:`indra_cogex.client.graph_stats.get_graph_stats`.
+
     Parameters
     ----------
     client :
@@ -1681,38 +1936,23 @@ def get_node_counter(*, client: Neo4jClient) -> Counter:
 
             This code assumes all nodes only have one label, as in ``label[0]``
     """
-    return Counter(
-        {
-            label: client.query_tx(f"MATCH (n:{label}) RETURN count(*)", squeeze=True)[
-                0
-            ]
-            for label in client.query_tx("call db.labels();", squeeze=True)
-        }
-    )
+    return Counter(get_graph_stats(client=client).node_counts)
 
 
-@autoclient(cache=True)
+@autoclient()
 def get_prefix_counter(*, client: Neo4jClient) -> Counter:
-    """Count node prefixes."""
-    cypher = (
-        """MATCH (n) WITH split(n.id, ":")[0] as prefix RETURN prefix, count(prefix)"""
-    )
-    return Counter(dict(client.query_tx(cypher)))
+    """Count node prefixes.
+
+    The counts come from the statistics manifest written at ingestion time
+    if available, otherwise they are counted once per graph version.
+    """
+    return Counter(get_graph_stats(client=client).prefix_counts)
 
 
-@autoclient(cache=True)
+@autoclient()
 def get_edge_counter(*, client: Neo4jClient) -> Counter:
     """Get a count of each edge type."""
-    return Counter(
-        {
-            relation: client.query_tx(
-                f"MATCH ()-[r:{relation}]->() RETURN count(*)", squeeze=True
-            )[0]
-            for relation in client.query_tx(
-            "call db.relationshipTypes();", squeeze=True
-        )
-        }
-    )
+    return Counter(get_graph_stats(client=client).edge_counts)
 
 
 @autoclient(cache=True)
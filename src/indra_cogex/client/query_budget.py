@@ -0,0 +1,204 @@
+"""Time budgets and cancellation for the graph queries of a request.
+
+A web request runs its queries within a :func:`query_budget`, e.g.::
+
+    with query_budget(30, is_cancelled=client_has_disconnected):
+        get_statements(..., client=client)
+
+Every read transaction the :class:`indra_cogex.client.neo4j_client.Neo4jClient`
+runs within the budget gets the time left as its Neo4j transaction timeout,
+so the server aborts queries that would outlive the request, and the
+metadata of the budget, so they can be told apart in ``SHOW TRANSACTIONS``.
+Before each query, the budget is checked: once the time is up a
+:class:`QueryTimeoutError` is raised, and once ``is_cancelled`` returns True,
+e.g., because the HTTP client went away, a :class:`QueryCancelledError`, so
+functions running several queries stop at the next one.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+__all__ = [
+    "QueryTimeoutError",
+    "QueryCancelledError",
+    "QueryBudget",
+    "query_budget",
+    "make_query_budget",
+    "use_query_budget",
+    "get_query_budget",
+]
+
+#: The shortest timeout given to a transaction, since Neo4j takes 0 as no timeout
+MIN_TIMEOUT = 0.001
+
+_BUDGET: ContextVar[Optional["QueryBudget"]] = ContextVar("query_budget", default=None)
+
+
+class QueryTimeoutError(Exception):
+    """Raised when the queries of a budget ran out of time."""
+
+
+class QueryCancelledError(Exception):
+    """Raised when the queries of a budget were cancelled."""
+
+
+class QueryBudget:
+    """The time left for, and the cancellation of, a group of queries.
+
+    Parameters
+    ----------
+    timeout :
+        The seconds the queries may take in total, no limit if None.
+    is_cancelled :
+        A function returning True once the queries should stop.
+    metadata :
+        Metadata attached to the Neo4j transactions of the queries.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.is_cancelled = is_cancelled
+        self.metadata = metadata or {}
+
+    def remaining(self) -> Optional[float]:
+        """Get the seconds left, None if there is no limit."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check(self):
+        """Check that the queries may go on.
+
+        Raises
+        ------
+        QueryCancelledError
+            If the queries were cancelled.
+        QueryTimeoutError
+            If the time is up.
+        """
+        if self.is_cancelled is not None and self.is_cancelled():
+            raise QueryCancelledError("The query was cancelled")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise QueryTimeoutError("The query took too long")
+
+    def get_transaction_timeout(self) -> Optional[float]:
+        """Check the budget and get the timeout for the next transaction.
+
+        Returns
+        -------
+        :
+            The seconds left, at least :data:`MIN_TIMEOUT`, or None if there
+            is no limit.
+        """
+        self.check()
+        remaining = self.remaining()
+        return None if remaining is None else max(remaining, MIN_TIMEOUT)
+
+
+@contextmanager
+def query_budget(
+    timeout: Optional[float] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+):
+    """Run the queries in the block within a time budget.
+
+    A budget within another one ends no later than the outer one and is also
+    cancelled with it.
+
+    Parameters
+    ----------
+    timeout :
+        The seconds the queries may take in total, no limit if None.
+    is_cancelled :
+        A function returning True once the queries should stop.
+    metadata :
+        Metadata attached to the Neo4j transactions of the queries.
+
+    Yields
+    ------
+    :
+        The budget.
+    """
+    with use_query_budget(make_query_budget(timeout, is_cancelled, metadata)) as budget:
+        yield budget
+
+
+def make_query_budget(
+    timeout: Optional[float] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> QueryBudget:
+    """Make a budget within the current one without running queries in it yet.
+
+    Parameters
+    ----------
+    timeout :
+        The seconds the queries may take in total, no limit if None.
+    is_cancelled :
+        A function returning True once the queries should stop.
+    metadata :
+        Metadata attached to the Neo4j transactions of the queries.
+
+    Returns
+    -------
+    :
+        The budget, see :func:`use_query_budget`.
+    """
+    budget = QueryBudget(timeout, is_cancelled, metadata)
+    outer = _BUDGET.get()
+    if outer is not None:
+        if outer.deadline is not None and (
+            budget.deadline is None or outer.deadline < budget.deadline
+        ):
+            budget.deadline = outer.deadline
+        if outer.is_cancelled is not None:
+            inner_cancelled = budget.is_cancelled
+            budget.is_cancelled = lambda: outer.is_cancelled() or bool(
+                inner_cancelled and inner_cancelled()
+            )
+        budget.metadata = {**outer.metadata, **budget.metadata}
+    return budget
+
+
+@contextmanager
+def use_query_budget(budget: QueryBudget):
+    """Run the queries in the block within an existing budget.
+
+    This lets the queries of a generator use the same budget each time it is
+    resumed, without leaving the budget set in the context of its caller.
+
+    Parameters
+    ----------
+    budget :
+        The budget, see :func:`make_query_budget`.
+
+    Yields
+    ------
+    :
+        The budget.
+    """
+    token = _BUDGET.set(budget)
+    try:
+        yield budget
+    finally:
+        _BUDGET.reset(token)
+
+
+def get_query_budget() -> Optional[QueryBudget]:
+    """Get the budget of the queries run in the current context.
+
+    Returns
+    -------
+    :
+        The innermost budget, None outside of any.
+    """
+    return _BUDGET.get()
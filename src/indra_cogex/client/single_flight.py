@@ -0,0 +1,206 @@
+"""Sharing one execution between identical concurrent read queries.
+
+When many requests ask for the same thing at once, e.g., after a search link
+was shared, identical Cypher queries with identical parameters reach
+:meth:`indra_cogex.client.neo4j_client.Neo4jClient.query_tx` from several
+threads. With a :class:`SingleFlight`, the first of them runs the query and
+the others wait for and share its result. Optionally, results are also kept
+for a few seconds so that identical queries arriving right after share them
+too.
+
+Each caller gets its own copy of the rows, so callers modifying their result
+don't affect each other. A query aborted because the time budget or the
+request of its caller ran out (see :mod:`indra_cogex.client.query_budget`)
+is run again by the callers waiting for it, other errors are shared.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from indra_cogex.client.query_budget import (
+    QueryBudget,
+    QueryCancelledError,
+    QueryTimeoutError,
+)
+
+__all__ = [
+    "SingleFlight",
+    "get_query_key",
+]
+
+#: The default maximum number of results kept
+DEFAULT_MEMO_SIZE = 256
+
+Result = Tuple[List[str], List[List[Any]]]
+
+
+def get_query_key(query: str, query_params: Mapping[str, Any]) -> Optional[str]:
+    """Get a key identifying a query with its parameters.
+
+    Parameters
+    ----------
+    query :
+        The Cypher query.
+    query_params :
+        The parameters of the query.
+
+    Returns
+    -------
+    :
+        The query and the parameters as canonical JSON, or None if the
+        parameters can't be serialized and so the query can't be shared.
+    """
+    try:
+        return json.dumps([query, query_params], sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _copy_result(result: Result) -> Result:
+    keys, values = result
+    return list(keys), [list(row) for row in values]
+
+
+class _Call:
+    """An execution of a query that other callers can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Result] = None
+        self.error: Optional[BaseException] = None
+        #: The number of other callers waiting for the result
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run identical concurrent queries once.
+
+    Parameters
+    ----------
+    memo_ttl :
+        The number of seconds results are kept after they were computed, 0
+        to only share results between concurrent queries.
+    memo_size :
+        The maximum number of results kept.
+    """
+
+    def __init__(self, memo_ttl: float = 0, memo_size: int = DEFAULT_MEMO_SIZE):
+        self.memo_ttl = memo_ttl
+        self.memo_size = memo_size
+        self._calls: Dict[Hashable, _Call] = {}
+        self._memo: "OrderedDict[Hashable, Tuple[float, Result]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "executed": 0,
+            "coalesced": 0,
+            "memo_hits": 0,
+            "retried": 0,
+        }
+
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Result],
+        budget: Optional[QueryBudget] = None,
+    ) -> Result:
+        """Run a query, or share the result of an identical one.
+
+        Parameters
+        ----------
+        key :
+            The key identifying the query, see :func:`get_query_key`.
+        func :
+            The function running the query and returning its keys and rows.
+        budget :
+            The time budget of the caller, limiting how long it waits for an
+            identical query run by another caller.
+
+        Returns
+        -------
+        :
+            The keys and the rows of the result.
+
+        Raises
+        ------
+        QueryTimeoutError
+            If the budget ran out while waiting.
+        """
+        with self._lock:
+            if self.memo_ttl > 0 and key in self._memo:
+                computed, result = self._memo[key]
+                if time.monotonic() - computed <= self.memo_ttl:
+                    self._memo.move_to_end(key)
+                    self._stats["memo_hits"] += 1
+                    return _copy_result(result)
+                del self._memo[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+            else:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+
+        if leader:
+            return self._lead(key, call, func)
+
+        timeout = None
+        if budget is not None:
+            timeout = budget.get_transaction_timeout()
+        if not call.done.wait(timeout):
+            raise QueryTimeoutError("The query took too long")
+        if isinstance(call.error, (QueryCancelledError, QueryTimeoutError)):
+            # The budget of the caller that ran it ran out, not necessarily ours
+            with self._lock:
+                self._stats["retried"] += 1
+            return func()
+        if call.error is not None:
+            raise call.error
+        return _copy_result(call.result)
+
+    def _lead(self, key: Hashable, call: _Call, func: Callable[[], Result]) -> Result:
+        try:
+            call.result = func()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.waiters > 0
+                if call.error is None and self.memo_ttl > 0:
+                    shared = True
+                    self._memo[key] = (time.monotonic(), call.result)
+                    while len(self._memo) > self.memo_size:
+                        self._memo.popitem(last=False)
+            call.done.set()
+        # The shared result stays untouched by the caller that ran the query
+        return _copy_result(call.result) if shared else call.result
+
+    def clear(self):
+        """Forget the kept results."""
+        with self._lock:
+            self._memo.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get how many queries were run and shared.
+
+        Returns
+        -------
+        :
+            The number of queries ``executed``, of those that shared the
+            execution of an identical concurrent query (``coalesced``) or a
+            kept result (``memo_hits``), of those that had to run again
+            because the query they waited for was aborted (``retried``), and
+            of the queries running and results kept right now.
+        """
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": len(self._calls),
+                "memo_size": len(self._memo),
+            }
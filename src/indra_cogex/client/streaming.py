@@ -0,0 +1,165 @@
+"""Streaming variants of queries with potentially very large results.
+
+Each function yields ``(position, item)`` pairs instead of returning a list,
+so results can be serialized and sent while later ones are still being read
+from the graph. ``position`` is an opaque, monotonically increasing integer:
+calling the function again with ``offset=position`` resumes right after the
+corresponding item. This is what the cursors of the NDJSON query API
+responses encode.
+"""
+
+from typing import Any, Iterator, List, Tuple
+
+from .neo4j_client import Neo4jClient, autoclient
+from .ontology_index import get_ontology_index
+from .queries import get_ontology_child_terms, get_stmts_for_stmt_hashes
+from ..representation import norm_id
+
+__all__ = [
+    "iter_publications_for_journal",
+    "iter_genes_for_go_term",
+    "iter_stmts_for_stmt_hashes",
+]
+
+#: The number of statement hashes whose statements are assembled at a time
+STMT_HASH_BATCH_SIZE = 1000
+
+
+def _iter_nodes(
+    query: str, offset: int, *, client: Neo4jClient, **query_params
+) -> Iterator[Tuple[int, Any]]:
+    # The query has to return a single node column in a stable order and
+    # take the number of rows to skip as $offset
+    rows = client.query_tx_stream(query, offset=offset, **query_params)
+    for position, (node,) in enumerate(rows, start=offset + 1):
+        yield position, client.neo4j_to_node(node)
+
+
+@autoclient()
+def iter_publications_for_journal(
+    journal: Tuple[str, str], offset: int = 0, *, client: Neo4jClient
+) -> Iterator[Tuple[int, Any]]:
+    """Stream the publications published in the given journal.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    journal :
+        The journal to query (e.g., ("nlm", "0000201"))
+    offset :
+        The position to resume from.
+
+    Yields
+    ------
+    :
+        The position and the node of each publication, ordered by ID.
+    """
+    query = """
+        MATCH (pub:Publication)-[:published_in]->(journal:Journal {id: $journal_id})
+        RETURN pub
+        ORDER BY pub.id
+        SKIP $offset
+    """
+    return _iter_nodes(query, offset, client=client, journal_id=norm_id(*journal))
+
+
+@autoclient()
+def iter_genes_for_go_term(
+    go_term: Tuple[str, str],
+    include_indirect: bool = False,
+    offset: int = 0,
+    *,
+    client: Neo4jClient,
+) -> Iterator[Tuple[int, Any]]:
+    """Stream the genes associated with the given GO term.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    go_term :
+        The GO term to query. Example: ``("GO", "GO:0006915")``
+    include_indirect :
+        Should ontological children of the given GO term
+        be queried as well? Defaults to False.
+    offset :
+        The position to resume from.
+
+    Yields
+    ------
+    :
+        The position and the node of each gene, ordered by ID.
+    """
+    term_ids = [norm_id(*go_term)]
+    if include_indirect:
+        index = get_ontology_index(client=client)
+        if index is not None:
+            term_ids += sorted(index.get_descendants(norm_id(*go_term)))
+        else:
+            children = get_ontology_child_terms(go_term, client=client)
+            term_ids += sorted(norm_id(*child.grounding()) for child in children)
+    query = """
+        MATCH (gene:BioEntity)-[:associated_with]->(term:BioEntity)
+        WHERE term.id IN $term_ids AND gene.id STARTS WITH 'hgnc:'
+        WITH DISTINCT gene
+        RETURN gene
+        ORDER BY gene.id
+        SKIP $offset
+    """
+    return _iter_nodes(query, offset, client=client, term_ids=term_ids)
+
+
+@autoclient()
+def iter_stmts_for_stmt_hashes(
+    stmt_hashes: List[int],
+    offset: int = 0,
+    *,
+    client: Neo4jClient,
+    batch_size: int = STMT_HASH_BATCH_SIZE,
+    **kwargs,
+) -> Iterator[Tuple[int, Any]]:
+    """Stream the statements for the given statement hashes.
+
+    The hashes are deduplicated and sorted, and the statements are assembled
+    ``batch_size`` hashes at a time with :func:`get_stmts_for_stmt_hashes`,
+    so only one batch of statements is held in memory.
+
+    Parameters
+    ----------
+    client :
+        The Neo4j client.
+    stmt_hashes :
+        The statement hashes to query.
+    offset :
+        The position to resume from, i.e., the number of sorted hashes
+        that were already processed.
+    batch_size :
+        The number of hashes to query at a time.
+    kwargs :
+        Other arguments of :func:`get_stmts_for_stmt_hashes`, except
+        ``return_evidence_counts``.
+
+    Yields
+    ------
+    :
+        The position and each statement, ordered by hash.
+    """
+    if kwargs.pop("return_evidence_counts", False):
+        raise ValueError("Evidence counts can't be returned when streaming")
+    stmt_hashes = sorted({int(stmt_hash) for stmt_hash in stmt_hashes})
+    return _iter_stmts(stmt_hashes, offset, batch_size, client=client, **kwargs)
+
+
+def _iter_stmts(stmt_hashes, offset, batch_size, *, client, **kwargs):
+    for start in range(offset, len(stmt_hashes), batch_size):
+        batch = stmt_hashes[start:start + batch_size]
+        positions = {stmt_hash: start + i + 1 for i, stmt_hash in enumerate(batch)}
+        stmts = get_stmts_for_stmt_hashes(batch, client=client, **kwargs)
+        # Statements whose hash can't be matched resume from the start
+        # of the batch, so they may be repeated but are never lost
+        keyed = sorted(
+            ((positions.get(stmt.get_hash(), start), stmt) for stmt in stmts),
+            key=lambda pair: pair[0],
+        )
+        yield from keyed
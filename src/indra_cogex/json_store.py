@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+
+"""An embedded store for statement and evidence JSONs keyed by hash.
+
+Statement JSONs (on ``indra_rel`` relations) and evidence JSONs (on
+``Evidence`` nodes) make up most of the size of the graph. The
+:class:`~indra_cogex.sources.indra_db.DbProcessor` and
+:class:`~indra_cogex.sources.indra_db.EvidenceProcessor` also write these
+JSONs into a SQLite file, compressed with zlib, so that they can be fetched
+in batches by statement hash or evidence id without going through Neo4j.
+
+The processors run before the graph is imported, so the store doesn't know
+which graph it belongs to when it is written. Once the graph is imported,
+the store is stamped with its version (see
+:func:`indra_cogex.client.graph_stats.get_graph_version`) by
+running ``python -m indra_cogex.json_store``, and :func:`get_json_store`
+only returns a store stamped with the version of the graph it is asked for.
+Rewriting the store with a processor removes the stamp and the rows the
+processor wrote before, so the store never mixes JSONs of two builds.
+"""
+
+import json
+import logging
+import sqlite3
+import zlib
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from indra_cogex.apps.constants import APP_CACHE_MODULE
+
+__all__ = [
+    "JSON_STORE_PATH",
+    "JsonStore",
+    "get_json_store",
+    "get_stmt_jsons",
+    "get_evidence_jsons",
+]
+
+logger = logging.getLogger(__name__)
+
+JSON_STORE_PATH = APP_CACHE_MODULE.join(name="json_store.db")
+
+#: Stay well below SQLite's limit on the number of query parameters
+_BATCH_SIZE = 900
+#: The tables of JSONs, each written by one processor
+_TABLES = ("statements", "evidences")
+
+
+def _compress(json_obj: Union[str, Dict[str, Any]]) -> bytes:
+    if not isinstance(json_obj, str):
+        json_obj = json.dumps(json_obj)
+    return zlib.compress(json_obj.encode("utf-8"))
+
+
+def _decompress(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _batches(items: Iterable, size: int = _BATCH_SIZE) -> Iterable[List]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+class JsonStore:
+    """Read and write statement and evidence JSONs in a SQLite file."""
+
+    def __init__(self, path: Union[None, str, Path] = None):
+        """Initialize the store.
+
+        Parameters
+        ----------
+        path :
+            The path to the SQLite file. Defaults to :data:`JSON_STORE_PATH`.
+        """
+        self.path = Path(path) if path else JSON_STORE_PATH
+
+    def exists(self) -> bool:
+        """Return True if the store file exists."""
+        return self.path.exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def create(self, force: bool = False, clear: Optional[str] = None):
+        """Create the tables of the store.
+
+        Parameters
+        ----------
+        force :
+            If True, delete any existing store first.
+        clear :
+            The name of a table, ``statements`` or ``evidences``, to delete
+            the rows of, e.g., because a processor is about to write all of
+            them again.
+
+        Raises
+        ------
+        ValueError
+            If the table to clear isn't a table of the store.
+        """
+        if clear is not None and clear not in _TABLES:
+            raise ValueError(f"Unknown table {clear}, must be one of {_TABLES}")
+        if force and self.path.exists():
+            self.path.unlink()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            # The contents are about to change, so the store has to be
+            # stamped again for the graph they are imported into
+            conn.execute("DELETE FROM meta WHERE key = 'graph_version'")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS statements "
+                "(stmt_hash INTEGER PRIMARY KEY, json BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS evidences "
+                "(evidence_id TEXT PRIMARY KEY, stmt_hash INTEGER NOT NULL, "
+                "json BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS evidences_stmt_hash "
+                "ON evidences (stmt_hash)"
+            )
+            if clear is not None:
+                conn.execute(f"DELETE FROM {clear}")
+        conn.close()
+
+    def get_graph_version(self) -> Optional[str]:
+        """Get the version of the graph the store was stamped with.
+
+        Returns
+        -------
+        :
+            The graph version, or None if the store hasn't been stamped.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'graph_version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Stores written before the meta table was added
+            row = None
+        conn.close()
+        return row[0] if row else None
+
+    def set_graph_version(self, graph_version: str):
+        """Stamp the store with the version of the graph it belongs to.
+
+        Parameters
+        ----------
+        graph_version :
+            The version of the graph the statements and evidences of the
+            store were imported into.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('graph_version', ?)",
+                (graph_version,),
+            )
+        conn.close()
+
+    def put_stmt_jsons(
+        self, stmt_jsons: Iterable[Tuple[int, Union[str, Dict[str, Any]]]]
+    ):
+        """Add statement JSONs to the store.
+
+        Parameters
+        ----------
+        stmt_jsons :
+            Pairs of statement hash and statement JSON (as a dict or an
+            already serialized string).
+        """
+        conn = self._connect()
+        with conn:
+            for batch in _batches(stmt_jsons, 10_000):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO statements VALUES (?, ?)",
+                    [(stmt_hash, _compress(sj)) for stmt_hash, sj in batch],
+                )
+        conn.close()
+
+    def put_evidence_jsons(
+        self, evidence_jsons: Iterable[Tuple[str, int, Union[str, Dict[str, Any]]]]
+    ):
+        """Add evidence JSONs to the store.
+
+        Parameters
+        ----------
+        evidence_jsons :
+            Triples of evidence id (as used in the graph, e.g.,
+            ``indra_evidence:1``), statement hash and evidence JSON.
+        """
+        conn = self._connect()
+        with conn:
+            for batch in _batches(evidence_jsons, 10_000):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO evidences VALUES (?, ?, ?)",
+                    [
+                        (evidence_id, stmt_hash, _compress(ej))
+                        for evidence_id, stmt_hash, ej in batch
+                    ],
+                )
+        conn.close()
+
+    def get_stmt_jsons(self, stmt_hashes: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Get statement JSONs by hash.
+
+        Parameters
+        ----------
+        stmt_hashes :
+            The statement hashes to look up.
+
+        Returns
+        -------
+        :
+            A dict of statement JSONs keyed by hash. Hashes that are not in
+            the store are left out.
+        """
+        rv = {}
+        conn = self._connect()
+        for batch in _batches({int(h) for h in stmt_hashes}):
+            query = (
+                "SELECT stmt_hash, json FROM statements WHERE stmt_hash IN (%s)"
+                % ",".join("?" * len(batch))
+            )
+            for stmt_hash, blob in conn.execute(query, batch):
+                rv[stmt_hash] = _decompress(blob)
+        conn.close()
+        return rv
+
+    def get_evidence_jsons_by_id(
+        self, evidence_ids: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get evidence JSONs by evidence id.
+
+        Parameters
+        ----------
+        evidence_ids :
+            The evidence ids as used in the graph, e.g., ``indra_evidence:1``.
+
+        Returns
+        -------
+        :
+            A dict of evidence JSONs keyed by evidence id. Ids that are not
+            in the store are left out.
+        """
+        rv = {}
+        conn = self._connect()
+        for batch in _batches(set(evidence_ids)):
+            query = (
+                "SELECT evidence_id, json FROM evidences WHERE evidence_id IN (%s)"
+                % ",".join("?" * len(batch))
+            )
+            for evidence_id, blob in conn.execute(query, batch):
+                rv[evidence_id] = _decompress(blob)
+        conn.close()
+        return rv
+
+    def get_evidence_jsons(
+        self, stmt_hashes: Iterable[int], limit: Optional[int] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Get the evidence JSONs of statements.
+
+        Parameters
+        ----------
+        stmt_hashes :
+            The statement hashes to get evidences for.
+        limit :
+            The maximum number of evidences to return per statement.
+
+        Returns
+        -------
+        :
+            A dict of evidence JSON lists keyed by statement hash.
+        """
+        rv: Dict[int, List[Dict[str, Any]]] = {}
+        conn = self._connect()
+        for batch in _batches({int(h) for h in stmt_hashes}):
+            query = (
+                "SELECT stmt_hash, json FROM evidences WHERE stmt_hash IN (%s) "
+                "ORDER BY stmt_hash, evidence_id" % ",".join("?" * len(batch))
+            )
+            for stmt_hash, blob in conn.execute(query, batch):
+                evidences = rv.setdefault(stmt_hash, [])
+                if limit is None or len(evidences) < limit:
+                    evidences.append(_decompress(blob))
+        conn.close()
+        return rv
+
+
+def get_json_store(
+    path: Union[None, str, Path] = None, graph_version: Optional[str] = None
+) -> Optional[JsonStore]:
+    """Return the JSON store if it has been built for the graph, otherwise None.
+
+    Parameters
+    ----------
+    path :
+        The path to the SQLite file. Defaults to :data:`JSON_STORE_PATH`.
+    graph_version :
+        The version of the graph the store is used with. If given, a store
+        stamped with another version, or not stamped at all, isn't used.
+
+    Returns
+    -------
+    :
+        The store, or None if the file doesn't exist or belongs to another
+        graph.
+    """
+    store = JsonStore(path)
+    if not store.exists():
+        return None
+    if graph_version is not None:
+        built_version = store.get_graph_version()
+        if built_version != graph_version:
+            logger.warning(
+                "Ignoring JSON store at %s stamped with graph version %s, the "
+                "current graph version is %s",
+                store.path, built_version, graph_version,
+            )
+            return None
+    return store
+
+
+def get_stmt_jsons(
+    stmt_hashes: Iterable[int],
+    path: Union[None, str, Path] = None,
+    graph_version: Optional[str] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """Get statement JSONs by hash from the JSON store.
+
+    Parameters
+    ----------
+    stmt_hashes :
+        The statement hashes to look up.
+    path :
+        The path to the SQLite file. Defaults to :data:`JSON_STORE_PATH`.
+    graph_version :
+        The version of the graph the store is used with, see
+        :func:`get_json_store`.
+
+    Returns
+    -------
+    :
+        A dict of statement JSONs keyed by hash. Empty if the store has not
+        been built for the graph.
+    """
+    store = get_json_store(path, graph_version=graph_version)
+    if store is None:
+        return {}
+    return store.get_stmt_jsons(stmt_hashes)
+
+
+def get_evidence_jsons(
+    stmt_hashes: Iterable[int],
+    limit: Optional[int] = None,
+    path: Union[None, str, Path] = None,
+    graph_version: Optional[str] = None,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Get the evidence JSONs of statements from the JSON store.
+
+    Parameters
+    ----------
+    stmt_hashes :
+        The statement hashes to get evidences for.
+    limit :
+        The maximum number of evidences to return per statement.
+    path :
+        The path to the SQLite file. Defaults to :data:`JSON_STORE_PATH`.
+    graph_version :
+        The version of the graph the store is used with, see
+        :func:`get_json_store`.
+
+    Returns
+    -------
+    :
+        A dict of evidence JSON lists keyed by statement hash. Empty if the
+        store has not been built for the graph.
+    """
+    store = get_json_store(path, graph_version=graph_version)
+    if store is None:
+        return {}
+    return store.get_evidence_jsons(stmt_hashes, limit=limit)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from indra_cogex.client.graph_stats import get_graph_version
+    from indra_cogex.client.neo4j_client import Neo4jClient
+
+    parser = argparse.ArgumentParser(
+        description="Stamp the JSON store with the version of the graph its "
+                    "statements and evidences were imported into."
+    )
+    parser.add_argument(
+        "--path",
+        default=str(JSON_STORE_PATH),
+        help="The path to the SQLite file of the store.",
+    )
+    parser.add_argument(
+        "--graph-version",
+        help="The version of the graph. Defaults to the version of the "
+             "configured graph. The store is only used with this graph version.",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    _store = JsonStore(args.path)
+    if not _store.exists():
+        parser.error(f"No JSON store at {args.path}")
+    _graph_version = args.graph_version or get_graph_version(client=Neo4jClient())
+    if _graph_version is None:
+        parser.error("Could not get the graph version, use --graph-version")
+    _store.set_graph_version(_graph_version)
+    logger.info("Stamped JSON store at %s with graph version %s", args.path, _graph_version)
@@ -497,6 +497,7 @@ def indra_stmts_from_relations(
     rels: Iterable[Relation],
     deduplicate: bool = True,
     order_by_ev_count: bool = False,
+    stmt_jsons: Optional[Mapping[int, Dict[str, Any]]] = None,
 ) -> List[Statement]:
     """
     Convert a list of relations to INDRA Statements.
@@ -516,15 +517,35 @@ def indra_stmts_from_relations(
         If True, the statements are ordered by the number of evidences they have with the
         statement with the most evidences first.
         Default: False.
+    stmt_jsons :
+        Statement JSONs keyed by hash for relations that were queried without
+        their ``stmt_json`` property, e.g., from the
+        :class:`~indra_cogex.json_store.JsonStore`.
 
     Returns
     -------
     :
         A list of INDRA Statements.
+
+    Raises
+    ------
+    ValueError
+        If a relation has no statement JSON and none is given for its hash.
     """
     if order_by_ev_count:
         rels = sorted(rels, key=lambda x: x.data["evidence_count"], reverse=True)
-    stmts_json = [load_statement_json(rel.data["stmt_json"]) for rel in rels]
+    else:
+        rels = list(rels)
+    stmts_json = []
+    for rel in rels:
+        if rel.data.get("stmt_json"):
+            stmts_json.append(load_statement_json(rel.data["stmt_json"]))
+        elif stmt_jsons and int(rel.data["stmt_hash"]) in stmt_jsons:
+            stmts_json.append(stmt_jsons[int(rel.data["stmt_hash"])])
+        else:
+            raise ValueError(
+                f"No statement JSON for statement hash {rel.data['stmt_hash']}"
+            )
     stmts = stmts_from_json(stmts_json)
     if deduplicate:
         # We do it this way to not change the order of the statements
@@ -14,6 +14,10 @@ import click
 from more_click import verbose_option
 from tqdm import tqdm
 
+from indra_cogex.client.graph_stats import (
+    GRAPH_STATS_MANIFEST_PATH,
+    build_graph_stats_manifest,
+)
 from indra_cogex.sources.processor_util import (
     check_duplicated_nodes,
     check_missing_node_ids_in_edges
@@ -87,6 +91,13 @@ def _iter_processors() -> Iterable[Type[Processor]]:
     help="Path to a manifest file that will listing all node and edge files "
          "that where imported."
 )
+@click.option(
+    "--stats-manifest",
+    is_flag=True,
+    help="If true, counts node labels and prefixes in the node files and writes "
+         "the graph statistics manifest used by the web app. This is always "
+         "done when --run-import is given.",
+)
 @click.option(
     "--database-name",
     type=str,
@@ -108,6 +119,7 @@ def main(
     skip_failed_processors: bool,
     check_ingestion_files: bool,
     ingestion_manifest: Optional[Path],
+    stats_manifest: bool,
     database_name: str,
 ):
     """Generate and import Neo4j nodes and edges tables."""
@@ -266,6 +278,19 @@ def main(
             "Ingestion file check completed without errors.", fg="green", bold=True
         )
 
+    # Precompute statistics that are expensive to get from the graph itself
+    if stats_manifest or run_import:
+        click.secho("Building graph statistics manifest...", fg="green", bold=True)
+        manifest = build_graph_stats_manifest(
+            [path for path in nodes_paths_for_import if path.exists()]
+        )
+        click.secho(
+            f"Counted {sum(manifest['prefix_counts'].values())} nodes with "
+            f"{len(manifest['prefix_counts'])} prefixes, saved to "
+            f"{GRAPH_STATS_MANIFEST_PATH}",
+            fg="green",
+        )
+
     # Import the nodes
     if run_import:
         # Documentation for neo4j-admin import:
@@ -21,11 +21,13 @@ from indra.statements import (
     stmt_from_json,
     Complex,
     Conversion,
+    Modification,
 )
 from indra.util import batch_iter
 from indra.sources import SOURCE_INFO
 from tqdm import tqdm
 
+from indra_cogex.json_store import JsonStore
 from indra_cogex.representation import Node, Relation
 from indra_cogex.sources.processor import Processor
 
@@ -57,7 +59,11 @@ class DbProcessor(Processor):
     name = "database"
     node_types = ["BioEntity"]
 
-    def __init__(self, dir_path: Union[None, str, Path] = None):
+    def __init__(
+        self,
+        dir_path: Union[None, str, Path] = None,
+        json_store_path: Union[None, str, Path] = None,
+    ):
         """Initialize the INDRA database processor.
 
         Parameters
@@ -66,7 +72,11 @@ class DbProcessor(Processor):
             The path to the directory containing unique and grounded
             statements as a \\*.tsv.gz file, source counts as a pickle file and
             belief scores as a pickle file.
+        json_store_path :
+            The path to the JSON store the statement JSONs are written to.
+            Defaults to :data:`indra_cogex.json_store.JSON_STORE_PATH`.
         """
+        self.json_store = JsonStore(json_store_path)
         if dir_path is None:
             dir_path = unique_stmts_fname.parent
         elif isinstance(dir_path, str):
@@ -136,6 +146,11 @@ class DbProcessor(Processor):
                         # Run OR on the current value and the new value
                         has_retracted_pmid[stmt_hash] |= is_retracted(pmid)
 
+        # The statement JSONs are also written to the JSON store in batches,
+        # replacing the ones of the previous run
+        self.json_store.create(clear="statements")
+        stmt_json_batch = []
+
         hashes_yielded = set()
         with gzip.open(self.stmts_fname, "rt") as fh:
             reader = csv.reader(fh, delimiter="\t")
@@ -186,6 +201,12 @@ class DbProcessor(Processor):
                 if isinstance(stmt, Conversion):
                     continue
 
+                # Store the modified site as typed properties so that sites
+                # can be queried without parsing the statement JSON
+                if isinstance(stmt, Modification) and stmt.residue and stmt.position:
+                    data["residue:string"] = stmt.residue
+                    data["position:string"] = stmt.position
+
                 # If we don't have at least 2 real agents, we skip it
                 if len(agents) < 2:
                     continue
@@ -215,7 +236,12 @@ class DbProcessor(Processor):
                     continue
 
                 hashes_yielded.add(stmt_hash)
+                stmt_json_batch.append((stmt_hash, data["stmt_json:string"]))
+                if len(stmt_json_batch) >= 100_000:
+                    self.json_store.put_stmt_jsons(stmt_json_batch)
+                    stmt_json_batch = []
 
+        self.json_store.put_stmt_jsons(stmt_json_batch)
         logger.info(
             f"Got {total_count} total relations from {len(hashes_yielded)} unique statements"
         )
@@ -225,9 +251,17 @@ class EvidenceProcessor(Processor):
     name = "indra_db_evidence"
     node_types = ["Evidence", "Publication"]
 
-    def __init__(self):
-        """Initialize the Evidence processor"""
+    def __init__(self, json_store_path: Union[None, str, Path] = None):
+        """Initialize the Evidence processor
+
+        Parameters
+        ----------
+        json_store_path :
+            The path to the JSON store the evidence JSONs are written to.
+            Defaults to :data:`indra_cogex.json_store.JSON_STORE_PATH`.
+        """
         self.stmt_fname = processed_stmts_fname
+        self.json_store = JsonStore(json_store_path)
         self._stmt_id_pmid_links = {}
         # Check if files exist without loading them
         if not self.stmt_fname.exists():
@@ -259,6 +293,8 @@ class EvidenceProcessor(Processor):
                 for pmid, year, types in csv.reader(fh, delimiter="\t")
             }
 
+        self.json_store.create(clear="evidences")
+
         # Loop the grounded statements and get the evidence w text refs
         logger.info("Looping statements from statements file")
         with gzip.open(self.stmt_fname.as_posix(), "rt") as fh:
@@ -275,6 +311,7 @@ class EvidenceProcessor(Processor):
                 total=total,
             ):
                 node_batch = []
+                evidence_json_batch = []
                 for stmt_hash_str, stmt_json_str in batch:
                     stmt_hash = int(stmt_hash_str)
                     if stmt_hash not in included_hashes:
@@ -349,6 +386,10 @@ class EvidenceProcessor(Processor):
                         #  is not the standard CVCL INDRA normally expects.
 
                         # Always add the Evidence node for this evidence
+                        evidence_json_str = json.dumps(evidence)
+                        evidence_json_batch.append(
+                            (f"indra_evidence:{yield_index}", stmt_hash, evidence_json_str)
+                        )
                         node_batch.append(
                             Node(
                                 db_ns="indra_evidence",
@@ -359,7 +400,7 @@ class EvidenceProcessor(Processor):
                                     "retracted:boolean": get_bool(
                                         is_retracted(pmid) if pmid else False
                                     ),
-                                    "evidence:string": json.dumps(evidence),
+                                    "evidence:string": evidence_json_str,
                                     "stmt_hash:int": stmt_hash,
                                     "source_api:string": evidence["source_api"],
                                 },
@@ -367,6 +408,7 @@ class EvidenceProcessor(Processor):
                         )
                         yield_index += 1
 
+                self.json_store.put_evidence_jsons(evidence_json_batch)
                 yield node_batch
 
     def get_relations(self):
@@ -0,0 +1,118 @@
+"""Tests for the cached query API specification."""
+
+import sys
+import textwrap
+from unittest import mock
+
+import pytest
+
+from indra_cogex.apps import api_spec
+from indra_cogex.apps.api_spec import LazyFunctions, get_api_spec
+from indra_cogex.apps.import_profile import parse_import_times
+
+MODULE_SOURCE = '''
+def query(gene, limit: int = 10, *, client) -> list:
+    """Get something."""
+    return [gene] * limit
+
+
+def no_client(gene):
+    """Not a query."""
+'''
+
+
+@pytest.fixture
+def module_name(tmp_path):
+    name = "api_spec_test_module"
+    (tmp_path / f"{name}.py").write_text(textwrap.dedent(MODULE_SOURCE))
+    sys.path.insert(0, str(tmp_path))
+    yield name
+    sys.path.remove(str(tmp_path))
+    sys.modules.pop(name, None)
+
+
+def _get_docstring(func, skip_params=None):
+    return func.__doc__, f"{func.__doc__} Skips {sorted(skip_params)}"
+
+
+def test_lazy_functions(module_name):
+    functions = LazyFunctions([(module_name, "query"), (module_name, "no_client")])
+    assert list(functions) == ["query", "no_client"]
+    assert "query" in functions
+    assert "missing" not in functions
+    assert module_name not in sys.modules
+    assert functions["query"]("A", 2, client=None) == ["A", "A"]
+    assert module_name in sys.modules
+    assert functions.is_loaded("query")
+    assert not functions.is_loaded("no_client")
+    with pytest.raises(KeyError):
+        functions["missing"]
+
+
+def test_get_api_spec(module_name, tmp_path):
+    path = tmp_path / "spec.json"
+    module_functions = [(module_name, "query"), (module_name, "no_client")]
+    kwargs = dict(skip_global={"client"}, skip_arguments={}, path=path)
+    spec = get_api_spec(module_functions, _get_docstring, **kwargs)
+    assert spec["no_client"] is None
+    assert spec["query"]["short_doc"] == "Get something."
+    assert spec["query"]["doc"] == "Get something. Skips ['client']"
+    assert spec["query"]["parameters"] == {
+        "gene": {"type": "<class 'inspect._empty'>", "required": True, "default": None},
+        "limit": {"type": "<class 'int'>", "required": False, "default": 10},
+    }
+    assert spec["query"]["return_type"] == "<class 'list'>"
+
+    # The cached spec is used without importing the module
+    sys.modules.pop(module_name)
+    get_docstring = mock.Mock(side_effect=_get_docstring)
+    assert get_api_spec(module_functions, get_docstring, **kwargs) == spec
+    get_docstring.assert_not_called()
+    assert module_name not in sys.modules
+
+    # Other skipped parameters invalidate the cache
+    spec = get_api_spec(
+        module_functions, get_docstring, **{**kwargs, "skip_arguments": {"query": {"limit"}}}
+    )
+    assert spec["query"]["doc"] == "Get something. Skips ['client', 'limit']"
+    assert get_docstring.call_count == 1
+
+    # So does a change to the source of the module
+    (tmp_path / f"{module_name}.py").write_text(
+        textwrap.dedent(MODULE_SOURCE).replace("Get something.", "Get more.")
+    )
+    sys.modules.pop(module_name)
+    spec = get_api_spec(module_functions, _get_docstring, **kwargs)
+    assert spec["query"]["short_doc"] == "Get more."
+
+
+def test_get_api_spec_decorator_modules(module_name, tmp_path, monkeypatch):
+    # A change to the source of a decorator invalidates the cache
+    decorator_path = tmp_path / "api_spec_test_decorator.py"
+    decorator_path.write_text("def decorate(func):\n    return func\n")
+    monkeypatch.setattr(api_spec, "DECORATOR_MODULES", ("api_spec_test_decorator",))
+    module_functions = [(module_name, "query")]
+    kwargs = dict(skip_global={"client"}, skip_arguments={}, path=tmp_path / "spec.json")
+    get_docstring = mock.Mock(side_effect=_get_docstring)
+    get_api_spec(module_functions, get_docstring, **kwargs)
+    get_api_spec(module_functions, get_docstring, **kwargs)
+    assert get_docstring.call_count == 1
+    decorator_path.write_text("def decorate(func):\n    return func  # changed\n")
+    get_api_spec(module_functions, get_docstring, **kwargs)
+    assert get_docstring.call_count == 2
+
+
+def test_parse_import_times():
+    lines = [
+        "import time: self [us] | cumulative | imported package",
+        "import time:       236 |        236 |   _io",
+        "import time:        50 |         50 |     json.scanner",
+        "import time:       100 |        150 |   json",
+        "something else",
+    ]
+    times = parse_import_times(lines)
+    assert [(t.module, t.self_us, t.cumulative_us, t.depth) for t in times] == [
+        ("_io", 236, 236, 0),
+        ("json.scanner", 50, 50, 1),
+        ("json", 100, 150, 0),
+    ]
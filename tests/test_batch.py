@@ -0,0 +1,98 @@
+"""Tests for running batches of query API calls."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from indra_cogex.apps.batch import run_batch
+from indra_cogex.apps.query_limits import AdmissionError
+from indra_cogex.client.query_budget import QueryTimeoutError
+
+
+def make_call():
+    calls = []
+    lock = threading.Lock()
+
+    def call(func_name, params):
+        with lock:
+            calls.append((func_name, dict(params)))
+        if func_name == "add":
+            return params["a"] + params["b"]
+        if func_name == "broken":
+            raise RuntimeError("broken")
+        if func_name == "busy":
+            raise AdmissionError("busy", retry_after=3)
+        if func_name == "slow":
+            raise QueryTimeoutError("slow")
+        raise ValueError(f"Unknown function: {func_name}")
+
+    return call, calls
+
+
+def test_run_batch():
+    call, calls = make_call()
+    items = [
+        {"function": "add", "params": {"a": 1, "b": 2}},
+        {"function": "missing"},
+        {"function": "add", "params": {"b": 2, "a": 1}},
+        {"function": "broken", "params": {}},
+        {"function": "add", "params": {"a": 2, "b": 2}},
+    ]
+    with ThreadPoolExecutor(2) as executor:
+        results = run_batch(items, call, executor)
+    assert results == [
+        {"result": 3},
+        {"error": "Unknown function: missing", "status": 400},
+        {"result": 3},
+        {"error": "Internal server error", "status": 500},
+        {"result": 4},
+    ]
+    # The identical first and third items only ran once
+    assert len(calls) == 4
+
+
+def test_run_batch_limits():
+    call, _ = make_call()
+    items = [{"function": "busy"}, {"function": "slow"}]
+    with ThreadPoolExecutor(2) as executor:
+        results = run_batch(items, call, executor)
+    assert results == [
+        {"error": "busy", "status": 429, "retry_after": 3},
+        {"error": "slow", "status": 504},
+    ]
+
+
+def test_run_batch_invalid():
+    call, calls = make_call()
+    with ThreadPoolExecutor(1) as executor:
+        with pytest.raises(ValueError):
+            run_batch({"function": "add"}, call, executor)
+        with pytest.raises(ValueError):
+            run_batch([{"params": {}}], call, executor)
+        with pytest.raises(ValueError):
+            run_batch([{"function": "add", "params": [1]}], call, executor)
+        with pytest.raises(ValueError):
+            run_batch([{"function": "add"}] * 3, call, executor, max_size=2)
+    assert not calls
+
+
+def test_run_batch_max_in_flight():
+    running = []
+    most_running = []
+    lock = threading.Lock()
+
+    def call(func_name, params):
+        with lock:
+            running.append(1)
+            most_running.append(len(running))
+        threading.Event().wait(0.01)
+        with lock:
+            running.pop()
+        return params["i"]
+
+    items = [{"function": "f", "params": {"i": i}} for i in range(10)]
+    with ThreadPoolExecutor(8) as executor:
+        results = run_batch(items, call, executor, max_in_flight=2)
+    assert results == [{"result": i} for i in range(10)]
+    assert max(most_running) <= 2
@@ -1,9 +1,12 @@
+import os
+import tempfile
 import unittest
 from datetime import datetime
+from unittest import mock
 
 import pandas as pd
 
-from indra_cogex.apps.curation_cache import CurationCache, Curations
+from indra_cogex.apps.curation_cache import CurationCache, Curations, CurationStore
 
 
 class MockCurationCache(CurationCache):
@@ -125,3 +128,151 @@ class TestCurationCache(unittest.TestCase):
         self.assertEqual(
             expected, curation_cache.get_curation_cache(only_most_recent=True)
         )
+
+
+class TestCurationCacheRefresh(unittest.TestCase):
+    def test_incremental_refresh_and_submit(self):
+        upstream = [
+            _curation(id=1, pa_hash=1, source_hash=1, tag="correct"),
+            _curation(id=2, pa_hash=2, source_hash=2, tag="incorrect"),
+        ]
+        module = "indra_cogex.apps.curation_cache.curation_cache"
+        with mock.patch(f"{module}.get_curations", side_effect=lambda: [dict(c) for c in upstream]):
+            curation_cache = CurationCache()
+            self.assertEqual([1], [c["id"] for c in curation_cache.get_curations(pa_hash=1)])
+            first = curation_cache.curation_list[0]
+
+            with mock.patch(f"{module}.submit_curation", return_value=3):
+                curation_cache.submit_curation(
+                    hash_val=2, tag="correct", email="dana", text="",
+                    ev_hash=2, source_api="test",
+                )
+            curations = curation_cache.get_curations(pa_hash=2, source_hash=2)
+            self.assertEqual(["incorrect", "correct"], [c["tag"] for c in curations])
+
+            upstream.append(_curation(id=3, pa_hash=2, source_hash=2, tag="correct", curator="dana"))
+            curation_cache.refresh_curations()
+            curations = curation_cache.get_curations(pa_hash=[2, 5])
+            self.assertEqual([2, 3], [c["id"] for c in curations])
+            # Curations that were seen before aren't processed again
+            self.assertIs(first, curation_cache.curation_list[0])
+            curation_cache.stop()
+
+    def test_derived_views_are_memoized(self):
+        upstream = [
+            _curation(id=1, pa_hash=1, source_hash=1, tag="correct"),
+            _curation(id=2, pa_hash=2, source_hash=2, tag="incorrect"),
+        ]
+        module = "indra_cogex.apps.curation_cache.curation_cache"
+        with mock.patch(f"{module}.get_curations", side_effect=lambda: [dict(c) for c in upstream]):
+            curation_cache = CurationCache()
+            version = curation_cache.version
+            correct = curation_cache.get_correct_statement_hashes()
+            self.assertEqual({1}, correct)
+            self.assertIs(correct, curation_cache.get_correct_statement_hashes())
+            self.assertEqual({1: {1}}, curation_cache.get_curated_pa_hash_map())
+            self.assertEqual(
+                {1: {1}, 2: {2}}, curation_cache.get_curated_pa_hash_map(only_correct=False)
+            )
+
+            with mock.patch(f"{module}.submit_curation", return_value=3):
+                curation_cache.submit_curation(
+                    hash_val=2, tag="correct", email="dana", text="",
+                    ev_hash=2, source_api="test",
+                )
+            self.assertGreater(curation_cache.version, version)
+            self.assertEqual({1, 2}, curation_cache.get_correct_statement_hashes())
+            # The pending curation's date compares with the downloaded ones
+            self.assertEqual(
+                3, len(curation_cache.get_curation_cache(only_most_recent=True))
+            )
+            curation_cache.stop()
+
+    def test_refresh_removes_deleted_curations(self):
+        upstream = [
+            _curation(id=1, pa_hash=1, source_hash=1, tag="correct"),
+            _curation(id=2, pa_hash=2, source_hash=2, tag="incorrect"),
+        ]
+        module = "indra_cogex.apps.curation_cache.curation_cache"
+        with mock.patch(f"{module}.get_curations", side_effect=lambda: [dict(c) for c in upstream]):
+            curation_cache = CurationCache()
+            version = curation_cache.version
+            del upstream[0]
+            curation_cache.refresh_curations()
+            self.assertEqual([2], [c["id"] for c in curation_cache.get_curation_cache()])
+            self.assertEqual([], curation_cache.get_curations(pa_hash=1))
+            self.assertGreater(curation_cache.version, version)
+            curation_cache.stop()
+
+    def test_process_curation_normalizes_dates(self):
+        curation = CurationCache._process_curation(
+            _curation(date="Thu, 29 Nov 2018 18:00:08 GMT")
+        )
+        self.assertEqual(datetime(2018, 11, 29, 18, 0, 8), curation["date"])
+
+
+class TestCurationStore(unittest.TestCase):
+    def test_processes_share_downloads(self):
+        upstream = [
+            _curation(id=1, pa_hash=1, source_hash=1, tag="correct"),
+            _curation(id=2, pa_hash=2, source_hash=2, tag="incorrect"),
+        ]
+        module = "indra_cogex.apps.curation_cache.curation_cache"
+        get_curations = mock.Mock(side_effect=lambda: [dict(c) for c in upstream])
+        with tempfile.TemporaryDirectory() as directory, mock.patch(
+            f"{module}.get_curations", get_curations
+        ):
+            path = os.path.join(directory, "curations.db")
+            first = CurationCache(store=CurationStore(path))
+            self.assertEqual(1, get_curations.call_count)
+            # The second cache loads the curations from the store
+            second = CurationCache(store=CurationStore(path))
+            self.assertEqual(1, get_curations.call_count)
+            self.assertEqual(first.curation_list, second.curation_list)
+            self.assertEqual(first.last_update, second.last_update)
+
+            upstream.append(_curation(id=3, pa_hash=2, source_hash=2, tag="correct"))
+            first.refresh_curations()
+            self.assertEqual(2, get_curations.call_count)
+            self.assertEqual([1, 2], [c["id"] for c in second.get_curation_cache()])
+            version = second.version
+            second._sync_from_store()
+            self.assertGreater(second.version, version)
+            self.assertEqual(first.curation_list, second.curation_list)
+            # Nothing new in the store keeps the snapshot
+            version = second.version
+            second._sync_from_store()
+            self.assertEqual(version, second.version)
+
+            # Deleted curations are removed from the store and all caches
+            del upstream[0]
+            first.refresh_curations()
+            self.assertEqual([2, 3], [c["id"] for c in first.get_curation_cache()])
+            second._sync_from_store()
+            self.assertEqual(first.curation_list, second.curation_list)
+            self.assertGreater(second.version, version)
+            third = CurationCache(store=CurationStore(path))
+            self.assertEqual(first.curation_list, third.curation_list)
+            first.stop()
+            third.stop()
+            second.stop()
+
+    def test_refresh_requests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = CurationStore(os.path.join(directory, "curations.db"))
+            self.assertEqual((0, [], 0), store.read())
+            self.assertIsNone(store.get_fetched())
+            fetched = datetime.utcnow().replace(microsecond=0)
+            store.add([dict(id=1, date=datetime(2018, 11, 29), tag="correct")], fetched)
+            store.add([dict(id=1, date=datetime(2018, 11, 29), tag="correct")], fetched)
+            self.assertEqual(
+                (1, [dict(id=1, date=datetime(2018, 11, 29), tag="correct")], 0),
+                store.read(),
+            )
+            self.assertEqual((1, [], 0), store.read(after=1))
+            self.assertEqual(fetched, store.get_fetched())
+            self.assertFalse(store.is_refresh_requested(fetched))
+            store.request_refresh()
+            self.assertTrue(store.is_refresh_requested(fetched))
+            self.assertTrue(store.acquire_refresh_lock())
+            store.release_refresh_lock()
@@ -26,3 +26,197 @@ def test_extend_by_ontology():
     assert (
         sum(map(lambda x: len(x), gene_set_mapping.values())) > len_before
     ), gene_set_mapping
+
+
+class _MockClient:
+    """A client that answers phosphosite queries from fixed rows."""
+
+    def __init__(self, site_rows, json_rows=()):
+        self.site_rows = site_rows
+        self.json_rows = json_rows
+
+    def query_tx(self, query, **kwargs):
+        if "r.residue IS NOT NULL" in query:
+            return self.site_rows
+        return self.json_rows
+
+
+def test_get_phosphosites(tmp_path):
+    import sqlite3
+
+    from indra_cogex.client.enrichment.utils import (
+        SQLITE_PHOSPHOSITE_TABLE,
+        get_phosphosites,
+        get_sqlite_phosphosite_count,
+    )
+
+    client = _MockClient(
+        [["hgnc:6871", "T", "185"], ["hgnc:6871", "Y", "187"]],
+    )
+    assert get_phosphosites(client=client, use_sqlite_cache=False) == {
+        ("hgnc:6871", "T", "185"),
+        ("hgnc:6871", "Y", "187"),
+    }
+
+    # Graphs without the typed properties fall back to the statement JSONs
+    client = _MockClient(
+        [],
+        [
+            ["hgnc:6871", '{"type": "Phosphorylation", "residue": "T", "position": "185"}'],
+            ["hgnc:6871", '{"type": "Phosphorylation", "residue": "T", "position": null}'],
+        ],
+    )
+    assert get_phosphosites(client=client, use_sqlite_cache=False) == {
+        ("hgnc:6871", "T", "185"),
+    }
+
+    # Caches built before the phosphosite table was added have no count
+    db_path = tmp_path / "cache.db"
+    conn = sqlite3.connect(db_path)
+    assert get_sqlite_phosphosite_count(db_path) is None
+    conn.execute(
+        f"CREATE TABLE {SQLITE_PHOSPHOSITE_TABLE} "
+        f"(substrate TEXT, residue TEXT, position TEXT)"
+    )
+    conn.executemany(
+        f"INSERT INTO {SQLITE_PHOSPHOSITE_TABLE} VALUES (?, ?, ?)",
+        [("hgnc:6871", "T", "185"), ("hgnc:6840", "S", "218")],
+    )
+    conn.commit()
+    conn.close()
+    assert get_sqlite_phosphosite_count(db_path) == 2
+    assert get_phosphosites(client=client, sqlite_db_path=db_path) == {
+        ("hgnc:6871", "T", "185"),
+        ("hgnc:6840", "S", "218"),
+    }
+
+
+def test_build_sqlite_cache_incremental(tmp_path, monkeypatch):
+    from indra_cogex.client.enrichment import utils
+
+    calls = []
+
+    def _loader(name, data):
+        def _load(*, client, use_sqlite_cache, limit=None):
+            assert not use_sqlite_cache
+            calls.append(name)
+            return data
+        return _load
+
+    class _PingClient:
+        def ping(self):
+            return True
+
+    class _Ontology:
+        def initialize(self):
+            pass
+
+    monkeypatch.setattr(utils, "bio_ontology", _Ontology())
+    monkeypatch.setattr(
+        utils,
+        "gene_set_table_datasets",
+        {"go": _loader("go", {("go:1", "a"): {"1", "2"}, ("go:2", None): {"3"}})},
+    )
+    monkeypatch.setattr(
+        utils,
+        "genes_with_confidence_datasets",
+        {
+            "entity_to_targets": _loader(
+                "entity_to_targets", {("hgnc:1", "A"): {"2": (0.5, 3)}}
+            ),
+            "kinase_phosphosites": _loader(
+                "kinase_phosphosites",
+                {("hgnc:1", "A"): {("hgnc:2", "B", "S10"): (0.9, 1)}},
+            ),
+        },
+    )
+    monkeypatch.setattr(
+        utils, "get_phosphosites", _loader("phosphosites", {("hgnc:2", "S", "10")})
+    )
+    version = ["db:1"]
+    monkeypatch.setattr(utils, "get_graph_version", lambda client: version[0])
+
+    db_path = tmp_path / "cache.db"
+    client = _PingClient()
+    utils.build_sqlite_cache(db_path=db_path, client=client)
+    assert sorted(calls) == [
+        "entity_to_targets", "go", "kinase_phosphosites", "phosphosites"
+    ]
+    assert set(utils.get_sqlite_cache_versions(db_path)) == set(calls)
+    assert utils.get_go(client=client, sqlite_db_path=db_path) == {
+        ("go:1", "a"): {"1", "2"},
+        ("go:2", None): {"3"},
+    }
+    assert utils.get_sqlite_genes_with_confidence_cache(
+        "kinase_phosphosites", sqlite_db_path=db_path
+    ) == {("hgnc:1", "A"): {("hgnc:2", "B", "S10"): (0.9, 1)}}
+    assert utils.get_sqlite_phosphosite_count(db_path) == 1
+
+    # Up to date datasets are skipped
+    calls.clear()
+    utils.build_sqlite_cache(db_path=db_path, client=client)
+    assert calls == []
+
+    # Only the selected datasets are rebuilt
+    utils.build_sqlite_cache(db_path=db_path, client=client, datasets=["go"], force=True)
+    assert calls == ["go"]
+
+    # A new graph version makes all datasets stale
+    calls.clear()
+    version[0] = "db:2"
+    utils.build_sqlite_cache(db_path=db_path, client=client, workers=1)
+    assert len(calls) == 4
+    assert utils.get_sqlite_phosphosite_count(db_path) == 1
+
+
+def test_extend_by_ontology_closure(monkeypatch):
+    import networkx as nx
+
+    from indra_cogex.client.enrichment import utils
+
+    class _Ontology(nx.DiGraph):
+        _initialized = True
+
+        @staticmethod
+        def label(ns, id):
+            return f"{ns}:{id}"
+
+    ontology = _Ontology()
+    # Edges point from the more specific term to the more general one
+    for child, parent, rel in [
+        ("0000003", "0000002", "isa"),
+        ("0000002", "0000001", "isa"),
+        ("0000004", "0000001", "partof"),
+        ("0000006", "0000005", "isa"),
+        ("0000005", "0000002", "isa"),
+        ("0000009", "0000001", "xref"),
+        ("0000007", "0000008", "isa"),
+        ("0000008", "0000007", "isa"),
+    ]:
+        ontology.add_edge(f"GO:GO:{child}", f"GO:GO:{parent}", type=rel)
+    monkeypatch.setattr(utils, "bio_ontology", ontology)
+
+    gene_set_mapping = {
+        ("go:0000001", "root"): {"1"},
+        ("go:0000002", "middle"): {"2"},
+        ("go:0000003", "leaf"): {"3"},
+        ("go:0000004", "part"): {"4"},
+        # Reached through a term that has no genes of its own
+        ("go:0000006", "deep leaf"): {"6"},
+        ("go:0000009", "not a child"): {"9"},
+        ("go:0000007", "cycle a"): {"7"},
+        ("go:0000008", "cycle b"): {"8"},
+        ("reactome:R-HSA-1", "not in ontology"): {"10"},
+    }
+    utils.extend_by_ontology(gene_set_mapping)
+    assert gene_set_mapping == {
+        ("go:0000001", "root"): {"1", "2", "3", "4", "6"},
+        ("go:0000002", "middle"): {"2", "3", "6"},
+        ("go:0000003", "leaf"): {"3"},
+        ("go:0000004", "part"): {"4"},
+        ("go:0000006", "deep leaf"): {"6"},
+        ("go:0000009", "not a child"): {"9"},
+        ("go:0000007", "cycle a"): {"7", "8"},
+        ("go:0000008", "cycle b"): {"7", "8"},
+        ("reactome:R-HSA-1", "not in ontology"): {"10"},
+    }
@@ -0,0 +1,107 @@
+"""Tests for the graph statistics service."""
+
+import csv
+import gzip
+from collections import Counter
+from unittest import mock
+
+import pytest
+
+from indra_cogex.client.graph_stats import (
+    GraphStats,
+    build_graph_stats_manifest,
+    get_cached_graph_version,
+    get_graph_stats,
+    get_graph_version,
+    load_graph_stats_manifest,
+)
+
+
+def _write_nodes(path, rows):
+    with gzip.open(path, "wt") as fh:
+        writer = csv.writer(fh, delimiter="\t")
+        writer.writerow(["id:ID", ":LABEL", "name:string"])
+        writer.writerows(rows)
+
+
+def test_build_graph_stats_manifest(tmp_path):
+    nodes_a = tmp_path / "nodes_BioEntity.tsv.gz"
+    nodes_b = tmp_path / "nodes_Publication.tsv.gz"
+    _write_nodes(
+        nodes_a,
+        [
+            ["HGNC:6407", "BioEntity", "KRAS"],
+            ["HGNC:1097", "BioEntity", "BRAF"],
+            ["MESH:D008545", "BioEntity", "Melanoma"],
+            ["HGNC:6407", "BioEntity", "KRAS"],
+        ],
+    )
+    _write_nodes(
+        nodes_b, [["PUBMED:123", "Publication", ""], ["HGNC:1097", "BioEntity", ""]]
+    )
+    manifest_path = tmp_path / "manifest.json"
+
+    manifest = build_graph_stats_manifest(
+        [nodes_a, nodes_b], manifest_path=manifest_path
+    )
+    assert manifest["prefix_counts"] == {"HGNC": 2, "MESH": 1, "PUBMED": 1}
+    assert manifest["graph_version"] is None
+    assert load_graph_stats_manifest(manifest_path) == manifest
+
+
+def test_graph_stats_manifest_version(tmp_path):
+    nodes = tmp_path / "nodes_BioEntity.tsv.gz"
+    _write_nodes(nodes, [["HGNC:6407", "BioEntity", "KRAS"]])
+    manifest_path = tmp_path / "manifest.json"
+    manifest = build_graph_stats_manifest([nodes], manifest_path=manifest_path)
+
+    # A graph created before the manifest was built is not the one it counts
+    assert load_graph_stats_manifest(
+        manifest_path, graph_version="db:2000-01-01T00:00:00Z"
+    ) is None
+    # The first graph created after it is, and the manifest is stamped
+    version = "db:2999-01-01T00:00:00.000000000+00:00"
+    assert load_graph_stats_manifest(manifest_path, graph_version=version) == {
+        **manifest, "graph_version": version
+    }
+    assert load_graph_stats_manifest(manifest_path)["graph_version"] == version
+    # Later graphs don't match the stamped version
+    assert load_graph_stats_manifest(
+        manifest_path, graph_version="db2:3000-01-01T00:00:00Z"
+    ) is None
+
+
+def test_load_missing_manifest(tmp_path):
+    assert load_graph_stats_manifest(tmp_path / "missing.json") is None
+
+
+def test_graph_stats_json_round_trip():
+    stats = GraphStats(
+        graph_version="abc:2024-01-01",
+        node_counts=Counter({"BioEntity": 3}),
+        edge_counts=Counter({"isa": 2}),
+        prefix_counts=Counter({"HGNC": 2, "MESH": 1}),
+    )
+    assert GraphStats.from_json(stats.to_json()) == stats
+
+
+def test_get_cached_graph_version():
+    client = mock.Mock(_url="bolt://test-graph-version")
+    client.query_tx.return_value = [["db", "2024-01-01"]]
+    assert get_cached_graph_version(client) == "db:2024-01-01"
+    assert get_cached_graph_version(client) == "db:2024-01-01"
+    assert client.query_tx.call_count == 1
+    client.query_tx.return_value = [["db", "2024-02-01"]]
+    assert get_cached_graph_version(client, refresh=True) == "db:2024-02-01"
+    with mock.patch("indra_cogex.client.graph_stats.time.time", return_value=1e12):
+        get_cached_graph_version(client)
+    assert client.query_tx.call_count == 3
+
+
+@pytest.mark.nonpublic
+def test_get_graph_stats():
+    stats = get_graph_stats(refresh=True)
+    assert stats.graph_version == get_graph_version()
+    assert stats.node_counts["BioEntity"] > 0
+    assert stats.edge_counts["indra_rel"] > 0
+    assert stats.prefix_counts["hgnc"] > 0
@@ -0,0 +1,79 @@
+"""Tests for the pre-ranked GSEA implementation."""
+
+import numpy as np
+
+from indra_cogex.client.enrichment.continuous import (
+    GSEA_RETURN_COLUMNS,
+    _get_permutation_executor,
+    gsea,
+    prerank,
+)
+
+SCORES = {f"{i}": float(score) for i, score in enumerate(range(10, 0, -1))}
+
+
+def _running_sum_es(scores, gene_set):
+    """Compute the enrichment score with an explicit running sum."""
+    ranking = sorted(scores, key=scores.get, reverse=True)
+    hits = [gene in gene_set for gene in ranking]
+    hit_total = sum(abs(scores[g]) for g in ranking if g in gene_set)
+    miss_step = 1 / (len(ranking) - sum(hits))
+    running, values = 0.0, []
+    for gene, hit in zip(ranking, hits):
+        running += abs(scores[gene]) / hit_total if hit else -miss_step
+        values.append(running)
+    return max(values) if max(values) > -min(values) else min(values)
+
+
+def test_enrichment_scores():
+    gene_sets = {
+        "top": {"0", "1", "3"},
+        "bottom": {"9", "8", "5"},
+        "mixed": {"0", "9", "4", "missing"},
+    }
+    rv = prerank(SCORES, gene_sets, permutation_num=0).set_index("Term")
+    for term, genes in gene_sets.items():
+        assert np.isclose(rv.loc[term, "ES"], _running_sum_es(SCORES, genes))
+    assert rv.loc["top", "Tag %"] == "3/3"
+    assert rv.loc["bottom", "Tag %"] == "3/3"
+    assert rv.loc["mixed", "Tag %"] == "1/3"
+
+
+def test_significance():
+    rng = np.random.default_rng(0)
+    scores = {f"{i}": score for i, score in enumerate(rng.normal(size=500))}
+    ranking = sorted(scores, key=scores.get, reverse=True)
+    gene_sets = {
+        "top": set(ranking[:20]),
+        "bottom": set(ranking[-20:]),
+        "random": set(rng.choice(ranking, 20, replace=False)),
+    }
+    rv = prerank(scores, gene_sets, permutation_num=300, seed=1).set_index("Term")
+    assert rv.loc["top", "NES"] > 0 and rv.loc["bottom", "NES"] < 0
+    assert rv.loc["top", "NOM p-val"] < 0.01
+    assert rv.loc["bottom", "NOM p-val"] < 0.01
+    assert rv.loc["random", "NOM p-val"] > 0.01
+    assert rv["FDR q-val"].between(0, 1).all()
+
+    # The same seed gives the same result, independent of the number of
+    # processes
+    other = prerank(scores, gene_sets, permutation_num=300, seed=1, threads=2)
+    assert np.allclose(rv["NES"], other.set_index("Term").loc[rv.index, "NES"])
+
+    # The processes are reused by later calls
+    executor = _get_permutation_executor(1)
+    prerank(scores, gene_sets, permutation_num=300, seed=1, threads=2)
+    assert _get_permutation_executor(2) is executor
+
+
+def test_gsea_columns():
+    gene_sets = {
+        ("go:1", "top"): {0, 1, 3},
+        ("go:2", "bottom"): {9, 8, 5},
+        ("go:3", "too small"): {100},
+    }
+    rv = gsea(SCORES, gene_sets, permutation_num=50)
+    assert list(rv.columns) == [c for c in GSEA_RETURN_COLUMNS if c != "statements"]
+    assert set(rv["Term"]) == {"go:1", "go:2"}
+    assert dict(zip(rv["Term"], rv["Name"])) == {"go:1": "top", "go:2": "bottom"}
+    assert dict(zip(rv["Term"], rv["geneset_size"])) == {"go:1": "3", "go:2": "3"}
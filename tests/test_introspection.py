@@ -0,0 +1,125 @@
+"""Tests for the MCP function registry."""
+
+import sys
+import textwrap
+
+import pytest
+
+from indra_cogex.apps.queries_web.introspection import (
+    FunctionSearchIndex,
+    build_function_registry,
+)
+
+MODULE_SOURCE = '''
+def get_genes_for_pathway(pathway, limit: int = 10, *, client) -> list:
+    """Get the genes in a pathway."""
+
+
+def get_pathways_for_gene(gene, *, client) -> list:
+    """Get the pathways a gene is part of."""
+
+
+def is_drug_target(drug, target, *, client) -> bool:
+    """Check if a drug targets a protein."""
+
+
+def undocumented(gene, *, client) -> list:
+    pass
+'''
+
+CATEGORIES = {
+    "biological_pathways": {
+        "functions": ["get_genes_for_pathway", "get_pathways_for_gene"],
+    },
+    "drug_targets": {"functions": ["is_drug_target"]},
+}
+
+
+def _get_docstring(func, skip_params=None):
+    if func.__doc__ is None:
+        raise ValueError(f"Missing docstring of {func.__name__}")
+    return func.__doc__, func.__doc__
+
+
+@pytest.fixture
+def module_name(tmp_path):
+    name = "introspection_test_module"
+    (tmp_path / f"{name}.py").write_text(textwrap.dedent(MODULE_SOURCE))
+    sys.path.insert(0, str(tmp_path))
+    yield name
+    sys.path.remove(str(tmp_path))
+    sys.modules.pop(name, None)
+
+
+def _build_registry(module_name, cache_path, get_docstring=_get_docstring):
+    from indra_cogex.apps.api_spec import LazyFunctions
+
+    module_functions = [
+        (module_name, name)
+        for name in [
+            "get_genes_for_pathway",
+            "get_pathways_for_gene",
+            "is_drug_target",
+            "undocumented",
+        ]
+    ]
+    return build_function_registry(
+        module_functions,
+        LazyFunctions(module_functions),
+        CATEGORIES,
+        {"biological_pathways": "Pathways", "drug_targets": "Drug targets"},
+        {"pathway": ["wikipathways", "WP1"], "gene": {"default": ["hgnc", "1"]}},
+        skip_global={"client"},
+        skip_arguments={"get_genes_for_pathway": {"limit"}},
+        get_docstring_func=get_docstring,
+        cache_path=cache_path,
+    )
+
+
+def test_build_function_registry(module_name, tmp_path):
+    cache_path = tmp_path / "registry.json"
+    registry = _build_registry(module_name, cache_path)
+    assert set(registry) == {
+        "get_genes_for_pathway", "get_pathways_for_gene", "is_drug_target"
+    }
+    metadata = registry["get_genes_for_pathway"]
+    assert metadata.category == "biological_pathways"
+    assert metadata.category_description == "Pathways"
+    assert metadata.module_name == module_name
+    assert metadata.parameters == {
+        "pathway": {
+            "type": "<class 'inspect._empty'>",
+            "required": True,
+            "default": None,
+            "example": ["wikipathways", "WP1"],
+        },
+    }
+    assert registry["get_pathways_for_gene"].parameters["gene"]["example"] == ["hgnc", "1"]
+
+    # The registry is rebuilt from the cache without importing the module
+    sys.modules.pop(module_name)
+    calls = []
+
+    def get_docstring(func, skip_params=None):
+        calls.append(func)
+        return _get_docstring(func, skip_params)
+
+    assert _build_registry(module_name, cache_path, get_docstring) == registry
+    assert not calls
+    assert module_name not in sys.modules
+
+
+def test_function_search_index(module_name, tmp_path):
+    index = FunctionSearchIndex(_build_registry(module_name, tmp_path / "registry.json"))
+    names = [metadata.name for metadata in index.search("pathway genes")]
+    assert names == ["get_genes_for_pathway", "get_pathways_for_gene"]
+    # Prefixes match too, but names rank higher than descriptions
+    assert [metadata.name for metadata in index.search("drug")] == ["is_drug_target"]
+    assert [metadata.name for metadata in index.search("pathw", limit=1)] == [
+        "get_genes_for_pathway"
+    ]
+    assert index.search("pathway", categories=["drug_targets"]) == []
+    assert index.search("unknown") == []
+    assert [metadata.name for metadata in index.get_category("drug_targets")] == [
+        "is_drug_target"
+    ]
@@ -0,0 +1,149 @@
+"""Tests for the background analysis job queue."""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from indra_cogex.analysis.jobs import (
+    JobError,
+    JobLimitError,
+    JobQueue,
+    report_progress,
+)
+
+started = threading.Event()
+release = threading.Event()
+
+
+def add(a, b):
+    report_progress("Adding")
+    return a + b
+
+
+def fail():
+    raise RuntimeError("broken")
+
+
+def block():
+    started.set()
+    while not release.wait(0.01):
+        report_progress("Waiting")
+    return "done"
+
+
+FUNCTIONS = {"add": add, "fail": fail, "block": block}
+
+
+def wait_for(queue, job_id, statuses=("finished", "failed", "cancelled")):
+    for _ in range(500):
+        status = queue.get_status(job_id)
+        if status["status"] in statuses:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {status['status']}")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    started.clear()
+    release.clear()
+    queue = JobQueue(tmp_path / "jobs.db", workers=1, user_limit=2, functions=FUNCTIONS)
+    yield queue
+    release.set()
+    queue.shutdown()
+
+
+def test_run_job(queue):
+    job_id = queue.submit("add", {"a": 1, "b": 2}, "alice")
+    status = wait_for(queue, job_id)
+    assert status["status"] == "finished"
+    assert status["progress"] == "Adding"
+    assert status["function"] == "add"
+    assert queue.get_result(job_id) == 3
+
+    with pytest.raises(KeyError):
+        queue.get_result("missing")
+    assert queue.get_status("missing") is None
+    with pytest.raises(JobError):
+        queue.submit("missing", {}, "alice")
+
+
+def test_failed_job(queue):
+    job_id = queue.submit("fail", {}, "alice")
+    status = wait_for(queue, job_id)
+    assert status["status"] == "failed"
+    assert status["error"] == "broken"
+    with pytest.raises(JobError):
+        queue.get_result(job_id)
+
+
+def test_user_limit_and_cancel(queue):
+    running_id = queue.submit("block", {}, "alice")
+    assert started.wait(5)
+    queued_id = queue.submit("add", {"a": 1, "b": 2}, "alice")
+    assert queue.get_status(queued_id)["position"] == 0
+    with pytest.raises(JobLimitError):
+        queue.submit("add", {"a": 1, "b": 2}, "alice")
+    # Other users have their own limit
+    other_id = queue.submit("add", {"a": 2, "b": 2}, "bob")
+    assert queue.get_status(other_id)["position"] == 1
+
+    assert queue.cancel(queued_id)
+    assert queue.get_status(queued_id)["status"] == "cancelled"
+    assert queue.cancel(running_id)
+    assert wait_for(queue, running_id)["status"] == "cancelled"
+    assert not queue.cancel(running_id)
+
+    assert queue.get_result(wait_for(queue, other_id)["id"]) == 4
+    queue.submit("add", {"a": 1, "b": 2}, "alice")
+
+
+def test_expire(queue):
+    job_id = queue.submit("add", {"a": 1, "b": 2}, "alice")
+    wait_for(queue, job_id)
+    assert queue.expire() == 0
+    queue.expiry = -1
+    assert queue.expire() == 1
+    assert queue.get_status(job_id) is None
+
+
+def test_recover_interrupted(tmp_path):
+    path = tmp_path / "jobs.db"
+    queue = JobQueue(path, workers=1, functions=FUNCTIONS)
+    queue.shutdown()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user, function, parameters, status, pid, created) "
+            "VALUES ('a', 'alice', 'add', x'', 'running', 999999999, 0)"
+        )
+    conn.close()
+    queue = JobQueue(path, workers=1, functions=FUNCTIONS)
+    status = queue.get_status("a")
+    assert status["status"] == "failed"
+    assert status["error"] == "Interrupted"
+    queue.shutdown()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="Needs procfs")
+def test_recover_reused_pid(tmp_path):
+    path = tmp_path / "jobs.db"
+    queue = JobQueue(path, workers=1, functions=FUNCTIONS)
+    queue.shutdown()
+    # The pid is alive but belongs to a process started after the job's worker
+    worker = f"{socket.gethostname()}:{os.getpid()}:0"
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user, function, parameters, status, pid, "
+            "worker, created) VALUES ('a', 'alice', 'add', x'', 'running', ?, ?, 0)",
+            (os.getpid(), worker),
+        )
+    conn.close()
+    queue = JobQueue(path, workers=1, functions=FUNCTIONS)
+    assert queue.get_status("a")["status"] == "failed"
+    queue.shutdown()
@@ -0,0 +1,145 @@
+"""Tests for the statement and evidence JSON store."""
+
+import json
+from unittest import mock
+
+import pytest
+from indra.statements import Agent, Evidence, Phosphorylation
+
+from indra_cogex import json_store
+from indra_cogex.json_store import JsonStore, get_json_store
+from indra_cogex.representation import Relation, indra_stmts_from_relations
+
+
+def test_json_store(tmp_path):
+    store = JsonStore(tmp_path / "store.db")
+    assert not store.exists()
+    store.create()
+    assert get_json_store(tmp_path / "store.db") is not None
+
+    store.put_stmt_jsons([(1, {"type": "Complex"}), (-2, '{"type": "Activation"}')])
+    assert store.get_stmt_jsons([1, -2, 3]) == {
+        1: {"type": "Complex"},
+        -2: {"type": "Activation"},
+    }
+
+    store.put_evidence_jsons(
+        [
+            ("indra_evidence:0", 1, {"text": "a"}),
+            ("indra_evidence:1", 1, {"text": "b"}),
+            ("indra_evidence:2", -2, '{"text": "c"}'),
+        ]
+    )
+    assert store.get_evidence_jsons([1, -2]) == {
+        1: [{"text": "a"}, {"text": "b"}],
+        -2: [{"text": "c"}],
+    }
+    assert store.get_evidence_jsons(["1"], limit=1) == {1: [{"text": "a"}]}
+    assert store.get_evidence_jsons_by_id(["indra_evidence:2", "missing"]) == {
+        "indra_evidence:2": {"text": "c"}
+    }
+
+
+def test_recreate_clears_table(tmp_path):
+    store = JsonStore(tmp_path / "store.db")
+    store.create()
+    store.put_stmt_jsons([(1, {"type": "Complex"})])
+    store.put_evidence_jsons([("indra_evidence:0", 1, {"text": "a"})])
+    # Rewriting the statements leaves the evidences of the other processor
+    store.create(clear="statements")
+    store.put_stmt_jsons([(2, {"type": "Activation"})])
+    assert store.get_stmt_jsons([1, 2]) == {2: {"type": "Activation"}}
+    assert store.get_evidence_jsons([1]) == {1: [{"text": "a"}]}
+    store.create(clear="evidences")
+    assert store.get_evidence_jsons([1]) == {}
+    with pytest.raises(ValueError):
+        store.create(clear="meta")
+
+
+def test_graph_version(tmp_path):
+    store = JsonStore(tmp_path / "store.db")
+    store.create()
+    assert store.get_graph_version() is None
+    # A store that isn't stamped is only used if the graph version is unknown
+    assert get_json_store(tmp_path / "store.db", graph_version="a") is None
+    assert get_json_store(tmp_path / "store.db") is not None
+
+    store.set_graph_version("a")
+    assert store.get_graph_version() == "a"
+    assert get_json_store(tmp_path / "store.db", graph_version="a") is not None
+    assert get_json_store(tmp_path / "store.db", graph_version="b") is None
+
+    # Rewriting the store removes the stamp
+    store.create()
+    assert store.get_graph_version() is None
+
+
+def test_missing_store(tmp_path):
+    assert get_json_store(tmp_path / "missing.db") is None
+    assert json_store.get_stmt_jsons([1], path=tmp_path / "missing.db") == {}
+
+
+def test_stmts_from_relations_with_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_store, "JSON_STORE_PATH", tmp_path / "store.db")
+    stmt = Phosphorylation(
+        Agent("MAP2K1", db_refs={"HGNC": "6840"}),
+        Agent("MAPK1", db_refs={"HGNC": "6871"}),
+        evidence=[Evidence(source_api="reach", text="MEK phosphorylates ERK")],
+    )
+    stmt_hash = stmt.get_hash()
+    store = JsonStore()
+    store.create()
+    store.put_stmt_jsons([(stmt_hash, stmt.to_json())])
+
+    rel = Relation(
+        "HGNC", "6840", "HGNC", "6871", "indra_rel",
+        data={"stmt_hash": stmt_hash, "evidence_count": 1},
+    )
+    stmts = indra_stmts_from_relations(
+        [rel], stmt_jsons=store.get_stmt_jsons([stmt_hash])
+    )
+    assert len(stmts) == 1
+    assert stmts[0].get_hash() == stmt_hash
+    assert stmts[0].evidence[0].text == "MEK phosphorylates ERK"
+
+    # Relations without a statement JSON aren't dropped silently
+    with pytest.raises(ValueError):
+        indra_stmts_from_relations([rel])
+
+
+def test_stmts_missing_from_store(tmp_path, monkeypatch):
+    from indra_cogex.client import queries
+
+    monkeypatch.setattr(json_store, "JSON_STORE_PATH", tmp_path / "store.db")
+    stmts = [
+        Phosphorylation(
+            Agent("MAP2K1", db_refs={"HGNC": "6840"}),
+            Agent(name, db_refs={"HGNC": hgnc_id}),
+            evidence=[Evidence(source_api="reach", text=name)],
+        )
+        for name, hgnc_id in [("MAPK1", "6871"), ("MAPK3", "6877")]
+    ]
+    hashes = [stmt.get_hash() for stmt in stmts]
+    store = JsonStore()
+    store.create()
+    store.put_stmt_jsons([(hashes[0], stmts[0].to_json())])
+    store.set_graph_version("a")
+
+    client = mock.MagicMock()
+    monkeypatch.setattr(queries, "get_cached_graph_version", lambda client: "a")
+
+    def query_tx(query, **kwargs):
+        if "RETURN DISTINCT r.stmt_hash, r.stmt_json" in query:
+            assert kwargs["stmt_hashes"] == [hashes[1]]
+            return [[hashes[1], json.dumps(stmts[1].to_json())]]
+        assert "RETURN p" not in query
+        return [
+            ["hgnc:6840", f"hgnc:{stmt.sub.db_refs['HGNC']}",
+             {"stmt_hash": stmt_hash, "evidence_count": 1}]
+            for stmt, stmt_hash in zip(stmts, hashes)
+        ]
+
+    client.query_tx.side_effect = query_tx
+    # The statement missing from the store is taken from the graph
+    rv = queries.get_stmts_for_stmt_hashes(hashes, evidence_limit=1, client=client)
+    assert [stmt.get_hash() for stmt in rv] == hashes
@@ -0,0 +1,123 @@
+"""Tests for the MeSH postings index."""
+
+import csv
+import gzip
+from unittest import mock
+
+from indra_cogex.client.mesh_index import (
+    MeshPostingsIndex,
+    build_mesh_postings_index,
+    build_mesh_postings_index_from_tsv,
+)
+from indra_cogex.client.queries import _get_mesh_indexed_hashes
+
+
+def test_postings(tmp_path):
+    build_mesh_postings_index(
+        [
+            ("mesh:D1", 30, 1),
+            ("mesh:D1", -10, 2),
+            ("mesh:D1", 30, 2),
+            ("mesh:D2", 20, 5),
+            ("mesh:D2", 30, 1),
+        ],
+        path=tmp_path / "index",
+    )
+    index = MeshPostingsIndex.load(tmp_path / "index")
+    assert len(index) == 2
+    assert "mesh:D1" in index
+    assert "mesh:D3" not in index
+
+    hashes, counts = index.get_postings("mesh:D1")
+    assert hashes.tolist() == [-10, 30]
+    assert counts.tolist() == [2, 3]
+
+    assert index.get_stmt_hash_counts(["mesh:D1"]) == [(30, 3), (-10, 2)]
+    assert index.get_stmt_hash_counts(["mesh:D1", "mesh:D2", "mesh:D3"]) == [
+        (20, 5),
+        (30, 4),
+        (-10, 2),
+    ]
+    assert index.get_stmt_hash_counts(["mesh:D1", "mesh:D2"], limit=1) == [(20, 5)]
+    assert index.get_stmt_hash_counts(["mesh:D3"]) == []
+
+    assert index.has_stmt_hashes(["mesh:D1"], [30, 20, -10, 99]).tolist() == [
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert index.has_stmt_hashes(
+        ["mesh:D1", "mesh:D2", "mesh:D3"], [20, 99, 30]
+    ).tolist() == [True, False, True]
+    assert index.has_stmt_hashes(["mesh:D3"], [30]).tolist() == [False]
+
+
+def _write_tsv(path, header, rows):
+    with gzip.open(path, "wt") as fh:
+        writer = csv.writer(fh, delimiter="\t")
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_build_from_tsv(tmp_path):
+    evidence_nodes = tmp_path / "nodes_Evidence.tsv.gz"
+    citations = tmp_path / "evidence_edges.tsv.gz"
+    annotations = tmp_path / "publication_edges.tsv.gz"
+    _write_tsv(
+        evidence_nodes,
+        ["id:ID", ":LABEL", "evidence:string", "stmt_hash:int"],
+        [
+            ["indra_evidence:0", "Evidence", '{"text": "a\\tb"}', "100"],
+            ["indra_evidence:1", "Evidence", "{}", "100"],
+            ["indra_evidence:2", "Evidence", "{}", "200"],
+        ],
+    )
+    _write_tsv(
+        citations,
+        [":START_ID", ":END_ID", ":TYPE"],
+        [
+            ["indra_evidence:0", "pubmed:1", "has_citation"],
+            ["indra_evidence:1", "pubmed:2", "has_citation"],
+            ["indra_evidence:2", "pubmed:2", "has_citation"],
+        ],
+    )
+    _write_tsv(
+        annotations,
+        [":START_ID", ":END_ID", ":TYPE", "is_major_topic:boolean"],
+        [
+            ["pubmed:1", "mesh:D1", "annotated_with", "true"],
+            ["pubmed:2", "mesh:D1", "annotated_with", "false"],
+            ["pubmed:2", "mesh:D2", "annotated_with", "false"],
+            ["pubmed:3", "mesh:D3", "annotated_with", "false"],
+        ],
+    )
+    index = build_mesh_postings_index_from_tsv(
+        evidence_nodes, citations, annotations, path=tmp_path / "index"
+    )
+    assert len(index) == 2
+    assert index.get_stmt_hash_counts(["mesh:D1"]) == [(100, 2), (200, 1)]
+    assert index.get_stmt_hash_counts(["mesh:D2"]) == [(100, 1), (200, 1)]
+
+
+def test_get_mesh_indexed_hashes():
+    index = build_mesh_postings_index(
+        [("mesh:D1", stmt_hash, 1) for stmt_hash in range(0, 100, 3)]
+        + [("mesh:D2", 50, 1)]
+    )
+    read = []
+
+    def rows():
+        for stmt_hash in range(100, 0, -1):
+            read.append(stmt_hash)
+            yield stmt_hash, stmt_hash
+
+    with mock.patch("indra_cogex.client.queries.MESH_HASH_BATCH_SIZE", 10):
+        assert _get_mesh_indexed_hashes(rows(), index, ["mesh:D1", "mesh:D2"], 4) == [
+            99, 96, 93, 90
+        ]
+        # Rows are only read a batch at a time until there are enough hashes
+        assert len(read) == 20
+        assert _get_mesh_indexed_hashes(
+            [(50, 1), (50, 1), (51, 1), (48, 1)], index, ["mesh:D2"], None
+        ) == [50]
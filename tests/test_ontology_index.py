@@ -0,0 +1,108 @@
+"""Tests for the ontology closure index."""
+
+import csv
+import gzip
+from unittest import mock
+
+from indra_cogex.client.index_loader import IndexLoader
+from indra_cogex.client.ontology_index import (
+    OntologyIndex,
+    build_ontology_index,
+    iter_ontology_edges_from_tsv,
+)
+
+# child -> parent, with a diamond below "root" and a cycle between c and d
+EDGES = [
+    ("a", "root"),
+    ("b", "root"),
+    ("c", "a"),
+    ("c", "b"),
+    ("d", "c"),
+    ("c", "d"),
+    ("e", "d"),
+    ("f", "other_root"),
+]
+
+
+def test_descendants_and_ancestors(tmp_path):
+    build_ontology_index(EDGES, path=tmp_path / "index")
+    index = OntologyIndex.load(tmp_path / "index")
+    assert len(index) == 8
+
+    assert index.get_descendants("root") == {"a", "b", "c", "d", "e"}
+    assert index.get_descendants("a") == {"c", "d", "e"}
+    assert index.get_descendants("c") == {"d", "e"}
+    assert index.get_descendants("e") == set()
+    assert index.get_descendants("missing") == set()
+
+    assert index.get_ancestors("e") == {"a", "b", "c", "d", "root"}
+    assert index.get_ancestors("f") == {"other_root"}
+    assert index.get_ancestors("root") == set()
+
+
+def test_isa_or_partof():
+    index = build_ontology_index(EDGES)
+    assert index.isa_or_partof("e", "root")
+    assert index.isa_or_partof("c", "d")
+    assert index.isa_or_partof("d", "c")
+    assert not index.isa_or_partof("root", "e")
+    assert not index.isa_or_partof("a", "b")
+    assert not index.isa_or_partof("f", "root")
+    assert not index.isa_or_partof("a", "a")
+    assert not index.isa_or_partof("a", "missing")
+
+
+def test_edges_from_tsv(tmp_path):
+    edges_path = tmp_path / "edges.tsv.gz"
+    with gzip.open(edges_path, "wt") as fh:
+        writer = csv.writer(fh, delimiter="\t")
+        writer.writerow([":START_ID", ":END_ID", ":TYPE"])
+        writer.writerow(["mesh:D2", "mesh:D1", "isa"])
+        writer.writerow(["go:2", "go:1", "partof"])
+        writer.writerow(["hgnc:1", "go:1", "associated_with"])
+    assert list(iter_ontology_edges_from_tsv([edges_path])) == [
+        ("mesh:D2", "mesh:D1"),
+        ("go:2", "go:1"),
+    ]
+
+
+def test_save_swaps_directory(tmp_path):
+    path = tmp_path / "index"
+    build_ontology_index(EDGES, path=path, meta={"graph_version": "1"})
+    first = path.resolve()
+    build_ontology_index(EDGES, path=path, meta={"graph_version": "2"})
+    second = path.resolve()
+    build_ontology_index(EDGES, path=path, meta={"graph_version": "3"})
+    assert path.is_symlink()
+    assert OntologyIndex.load(path).meta["graph_version"] == "3"
+    # The previous build is kept for processes still loading it
+    assert not first.exists()
+    assert second.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["index", second.name, path.resolve().name]
+    )
+
+
+def test_index_loader(tmp_path):
+    tmp_path = tmp_path / "index"
+    client = mock.Mock()
+    loader = IndexLoader("ontology index", OntologyIndex.load, recheck_interval=0)
+    version = "graph-loader-test:1"
+    with mock.patch(
+        "indra_cogex.client.index_loader.get_cached_graph_version",
+        side_effect=lambda client: version,
+    ):
+        # A missing index isn't remembered
+        assert loader.get(tmp_path, client) is None
+        build_ontology_index(EDGES, path=tmp_path, meta={"graph_version": version})
+        index = loader.get(tmp_path, client)
+        assert index is not None
+        assert loader.get(tmp_path, client) is index
+
+        # Indexes of another graph or without a version aren't used
+        version = "graph-loader-test:2"
+        assert loader.get(tmp_path, client) is None
+        build_ontology_index(EDGES, path=tmp_path)
+        assert loader.get(tmp_path, client) is None
+        build_ontology_index(EDGES, path=tmp_path, meta={"graph_version": version})
+        assert loader.get(tmp_path, client).meta["graph_version"] == version
@@ -0,0 +1,156 @@
+"""Tests for query time budgets and admission control."""
+
+import socket
+import time
+from unittest import mock
+
+import neo4j.exceptions
+import pytest
+
+from indra_cogex.apps.query_limits import (
+    AdmissionError,
+    ConcurrencyLimiter,
+    is_client_disconnected,
+    iter_limited,
+)
+from indra_cogex.client.neo4j_client import Neo4jClient
+from indra_cogex.client.query_budget import (
+    QueryCancelledError,
+    QueryTimeoutError,
+    get_query_budget,
+    make_query_budget,
+    query_budget,
+)
+
+
+def test_query_budget():
+    assert get_query_budget() is None
+    cancelled = []
+    with query_budget(10, is_cancelled=lambda: bool(cancelled), metadata={"a": 1}) as outer:
+        assert get_query_budget() is outer
+        assert 9 < outer.get_transaction_timeout() <= 10
+        # An inner budget ends with the outer one and is cancelled with it
+        with query_budget(60, metadata={"b": 2}) as inner:
+            assert inner.remaining() <= 10
+            assert inner.metadata == {"a": 1, "b": 2}
+            cancelled.append(True)
+            with pytest.raises(QueryCancelledError):
+                inner.check()
+        assert get_query_budget() is outer
+    assert get_query_budget() is None
+
+    with query_budget(0.01) as budget:
+        time.sleep(0.02)
+        with pytest.raises(QueryTimeoutError):
+            budget.get_transaction_timeout()
+
+
+def _make_client():
+    client = Neo4jClient.__new__(Neo4jClient)
+    client.driver = mock.MagicMock()
+    session = client.driver.session.return_value.__enter__.return_value
+    session.execute_read.return_value = (["n"], [[1]])
+    return client, session
+
+
+def test_query_tx_budget():
+    client, session = _make_client()
+    assert client.query_tx("RETURN 1", squeeze=True) == [1]
+    tx_func = session.execute_read.call_args[0][0]
+    assert getattr(tx_func, "timeout", None) is None
+
+    with query_budget(5, metadata={"function": "get_statements"}):
+        client.query_tx("RETURN 1")
+    tx_func = session.execute_read.call_args[0][0]
+    assert 4 < tx_func.timeout <= 5
+    assert tx_func.metadata == {"function": "get_statements"}
+
+    # Transactions aborted by Neo4j for taking too long
+    error = neo4j.exceptions.ClientError._hydrate_neo4j(
+        code="Neo.ClientError.Transaction.TransactionTimedOut", message="timed out"
+    )
+    session.execute_read.side_effect = error
+    with pytest.raises(QueryTimeoutError):
+        client.query_tx("RETURN 1")
+
+    # Cancelled budgets don't run more queries
+    session.execute_read.reset_mock()
+    with query_budget(5, is_cancelled=lambda: True), pytest.raises(QueryCancelledError):
+        client.query_tx("RETURN 1")
+    session.execute_read.assert_not_called()
+
+
+def test_concurrency_limiter():
+    limiter = ConcurrencyLimiter(max_concurrent=3, max_per_user=2)
+    with limiter.admit("a"), limiter.admit("a"):
+        with pytest.raises(AdmissionError) as err:
+            with limiter.admit("a"):
+                pass
+        assert err.value.retry_after == 1
+        with limiter.admit("b"):
+            assert limiter.get_stats()["running"] == 3
+            with pytest.raises(AdmissionError):
+                with limiter.admit("c"):
+                    pass
+    stats = limiter.get_stats()
+    assert stats["running"] == 0
+    assert stats["users"] == 0
+    assert stats["rejected"] == 2
+    # Slots are freed when a query fails
+    with pytest.raises(RuntimeError), limiter.admit("a"):
+        raise RuntimeError
+    assert limiter.get_stats()["running"] == 0
+
+
+def test_is_client_disconnected():
+    assert not is_client_disconnected({})
+    server, client = socket.socketpair()
+    try:
+        environ = {"gunicorn.socket": server}
+        assert not is_client_disconnected(environ)
+        # Data sent by a client that is still connected isn't consumed
+        client.sendall(b"x")
+        assert not is_client_disconnected(environ)
+        assert server.recv(1) == b"x"
+        client.close()
+        assert is_client_disconnected(environ)
+    finally:
+        server.close()
+
+
+def test_iter_limited():
+    limiter = ConcurrencyLimiter(max_concurrent=1)
+    budget = make_query_budget(10)
+    budgets = []
+
+    def items():
+        for i in range(3):
+            budgets.append(get_query_budget())
+            yield i
+
+    stream = iter_limited(items, budget, limiter.admit("a"))
+    # The first item is computed right away, outside the budget's context
+    assert budgets == [budget]
+    assert get_query_budget() is None
+    assert limiter.get_stats()["running"] == 1
+    assert list(stream) == [0, 1, 2]
+    assert budgets == [budget] * 3
+    assert get_query_budget() is None
+    assert limiter.get_stats()["running"] == 0
+
+    # Closing a stream that was never read releases the admission
+    stream = iter_limited(items, budget, limiter.admit("a"))
+    with pytest.raises(AdmissionError):
+        iter_limited(items, budget, limiter.admit("a"))
+    stream.close()
+    assert limiter.get_stats()["running"] == 0
+
+    # A query failing before its first item fails before streaming
+    def failing():
+        raise QueryTimeoutError("The query took too long")
+        yield
+
+    with pytest.raises(QueryTimeoutError):
+        iter_limited(failing, budget, limiter.admit("a"))
+    assert limiter.get_stats()["running"] == 0
+    assert list(iter_limited(lambda: iter(()), budget)) == []
@@ -0,0 +1,54 @@
+"""Tests for the query API response cache."""
+
+import os
+import time
+
+from indra_cogex.apps.response_cache import (
+    ResponseCache,
+    get_response_cache_key,
+    make_etag,
+)
+
+
+def test_response_cache():
+    cache = ResponseCache(max_size=10_000, ttl=60)
+    assert cache.get("a") is None
+
+    body = b'[{"id": "hgnc:6871"}]'
+    etag = cache.put("a", body)
+    assert etag == make_etag(body)
+    assert cache.get("a") == (etag, body)
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["entries"] == 1
+    assert 0 < stats["size"] < len(body) + 20
+
+    cache.clear()
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_response_cache_bounds():
+    # Random bytes don't compress, so each entry takes about 4 kB
+    cache = ResponseCache(max_size=10_000, ttl=60)
+    for key in "abc":
+        cache.put(key, os.urandom(4000))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+    cache = ResponseCache(max_size=10_000, ttl=0.01)
+    cache.put("a", b"[]")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_response_cache_key():
+    key = get_response_cache_key("get_genes_for_go_term", {"a": 1, "b": [2]}, "v1")
+    assert key == get_response_cache_key(
+        "get_genes_for_go_term", {"b": [2], "a": 1}, "v1"
+    )
+    assert key != get_response_cache_key(
+        "get_genes_for_go_term", {"a": 1, "b": [2]}, "v2"
+    )
+    assert key != get_response_cache_key("get_go_terms_for_gene", {"a": 1, "b": [2]}, "v1")
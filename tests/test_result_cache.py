@@ -0,0 +1,107 @@
+"""Tests for the analysis result cache."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indra_cogex.analysis import result_cache
+from indra_cogex.analysis.result_cache import (
+    ResultCache,
+    cache_analysis_result,
+    get_fingerprint,
+)
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "cache.db", max_size=1000)
+    assert cache.get("a") == (False, None)
+    cache.put("a", b"x" * 400)
+    cache.put("b", b"x" * 400)
+    assert cache.get("a") == (True, b"x" * 400)
+    # b is now the least recently used entry and gets evicted
+    cache.put("c", b"x" * 400)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+    # Results larger than the cache are not stored
+    cache.put("d", b"x" * 2000)
+    assert not cache.get("d")[0]
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+
+    cache.clear()
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_lookups_are_read_only(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = ResultCache(path, max_size=1000)
+    cache.put("a", b"x")
+    cache.get("a")
+    cache.get("b")
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT * FROM counters").fetchall() == []
+    conn.close()
+    # The collected accesses are written with the next result or the stats
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_fingerprint():
+    version = "db:1"
+    fp = get_fingerprint(
+        "f", {"genes": ["b", "a", "a"], "alpha": 0.05}, version, unordered=["genes"]
+    )
+    assert fp == get_fingerprint(
+        "f", {"alpha": 0.05, "genes": ["a", "b"]}, version, unordered=["genes"]
+    )
+    # Order matters unless the argument is marked as unordered
+    assert get_fingerprint("f", {"genes": ["b", "a"]}, version) != get_fingerprint(
+        "f", {"genes": ["a", "b"]}, version
+    )
+    assert fp != get_fingerprint(
+        "f", {"genes": ["a", "b"], "alpha": 0.01}, version, unordered=["genes"]
+    )
+    assert fp != get_fingerprint(
+        "f", {"genes": ["a", "b"], "alpha": 0.05}, "db:2", unordered=["genes"]
+    )
+    assert fp == get_fingerprint(
+        "f", {"genes": np.array(["a", "b"]), "alpha": np.float64(0.05)}, version,
+        unordered=["genes"],
+    )
+    assert get_fingerprint("f", {"m": {1: "a"}}, version) != get_fingerprint(
+        "f", {"m": {"1": "a"}}, version
+    )
+    # Values without a canonical encoding aren't keyed by their repr
+    with pytest.raises(TypeError):
+        get_fingerprint("f", {"genes": object()}, version)
+
+
+def test_cache_analysis_result(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache.db", max_size=10 ** 6)
+    monkeypatch.setattr(result_cache, "get_result_cache", lambda: cache)
+    monkeypatch.setattr(result_cache, "_get_data_version", lambda client: "db:1")
+    calls = []
+
+    @cache_analysis_result(unordered=("genes",))
+    def analysis(genes, alpha=0.05, *, client):
+        calls.append(genes)
+        return pd.DataFrame({"gene": sorted(genes), "alpha": alpha})
+
+    first = analysis(["b", "a"], client=None)
+    second = analysis(["a", "b"], alpha=0.05, client=None)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    analysis(["a", "b"], 0.01, client=None)
+    assert len(calls) == 2
+    assert cache.get_stats()["hits"] == 1
+
+    # Arguments without a canonical encoding are run without the cache
+    analysis([object()], client=None)
+    analysis([object()], client=None)
+    assert len(calls) == 4
@@ -0,0 +1,76 @@
+"""Tests for the JSON serialization of query results."""
+
+import json
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask, jsonify
+from indra.statements import Agent, Evidence, Phosphorylation
+
+from indra_cogex.apps import serialization
+from indra_cogex.apps.serialization import JSONProvider, dumps
+from indra_cogex.representation import Node, Relation
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_dumps(encoder):
+    node = Node("HGNC", "6407", ["BioEntity"], {"name": "KRAS"})
+    rel = Relation("HGNC", "6407", "GO", "GO:0005525", "associated_with", {"x": 1})
+    evidence = Evidence(source_api="reach", text="A phosphorylates B")
+    stmt = Phosphorylation(Agent("A"), Agent("B"), evidence=[evidence])
+    result = {
+        "nodes": [[node]],
+        "relations": (rel,),
+        "stmts": [stmt],
+        "evidence": evidence,
+        "df": pd.DataFrame({"a": [1, 2], "b": [0.5, 1.5]}),
+        "numpy": [np.int64(3), np.float32(0.5), np.bool_(True), np.arange(2)],
+        "set": {"x"},
+        "counter": Counter("aab"),
+        "generator": (i for i in range(2)),
+        "date": datetime(2018, 11, 29, 18, 0, 8),
+    }
+    assert json.loads(dumps(result)) == {
+        "nodes": [[node.to_json()]],
+        "relations": [json.loads(json.dumps(rel.to_json()))],
+        "stmts": [stmt.to_json()],
+        "evidence": evidence.to_json(),
+        "df": [{"a": 1, "b": 0.5}, {"a": 2, "b": 1.5}],
+        "numpy": [3, 0.5, True, [0, 1]],
+        "set": ["x"],
+        "counter": {"a": 2, "b": 1},
+        "generator": [0, 1],
+        "date": "Thu, 29 Nov 2018 18:00:08 GMT",
+    }
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+def test_dumps_key_order_and_nan(encoder):
+    assert dumps({"b": 1, "a": {"d": 2, "c": 3}}) == b'{"a":{"c":3,"d":2},"b":1}'
+    if encoder == "orjson":
+        assert dumps([float("nan"), np.inf]) == b"[null,null]"
+    else:
+        assert dumps([float("nan"), np.inf]) == b"[NaN,Infinity]"
+
+
+def test_json_provider():
+    app = Flask(__name__)
+    app.json = JSONProvider(app)
+    node = Node("HGNC", "6407", ["BioEntity"], {"name": "KRAS"})
+    with app.app_context():
+        response = jsonify([node])
+        assert response.mimetype == "application/json"
+        assert response.get_json() == [node.to_json()]
+        assert json.loads(app.json.dumps({"n": np.int64(1)}, indent=2)) == {"n": 1}
@@ -0,0 +1,100 @@
+"""Tests for reverse causal reasoning."""
+
+from collections import OrderedDict
+from unittest import mock
+
+import scipy.stats
+
+from indra_cogex.client.enrichment import signed
+
+POSITIVE = {
+    ("hgnc:1", "A"): {"1", "2", "3", "10"},
+    ("hgnc:2", "B"): {"4", "5"},
+    ("hgnc:3", "C"): {"1"},
+}
+NEGATIVE = {
+    ("hgnc:1", "A"): {"3", "4"},
+    ("hgnc:2", "B"): {"1", "2", "11", "12"},
+}
+
+
+def test_reverse_causal_reasoning(monkeypatch):
+    monkeypatch.setattr(signed, "get_positive_stmt_sets", lambda **_: POSITIVE)
+    monkeypatch.setattr(signed, "get_negative_stmt_sets", lambda **_: NEGATIVE)
+    monkeypatch.setattr(signed, "_get_stmt_sets_version", lambda client: None)
+    df = signed.reverse_causal_reasoning(
+        positive_hgnc_ids=["1", "2", "3"],
+        negative_hgnc_ids=["4", "5", "6"],
+        client=object(),
+    )
+    # C regulates fewer than 4 genes so it is skipped
+    assert list(df.columns) == [
+        "curie",
+        "name",
+        "correct",
+        "incorrect",
+        "ambiguous",
+        "binom_pvalue",
+        "binom_ambig_pvalue",
+    ]
+    rows = {row.curie: row for row in df.itertuples()}
+    assert set(rows) == {"hgnc:1", "hgnc:2"}
+
+    # A: 1 and 2 are correct, 3 is in both sets, 4 is correct, 5 and 6 are
+    # not regulated
+    a = rows["hgnc:1"]
+    assert (a.correct, a.incorrect, a.ambiguous) == (3, 0, 3)
+    assert a.binom_pvalue == scipy.stats.binomtest(3, 3, alternative="greater").pvalue
+    assert a.binom_ambig_pvalue == scipy.stats.binomtest(
+        3, 6, alternative="greater"
+    ).pvalue
+
+    # B: 1, 2, 4 and 5 are regulated in the opposite direction, 3 and 6 are
+    # not regulated
+    b = rows["hgnc:2"]
+    assert (b.correct, b.incorrect, b.ambiguous) == (0, 4, 2)
+    assert b.binom_pvalue == 1.0
+
+
+def test_reverse_causal_reasoning_filter(monkeypatch):
+    monkeypatch.setattr(signed, "get_positive_stmt_sets", lambda **_: POSITIVE)
+    monkeypatch.setattr(signed, "get_negative_stmt_sets", lambda **_: NEGATIVE)
+    monkeypatch.setattr(signed, "_get_stmt_sets_version", lambda client: None)
+    df = signed.reverse_causal_reasoning(
+        positive_hgnc_ids=["1", "2", "3"],
+        negative_hgnc_ids=["4", "5", "6"],
+        keep_insignificant=False,
+        alpha=0.2,
+        client=object(),
+    )
+    assert list(df["curie"]) == ["hgnc:1"]
+
+
+def test_signed_matrix_cache(monkeypatch):
+    positive = mock.Mock(return_value=POSITIVE)
+    monkeypatch.setattr(signed, "get_positive_stmt_sets", positive)
+    monkeypatch.setattr(signed, "get_negative_stmt_sets", lambda **_: NEGATIVE)
+    version = mock.Mock(return_value="1")
+    monkeypatch.setattr(signed, "_get_stmt_sets_version", version)
+    monkeypatch.setattr(signed, "_SIGNED_MATRICES", OrderedDict())
+
+    for hgnc_ids in (["1", "2"], ["4", "99"]):
+        df = signed.reverse_causal_reasoning(
+            positive_hgnc_ids=hgnc_ids, negative_hgnc_ids=[], client=object()
+        )
+        assert set(df["curie"]) == {"hgnc:1", "hgnc:2"}
+    # The matrix is built once per version of the statement sets
+    assert positive.call_count == 1
+    version.return_value = "2"
+    signed.reverse_causal_reasoning(
+        positive_hgnc_ids=["1"], negative_hgnc_ids=[], client=object()
+    )
+    assert positive.call_count == 2
+
+    signed_matrix = signed.get_signed_matrix(client=object())
+    entities, genes, matrix = signed_matrix.get_submatrix(["3", "1", "99"], 1)
+    assert entities == [("hgnc:1", "A"), ("hgnc:2", "B"), ("hgnc:3", "C")]
+    assert genes == ["1", "3"]
+    assert matrix.toarray().tolist() == [[1, 0], [-1, 0], [1, 0]]
+    entities, _, _ = signed_matrix.get_submatrix(["1"], 4)
+    assert entities == [("hgnc:1", "A"), ("hgnc:2", "B")]
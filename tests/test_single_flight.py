@@ -0,0 +1,128 @@
+"""Tests for sharing identical concurrent graph queries."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from indra_cogex.client.neo4j_client import Neo4jClient
+from indra_cogex.client.query_budget import QueryCancelledError, query_budget
+from indra_cogex.client.single_flight import SingleFlight, get_query_key
+
+
+def _run_concurrently(single_flight, key, func, n=5):
+    """Run a blocking function from several threads once all have started."""
+    coalesced = single_flight.get_stats()["coalesced"] + n - 1
+    with ThreadPoolExecutor(n) as executor:
+        futures = [executor.submit(single_flight.do, key, func) for _ in range(n)]
+        while single_flight.get_stats()["coalesced"] < coalesced:
+            time.sleep(0.001)
+        return futures
+
+
+def test_get_query_key():
+    assert get_query_key("RETURN $a, $b", {"a": 1, "b": [1, 2]}) == get_query_key(
+        "RETURN $a, $b", {"b": [1, 2], "a": 1}
+    )
+    assert get_query_key("RETURN $a", {"a": 1}) != get_query_key("RETURN $a", {"a": 2})
+    assert get_query_key("RETURN $a", {"a": object()}) is None
+
+
+def test_single_flight():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        return ["n"], [[1], [2]]
+
+    futures = _run_concurrently(single_flight, "key", func)
+    release.set()
+    results = [future.result() for future in futures]
+    assert len(calls) == 1
+    assert all(result == (["n"], [[1], [2]]) for result in results)
+    # Callers get their own rows
+    results[0][1][0].append(3)
+    assert results[1][1][0] == [1]
+    stats = single_flight.get_stats()
+    assert stats["executed"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["memo_size"] == 0
+
+    # Without memo, later calls run again
+    single_flight.do("key", func)
+    assert len(calls) == 2
+
+
+def test_single_flight_errors():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def cancelled():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            raise QueryCancelledError
+        return ["n"], [[1]]
+
+    # The callers waiting for a cancelled query run it themselves
+    futures = _run_concurrently(single_flight, "key", cancelled, n=3)
+    release.set()
+    with pytest.raises(QueryCancelledError):
+        futures[0].result()
+    assert [future.result() for future in futures[1:]] == [(["n"], [[1]])] * 2
+    assert single_flight.get_stats()["retried"] == 2
+
+    # Other errors are shared
+    release.clear()
+
+    def failing():
+        release.wait(5)
+        raise ValueError
+
+    futures = _run_concurrently(single_flight, "other", failing, n=3)
+    release.set()
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+
+
+def test_single_flight_memo():
+    single_flight = SingleFlight(memo_ttl=0.05, memo_size=1)
+    func = mock.Mock(return_value=(["n"], [[1]]))
+    assert single_flight.do("a", func) == (["n"], [[1]])
+    assert single_flight.do("a", func) == (["n"], [[1]])
+    assert func.call_count == 1
+    assert single_flight.get_stats()["memo_hits"] == 1
+    # The least recently used result is dropped
+    single_flight.do("b", func)
+    single_flight.do("a", func)
+    assert func.call_count == 3
+    time.sleep(0.06)
+    single_flight.do("a", func)
+    assert func.call_count == 4
+    single_flight.clear()
+    assert single_flight.get_stats()["memo_size"] == 0
+
+
+def test_query_tx_coalescing():
+    client = Neo4jClient.__new__(Neo4jClient)
+    client.driver = mock.MagicMock()
+    client.single_flight = SingleFlight(memo_ttl=60)
+    session = client.driver.session.return_value.__enter__.return_value
+    session.execute_read.return_value = (["n"], [[1]])
+    assert client.query_tx("RETURN $a", a=1, squeeze=True) == [1]
+    assert client.query_tx("RETURN $a", a=1, squeeze=True) == [1]
+    assert session.execute_read.call_count == 1
+    client.query_tx("RETURN $a", a=2)
+    assert session.execute_read.call_count == 2
+    # Callers that already ran out of time don't wait
+    with query_budget(5, is_cancelled=lambda: True), pytest.raises(QueryCancelledError):
+        client.query_tx("RETURN $a", a=3)
+    assert session.execute_read.call_count == 2
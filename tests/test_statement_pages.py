@@ -0,0 +1,120 @@
+"""Tests for the page-by-page rendering of statement lists."""
+
+import json
+import time
+
+from indra.statements import Activation, Agent, Evidence
+
+from indra_cogex.apps.statement_pages import (
+    ResultStore,
+    RowCache,
+    StatementResults,
+    get_row_key,
+    rank_statements,
+    stmt_row_to_json,
+)
+
+
+def _make_stmt(name, sources):
+    evidence = [Evidence(source_api=source, text=f"{name} {i}") for i, source in enumerate(sources)]
+    return Activation(Agent(name), Agent("B"), evidence=evidence)
+
+
+def test_rank_statements():
+    a = _make_stmt("A", ["reach"])
+    b = _make_stmt("B", ["medscan"])
+    c = _make_stmt("C", ["sparser", "medscan"])
+    d = _make_stmt("D", ["reach"])
+    counts = {a.get_hash(): 1, b.get_hash(): 5, c.get_hash(): 2, d.get_hash(): 1}
+    assert rank_statements([a, b, c, d], counts) == [c, a, d]
+    assert rank_statements([d, b, c, a], counts, remove_medscan=False) == [b, c, d, a]
+
+
+def test_result_store():
+    stmts = [_make_stmt("A", ["reach"] * 3), _make_stmt("C", ["reach"])]
+    counts = {stmt.get_hash(): 10 for stmt in stmts}
+    results = StatementResults(stmts, counts, source_counts={stmts[0].get_hash(): {"reach": 3}})
+    assert results.num_evidences == 4
+    assert results.get_statements([stmts[1].get_hash(), 123]) == [stmts[1]]
+    assert results.source_counts == {stmts[0].get_hash(): {"reach": 3}}
+
+    store = ResultStore(max_evidences=6)
+    first = store.put(results)
+    assert store.get(first) is results
+    assert store.get("unknown") is None
+    # The least recently used results are evicted
+    second = store.put(StatementResults(stmts[1:], counts))
+    third = store.put(StatementResults(stmts[:1], counts))
+    assert store.get(first) is None
+    assert store.get(second) is not None
+    assert store.get_stats() == {"results": 2, "evidences": 4}
+    # Results that can't be kept at all get no token
+    assert store.put(StatementResults(stmts * 2, counts)) is None
+    assert store.get(third) is not None
+
+    store = ResultStore(max_evidences=10, ttl=0.01)
+    token = store.put(results)
+    time.sleep(0.02)
+    assert store.get(token) is None
+    assert store.get_stats()["evidences"] == 0
+
+
+def test_shared_result_store(tmp_path):
+    stmts = [_make_stmt("A", ["reach"] * 3), _make_stmt("C", ["reach"])]
+    hashes = [stmt.get_hash() for stmt in stmts]
+    counts = {stmt_hash: 10 for stmt_hash in hashes}
+    curations = [{"pa_hash": hashes[0], "source_hash": 1, "tag": "correct"}]
+    path = tmp_path / "results.db"
+    token = ResultStore(max_evidences=6, path=path).put(
+        StatementResults(
+            stmts,
+            counts,
+            source_counts={hashes[0]: {"reach": 3}},
+            curations=curations,
+            remove_medscan=False,
+        )
+    )
+
+    # Another process only loads the statements of the page
+    other = ResultStore(max_evidences=6, path=path)
+    results = other.get(token, [hashes[0], 123])
+    assert [stmt.get_hash() for stmt in results.get_statements(hashes)] == hashes[:1]
+    assert len(results.get_statements(hashes)[0].evidence) == 3
+    assert results.evidence_counts == {hashes[0]: 10}
+    assert results.source_counts == {hashes[0]: {"reach": 3}}
+    assert results.curations == curations
+    assert results.remove_medscan is False
+    assert other.get(token).evidence_counts == counts
+    assert other.get("unknown") is None
+
+    # The oldest results of all processes are evicted from the file
+    other.put(StatementResults(stmts, counts))
+    assert ResultStore(max_evidences=6, path=path).get(token) is None
+
+
+def test_row_cache():
+    stmt = _make_stmt("A", ["reach", "sparser"])
+    kwargs = dict(total_evidence=2, sources=None, remove_medscan=True, curation_version=1)
+    key = get_row_key(stmt, **kwargs)
+    assert get_row_key(_make_stmt("A", ["reach", "sparser"]), **kwargs) == key
+    assert get_row_key(stmt, **{**kwargs, "curation_version": 2}) != key
+    assert get_row_key(_make_stmt("A", ["reach"]), **kwargs) != key
+
+    row = ("[]", '"A activates B."', '"1"', "{}", "2", "[]")
+    cache = RowCache(max_size=30)
+    assert cache.get(key) is None
+    cache.put(key, row)
+    assert cache.get(key) == row
+    cache.put("other", row)
+    assert cache.get(key) is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["rows"]) == (1, 2, 1)
+
+    assert json.loads(stmt_row_to_json(row)) == {
+        "ev_array": [],
+        "english": "A activates B.",
+        "hash": "1",
+        "sources": {},
+        "total_evidence": 2,
+        "badges": [],
+    }
@@ -0,0 +1,103 @@
+"""Tests for streaming query results as NDJSON."""
+
+import json
+
+import pandas as pd
+import pytest
+from flask import Flask, request
+
+from indra_cogex.apps.streaming import (
+    decode_cursor,
+    encode_cursor,
+    get_query_fingerprint,
+    iter_ndjson,
+    iter_positions,
+    wants_ndjson,
+)
+from indra_cogex.client.streaming import iter_publications_for_journal
+from indra_cogex.representation import Node
+
+
+def _dumps(obj):
+    return json.dumps(obj).encode("utf-8")
+
+
+def _read(chunks):
+    return [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+
+def test_wants_ndjson():
+    app = Flask(__name__)
+    with app.test_request_context("/", headers={"Accept": "application/x-ndjson"}):
+        assert wants_ndjson(request)
+    with app.test_request_context("/?stream=1"):
+        assert wants_ndjson(request)
+    with app.test_request_context("/", headers={"Accept": "application/json"}):
+        assert not wants_ndjson(request)
+    with app.test_request_context("/", headers={"Accept": "*/*"}):
+        assert not wants_ndjson(request)
+    with app.test_request_context("/"):
+        assert not wants_ndjson(request)
+
+
+def test_cursor():
+    fingerprint = get_query_fingerprint("f", {"a": 1})
+    assert fingerprint == get_query_fingerprint("f", {"a": 1})
+    assert fingerprint != get_query_fingerprint("f", {"a": 2})
+    cursor = encode_cursor(42, fingerprint)
+    assert decode_cursor(cursor, fingerprint) == 42
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, get_query_fingerprint("f", {"a": 2}))
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", fingerprint)
+
+
+def test_iter_positions():
+    assert list(iter_positions(["a", "b", "c"], offset=1)) == [(2, "b"), (3, "c")]
+    assert list(iter_positions({"f": True})) == [(1, {"f": True})]
+    df = pd.DataFrame({"x": [1, 2]})
+    assert list(iter_positions(df)) == [(1, {"x": 1}), (2, {"x": 2})]
+
+
+def test_iter_ndjson_pages():
+    items = list(iter_positions(range(5)))
+    lines = _read(iter_ndjson(items, _dumps, "abc", page_size=2, chunk_size=1))
+    assert lines[:2] == [0, 1]
+    offset = decode_cursor(lines[2]["next_cursor"], "abc")
+    lines = _read(iter_ndjson(iter_positions(range(5), offset), _dumps, "abc"))
+    assert lines == [2, 3, 4]
+
+
+def test_iter_ndjson_error():
+    def items():
+        yield 1, "a"
+        raise RuntimeError("broken")
+
+    assert _read(iter_ndjson(items(), _dumps, "abc")) == ["a", {"error": "broken"}]
+
+
+class FakeClient:
+    """A client returning rows after the requested offset."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.params = None
+
+    def query_tx_stream(self, query, offset=0, **query_params):
+        self.params = query_params
+        for curie in self.ids[offset:]:
+            yield [curie]
+
+    def neo4j_to_node(self, curie):
+        db_ns, db_id = curie.split(":")
+        return Node(db_ns, db_id, ["Publication"])
+
+
+def test_iter_publications_for_journal():
+    client = FakeClient(["pubmed:1", "pubmed:2", "pubmed:3"])
+    pairs = list(iter_publications_for_journal(("nlm", "0000201"), client=client))
+    assert client.params == {"journal_id": "nlm:0000201"}
+    assert [position for position, _ in pairs] == [1, 2, 3]
+    assert pairs[0][1].db_id == "1"
+    pairs = list(iter_publications_for_journal(("nlm", "0000201"), 2, client=client))
+    assert [(position, node.db_id) for position, node in pairs] == [(3, "3")]
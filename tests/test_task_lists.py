@@ -0,0 +1,81 @@
+"""Tests for the materialized curator task lists."""
+
+from unittest import mock
+
+from indra_cogex.apps.task_lists import (
+    TaskListStore,
+    get_task_list_page,
+    refresh_task_lists,
+)
+
+SOURCE_COUNTS = {
+    1: {"reach": 3},
+    2: {"reach": 10, "sparser": 2},
+    3: {"signor": 1},
+    4: {"reach": 5},
+}
+
+
+def test_task_list_store(tmp_path):
+    store = TaskListStore(tmp_path / "task_lists.db")
+    assert store.get_info("tf") is None
+    store.put("tf", SOURCE_COUNTS, "v1")
+    assert store.get_info("tf") == ("v1", 4)
+
+    page, has_more = store.get_page("tf", limit=2)
+    assert list(page) == [2, 4]
+    assert page[2] == {"reach": 10, "sparser": 2}
+    assert has_more
+    # Excluded statements don't count towards the offset
+    page, has_more = store.get_page("tf", offset=1, limit=2, exclude={2})
+    assert list(page) == [1, 3]
+    assert not has_more
+
+    store.put("tf", {5: {"reach": 1}}, "v2")
+    assert store.get_info("tf") == ("v2", 1)
+    assert store.get_page("tf") == ({5: {"reach": 1}}, False)
+
+
+def test_get_task_list_page(tmp_path):
+    store = TaskListStore(tmp_path / "task_lists.db")
+    view = mock.Mock(return_value=SOURCE_COUNTS)
+    client = object()
+
+    page, _ = get_task_list_page(
+        "tf", view, client=client, graph_version="v1", store=store, limit=1
+    )
+    assert page == {2: SOURCE_COUNTS[2]}
+    view.assert_called_once_with(client=client)
+    get_task_list_page("tf", view, client=client, graph_version="v1", store=store)
+    get_task_list_page("tf", view, client=client, graph_version=None, store=store)
+    assert view.call_count == 1
+
+    # An outdated list is kept while a refresher is running
+    assert store.acquire_refresh_lock()
+    get_task_list_page("tf", view, client=client, graph_version="v2", store=store)
+    assert view.call_count == 1
+    store.release_refresh_lock()
+    get_task_list_page("tf", view, client=client, graph_version="v2", store=store)
+    assert view.call_count == 2
+
+
+def test_refresh_task_lists(tmp_path):
+    store = TaskListStore(tmp_path / "task_lists.db")
+    views = {
+        "tf": mock.Mock(return_value=SOURCE_COUNTS),
+        "kinase": mock.Mock(side_effect=ValueError),
+    }
+    client = object()
+    assert refresh_task_lists(
+        views, client=client, store=store, graph_version="v1"
+    ) == ["tf"]
+    assert store.get_info("kinase") is None
+    views["kinase"].side_effect = None
+    views["kinase"].return_value = {}
+    assert refresh_task_lists(
+        views, client=client, store=store, graph_version="v1"
+    ) == ["kinase"]
+    assert refresh_task_lists(
+        views, client=client, store=store, graph_version="v2"
+    ) == ["tf", "kinase"]
+    assert views["tf"].call_count == 2
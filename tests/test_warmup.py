@@ -0,0 +1,59 @@
+"""Tests for warming up the web app."""
+
+from unittest import mock
+
+from flask import Flask
+
+from indra_cogex.apps import warmup
+from indra_cogex.apps.constants import INDRA_COGEX_EXTENSION
+
+
+def test_preload():
+    loaded = []
+
+    def fail(client):
+        raise ValueError("missing")
+
+    preloaders = {"a": loaded.append, "b": fail}
+    with mock.patch.dict(warmup.PRELOADERS, preloaders, clear=True), \
+            mock.patch.dict(warmup._STATUS, clear=True):
+        ready, resources = warmup.get_readiness()
+        assert not ready
+        assert resources == {"a": {"status": "pending"}, "b": {"status": "pending"}}
+
+        client = object()
+        resources = warmup.preload(client)
+        assert loaded == [client]
+        assert resources["a"]["status"] == "ready"
+        assert resources["b"]["status"] == "failed"
+        assert resources["b"]["error"] == "missing"
+        assert warmup.get_readiness()[0]
+
+        # Loaded resources aren't loaded again
+        warmup.preload(client)
+        assert loaded == [client]
+
+
+def test_ready_endpoint():
+    app = Flask(__name__)
+    app.extensions[INDRA_COGEX_EXTENSION] = client = mock.Mock()
+    started = []
+    with mock.patch.dict(warmup.PRELOADERS, {"a": lambda client: None}, clear=True), \
+            mock.patch.dict(warmup._STATUS, clear=True), \
+            mock.patch.dict(warmup._PIDS, clear=True), \
+            mock.patch.object(warmup, "_WORKER_STARTERS", [started.append]), \
+            mock.patch.object(warmup, "preload") as preload:
+        warmup.init_warmup(app)
+        response = app.test_client().get("/ready")
+        assert response.status_code == 503
+        assert response.get_json()["resources"] == {"a": {"status": "pending"}}
+        # The first request started the worker in the process that loaded the app
+        preload.assert_called_once_with(client)
+        assert started == [app]
+        client.reconnect.assert_not_called()
+
+        warmup._STATUS["a"] = {"status": "ready", "seconds": 0.1}
+        response = app.test_client().get("/ready")
+        assert response.status_code == 200
+        assert response.get_json()["ready"]
+        assert started == [app]